@@ -7,18 +7,31 @@ This script orchestrates the entire process:
 3. Generated Manim .py Scripts -> ManimRenderer (Video Rendering)
 """
 
+import argparse
 import logging
 import os
 import json  # For pretty printing outputs if needed
+import re
 import asyncio
 import time  # NEW: For timing measurements
 from functools import partial
 
 from project_drishti.didactic_scripter import DidacticScripter
 from project_drishti.visual_architect import VisualArchitect
-from project_drishti.manim_renderer import ManimRenderer
+from project_drishti.manim_renderer import RENDER_TIER_FINAL, RENDER_TIER_QA, ManimRenderer
 from project_drishti.video_analyzer import VideoAnalyzer
 from project_drishti import config # To check for API key and use settings
+from project_drishti.http_clients import aclose_async_http_clients
+from project_drishti.scheduling import PipelineStages, ResourceLimits, StagePool
+from project_drishti.adaptive_concurrency import AdaptiveConcurrency
+from project_drishti.usage_tracker import UsageTracker, empty_totals, usage_difference
+from project_drishti.run_manifest import (
+    RunManifest,
+    STAGE_ANALYZED,
+    STAGE_FINALIZED,
+    STAGE_RENDERED,
+    STAGE_SCRIPT_GENERATED,
+)
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,32 +39,214 @@ logger = logging.getLogger("MainPipeline")
 
 MAX_RENDER_ATTEMPTS = 3 # Maximum number of rendering attempts for a single scene
 
-# Helper function to wrap architect call for returning scene_data
-def generate_manim_script_for_scene_wrapper(architect_instance, scene_data, topic_title_str):
-    script_path, manim_class_name = architect_instance.generate_manim_code_for_scene(
-        scene_data,
-        topic_title=topic_title_str
-    )
-    logger.info(f"generate_manim_script_for_scene_wrapper completed for scene: {scene_data.get('title', 'Unknown')}, returning: {(script_path, manim_class_name, scene_data)}")
-    return script_path, manim_class_name, scene_data
+async def fix_script_for_scene_async(
+    architect_instance: VisualArchitect,
+    scene_data: dict,
+    topic_title_str: str,
+    script_path: str,
+    error_message: str | None,
+    analysis_verdict: str | None,
+    limits: ResourceLimits
+):
+    """
+    Fix stage job: patches the failing script in place (see `VisualArchitect.fix_manim_code_for_scene`)
+    while holding one of the topic's LLM slots. Returns (None, None) if no valid patch was found.
+    """
+    with open(script_path, "r") as f:
+        faulty_script_content = f.read()
+    async with limits.llm.slot(topic_title_str):
+        script_path, manim_class_name = await architect_instance.fix_manim_code_for_scene_async(
+            scene_data,
+            topic_title=topic_title_str,
+            faulty_code_content=faulty_script_content,
+            error_message=error_message,
+            script_path=script_path,
+            analysis_verdict=analysis_verdict
+        )
+    logger.info(f"fix_script_for_scene_async completed for scene: {scene_data.get('title', 'Unknown')}, returning: {(script_path, manim_class_name)}")
+    return script_path, manim_class_name
 
-# NEW Helper function to wrap architect fix call
-def fix_manim_script_for_scene_wrapper(
+async def generate_script_for_scene_async(
     architect_instance: VisualArchitect,
-    original_scene_data: dict, # For context like title, narration
+    scene_data: dict,
+    topic_title_str: str,
+    limits: ResourceLimits,
+    output_namespace: str | None = None,
+    candidate_id: str | None = None,
+    sample: str | int = 1
+):
+    """
+    Generates a scene's script through the async OpenRouter client while holding one of the topic's
+    LLM slots. `sample` labels the attempt (or candidate) so each retry gets its own cached completion.
+    """
+    script_prefix = f"{output_namespace}__" if output_namespace else ""
+    if candidate_id:
+        # Speculative candidates of the same scene need their own script (and therefore video) paths
+        script_prefix += f"{candidate_id}__"
+    async with limits.llm.slot(topic_title_str):
+        script_path, manim_class_name = await architect_instance.generate_manim_code_for_scene_async(
+            scene_data,
+            topic_title=topic_title_str,
+            script_prefix=script_prefix,
+            sample=sample
+        )
+    logger.info(f"generate_script_for_scene_async completed for scene: {scene_data.get('title', 'Unknown')}, returning: {(script_path, manim_class_name)}")
+    return script_path, manim_class_name, scene_data
+
+async def render_script_async(
+    renderer_instance: ManimRenderer,
+    script_path: str,
+    manim_class_name: str,
+    topic_title_str: str,
+    limits: ResourceLimits,
+    tier: str = RENDER_TIER_FINAL
+):
+    """
+    Render stage job: runs Manim as an asyncio subprocess while holding a render slot. Returns the
+    render result and its duration. If the job is cancelled, the Manim process group is killed.
+    """
+    async with limits.render.slot(topic_title_str):
+        rd_start = time.perf_counter()
+        render_success, video_path, render_error = await renderer_instance.render_scene_async(
+            script_path, manim_class_name, tier=tier, render_slots=limits.render
+        )
+        return render_success, video_path, render_error, time.perf_counter() - rd_start
+
+def analysis_render_tier() -> str:
+    """The tier rendered for video analysis: a QA preview in two-tier mode, else the final quality."""
+    return RENDER_TIER_QA if config.RENDER_QA_FIRST else RENDER_TIER_FINAL
+
+async def _render_final_quality(
+    renderer_instance: ManimRenderer,
+    script_path: str,
+    manim_class_name: str,
+    topic_title_str: str,
+    limits: ResourceLimits,
+    stages: PipelineStages,
+    attempt_metrics: dict,
+    scene_title: str
+) -> tuple[str | None, str | None]:
+    """
+    Two-tier mode: renders a script whose QA render passed analysis at MANIM_QUALITY_FLAG. It goes
+    through the render stage like any render, so it overlaps with other scenes' QA renders.
+    Adds its duration to the attempt's render time. Returns (video path, None) or (None, error).
+    """
+    logger.info(f"QA render of '{scene_title}' passed; rendering it at final quality.")
+    try:
+        render_success, video_path, render_error, render_time = await run_stage_with_deadline(
+            stages.render, config.RENDER_TIMEOUT_SECONDS, topic_title_str, render_script_async,
+            renderer_instance, script_path, manim_class_name, topic_title_str, limits, RENDER_TIER_FINAL
+        )
+    except asyncio.TimeoutError:
+        attempt_metrics["render_time"] += config.RENDER_TIMEOUT_SECONDS
+        attempt_metrics["status"] = "Timed Out"
+        return None, f"Final quality Manim render timed out after {config.RENDER_TIMEOUT_SECONDS:.0f} seconds."
+    attempt_metrics["render_time"] += render_time
+    if not render_success:
+        return None, render_error or "Final quality render failed."
+    return video_path, None
+
+async def compress_video_async(
+    video_analyzer_instance: VideoAnalyzer,
+    video_path: str
+):
+    """
+    Compress stage job: downscales the render for analysis. Returns the compressed path (or None)
+    and the duration. If the job is cancelled, the ffmpeg process group is killed.
+    """
+    cp_start = time.perf_counter()
+    compressed_path = await video_analyzer_instance.compress_video_async(video_path)
+    return compressed_path, time.perf_counter() - cp_start
+
+async def analyze_video_async(
+    video_analyzer_instance: VideoAnalyzer,
+    compressed_path: str,
+    scene_narration: str,
     topic_title_str: str,
-    faulty_script_content: str,
-    error_message: str
+    limits: ResourceLimits,
+    scene_title: str | None = None
 ):
-    script_path, manim_class_name = architect_instance.fix_manim_code_for_scene(
-        scene_data=original_scene_data,
-        topic_title=topic_title_str,
-        faulty_code_content=faulty_script_content,
-        error_message=error_message
+    """Analyze stage job: uploads to Gemini while holding a Gemini slot. Returns (passed, verdict, duration)."""
+    async with limits.gemini.slot(topic_title_str):
+        an_start = time.perf_counter()
+        analysis_passed, analysis_reason = await video_analyzer_instance.analyze_compressed_video_async(
+            compressed_path,
+            scene_narration,
+            topic_title=topic_title_str,
+            scene_title=scene_title
+        )
+        return analysis_passed, analysis_reason, time.perf_counter() - an_start
+
+async def run_stage_with_deadline(pool: StagePool, timeout: float, key: str, fn, *args):
+    """
+    Runs a job on a stage pool with a deadline (0 disables it). When the deadline passes, the
+    job is cancelled, which kills its subprocess group and frees its slot, and
+    asyncio.TimeoutError is raised.
+    """
+    return await asyncio.wait_for(pool.run(key, fn, *args), timeout=timeout or None)
+
+def _cancelled_attempt_status(metrics_tracker: dict, scene_title: str) -> str:
+    """Status for an attempt interrupted by cancellation: the scene deadline, or a plain cancel."""
+    return "Timed Out" if metrics_tracker[scene_title]["status"] == "Timed Out" else "Cancelled"
+
+def _record_attempt(metrics_tracker: dict, scene_title: str, attempt_metrics: dict, attempt_usage: dict | None = None):
+    """Totals an attempt's timings, attaches the LLM/Gemini usage it caused and appends it to the scene's details."""
+    attempt_metrics["total_time"] = (
+        attempt_metrics["script_gen_time"]
+        + attempt_metrics["render_time"]
+        + attempt_metrics["compress_time"]
+        + attempt_metrics["analysis_time"]
     )
-    # Return original_scene_data to maintain consistency with generate_manim_script_for_scene_wrapper if its result structure is used similarly
-    logger.info(f"fix_manim_script_for_scene_wrapper completed for scene: {original_scene_data.get('title', 'Unknown')}, returning: {(script_path, manim_class_name, original_scene_data)}")
-    return script_path, manim_class_name, original_scene_data
+    if attempt_usage is not None:
+        attempt_metrics["usage"] = attempt_usage
+    metrics_tracker[scene_title]["attempt_details"].append(attempt_metrics)
+
+async def _record_exemplar(
+    architect_instance: VisualArchitect,
+    scene_data: dict,
+    topic_title_str: str,
+    script_path: str,
+    manim_class_name: str,
+    video_path: str | None
+):
+    """Keeps the script of a scene that passed analysis as an example for later topics (see exemplar_store)."""
+    exemplar_store = getattr(architect_instance, "exemplar_store", None)
+    if exemplar_store is None:
+        return
+    await asyncio.to_thread(exemplar_store.add, scene_data, topic_title_str, script_path, manim_class_name, video_path)
+
+class PipelineResources:
+    """
+    Stage instances, stage worker pools and global resource limits shared by every
+    topic run in this process.
+    """
+
+    def __init__(self, limits: ResourceLimits | None = None):
+        self.scripter = DidacticScripter()
+        self.architect = VisualArchitect()
+        self.renderer = ManimRenderer()
+        self.video_analyzer = VideoAnalyzer()
+        self.limits = limits or ResourceLimits()
+        self.stages = PipelineStages()
+        self.concurrency = AdaptiveConcurrency(self.limits) if config.ADAPTIVE_CONCURRENCY else None
+        # Token usage and cost of every LLM and Gemini call, checked against the configured budgets
+        self.usage = UsageTracker()
+        for stage in (self.scripter, self.architect, self.video_analyzer):
+            stage.usage_tracker = self.usage
+            if self.concurrency:
+                stage.api_observer = self.concurrency.observe_api_call
+
+    def start(self):
+        """Starts the adaptive concurrency controller on the running loop."""
+        if self.concurrency:
+            self.concurrency.start()
+
+    async def close(self):
+        """Stops the stage workers and the concurrency controller, and closes the pooled async HTTP clients."""
+        await self.stages.close()
+        if self.concurrency:
+            await self.concurrency.stop()
+        await aclose_async_http_clients()
 
 async def render_scene_with_retries(
     *,  # enforce keyword usage for new arg backwards compatibility
@@ -65,12 +260,86 @@ async def render_scene_with_retries(
     topic_title_str: str,
     metrics_tracker: dict,
     initial_script_gen_time: float = 0.0,
-    max_retries: int = MAX_RENDER_ATTEMPTS
+    max_retries: int = MAX_RENDER_ATTEMPTS,
+    manifest: RunManifest | None = None,
+    initial_video_path: str | None = None,
+    limits: ResourceLimits | None = None,
+    output_namespace: str | None = None,
+    stages: PipelineStages | None = None,
+    candidates: int = 1,
+    usage_tracker: UsageTracker | None = None
 ) -> str | None:
+    limits = limits or ResourceLimits()
+    owns_stages = stages is None
+    stages = stages or PipelineStages()
+    if candidates > 1:
+        attempt_loop = partial(_render_scene_speculative, candidates=candidates)
+    else:
+        attempt_loop = _render_scene_attempts
+    try:
+        return await attempt_loop(
+            initial_script_path=initial_script_path,
+            initial_manim_class_name=initial_manim_class_name,
+            original_scene_data=original_scene_data,
+            architect_instance=architect_instance,
+            renderer_instance=renderer_instance,
+            video_analyzer_instance=video_analyzer_instance,
+            loop=loop,
+            topic_title_str=topic_title_str,
+            metrics_tracker=metrics_tracker,
+            initial_script_gen_time=initial_script_gen_time,
+            max_retries=max_retries,
+            manifest=manifest,
+            initial_video_path=initial_video_path,
+            limits=limits,
+            output_namespace=output_namespace,
+            stages=stages,
+            usage_tracker=usage_tracker
+        )
+    finally:
+        if owns_stages:
+            await stages.close()
+
+async def _render_scene_attempts(
+    *,
+    initial_script_path: str,
+    initial_manim_class_name: str,
+    original_scene_data: dict,
+    architect_instance: VisualArchitect,
+    renderer_instance: ManimRenderer,
+    video_analyzer_instance: VideoAnalyzer,
+    loop: asyncio.AbstractEventLoop,
+    topic_title_str: str,
+    metrics_tracker: dict,
+    initial_script_gen_time: float,
+    max_retries: int,
+    manifest: RunManifest | None,
+    initial_video_path: str | None,
+    limits: ResourceLimits,
+    output_namespace: str | None,
+    stages: PipelineStages,
+    usage_tracker: UsageTracker | None
+) -> str | None:
+    """
+    Attempt loop behind `render_scene_with_retries`. Every step is submitted to its stage's
+    worker pool, so the scene only occupies a worker of the stage it is currently in.
+    Retries stop early once the scene or its topic has used up its token or cost budget.
+    """
     current_script_path = initial_script_path
     current_manim_class_name = initial_manim_class_name
     scene_title = original_scene_data.get("title", "Unknown Scene")
     scene_narration = original_scene_data.get("script_content", "") # Use script_content as narration
+    # Usage up to the end of the previous attempt. Calls made between two attempts (the initial
+    # generation, a fix) are attributed to the attempt that follows, like their script_gen_time.
+    usage_mark = empty_totals()
+
+    def next_attempt_usage() -> dict | None:
+        nonlocal usage_mark
+        if usage_tracker is None:
+            return None
+        scene_usage = usage_tracker.totals(topic_title_str, scene_title)
+        attempt_usage, usage_mark = usage_difference(scene_usage, usage_mark), scene_usage
+        return attempt_usage
     
     # Initialize metrics for this scene if not already present
     if scene_title not in metrics_tracker:
@@ -81,174 +350,492 @@ async def render_scene_with_retries(
             "attempt_details": []  # NEW: hold per-attempt timing metrics
         }
     
-    for attempt in range(max_retries):
-        # --- Per-attempt timing structure ---
-        attempt_metrics = {
-            "attempt_number": attempt + 1,
-            "script_gen_time": 0.0,
-            "render_time": 0.0,
-            "compress_time": 0.0,
-            "analysis_time": 0.0,
-            "total_time": 0.0,
-            "status": "Pending",
-        }
+    attempt_metrics = None
+    try:
+        for attempt in range(max_retries):
+            # --- Per-attempt timing structure ---
+            attempt_metrics = {
+                "attempt_number": attempt + 1,
+                "script_gen_time": 0.0,
+                "render_time": 0.0,
+                "compress_time": 0.0,
+                "analysis_time": 0.0,
+                "total_time": 0.0,
+                "status": "Pending",
+            }
 
-        # Seed with any script generation time that happened prior to this attempt (e.g., initial generation or a regeneration done at the end of the previous loop)
-        if initial_script_gen_time > 0:
-            attempt_metrics["script_gen_time"] = initial_script_gen_time
-            # Reset for subsequent attempts so it isn't double-counted
-            initial_script_gen_time = 0.0
-        logger.info(
-            f"Processing attempt {attempt + 1}/{max_retries} for scene '{scene_title}'."
-        )
-        metrics_tracker[scene_title]["script_generation_attempts"] = attempt + 1
+            # Seed with any script generation time that happened prior to this attempt (e.g., initial generation or a regeneration done at the end of the previous loop)
+            if initial_script_gen_time > 0:
+                attempt_metrics["script_gen_time"] = initial_script_gen_time
+                # Reset for subsequent attempts so it isn't double-counted
+                initial_script_gen_time = 0.0
+            logger.info(
+                f"Processing attempt {attempt + 1}/{max_retries} for scene '{scene_title}'."
+            )
+            metrics_tracker[scene_title]["script_generation_attempts"] = attempt + 1
 
-        # Ensure script exists, if not, generate it.
-        if not current_script_path or not os.path.exists(current_script_path):
-            logger.warning(f"Script not found for '{scene_title}'. Attempting to generate.")
-            try:
-                # This is a blocking call, run in executor
-                sg_start = time.perf_counter()
-                gen_script_path, gen_manim_class_name, _ = await loop.run_in_executor(
-                    None,
-                    partial(
-                        generate_manim_script_for_scene_wrapper,
-                        architect_instance,
-                        original_scene_data,
-                        topic_title_str
+            # Ensure script exists, if not, generate it.
+            if not current_script_path or not os.path.exists(current_script_path):
+                logger.warning(f"Script not found for '{scene_title}'. Attempting to generate.")
+                try:
+                    # Submitted to the codegen stage workers
+                    sg_start = time.perf_counter()
+                    gen_script_path, gen_manim_class_name, _ = await stages.codegen.run(
+                        topic_title_str, generate_script_for_scene_async,
+                        architect_instance, original_scene_data, topic_title_str, limits, output_namespace, None, attempt + 1
                     )
-                )
-                attempt_metrics["script_gen_time"] += time.perf_counter() - sg_start
-                if not (gen_script_path and gen_manim_class_name):
-                    raise ValueError("Script generation failed to return a valid path or class name.")
-                current_script_path, current_manim_class_name = gen_script_path, gen_manim_class_name
-                logger.info(f"Successfully generated script: {current_script_path}")
-            except Exception as e:
-                logger.error(f"FATAL: Could not generate script for '{scene_title}' on attempt {attempt + 1}: {e}")
-                attempt_metrics["status"] = "Script Gen Failed"
-                attempt_metrics["total_time"] = (
-                    attempt_metrics["script_gen_time"]
-                    + attempt_metrics["render_time"]
-                    + attempt_metrics["compress_time"]
-                    + attempt_metrics["analysis_time"]
-                )
-                metrics_tracker[scene_title]["attempt_details"].append(attempt_metrics)
-                continue  # Move to the next attempt
+                    attempt_metrics["script_gen_time"] += time.perf_counter() - sg_start
+                    if not (gen_script_path and gen_manim_class_name):
+                        raise ValueError("Script generation failed to return a valid path or class name.")
+                    current_script_path, current_manim_class_name = gen_script_path, gen_manim_class_name
+                    logger.info(f"Successfully generated script: {current_script_path}")
+                    if manifest is not None:
+                        manifest.record_stage(scene_title, STAGE_SCRIPT_GENERATED, current_script_path, class_name=current_manim_class_name)
+                except Exception as e:
+                    logger.error(f"FATAL: Could not generate script for '{scene_title}' on attempt {attempt + 1}: {e}")
+                    attempt_metrics["status"] = "Script Gen Failed"
+                    _record_attempt(metrics_tracker, scene_title, attempt_metrics, next_attempt_usage())
+                    continue  # Move to the next attempt
 
-        # If script is still missing, we can't proceed with this attempt.
-        if not current_script_path or not os.path.exists(current_script_path):
-            logger.error(f"Script for '{scene_title}' is missing after generation attempt. Skipping to next retry.")
-            continue
+            # If script is still missing, we can't proceed with this attempt.
+            if not current_script_path or not os.path.exists(current_script_path):
+                logger.error(f"Script for '{scene_title}' is missing after generation attempt. Skipping to next retry.")
+                continue
 
-        # Try to render the video
-        logger.info(f"Rendering '{scene_title}' from {current_script_path}...")
-        rd_start = time.perf_counter()
-        render_success, video_path, render_error = await loop.run_in_executor(
-            None,
-            renderer_instance.render_scene,
-            current_script_path,
-            current_manim_class_name
-        )
-        attempt_metrics["render_time"] = time.perf_counter() - rd_start
-
-        # If rendering is successful, analyze the video
-        if render_success:
-            logger.info(f"Successfully rendered '{scene_title}' to {video_path}.")
-            logger.info(f"Analyzing video quality for '{scene_title}'...")
-            metrics_tracker[scene_title]["video_analysis_attempts"] += 1
-
-            analysis_passed, analysis_reason, timing_info = await loop.run_in_executor(
-                None,
-                video_analyzer_instance.analyze_and_report,
-                video_path,
-                scene_narration,
-            )
-
-            attempt_metrics["compress_time"] = timing_info.get("compress_time", 0.0)
-            attempt_metrics["analysis_time"] = timing_info.get("analysis_time", 0.0)
-
-            if analysis_passed:
-                logger.info(f"SUCCESS: Video for '{scene_title}' passed quality analysis. Reason: {analysis_reason}")
-                metrics_tracker[scene_title]["status"] = "Success"
-                attempt_metrics["status"] = "Success"
-                attempt_metrics["total_time"] = (
-                    attempt_metrics["script_gen_time"]
-                    + attempt_metrics["render_time"]
-                    + attempt_metrics["compress_time"]
-                    + attempt_metrics["analysis_time"]
-                )
-                metrics_tracker[scene_title]["attempt_details"].append(attempt_metrics)
-                # Clean up intermediate script if a fix had created a new one
-                if initial_script_path and current_script_path != initial_script_path and os.path.exists(initial_script_path):
-                    os.remove(initial_script_path)
-                return video_path
+            if initial_video_path and attempt == 0:
+                # Resumed run: the manifest holds a verified render of this exact script
+                logger.info(f"Resuming '{scene_title}' from previously rendered video {initial_video_path}.")
+                render_success, video_path, render_error = True, initial_video_path, None
             else:
-                logger.warning(f"Video for '{scene_title}' FAILED quality analysis. Reason: {analysis_reason}")
-                render_success = False # Mark as failed to trigger recovery
-                render_error = analysis_reason # Use analysis reason as the error for the fix prompt
-                attempt_metrics["status"] = "Analysis Failed"
-
-        # If rendering or analysis failed
-        if not render_success:
-            logger.error(f"Failed to produce a good quality video for '{scene_title}' on attempt {attempt + 1}. Error: {render_error}")
-
-            attempt_metrics["total_time"] = (
-                attempt_metrics["script_gen_time"]
-                + attempt_metrics["render_time"]
-                + attempt_metrics["compress_time"]
-                + attempt_metrics["analysis_time"]
-            )
-            metrics_tracker[scene_title]["attempt_details"].append(attempt_metrics)
+                # Try to render the video
+                logger.info(f"Rendering '{scene_title}' from {current_script_path}...")
+                try:
+                    render_success, video_path, render_error, attempt_metrics["render_time"] = await run_stage_with_deadline(
+                        stages.render, config.RENDER_TIMEOUT_SECONDS, topic_title_str, render_script_async,
+                        renderer_instance, current_script_path, current_manim_class_name, topic_title_str, limits,
+                        analysis_render_tier()
+                    )
+                except asyncio.TimeoutError:
+                    render_success, video_path = False, None
+                    render_error = f"Manim render timed out after {config.RENDER_TIMEOUT_SECONDS:.0f} seconds."
+                    attempt_metrics["render_time"] = config.RENDER_TIMEOUT_SECONDS
+                    attempt_metrics["status"] = "Timed Out"
+                if render_success and manifest is not None:
+                    manifest.record_stage(scene_title, STAGE_RENDERED, video_path)
 
-            if attempt >= max_retries - 1:
-                logger.critical(f"Max retries reached for '{scene_title}'. Moving on.")
-                break  # Exit loop
+            analysis_verdict = None
+            # If rendering is successful, analyze the video
+            if render_success:
+                logger.info(f"Successfully rendered '{scene_title}' to {video_path}.")
+                logger.info(f"Analyzing video quality for '{scene_title}'...")
+                metrics_tracker[scene_title]["video_analysis_attempts"] += 1
 
-            # Attempt to regenerate the script for the next iteration
-            logger.info(f"Attempting to regenerate script for '{scene_title}'...")
-            try:
-                # We are choosing to regenerate from scratch instead of fixing
-                # This is a blocking call, run in executor
-                sg_start_retry = time.perf_counter()
-                gen_script_path, gen_manim_class_name, _ = await loop.run_in_executor(
-                    None,
-                    partial(
-                        generate_manim_script_for_scene_wrapper,
-                        architect_instance,
-                        original_scene_data,
-                        topic_title_str
-                    )
+                analysis_passed, analysis_reason = await _compress_and_analyze(
+                    video_path, scene_narration, video_analyzer_instance, topic_title_str,
+                    limits, stages, attempt_metrics, scene_title
                 )
-                attempt_metrics_retry_extra = time.perf_counter() - sg_start_retry
-                # This generation is for the NEXT attempt, so we'll carry it forward in the next loop iteration via initial_script_gen_time update
-                initial_script_gen_time = attempt_metrics_retry_extra
-
-                if gen_script_path and gen_manim_class_name:
-                    logger.info(f"Script for '{scene_title}' was regenerated. New script: {gen_script_path}")
-                    # Clean up the old faulty script if a new one was created
-                    if current_script_path != gen_script_path and os.path.exists(current_script_path):
-                        os.remove(current_script_path)
-                    current_script_path = gen_script_path
-                    current_manim_class_name = gen_manim_class_name
+                final_render_error = None
+                if analysis_passed and config.RENDER_QA_FIRST:
+                    final_quality_path, final_render_error = await _render_final_quality(
+                        renderer_instance, current_script_path, current_manim_class_name, topic_title_str,
+                        limits, stages, attempt_metrics, scene_title
+                    )
+                    video_path = final_quality_path or video_path
+
+                if analysis_passed and final_render_error:
+                    logger.warning(f"Final quality render of '{scene_title}' failed after its QA render passed. Error: {final_render_error}")
+                    render_success = False
+                    render_error = final_render_error
+                    if attempt_metrics["status"] != "Timed Out":
+                        attempt_metrics["status"] = "Final Render Failed"
+                elif analysis_passed:
+                    logger.info(f"SUCCESS: Video for '{scene_title}' passed quality analysis. Reason: {analysis_reason}")
+                    final_video_path = await asyncio.to_thread(
+                        video_analyzer_instance.move_to_final_videos, video_path, subdir=output_namespace
+                    )
+                    if manifest is not None:
+                        manifest.record_stage(scene_title, STAGE_ANALYZED, final_video_path or video_path, reason=analysis_reason)
+                        if final_video_path:
+                            manifest.record_stage(scene_title, STAGE_FINALIZED, final_video_path)
+                    await _record_exemplar(
+                        architect_instance, original_scene_data, topic_title_str,
+                        current_script_path, current_manim_class_name, final_video_path or video_path
+                    )
+                    metrics_tracker[scene_title]["status"] = "Success"
+                    attempt_metrics["status"] = "Success"
+                    _record_attempt(metrics_tracker, scene_title, attempt_metrics, next_attempt_usage())
+                    # Clean up intermediate script if a fix had created a new one
+                    if initial_script_path and current_script_path != initial_script_path and os.path.exists(initial_script_path):
+                        os.remove(initial_script_path)
+                    return final_video_path or video_path
                 else:
-                    logger.error(f"Failed to regenerate script for '{scene_title}'. Will retry with the same script if it exists.")
+                    logger.warning(f"Video for '{scene_title}' FAILED quality analysis. Reason: {analysis_reason}")
+                    render_success = False # Mark as failed to trigger recovery
+                    render_error = analysis_reason
+                    analysis_verdict = analysis_reason # The fix prompt gets it as the review verdict, not as an error
+                    if attempt_metrics["status"] != "Timed Out":
+                        attempt_metrics["status"] = "Analysis Failed"
 
-            except Exception as e:
-                logger.error(f"An exception occurred while trying to regenerate the script for '{scene_title}': {e}")
+            # If rendering or analysis failed
+            if not render_success:
+                logger.error(f"Failed to produce a good quality video for '{scene_title}' on attempt {attempt + 1}. Error: {render_error}")
+
+                _record_attempt(metrics_tracker, scene_title, attempt_metrics, next_attempt_usage())
+
+                if attempt >= max_retries - 1:
+                    logger.critical(f"Max retries reached for '{scene_title}'. Moving on.")
+                    break  # Exit loop
+                budget_reason = usage_tracker.budget_exceeded(topic_title_str, scene_title) if usage_tracker else None
+                if budget_reason:
+                    logger.critical(f"Not retrying '{scene_title}': {budget_reason}")
+                    metrics_tracker[scene_title]["status"] = "Over Budget"
+                    return None
+
+                # First try a minimal patch of the failing script. It is rewritten in place, so the
+                # re-render reuses Manim's partial movies of the animations the patch left unchanged.
+                if config.FIX_WITH_PATCHES and os.path.exists(current_script_path):
+                    logger.info(f"Attempting to patch the script for '{scene_title}'...")
+                    sg_start_fix = time.perf_counter()
+                    try:
+                        fixed_script_path, fixed_manim_class_name = await stages.fix.run(
+                            topic_title_str, fix_script_for_scene_async,
+                            architect_instance, original_scene_data, topic_title_str, current_script_path,
+                            None if analysis_verdict else render_error, analysis_verdict, limits
+                        )
+                    except Exception as e:
+                        logger.error(f"An exception occurred while trying to patch the script for '{scene_title}': {e}")
+                        fixed_script_path = fixed_manim_class_name = None
+                    initial_script_gen_time = time.perf_counter() - sg_start_fix
+                    if fixed_script_path and fixed_manim_class_name:
+                        logger.info(f"Script for '{scene_title}' was patched: {fixed_script_path}")
+                        current_script_path, current_manim_class_name = fixed_script_path, fixed_manim_class_name
+                        if manifest is not None:
+                            manifest.record_stage(scene_title, STAGE_SCRIPT_GENERATED, current_script_path, class_name=current_manim_class_name)
+                        continue
+                    logger.warning(f"Patching failed for '{scene_title}'. Falling back to regenerating the script.")
+
+                # Regenerate the script from scratch for the next iteration
+                logger.info(f"Attempting to regenerate script for '{scene_title}'...")
+                try:
+                    # Submitted to the fix stage workers
+                    sg_start_retry = time.perf_counter()
+                    gen_script_path, gen_manim_class_name, _ = await stages.fix.run(
+                        topic_title_str, generate_script_for_scene_async,
+                        architect_instance, original_scene_data, topic_title_str, limits, output_namespace, None, attempt + 2
+                    )
+                    attempt_metrics_retry_extra = time.perf_counter() - sg_start_retry
+                    # This generation is for the NEXT attempt, so we'll carry it forward in the next loop iteration via initial_script_gen_time update
+                    initial_script_gen_time += attempt_metrics_retry_extra
+
+                    if gen_script_path and gen_manim_class_name:
+                        logger.info(f"Script for '{scene_title}' was regenerated. New script: {gen_script_path}")
+                        # Clean up the old faulty script if a new one was created
+                        if current_script_path != gen_script_path and os.path.exists(current_script_path):
+                            os.remove(current_script_path)
+                        current_script_path = gen_script_path
+                        current_manim_class_name = gen_manim_class_name
+                        if manifest is not None:
+                            manifest.record_stage(scene_title, STAGE_SCRIPT_GENERATED, current_script_path, class_name=current_manim_class_name)
+                    else:
+                        logger.error(f"Failed to regenerate script for '{scene_title}'. Will retry with the same script if it exists.")
+
+                except Exception as e:
+                    logger.error(f"An exception occurred while trying to regenerate the script for '{scene_title}': {e}")
+    except asyncio.CancelledError:
+        # Scene deadline or cancellation: record the attempt that was in flight
+        if attempt_metrics and attempt_metrics not in metrics_tracker[scene_title]["attempt_details"]:
+            attempt_metrics["status"] = _cancelled_attempt_status(metrics_tracker, scene_title)
+            _record_attempt(metrics_tracker, scene_title, attempt_metrics, next_attempt_usage())
+        raise
 
     logger.error(f"All {max_retries} attempts failed for scene '{scene_title}'.")
     metrics_tracker[scene_title]["status"] = "Failed"
     # Ensure last attempt metrics captured if loop exits due to max retries
     if attempt_metrics and attempt_metrics not in metrics_tracker[scene_title]["attempt_details"]:
-        attempt_metrics["total_time"] = (
-            attempt_metrics["script_gen_time"]
-            + attempt_metrics["render_time"]
-            + attempt_metrics["compress_time"]
-            + attempt_metrics["analysis_time"]
-        )
-        metrics_tracker[scene_title]["attempt_details"].append(attempt_metrics)
+        _record_attempt(metrics_tracker, scene_title, attempt_metrics, next_attempt_usage())
     return None
 
+async def _render_scene_speculative(
+    *,
+    initial_script_path: str,
+    initial_manim_class_name: str,
+    original_scene_data: dict,
+    architect_instance: VisualArchitect,
+    renderer_instance: ManimRenderer,
+    video_analyzer_instance: VideoAnalyzer,
+    loop: asyncio.AbstractEventLoop,
+    topic_title_str: str,
+    metrics_tracker: dict,
+    initial_script_gen_time: float,
+    max_retries: int,
+    manifest: RunManifest | None,
+    initial_video_path: str | None,
+    limits: ResourceLimits,
+    output_namespace: str | None,
+    stages: PipelineStages,
+    candidates: int,
+    usage_tracker: UsageTracker | None
+) -> str | None:
+    """
+    Speculative variant of `_render_scene_attempts`. Each attempt takes `candidates` scripts
+    through render, compression and analysis side by side. The first attempt includes the
+    initial script. The first candidate to pass analysis wins. The others are cancelled, which
+    kills their Manim renders. Spare LLM and render capacity buys wall-clock time.
+    Candidates run concurrently, so usage is only tracked per scene, not per candidate.
+    """
+    scene_title = original_scene_data.get("title", "Unknown Scene")
+    if scene_title not in metrics_tracker:
+        metrics_tracker[scene_title] = {
+            "script_generation_attempts": 0,
+            "video_analysis_attempts": 0,
+            "status": "Pending",
+            "attempt_details": []
+        }
+
+    for attempt in range(max_retries):
+        budget_reason = usage_tracker.budget_exceeded(topic_title_str, scene_title) if usage_tracker and attempt else None
+        if budget_reason:
+            logger.critical(f"Not retrying '{scene_title}': {budget_reason}")
+            metrics_tracker[scene_title]["status"] = "Over Budget"
+            return None
+        logger.info(f"Speculative attempt {attempt + 1}/{max_retries} for scene '{scene_title}' with {candidates} candidates.")
+        metrics_tracker[scene_title]["script_generation_attempts"] += candidates
+        candidate_tasks = []
+        for index in range(candidates):
+            seeded = attempt == 0 and index == 0 and initial_script_path
+            candidate_tasks.append(asyncio.ensure_future(_run_candidate(
+                candidate_label=f"{attempt + 1}.{index + 1}",
+                candidate_id=None if seeded else f"c{index + 1}",
+                script_path=initial_script_path if seeded else None,
+                manim_class_name=initial_manim_class_name if seeded else None,
+                script_gen_time=initial_script_gen_time if seeded else 0.0,
+                video_path=initial_video_path if seeded else None,
+                original_scene_data=original_scene_data,
+                architect_instance=architect_instance,
+                renderer_instance=renderer_instance,
+                video_analyzer_instance=video_analyzer_instance,
+                loop=loop,
+                topic_title_str=topic_title_str,
+                metrics_tracker=metrics_tracker,
+                limits=limits,
+                output_namespace=output_namespace,
+                stages=stages
+            )))
+
+        winner, finished = await _first_passing_candidate(candidate_tasks)
+
+        # Scripts of losing candidates are not needed again (every attempt regenerates)
+        for result in finished:
+            if result is not winner and result.get("script_path") and os.path.exists(result["script_path"]):
+                os.remove(result["script_path"])
+
+        if winner and config.RENDER_QA_FIRST:
+            winner_metrics = winner["attempt_metrics"]
+            render_time_before = winner_metrics["render_time"]
+            final_quality_path, final_render_error = await _render_final_quality(
+                renderer_instance, winner["script_path"], winner["class_name"], topic_title_str,
+                limits, stages, winner_metrics, scene_title
+            )
+            # The candidate's attempt is already recorded; add the final render to its total
+            winner_metrics["total_time"] += winner_metrics["render_time"] - render_time_before
+            if final_quality_path:
+                winner["video_path"] = final_quality_path
+            else:
+                logger.error(f"Final quality render of candidate {winner['label']} for '{scene_title}' failed. Error: {final_render_error}")
+                if winner_metrics["status"] != "Timed Out":
+                    winner_metrics["status"] = "Final Render Failed"
+                if os.path.exists(winner["script_path"]):
+                    os.remove(winner["script_path"])
+                winner = None
+
+        if winner:
+            logger.info(f"SUCCESS: Candidate {winner['label']} for '{scene_title}' passed quality analysis. Reason: {winner['reason']}")
+            final_video_path = await asyncio.to_thread(
+                video_analyzer_instance.move_to_final_videos, winner["video_path"], subdir=output_namespace
+            )
+            if manifest is not None:
+                manifest.record_stage(scene_title, STAGE_SCRIPT_GENERATED, winner["script_path"], class_name=winner["class_name"])
+                manifest.record_stage(scene_title, STAGE_ANALYZED, final_video_path or winner["video_path"], reason=winner["reason"])
+                if final_video_path:
+                    manifest.record_stage(scene_title, STAGE_FINALIZED, final_video_path)
+            await _record_exemplar(
+                architect_instance, original_scene_data, topic_title_str,
+                winner["script_path"], winner["class_name"], final_video_path or winner["video_path"]
+            )
+            metrics_tracker[scene_title]["status"] = "Success"
+            return final_video_path or winner["video_path"]
+
+        logger.error(f"No candidate for '{scene_title}' passed on speculative attempt {attempt + 1}.")
+
+    logger.error(f"All {max_retries} speculative attempts failed for scene '{scene_title}'.")
+    metrics_tracker[scene_title]["status"] = "Failed"
+    return None
+
+async def _first_passing_candidate(candidate_tasks: list[asyncio.Task]) -> tuple[dict | None, list[dict]]:
+    """
+    Waits for the candidate tasks until one passes analysis, then cancels the rest.
+    Returns the winning result (or None) and the results of every candidate that finished.
+    """
+    winner = None
+    finished = []
+    pending = set(candidate_tasks)
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    logger.error(f"Speculative candidate raised an exception: {task.exception()}")
+                    continue
+                result = task.result()
+                finished.append(result)
+                if result["passed"] and winner is None:
+                    winner = result
+    finally:
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, dict):
+                finished.append(result)
+    return winner, finished
+
+async def _run_candidate(
+    *,
+    candidate_label: str,
+    candidate_id: str | None,
+    script_path: str | None,
+    manim_class_name: str | None,
+    script_gen_time: float,
+    video_path: str | None,
+    original_scene_data: dict,
+    architect_instance: VisualArchitect,
+    renderer_instance: ManimRenderer,
+    video_analyzer_instance: VideoAnalyzer,
+    loop: asyncio.AbstractEventLoop,
+    topic_title_str: str,
+    metrics_tracker: dict,
+    limits: ResourceLimits,
+    output_namespace: str | None,
+    stages: PipelineStages
+) -> dict:
+    """
+    Takes one speculative candidate from script generation (skipped when `script_path` is given)
+    through analysis. Records its attempt metrics, including when it is cancelled.
+    """
+    scene_title = original_scene_data.get("title", "Unknown Scene")
+    scene_narration = original_scene_data.get("script_content", "")
+    attempt_metrics = {
+        "attempt_number": candidate_label,
+        "script_gen_time": script_gen_time,
+        "render_time": 0.0,
+        "compress_time": 0.0,
+        "analysis_time": 0.0,
+        "total_time": 0.0,
+        "status": "Pending",
+    }
+    result = {
+        "label": candidate_label,
+        "passed": False,
+        "script_path": script_path,
+        "class_name": manim_class_name,
+        "video_path": None,
+        "reason": None,
+        "attempt_metrics": attempt_metrics,
+    }
+    try:
+        if not script_path:
+            sg_start = time.perf_counter()
+            script_path, manim_class_name, _ = await stages.codegen.run(
+                topic_title_str, generate_script_for_scene_async,
+                architect_instance, original_scene_data, topic_title_str, limits, output_namespace, candidate_id,
+                candidate_label
+            )
+            attempt_metrics["script_gen_time"] += time.perf_counter() - sg_start
+            result.update(script_path=script_path, class_name=manim_class_name)
+            if not (script_path and manim_class_name):
+                attempt_metrics["status"] = "Script Gen Failed"
+                result["reason"] = "Script generation failed."
+                return result
+
+        if video_path:
+            logger.info(f"Candidate {candidate_label} for '{scene_title}' resumes from rendered video {video_path}.")
+        else:
+            try:
+                render_success, video_path, render_error, attempt_metrics["render_time"] = await run_stage_with_deadline(
+                    stages.render, config.RENDER_TIMEOUT_SECONDS, topic_title_str, render_script_async,
+                    renderer_instance, script_path, manim_class_name, topic_title_str, limits, analysis_render_tier()
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Candidate {candidate_label} for '{scene_title}' timed out while rendering.")
+                attempt_metrics["render_time"] = config.RENDER_TIMEOUT_SECONDS
+                attempt_metrics["status"] = "Timed Out"
+                result["reason"] = f"Manim render timed out after {config.RENDER_TIMEOUT_SECONDS:.0f} seconds."
+                return result
+            if not render_success:
+                logger.warning(f"Candidate {candidate_label} for '{scene_title}' failed to render. Error: {render_error}")
+                attempt_metrics["status"] = "Render Failed"
+                result["reason"] = render_error
+                return result
+
+        metrics_tracker[scene_title]["video_analysis_attempts"] += 1
+        analysis_passed, analysis_reason = await _compress_and_analyze(
+            video_path, scene_narration, video_analyzer_instance, topic_title_str,
+            limits, stages, attempt_metrics, scene_title
+        )
+        result.update(passed=analysis_passed, video_path=video_path, reason=analysis_reason)
+        if attempt_metrics["status"] != "Timed Out":
+            attempt_metrics["status"] = "Success" if analysis_passed else "Analysis Failed"
+        if not analysis_passed:
+            logger.warning(f"Candidate {candidate_label} for '{scene_title}' FAILED quality analysis. Reason: {analysis_reason}")
+        return result
+    except asyncio.CancelledError:
+        attempt_metrics["status"] = _cancelled_attempt_status(metrics_tracker, scene_title)
+        if candidate_id and script_path and os.path.exists(script_path):
+            os.remove(script_path)
+        raise
+    finally:
+        _record_attempt(metrics_tracker, scene_title, attempt_metrics)
+
+async def _compress_and_analyze(
+    video_path: str,
+    scene_narration: str,
+    video_analyzer_instance: VideoAnalyzer,
+    topic_title_str: str,
+    limits: ResourceLimits,
+    stages: PipelineStages,
+    attempt_metrics: dict,
+    scene_title: str | None = None
+) -> tuple[bool, str]:
+    """
+    Runs the compress and analyze stages for a rendered video, each under its deadline.
+    Fills in the attempt's timings and sets its status to "Timed Out" if a deadline passed.
+    Returns (passed, verdict).
+    """
+    try:
+        compressed_path, attempt_metrics["compress_time"] = await run_stage_with_deadline(
+            stages.compress, config.COMPRESS_TIMEOUT_SECONDS, topic_title_str, compress_video_async,
+            video_analyzer_instance, video_path
+        )
+    except asyncio.TimeoutError:
+        attempt_metrics["compress_time"] = config.COMPRESS_TIMEOUT_SECONDS
+        attempt_metrics["status"] = "Timed Out"
+        return False, f"Video compression timed out after {config.COMPRESS_TIMEOUT_SECONDS:.0f} seconds."
+    if not compressed_path:
+        return False, "Video compression for analysis failed."
+
+    try:
+        analysis_passed, analysis_reason, attempt_metrics["analysis_time"] = await run_stage_with_deadline(
+            stages.analyze, config.ANALYSIS_TIMEOUT_SECONDS, topic_title_str, analyze_video_async,
+            video_analyzer_instance, compressed_path, scene_narration, topic_title_str, limits, scene_title
+        )
+    except asyncio.TimeoutError:
+        # Cancelling the analysis deletes the Gemini upload and the compressed file on its way out
+        attempt_metrics["analysis_time"] = config.ANALYSIS_TIMEOUT_SECONDS
+        attempt_metrics["status"] = "Timed Out"
+        return False, f"Video analysis timed out after {config.ANALYSIS_TIMEOUT_SECONDS:.0f} seconds."
+    return analysis_passed, analysis_reason
+
 def print_metrics_table(metrics: dict):
     """Prints a formatted table of the scene metrics."""
     logger.info("--- Final Run Metrics ---")
@@ -282,49 +869,166 @@ async def process_scene(
     loop: asyncio.AbstractEventLoop,
     topic_title_str: str,
     metrics_tracker: dict,
-    semaphore: asyncio.Semaphore
+    stages: PipelineStages,
+    manifest: RunManifest | None = None,
+    limits: ResourceLimits | None = None,
+    output_namespace: str | None = None,
+    candidates: int = 1,
+    usage_tracker: UsageTracker | None = None
 ):
     """
     Complete processing for a single scene, from script generation to final video.
+
+    Each step runs on the worker pool of its stage, so the scene holds no slot while it
+    waits between stages. Stages already recorded in `manifest` whose artifacts still
+    verify are skipped.
     """
-    async with semaphore:
-        scene_title = scene_data.get("title", f"Scene_{scene_data.get('scene_number', 'Unknown')}")
-        logger.info(f"Starting processing for scene: {scene_title}")
+    limits = limits or ResourceLimits()
+    scene_title = scene_data.get("title", f"Scene_{scene_data.get('scene_number', 'Unknown')}")
+    logger.info(f"Starting processing for scene: {scene_title}")
+
+    if manifest is not None:
+        resumed_video_path = _resume_finished_scene(scene_title, manifest, video_analyzer, output_namespace)
+        if resumed_video_path:
+            metrics_tracker[scene_title]["status"] = "Resumed"
+            return resumed_video_path
+
+    script_entry = manifest.verified_stage(scene_title, STAGE_SCRIPT_GENERATED) if manifest is not None else None
+    rendered_entry = manifest.verified_stage(scene_title, STAGE_RENDERED) if script_entry else None
 
+    budget_reason = usage_tracker.budget_exceeded(topic_title_str) if usage_tracker and not script_entry else None
+    if budget_reason:
+        logger.error(f"Skipping scene '{scene_title}': {budget_reason}")
+        metrics_tracker[scene_title]["status"] = "Over Budget"
+        return None
+
+    if script_entry:
+        logger.info(f"Resuming '{scene_title}' with previously generated script {script_entry['path']}.")
+        script_path, manim_class_name = script_entry["path"], script_entry["class_name"]
+        initial_script_gen_time = 0.0
+    else:
         # Initial script generation
         sg_start_initial = time.perf_counter()
-        script_path, manim_class_name, _ = await loop.run_in_executor(
-            None,
-            partial(
-                generate_manim_script_for_scene_wrapper,
-                architect,
-                scene_data,
-                topic_title_str
-            )
+        script_path, manim_class_name, _ = await stages.codegen.run(
+            topic_title_str, generate_script_for_scene_async,
+            architect, scene_data, topic_title_str, limits, output_namespace
         )
         initial_script_gen_time = time.perf_counter() - sg_start_initial
+        if script_path and manim_class_name and manifest is not None:
+            manifest.record_stage(scene_title, STAGE_SCRIPT_GENERATED, script_path, class_name=manim_class_name)
 
-        if not (script_path and manim_class_name):
-            logger.error(f"Could not generate initial script for scene: {scene_title}. It will not be rendered.")
-            metrics_tracker[scene_title]["status"] = "Script Gen Failed"
-            return None
+    if not (script_path and manim_class_name):
+        logger.error(f"Could not generate initial script for scene: {scene_title}. It will not be rendered.")
+        metrics_tracker[scene_title]["status"] = "Script Gen Failed"
+        return None
 
-        # Render with retries
-        video_path = await render_scene_with_retries(
-            initial_script_path=script_path,
-            initial_manim_class_name=manim_class_name,
-            original_scene_data=scene_data,
-            architect_instance=architect,
-            renderer_instance=renderer,
-            video_analyzer_instance=video_analyzer,
-            loop=loop,
-            topic_title_str=topic_title_str,
-            metrics_tracker=metrics_tracker,
-            initial_script_gen_time=initial_script_gen_time
-        )
-        return video_path
+    # Render with retries
+    video_path = await render_scene_with_retries(
+        initial_script_path=script_path,
+        initial_manim_class_name=manim_class_name,
+        original_scene_data=scene_data,
+        architect_instance=architect,
+        renderer_instance=renderer,
+        video_analyzer_instance=video_analyzer,
+        loop=loop,
+        topic_title_str=topic_title_str,
+        metrics_tracker=metrics_tracker,
+        initial_script_gen_time=initial_script_gen_time,
+        manifest=manifest,
+        initial_video_path=rendered_entry["path"] if rendered_entry else None,
+        limits=limits,
+        output_namespace=output_namespace,
+        stages=stages,
+        candidates=candidates,
+        usage_tracker=usage_tracker
+    )
+    return video_path
+
+async def run_scene_with_deadline(scene_coro, scene_title: str, metrics_tracker: dict, deadline: float):
+    """
+    Awaits a scene's processing coroutine, cancelling it once `deadline` seconds pass (0 disables).
+    Cancellation kills any render or ffmpeg process group the scene has in flight and frees its
+    stage slots. The scene and its in-flight attempt are recorded as "Timed Out".
+    """
+    scene_task = asyncio.ensure_future(scene_coro)
+    if not deadline:
+        return await scene_task
+
+    def expire():
+        logger.error(f"Scene '{scene_title}' exceeded its {deadline:.0f}s deadline. Cancelling it.")
+        metrics_tracker[scene_title]["status"] = "Timed Out"
+        scene_task.cancel()
+
+    deadline_handle = asyncio.get_running_loop().call_later(deadline, expire)
+    try:
+        return await scene_task
+    except asyncio.CancelledError:
+        if metrics_tracker[scene_title]["status"] != "Timed Out" or not scene_task.cancelled():
+            raise
+        return None
+    finally:
+        deadline_handle.cancel()
+
+def _resume_finished_scene(
+    scene_title: str,
+    manifest: RunManifest,
+    video_analyzer: VideoAnalyzer,
+    output_namespace: str | None = None
+) -> str | None:
+    """
+    Returns the final video path if the manifest shows the scene already passed
+    analysis, moving the video to FINAL_VIDEOS_DIR first if that step was lost.
+    """
+    finalized_entry = manifest.verified_stage(scene_title, STAGE_FINALIZED)
+    if finalized_entry:
+        logger.info(f"Skipping '{scene_title}': final video already verified at {finalized_entry['path']}.")
+        return finalized_entry["path"]
 
-async def run_pipeline(topic: str, num_scenes_override: int | None = None):
+    analyzed_entry = manifest.verified_stage(scene_title, STAGE_ANALYZED)
+    if analyzed_entry:
+        logger.info(f"'{scene_title}' passed analysis in a previous run. Moving it to the final videos directory.")
+        final_video_path = video_analyzer.move_to_final_videos(analyzed_entry["path"], subdir=output_namespace)
+        if final_video_path:
+            manifest.record_stage(scene_title, STAGE_FINALIZED, final_video_path)
+            return final_video_path
+    return None
+
+async def cancel_scene_tasks(tasks: list) -> None:
+    """Cancels scene tasks that are still running and waits until every one has finished."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def stream_didactic_script(
+    scripter: DidacticScripter,
+    didactic_script_args: dict,
+    on_scene
+) -> dict | None:
+    """
+    Streams the didactic script and calls `on_scene` for each scene as soon as it has been
+    parsed. Returns the full script once the stream ends.
+    """
+    stream_start = time.perf_counter()
+    scenes_started = 0
+
+    def start_scene(scene_data: dict):
+        nonlocal scenes_started
+        if scenes_started == 0:
+            logger.info(f"First scene streamed after {time.perf_counter() - stream_start:.2f}s. Starting scene processing.")
+        scenes_started += 1
+        on_scene(scene_data)
+
+    return await scripter.stream_script_async(on_scene=start_scene, **didactic_script_args)
+
+async def run_pipeline(
+    topic: str,
+    num_scenes_override: int | None = None,
+    resume: bool = False,
+    stream_script: bool = config.DIDACTIC_SCRIPT_STREAMING,
+    resources: PipelineResources | None = None,
+    namespace_outputs: bool = False,
+    candidates: int = config.SPECULATIVE_CANDIDATES
+) -> list[str] | None:
     """
     Runs the full pipeline from topic to individual scene videos.
 
@@ -332,96 +1036,226 @@ async def run_pipeline(topic: str, num_scenes_override: int | None = None):
         topic (str): The UPSC topic to generate a video for.
         num_scenes_override (int | None): Optionally override the number of scenes.
                                            If None, DidacticScripter's default is used.
+        resume (bool): If True, reuse every stage recorded in the topic's run manifest
+                       whose artifact still verifies, instead of starting from scratch.
+        stream_script (bool): If True, stream the didactic script and start processing each
+                              scene as soon as it is parsed, instead of waiting for the whole script.
+        resources (PipelineResources | None): Shared stage instances and global limits. Batch runs
+                                              pass one instance to every topic; if None, a private
+                                              set is created for this run.
+        namespace_outputs (bool): If True, prefix script names with the topic and move final
+                                  videos into a per-topic subdirectory, so concurrent topics
+                                  with identically named scenes do not collide.
+        candidates (int): Number of speculative candidate scripts taken through render and
+                          analysis side by side on each attempt. The first one to pass wins.
+                          1 disables speculation.
+
+    Returns:
+        list[str] | None: Paths of the scene videos that passed analysis, or None if the
+                          didactic script could not be generated.
     """
     logger.info(f"Starting Project Drishti pipeline for topic: '{topic}'")
     scene_metrics = {}
+    manifest = RunManifest.load(topic) if resume else RunManifest(topic)
 
     if not config.OPENROUTER_API_KEY:
         logger.error("CRITICAL: OPENROUTER_API_KEY is not set in .env file. LLM calls will fail.")
         logger.error("Please create a .env file in the workspace root with your OpenRouter API key.")
         # return # Optionally exit early
 
-    # --- Stage 1: Didactic Scripter --- 
-    logger.info("--- Stage 1: Generating Didactic Script ---")
-    scripter = DidacticScripter()
-    ds_start = time.perf_counter()
-    didactic_script_args = {"topic": topic}
-    if num_scenes_override is not None:
-        didactic_script_args["num_scenes"] = num_scenes_override
+    # Each scene step is submitted to the worker pool of its stage (see PipelineStages),
+    # so concurrency is bounded per stage rather than per scene.
+    topic_title_str = topic.replace(" ", "_")
+    owns_resources = resources is None
+    resources = resources or PipelineResources()
+    resources.start()
+    try:
+        # The scene workers are created before the didactic script is requested so that, in
+        # streaming mode, a scene can start processing as soon as it arrives.
+        architect = resources.architect
+        renderer = resources.renderer
+        video_analyzer = resources.video_analyzer
+        loop = asyncio.get_event_loop()
+        output_namespace = re.sub(r"[^a-zA-Z0-9_]", "", topic_title_str) if namespace_outputs else None
+        processing_tasks = []
+
+        def start_scene_processing(scene_data: dict):
+            """Initializes metrics for a scene and schedules its processing task."""
+            scene_title = scene_data.get("title", f"Scene_{scene_data.get('scene_number', 'Unknown')}")
+            scene_metrics[scene_title] = {
+                "script_generation_attempts": 0,
+                "video_analysis_attempts": 0,
+                "status": "Pending",
+                "attempt_details": []
+            }
+            task = asyncio.ensure_future(run_scene_with_deadline(process_scene(
+                scene_data=scene_data,
+                architect=architect,
+                renderer=renderer,
+                video_analyzer=video_analyzer,
+                loop=loop,
+                topic_title_str=topic_title_str,
+                metrics_tracker=scene_metrics,
+                stages=resources.stages,
+                manifest=manifest,
+                limits=resources.limits,
+                output_namespace=output_namespace,
+                candidates=candidates,
+                usage_tracker=resources.usage
+            ), scene_title, scene_metrics, config.SCENE_DEADLINE_SECONDS))
+            processing_tasks.append(task)
+
+        # Scene tasks start while the script streams in; any failure before they are gathered,
+        # or cancelling the run, must not leave them using resources that are about to close
+        try:
+            # --- Stage 1: Didactic Scripter --- 
+            logger.info("--- Stage 1: Generating Didactic Script ---")
+            scripter = resources.scripter
+            ds_start = time.perf_counter()
+            didactic_script_args = {"topic": topic}
+            if num_scenes_override is not None:
+                didactic_script_args["num_scenes"] = num_scenes_override
     
-    didactic_script = scripter.generate_script(**didactic_script_args)
-    didactic_script_time = time.perf_counter() - ds_start
-    if not didactic_script:
-        logger.error("Failed to generate the didactic script. Cannot proceed.")
-        return
+            didactic_script = manifest.get_didactic_script()
+            if didactic_script:
+                logger.info(f"Resuming with the didactic script stored in {manifest.path}")
+                for scene_data in didactic_script.get("scenes", []):
+                    start_scene_processing(scene_data)
+            elif stream_script:
+                # Stages 2 & 3 start per scene while the rest of the script is still streaming in
+                async with resources.limits.llm.slot(topic_title_str):
+                    didactic_script = await stream_didactic_script(scripter, didactic_script_args, start_scene_processing)
+            else:
+                async with resources.limits.llm.slot(topic_title_str):
+                    didactic_script = await scripter.generate_script_async(**didactic_script_args)
+                if didactic_script:
+                    for scene_data in didactic_script.get("scenes", []):
+                        start_scene_processing(scene_data)
+            didactic_script_time = time.perf_counter() - ds_start
+            if not didactic_script:
+                logger.error("Failed to generate the didactic script. Cannot proceed.")
+                await cancel_scene_tasks(processing_tasks)
+                return None
+            manifest.record_didactic_script(didactic_script)
 
-    logger.info(f"Successfully generated didactic script with {len(didactic_script['scenes'])} scenes.")
-    logger.debug(f"Didactic Script Content:\n{json.dumps(didactic_script, indent=4)}")
-    # The script is also saved to a .md file by the scripter itself.
+            logger.info(f"Successfully generated didactic script with {len(didactic_script['scenes'])} scenes.")
+            logger.debug(f"Didactic Script Content:\n{json.dumps(didactic_script, indent=4)}")
+            # The script is also saved to a .md file by the scripter itself.
 
-    # --- Stage 2 & 3: Visual Architect & Manim Renderer (in parallel) ---
-    logger.info("--- Stages 2 & 3: Generating Manim Scripts and Rendering Videos ---")
-    architect = VisualArchitect()
-    renderer = ManimRenderer()
-    video_analyzer = VideoAnalyzer() # Instantiate the video analyzer
-    loop = asyncio.get_event_loop()
-    topic_title_str = topic.replace(" ", "_")
-    # Introduce a semaphore to limit concurrent rendering/analysis tasks
-    # to avoid overwhelming the system. Adjust the number based on system capacity.
-    concurrency_limit = 10  #change based on number of scenes
-    semaphore = asyncio.Semaphore(concurrency_limit)
-
-    # Initialize metrics for all scenes
-    for scene_data in didactic_script.get("scenes", []):
-        scene_title = scene_data.get("title", f"Scene_{scene_data.get('scene_number', 'Unknown')}")
-        scene_metrics[scene_title] = {
-            "script_generation_attempts": 0,
-            "video_analysis_attempts": 0,
-            "status": "Pending",
-            "attempt_details": []
-        }
+            # --- Stage 2 & 3: Visual Architect & Manim Renderer (in parallel) ---
+            logger.info("--- Stages 2 & 3: Generating Manim Scripts and Rendering Videos ---")
 
-    # Create tasks for each scene to be processed concurrently
-    processing_tasks = []
-    for scene_data in didactic_script.get("scenes", []):
-        task = process_scene(
-            scene_data=scene_data,
-            architect=architect,
-            renderer=renderer,
-            video_analyzer=video_analyzer,
-            loop=loop,
-            topic_title_str=topic_title_str,
-            metrics_tracker=scene_metrics,
-            semaphore=semaphore
-        )
-        processing_tasks.append(task)
-    
-    final_video_paths = []
-    logger.info(f"--- Starting parallel processing of {len(processing_tasks)} scenes (max concurrency: {concurrency_limit}) ---")
+            final_video_paths = []
+            logger.info(f"--- Starting parallel processing of {len(processing_tasks)} scenes ---")
     
-    # This loop is for the async processing of all scene tasks
-    for result in await asyncio.gather(*processing_tasks):
-        if result:
-            final_video_paths.append(result)
-
-    # --- Final Summary ---
-    logger.info("--- Pipeline Execution Finished ---")
-    logger.info(f"Successfully generated {len(final_video_paths)} out of {len(didactic_script['scenes'])} scenes.")
-    if final_video_paths:
-        logger.info("Final video paths:")
-        for path in final_video_paths:
-            logger.info(f" - {path}")
+            # This loop is for the async processing of all scene tasks
+            for result in await asyncio.gather(*processing_tasks):
+                if result:
+                    final_video_paths.append(result)
+        except BaseException:
+            await cancel_scene_tasks(processing_tasks)
+            raise
+
+        # --- Final Summary ---
+        logger.info("--- Pipeline Execution Finished ---")
+        logger.info(f"Successfully generated {len(final_video_paths)} out of {len(didactic_script['scenes'])} scenes.")
+        if final_video_paths:
+            logger.info("Final video paths:")
+            for path in final_video_paths:
+                logger.info(f" - {path}")
     
-    print_metrics_table(scene_metrics)
+        print_metrics_table(scene_metrics)
 
-    # ---- New Latency Dashboard ----
-    print_latency_table(scene_metrics, didactic_script_time)
+        # ---- New Latency Dashboard ----
+        print_latency_table(scene_metrics, didactic_script_time, resources.usage.totals(topic_title_str, stage="script"))
+        print_usage_table(resources.usage, topic_title_str)
+        if owns_resources:
+            print_concurrency_table(resources.concurrency)
+            print_llm_cache_stats(resources)
+            print_render_cache_stats(resources)
+        return final_video_paths
+    finally:
+        # Also written when the run fails, since failed attempts cost the most
+        resources.usage.write_report(usage_report_path(topic_title_str), topic_title_str)
+        if owns_resources:
+            await resources.close()
 
+def load_topics_file(topics_file: str) -> list[str]:
+    """Reads one topic per line, ignoring blank lines and lines starting with '#'."""
+    with open(topics_file, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+async def run_batch(
+    topics_file: str,
+    num_scenes_override: int | None = None,
+    resume: bool = False,
+    stream_script: bool = config.DIDACTIC_SCRIPT_STREAMING,
+    max_concurrent_topics: int = config.BATCH_MAX_CONCURRENT_TOPICS,
+    candidates: int = config.SPECULATIVE_CANDIDATES
+):
+    """
+    Runs every topic in `topics_file` through one shared set of stage instances.
+
+    LLM calls, renders and Gemini uploads are capped by global limits that are shared
+    across topics, and free slots are granted round-robin between topics so a large
+    topic cannot starve the others.
+    """
+    topics = load_topics_file(topics_file)
+    if not topics:
+        logger.error(f"No topics found in {topics_file}.")
+        return
+    logger.info(f"--- Starting batch of {len(topics)} topics (max {max_concurrent_topics} at a time) ---")
 
-def print_latency_table(metrics: dict, didactic_time: float):
-    """Prints a detailed latency table for each attempt across all scenes."""
+    resources = PipelineResources()
+    resources.start()
+    topic_semaphore = asyncio.Semaphore(max(1, max_concurrent_topics))
+
+    async def run_topic(topic: str):
+        async with topic_semaphore:
+            try:
+                return await run_pipeline(
+                    topic,
+                    num_scenes_override,
+                    resume=resume,
+                    stream_script=stream_script,
+                    resources=resources,
+                    namespace_outputs=True,
+                    candidates=candidates
+                )
+            except Exception as e:
+                logger.error(f"Pipeline for topic '{topic}' failed: {e}", exc_info=True)
+                return None
+
+    batch_start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(run_topic(topic) for topic in topics))
+    finally:
+        await resources.close()
+
+    logger.info(f"--- Batch Finished in {time.perf_counter() - batch_start:.2f} seconds ---")
+    for topic, video_paths in zip(topics, results):
+        if video_paths is None:
+            logger.info(f"{topic}: FAILED")
+        else:
+            logger.info(f"{topic}: {len(video_paths)} scene videos")
+    print_concurrency_table(resources.concurrency)
+    print_llm_cache_stats(resources)
+    print_render_cache_stats(resources)
+    resources.usage.write_report(usage_report_path("batch"))
+
+def usage_report_path(name: str) -> str:
+    """Path of the JSON usage report for a topic (or "batch"), overwritten by each run."""
+    return os.path.join(config.USAGE_REPORT_DIR, f"usage_{re.sub(r'[^a-zA-Z0-9_]', '', name)}.json")
+
+def print_latency_table(metrics: dict, didactic_time: float, didactic_usage: dict | None = None):
+    """Prints a detailed latency and token usage table for each attempt across all scenes."""
     logger.info("--- Latency Metrics ---")
     logger.info(f"Didactic Script Generation Time: {didactic_time:.2f} seconds")
+    if didactic_usage and didactic_usage["calls"]:
+        logger.info(
+            f"Didactic Script Tokens: {didactic_usage['prompt_tokens']} in, "
+            f"{didactic_usage['completion_tokens']} out (${didactic_usage['cost']:.4f})"
+        )
 
     headers = [
         "Scene Title",
@@ -431,6 +1265,9 @@ def print_latency_table(metrics: dict, didactic_time: float):
         "Compress(s)",
         "Analysis(s)",
         "Total(s)",
+        "Tokens In",
+        "Tokens Out",
+        "Cost($)",
         "Status",
     ]
 
@@ -445,6 +1282,9 @@ def print_latency_table(metrics: dict, didactic_time: float):
         13,
         10,
         10,
+        10,
+        8,
+        10,
     ]
 
     header_row = " | ".join(h.ljust(w) for h, w in zip(headers, col_widths))
@@ -453,6 +1293,8 @@ def print_latency_table(metrics: dict, didactic_time: float):
 
     for scene_title, data in metrics.items():
         for attempt in data.get("attempt_details", []):
+            # Speculative candidates and untracked runs have no per-attempt usage
+            usage = attempt.get("usage")
             row_data = [
                 scene_title,
                 str(attempt.get("attempt_number", "")),
@@ -461,16 +1303,148 @@ def print_latency_table(metrics: dict, didactic_time: float):
                 f"{attempt.get('compress_time', 0.0):.2f}",
                 f"{attempt.get('analysis_time', 0.0):.2f}",
                 f"{attempt.get('total_time', 0.0):.2f}",
+                str(usage["prompt_tokens"]) if usage else "-",
+                str(usage["completion_tokens"]) if usage else "-",
+                f"{usage['cost']:.4f}" if usage else "-",
                 attempt.get("status", ""),
             ]
             data_row = " | ".join(d.ljust(w) for d, w in zip(row_data, col_widths))
             logger.info(data_row)
     logger.info("-" * len(header_row))
 
+def print_usage_table(usage_tracker: UsageTracker, topic_title_str: str):
+    """Prints the topic's LLM and Gemini usage per scene and stage, and the topic total."""
+    report = usage_tracker.report(topic_title_str)
+    topic_report = report["topics"].get(topic_title_str)
+    if not topic_report:
+        return
+    logger.info("--- LLM Usage ---")
+    headers = ["Scene / Stage", "Calls", "Prompt", "Cached", "Completion", "Reasoning", "Cost($)"]
+    rows = [
+        (f"{scene} / {stage}", totals)
+        for scene, scene_report in topic_report["scenes"].items()
+        for stage, totals in scene_report["stages"].items()
+    ]
+    if "script" in topic_report["stages"]:
+        rows.insert(0, ("Didactic script", topic_report["stages"]["script"]))
+    rows.append(("TOTAL", topic_report["totals"]))
+    col_widths = [max(len(headers[0]), *(len(label) for label, _ in rows)) + 2, 6, 10, 10, 11, 10, 10]
+    header_row = " | ".join(h.ljust(w) for h, w in zip(headers, col_widths))
+    logger.info(header_row)
+    logger.info("-" * len(header_row))
+    for label, totals in rows:
+        if label == "TOTAL":
+            logger.info("-" * len(header_row))
+        row_data = [
+            label,
+            str(totals["calls"]),
+            str(totals["prompt_tokens"]),
+            str(totals["cached_tokens"]),
+            str(totals["completion_tokens"]),
+            str(totals["reasoning_tokens"]),
+            f"{totals['cost']:.4f}",
+        ]
+        logger.info(" | ".join(d.ljust(w) for d, w in zip(row_data, col_widths)))
+    if topic_report["totals"]["estimated_calls"]:
+        logger.info(f"{topic_report['totals']['estimated_calls']} call(s) were stopped before their usage was reported and are estimated.")
+
+def print_concurrency_table(controller: AdaptiveConcurrency | None):
+    """Prints every limit change made by the adaptive concurrency controller, and the final limits."""
+    if controller is None:
+        return
+    logger.info("--- Adaptive Concurrency ---")
+    final_limits = controller.current_limits()
+    logger.info(
+        f"Final limits: {final_limits['llm']} LLM calls, {final_limits['render']} renders, "
+        f"{final_limits['gemini']} Gemini uploads"
+    )
+    if not controller.decisions:
+        logger.info("No limit changes were made.")
+        return
+
+    headers = ["Time(s)", "Resource", "Limit", "Reason"]
+    col_widths = [10, 10, 10, 40]
+    header_row = " | ".join(h.ljust(w) for h, w in zip(headers, col_widths))
+    logger.info(header_row)
+    logger.info("-" * len(header_row))
+    for decision in controller.decisions:
+        row_data = [
+            f"{decision['elapsed']:.1f}",
+            decision["resource"],
+            f"{decision['old_limit']} -> {decision['new_limit']}",
+            decision["reason"],
+        ]
+        logger.info(" | ".join(d.ljust(w) for d, w in zip(row_data, col_widths)))
+    logger.info("-" * len(header_row))
+
+def print_llm_cache_stats(resources: PipelineResources):
+    """
+    Logs how many LLM completions were served from the response cache, and how much of the
+    Manim code prompts the provider served from its prompt cache.
+    """
+    for name, stage in (("Didactic script", resources.scripter), ("Manim code", resources.architect)):
+        if stage.llm_cache is None:
+            continue
+        stats = stage.llm_cache.stats()
+        logger.info(
+            f"LLM cache ({name}): {stats['hits']} hits, {stats['misses']} misses; "
+            f"{stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f} MiB on disk"
+        )
+    usage = resources.architect.prompt_cache_usage
+    if usage["requests"]:
+        cached_share = usage["cached_tokens"] / usage["prompt_tokens"] if usage["prompt_tokens"] else 0.0
+        logger.info(
+            f"Prompt cache (Manim code): {usage['cache_hits']}/{usage['requests']} requests hit; "
+            f"{usage['cached_tokens']} of {usage['prompt_tokens']} prompt tokens cached ({cached_share:.0%})"
+        )
+
+def print_render_cache_stats(resources: PipelineResources):
+    """Logs how many renders were served from the render cache."""
+    render_cache = getattr(resources.renderer, "render_cache", None)
+    if render_cache is None:
+        return
+    stats = render_cache.stats()
+    logger.info(
+        f"Render cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted; "
+        f"{stats['entries']} videos, {stats['bytes'] / (1024 * 1024):.1f} MiB on disk"
+    )
+
 async def main():
     """
     Main function to parse arguments and run the pipeline.
     """
+    parser = argparse.ArgumentParser(description="Project Drishti end-to-end pipeline.")
+    parser.add_argument("--topic", help="Topic to generate a video for (defaults to the topic configured in main()).")
+    parser.add_argument("--num-scenes", type=int, help="Override the number of scenes requested from the scripter.")
+    parser.add_argument(
+        "--topics-file",
+        help="Batch mode: file with one topic per line. All topics share the same stage workers and global limits."
+    )
+    parser.add_argument(
+        "--stream-script",
+        action=argparse.BooleanOptionalAction,
+        default=config.DIDACTIC_SCRIPT_STREAMING,
+        help="Stream the didactic script and start each scene as soon as it arrives (default: DIDACTIC_SCRIPT_STREAMING)."
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=config.SPECULATIVE_CANDIDATES,
+        help="Speculative candidate scripts per scene attempt, rendered and analyzed in parallel (first to pass wins)."
+    )
+    parser.add_argument(
+        "--fresh-llm-samples",
+        action=argparse.BooleanOptionalAction,
+        default=config.LLM_CACHE_BYPASS,
+        help="Skip LLM response cache lookups. Fresh responses still replace the cached ones (default: LLM_CACHE_BYPASS)."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the topic's run manifest, skipping every stage whose artifact still verifies."
+    )
+    args = parser.parse_args()
+
     # --- Configuration ---
     topic_to_process = "The Non-Cooperation Movement in India"
     # topic_to_process = "The story of the Elephant and the Rope"
@@ -483,8 +1457,24 @@ async def main():
     # Set to None to let the scripter decide.
     num_scenes_for_topic = 5
 
+    if args.topic:
+        topic_to_process = args.topic
+    if args.num_scenes is not None:
+        num_scenes_for_topic = args.num_scenes
+    # Read by DidacticScripter and VisualArchitect at call time
+    config.LLM_CACHE_BYPASS = args.fresh_llm_samples
+
     # --- Run Pipeline ---
-    await run_pipeline(topic_to_process, num_scenes_for_topic)
+    if args.topics_file:
+        await run_batch(
+            args.topics_file, args.num_scenes, resume=args.resume, stream_script=args.stream_script,
+            candidates=args.candidates
+        )
+    else:
+        await run_pipeline(
+            topic_to_process, num_scenes_for_topic, resume=args.resume, stream_script=args.stream_script,
+            candidates=args.candidates
+        )
 
 if __name__ == "__main__":
     # asyncio.run() to call the async main
@@ -0,0 +1,284 @@
+"""
+Module: adaptive_concurrency
+
+Description:
+Runtime controller for the `FairLimiter` limits in `ResourceLimits`.
+
+The configured limits (`LLM_MAX_CONCURRENT_CALLS`, `RENDER_MAX_CONCURRENT`,
+`GEMINI_MAX_CONCURRENT_UPLOADS`) are treated as ceilings. Inside them:
+
+1.  Render concurrency follows machine load. Every sample interval, the 1-minute
+    load average per CPU and the fraction of available memory are read. When
+    either is past its threshold, the render limit drops by one. When the machine
+    has headroom and every render slot is busy, the limit goes up by one.
+2.  LLM (OpenRouter) and Gemini concurrency use AIMD (additive increase,
+    multiplicative decrease), driven by the calls the stages report through their
+    `api_observer` hook. An HTTP 429 halves the limit. A latency spike (a call
+    much slower than the running average) reduces it by a quarter. After a full
+    window of healthy calls, the limit grows by one. A cooldown follows each
+    decrease, so the calls already in flight under the old limit cannot shrink
+    it again.
+
+    Blocking calls report their full duration and streamed calls their time to
+    the first chunk, under separate service keys (`llm` and `llm_stream`). Both
+    keys drive the same limit, but each has its own latency average.
+
+Every change is recorded in `decisions` and printed with the pipeline metrics.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ERROR_NAMES = ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+# Service keys the stages report calls under, and the limiter each one drives
+API_SERVICE_LIMITERS = {"llm": "llm", "llm_stream": "llm", "gemini": "gemini"}
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True if `error` is an HTTP 429 / quota error from the OpenAI or Google clients."""
+    response = getattr(error, "response", None)
+    for source, attr in ((error, "status_code"), (error, "code"), (error, "status"), (response, "status_code")):
+        if getattr(source, attr, None) == 429:
+            return True
+    return type(error).__name__ in RATE_LIMIT_ERROR_NAMES
+
+
+def load_per_cpu() -> float | None:
+    """1-minute load average divided by the CPU count, or None where unsupported."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def available_memory_fraction() -> float | None:
+    """MemAvailable / MemTotal from /proc/meminfo, or None where unavailable."""
+    try:
+        meminfo = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                meminfo[key] = int(value.split()[0])
+        return meminfo["MemAvailable"] / meminfo["MemTotal"]
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease policy for one `FairLimiter`.
+    """
+
+    def __init__(
+        self,
+        limiter,
+        min_limit: int = 1,
+        max_limit: int | None = None,
+        latency_spike_factor: float = config.ADAPTIVE_LATENCY_SPIKE_FACTOR,
+        cooldown_seconds: float = config.ADAPTIVE_BACKOFF_COOLDOWN_SECONDS,
+        min_latency_samples: int = 5,
+        ewma_alpha: float = 0.2,
+        clock=time.monotonic,
+    ):
+        self.limiter = limiter
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or limiter.limit)
+        self.latency_spike_factor = latency_spike_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.min_latency_samples = min_latency_samples
+        self.ewma_alpha = ewma_alpha
+        self.clock = clock
+        # Running latency average and sample count per measurement (e.g. full call vs first chunk)
+        self.latency_averages: dict[str, float] = {}
+        self._latency_samples: dict[str, int] = {}
+        self._healthy_calls = 0
+        self._cooldown_until = 0.0
+
+    def observe(self, latency: float, error: BaseException | None = None, measurement: str = "call") -> dict | None:
+        """
+        Feeds one finished call into the policy. Returns the decision dict if the
+        limit changed, else None. Errors other than rate limits are ignored.
+        `latency` is only compared with earlier calls of the same `measurement`.
+        """
+        now = self.clock()
+        if error is not None:
+            if is_rate_limit_error(error):
+                return self._decrease(0.5, "rate limited (HTTP 429)", now)
+            return None
+
+        if self._is_latency_spike(latency, measurement):
+            average = self.latency_averages[measurement]
+            return self._decrease(0.75, f"latency spike ({measurement}: {latency:.1f}s vs {average:.1f}s average)", now)
+        self._update_latency_average(latency, measurement)
+
+        self._healthy_calls += 1
+        if self._healthy_calls >= self.limiter.limit and now >= self._cooldown_until:
+            self._healthy_calls = 0
+            return self._set_limit(self.limiter.limit + 1, f"{self.limiter.limit} healthy calls", now)
+        return None
+
+    def _is_latency_spike(self, latency: float, measurement: str) -> bool:
+        return (
+            self._latency_samples.get(measurement, 0) >= self.min_latency_samples
+            and latency > self.latency_averages[measurement] * self.latency_spike_factor
+        )
+
+    def _update_latency_average(self, latency: float, measurement: str) -> None:
+        self._latency_samples[measurement] = self._latency_samples.get(measurement, 0) + 1
+        average = self.latency_averages.get(measurement)
+        if average is None:
+            self.latency_averages[measurement] = latency
+        else:
+            self.latency_averages[measurement] = average + self.ewma_alpha * (latency - average)
+
+    def _decrease(self, factor: float, reason: str, now: float) -> dict | None:
+        self._healthy_calls = 0
+        if now < self._cooldown_until:
+            return None
+        self._cooldown_until = now + self.cooldown_seconds
+        return self._set_limit(int(self.limiter.limit * factor), reason, now)
+
+    def _set_limit(self, new_limit: int, reason: str, now: float) -> dict | None:
+        new_limit = min(self.max_limit, max(self.min_limit, new_limit))
+        old_limit = self.limiter.limit
+        if new_limit == old_limit:
+            return None
+        self.limiter.set_limit(new_limit)
+        return {"resource": self.limiter.name, "old_limit": old_limit, "new_limit": new_limit, "reason": reason}
+
+
+class LoadController:
+    """
+    Steps one `FairLimiter` (renders) up or down by one from CPU load and memory pressure.
+    """
+
+    def __init__(
+        self,
+        limiter,
+        min_limit: int = 1,
+        max_limit: int | None = None,
+        high_load_per_cpu: float = config.RENDER_HIGH_LOAD_PER_CPU,
+        low_load_per_cpu: float = config.RENDER_LOW_LOAD_PER_CPU,
+        min_free_memory_fraction: float = config.RENDER_MIN_FREE_MEMORY_FRACTION,
+        load_sampler=load_per_cpu,
+        memory_sampler=available_memory_fraction,
+    ):
+        self.limiter = limiter
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or limiter.limit)
+        self.high_load_per_cpu = high_load_per_cpu
+        self.low_load_per_cpu = low_load_per_cpu
+        self.min_free_memory_fraction = min_free_memory_fraction
+        self.load_sampler = load_sampler
+        self.memory_sampler = memory_sampler
+
+    def sample(self) -> dict | None:
+        """Reads load and memory once and returns the decision dict if the limit changed."""
+        load = self.load_sampler()
+        free_memory = self.memory_sampler()
+        old_limit = self.limiter.limit
+
+        if free_memory is not None and free_memory < self.min_free_memory_fraction:
+            new_limit, reason = old_limit - 1, f"memory pressure ({free_memory:.0%} available)"
+        elif load is not None and load > self.high_load_per_cpu:
+            new_limit, reason = old_limit - 1, f"CPU load {load:.2f} per core"
+        elif (
+            load is not None
+            and load < self.low_load_per_cpu
+            and (free_memory is None or free_memory >= 2 * self.min_free_memory_fraction)
+            and self.limiter.active >= old_limit
+        ):
+            new_limit, reason = old_limit + 1, f"headroom (CPU load {load:.2f} per core, all slots busy)"
+        else:
+            return None
+
+        new_limit = min(self.max_limit, max(self.min_limit, new_limit))
+        if new_limit == old_limit:
+            return None
+        self.limiter.set_limit(new_limit)
+        return {"resource": self.limiter.name, "old_limit": old_limit, "new_limit": new_limit, "reason": reason}
+
+
+class AdaptiveConcurrency:
+    """
+    Drives the limits of a `ResourceLimits` instance: a periodic sampler for renders and
+    AIMD policies for LLM and Gemini calls reported through `observe_api_call`.
+    """
+
+    def __init__(self, limits, sample_interval: float = config.ADAPTIVE_SAMPLE_INTERVAL_SECONDS):
+        self.limits = limits
+        self.sample_interval = sample_interval
+        self.render = LoadController(limits.render)
+        self.api = {
+            "llm": AIMDController(limits.llm),
+            "gemini": AIMDController(limits.gemini),
+        }
+        self.decisions: list[dict] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sampler_task: asyncio.Task | None = None
+        self._started_at = time.monotonic()
+
+    def start(self) -> None:
+        """Starts the render sampler on the running loop. Safe to call more than once."""
+        if self._sampler_task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._sampler_task = asyncio.ensure_future(self._sample_forever())
+        logger.info(
+            f"Adaptive concurrency enabled (ceilings: {self.api['llm'].max_limit} LLM calls, "
+            f"{self.render.max_limit} renders, {self.api['gemini'].max_limit} Gemini uploads)."
+        )
+
+    async def stop(self) -> None:
+        if self._sampler_task is None:
+            return
+        self._sampler_task.cancel()
+        await asyncio.gather(self._sampler_task, return_exceptions=True)
+        self._sampler_task = None
+
+    def observe_api_call(self, service: str, latency: float, error: BaseException | None = None) -> None:
+        """
+        Observer hook for the stage classes (`api_observer`), called after each LLM or Gemini call,
+        normally on the event loop. The policy update is scheduled with `call_soon_threadsafe`, so a
+        call from a blocking method run through `asyncio.to_thread` is applied on the loop as well.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._apply_api_call, service, latency, error)
+        else:
+            self._apply_api_call(service, latency, error)
+
+    def _apply_api_call(self, service: str, latency: float, error: BaseException | None) -> None:
+        controller = self.api.get(API_SERVICE_LIMITERS.get(service, service))
+        if controller is not None:
+            self._record(controller.observe(latency, error, measurement=service))
+
+    async def _sample_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            try:
+                self._record(self.render.sample())
+            except Exception as e:
+                logger.error(f"Render load sampling failed: {e}")
+
+    def _record(self, decision: dict | None) -> None:
+        if decision is None:
+            return
+        decision["elapsed"] = time.monotonic() - self._started_at
+        self.decisions.append(decision)
+        logger.info(
+            f"Concurrency: {decision['resource']} limit {decision['old_limit']} -> "
+            f"{decision['new_limit']} ({decision['reason']})"
+        )
+
+    def current_limits(self) -> dict:
+        return {
+            "llm": self.limits.llm.limit,
+            "render": self.limits.render.limit,
+            "gemini": self.limits.gemini.limit,
+        }
@@ -0,0 +1,135 @@
+"""
+Module: api_guide_eval
+
+Description:
+Offline comparison of code generation with the whole Manim API guide against
+generation with the retrieved guide sections (see `api_guide_index`).
+
+Every scene of a didactic script is generated in both modes, `--samples` times
+each. Each script is then checked statically, and with `--render` also
+rendered. The report gives, per mode, the failure rate and the prompt tokens and
+cost of code generation (from `UsageTracker`):
+
+    python -m project_drishti.api_guide_eval --topic "The Rosetta Stone" --samples 3
+    python -m project_drishti.api_guide_eval --script outputs/didactic_script.json --render
+
+`--topic` reads the didactic script stored in the topic's run manifest.
+Completions go through the LLM cache as usual, so an interrupted evaluation
+resumes where it stopped. Use `--fresh` to request new completions.
+"""
+
+import argparse
+import json
+import logging
+import os
+
+from project_drishti import config
+from project_drishti.manim_renderer import ManimRenderer
+from project_drishti.run_manifest import RunManifest
+from project_drishti.usage_tracker import UsageTracker, topic_key
+from project_drishti.visual_architect import VisualArchitect
+
+logger = logging.getLogger(__name__)
+
+MODES = {"full_guide": False, "retrieval": True}
+OUTCOMES = ("ok", "no_code", "invalid", "render_failed")
+EVAL_REPORT_DIR = os.path.join(config.APP_BASE_DIR, config.GENERATED_CONTENT_BASE, "api_guide_eval")
+
+
+def evaluate_mode(
+    mode: str,
+    scenes: list[dict],
+    topic: str,
+    samples: int,
+    render: bool,
+    use_cache: bool,
+    renderer: ManimRenderer | None = None
+) -> dict:
+    """Generates and checks every scene `samples` times with the guide `mode` and returns its summary."""
+    architect = VisualArchitect(api_guide_retrieval=MODES[mode])
+    architect.usage_tracker = UsageTracker()
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    results = []
+    for scene_data in scenes:
+        for sample in range(1, samples + 1):
+            script_path, manim_class_name = architect.generate_manim_code_for_scene(
+                scene_data, topic, script_prefix=f"{topic_key(topic)}__eval_{mode}_{sample}__", sample=f"eval{sample}", use_cache=use_cache
+            )
+            problems = []
+            if not script_path:
+                outcome = "no_code"
+            else:
+                with open(script_path, "r") as f:
+                    problems = architect._check_patched_code(f.read(), manim_class_name)
+                outcome = "invalid" if problems else "ok"
+                if outcome == "ok" and render:
+                    success, _, error = renderer.render_scene(script_path, manim_class_name)
+                    if not success:
+                        outcome = "render_failed"
+                        problems = [(error or "")[-500:]]
+            outcomes[outcome] += 1
+            results.append({"scene": scene_data.get("title"), "sample": sample, "outcome": outcome, "problems": problems})
+            logger.info(f"[{mode}] '{scene_data.get('title')}' sample {sample}: {outcome}")
+
+    attempts = len(results)
+    codegen_usage = architect.usage_tracker.totals(stage="codegen")
+    return {
+        "attempts": attempts,
+        "outcomes": outcomes,
+        "failure_rate": (attempts - outcomes["ok"]) / attempts if attempts else 0.0,
+        "static_prompt_chars": len(architect.static_prompt_prefix),
+        "prompt_tokens": codegen_usage["prompt_tokens"],
+        "prompt_tokens_per_call": codegen_usage["prompt_tokens"] / codegen_usage["calls"] if codegen_usage["calls"] else 0.0,
+        "cached_tokens": codegen_usage["cached_tokens"],
+        "cost": codegen_usage["cost"],
+        "results": results,
+    }
+
+
+def print_comparison(report: dict) -> None:
+    header = f"{'Mode':<12} | {'Attempts':>8} | {'Failure rate':>12} | {'Prompt tok/call':>15} | {'Cached tok':>10} | {'Cost($)':>8}"
+    print(header)
+    print("-" * len(header))
+    for mode, summary in report["modes"].items():
+        print(
+            f"{mode:<12} | {summary['attempts']:>8} | {summary['failure_rate']:>12.1%} | "
+            f"{summary['prompt_tokens_per_call']:>15.0f} | {summary['cached_tokens']:>10} | {summary['cost']:>8.4f}"
+        )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Compare code generation with the whole API guide and with retrieved sections.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topic", help="Use the didactic script stored in this topic's run manifest.")
+    source.add_argument("--script", help="Path of a didactic script JSON file (with a 'scenes' list).")
+    parser.add_argument("--samples", type=int, default=1, help="Generations per scene and mode.")
+    parser.add_argument("--render", action="store_true", help="Also render the scripts that pass the static check.")
+    parser.add_argument("--fresh", action="store_true", help="Skip the LLM cache.")
+    args = parser.parse_args()
+
+    if args.topic:
+        didactic_script = RunManifest.load(args.topic).get_didactic_script()
+        if not didactic_script:
+            parser.error(f"No didactic script is stored for '{args.topic}'. Run the pipeline for it first.")
+    else:
+        with open(args.script, "r") as f:
+            didactic_script = json.load(f)
+    topic = args.topic or didactic_script.get("topic") or os.path.splitext(os.path.basename(args.script))[0]
+    scenes = didactic_script.get("scenes", [])
+
+    renderer = ManimRenderer() if args.render else None
+    report = {"topic": topic, "samples": args.samples, "render": args.render, "modes": {}}
+    for mode in MODES:
+        report["modes"][mode] = evaluate_mode(mode, scenes, topic, args.samples, args.render, not args.fresh, renderer)
+
+    os.makedirs(EVAL_REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(EVAL_REPORT_DIR, f"{topic_key(topic)}.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print_comparison(report)
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Module: api_guide_index
+
+Description:
+Retrieval over the sections of the Manim API guide, so a code generation
+prompt carries only the parts of the guide that its scene needs.
+
+The guide is split at its markdown headings (levels 1-3; headings inside code
+blocks are ignored). Each section is indexed for BM25 over its words and code
+identifiers. `FadeIn` and `fade_in` are also indexed as `fade` and `in`, and
+headings and code count more than prose. The index is saved as JSON keyed by a
+hash of the guide, so it is only rebuilt when the guide changes.
+
+The prompt is assembled from two parts:
+1.  A fixed core, chosen once per process: the text before the first heading,
+    the sections named in `API_GUIDE_CORE_HEADINGS`, and the sections that best
+    match the code generation prompt template. The template names the API that
+    every scene uses. The core is part of the static prompt prefix, so the
+    provider can still cache it.
+2.  The sections that best match a scene's title and narration (or, for a fix,
+    the error). They go into the scene's own message.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Each heading token counts as this many prose tokens, each code token as CODE_WEIGHT
+HEADING_WEIGHT = 3
+CODE_WEIGHT = 2
+MAX_HEADING_LEVEL = 3
+# Scene fields used as the retrieval query (see the section format in prompts.py)
+SCENE_QUERY_FIELDS = (
+    "title", "narration", "script_content", "core_message",
+    "manim_animation_suggestions", "diagram_suggestions", "key_elements_to_highlight",
+)
+
+_HEADING_REGEX = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_REGEX = re.compile(r"^\s*(```|~~~)")
+_WORD_REGEX = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_PART_REGEX = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+you your can should must not use using used do does if then than into only also more most such their
+there these those which while when where what who how all any each may our we us he she they them
+""".split())
+
+
+def _normalize(word: str) -> str | None:
+    word = word.lower()
+    if len(word) < 2 or word in _STOPWORDS:
+        return None
+    # Crude plural folding, applied alike to the guide and the queries
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words and identifiers, with CamelCase and snake_case identifiers also split into parts."""
+    tokens = []
+    for word in _WORD_REGEX.findall(text):
+        parts = [part for piece in word.split("_") for part in _WORD_PART_REGEX.findall(piece)]
+        candidates = [word] + (parts if len(parts) > 1 else [])
+        tokens.extend(token for token in map(_normalize, candidates) if token)
+    return tokens
+
+
+def split_guide_sections(guide_text: str) -> list[dict]:
+    """
+    Splits the guide at headings up to MAX_HEADING_LEVEL. Each section has its `heading` (empty for
+    the text before the first heading), the `path` of enclosing headings, its full `text` and its `code`.
+    """
+    sections = []
+    current = {"heading": "", "path": [], "lines": [], "code_lines": []}
+    parents: list[tuple[int, str]] = []
+    in_code = False
+    for line in guide_text.split("\n"):
+        if _FENCE_REGEX.match(line):
+            in_code = not in_code
+        else:
+            heading_match = None if in_code else _HEADING_REGEX.match(line)
+            if heading_match and len(heading_match.group(1)) <= MAX_HEADING_LEVEL:
+                sections.append(current)
+                level, heading = len(heading_match.group(1)), heading_match.group(2)
+                parents = [(parent_level, parent) for parent_level, parent in parents if parent_level < level]
+                current = {"heading": heading, "path": [parent for _, parent in parents], "lines": [], "code_lines": []}
+                parents.append((level, heading))
+            elif in_code:
+                current["code_lines"].append(line)
+        current["lines"].append(line)
+    sections.append(current)
+    return [
+        {
+            "heading": section["heading"],
+            "path": section["path"],
+            "text": "\n".join(section["lines"]).strip("\n"),
+            "code": "\n".join(section["code_lines"]),
+        }
+        for section in sections
+        if "\n".join(section["lines"]).strip()
+    ]
+
+
+def scene_query(scene_data: dict) -> str:
+    """The text of a scene that says what it shows: its title, narration and the scripter's visual suggestions."""
+    parts = []
+    for field in SCENE_QUERY_FIELDS:
+        value = scene_data.get(field)
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(item for item in value if isinstance(item, str))
+    return "\n".join(parts)
+
+
+def guide_hash(guide_text: str) -> str:
+    return hashlib.sha256(guide_text.encode("utf-8")).hexdigest()
+
+
+class Bm25Index:
+    """
+    BM25 ranking over documents given as term frequency dicts (built with `tokenize`).
+    """
+
+    def __init__(self, term_freqs: list[dict]):
+        self.term_freqs = term_freqs
+        self.doc_lengths = [sum(freqs.values()) for freqs in term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self.doc_freqs = Counter(term for freqs in term_freqs for term in freqs)
+
+    def scores(self, query: str) -> list[float]:
+        """BM25 score of every document for the query."""
+        query_terms = Counter(tokenize(query))
+        doc_count = len(self.term_freqs)
+        scores = []
+        for freqs, length in zip(self.term_freqs, self.doc_lengths):
+            score = 0.0
+            for term, query_count in query_terms.items():
+                term_freq = freqs.get(term)
+                if not term_freq:
+                    continue
+                doc_freq = self.doc_freqs[term]
+                idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length) if self.avg_length else BM25_K1
+                score += query_count * idf * term_freq * (BM25_K1 + 1) / (term_freq + norm)
+            scores.append(score)
+        return scores
+
+
+class ApiGuideIndex(Bm25Index):
+    """
+    BM25 index over the sections of the API guide.
+    """
+
+    def __init__(self, sections: list[dict], term_freqs: list[dict], source_hash: str):
+        super().__init__(term_freqs)
+        self.sections = sections
+        self.source_hash = source_hash
+
+    @classmethod
+    def build(cls, guide_text: str) -> "ApiGuideIndex":
+        sections = split_guide_sections(guide_text)
+        term_freqs = []
+        for section in sections:
+            heading_tokens = tokenize(" ".join(section["path"] + [section["heading"]]))
+            code_tokens = tokenize(section["code"])
+            # The section text contains the code too, so code tokens get CODE_WEIGHT - 1 extra copies
+            freqs = Counter(tokenize(section["text"]))
+            for token in heading_tokens:
+                freqs[token] += HEADING_WEIGHT
+            for token in code_tokens:
+                freqs[token] += CODE_WEIGHT - 1
+            term_freqs.append(dict(freqs))
+        return cls(sections, term_freqs, guide_hash(guide_text))
+
+    @classmethod
+    def load(cls, guide_text: str, index_path: str = config.API_GUIDE_INDEX_PATH) -> "ApiGuideIndex":
+        """Returns the saved index if it was built from this guide text, otherwise builds and saves one."""
+        source_hash = guide_hash(guide_text)
+        try:
+            with open(index_path, "r") as f:
+                saved = json.load(f)
+            if saved.get("source_hash") == source_hash:
+                return cls(saved["sections"], saved["term_freqs"], source_hash)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.build(guide_text)
+        logger.info(f"Built the API guide index: {len(index.sections)} sections.")
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            with open(index_path, "w") as f:
+                json.dump({"source_hash": source_hash, "sections": index.sections, "term_freqs": index.term_freqs}, f)
+        except OSError as e:
+            logger.warning(f"Could not save the API guide index to {index_path}: {e}")
+        return index
+
+    def search(self, query: str, top_k: int, exclude=(), max_chars: int = 0) -> list[int]:
+        """
+        Ids of the best matching sections, best first. Sections without a matching term are never
+        returned. With `max_chars`, sections that would exceed the character budget are skipped.
+        """
+        ranked = sorted(
+            ((score, section_id) for section_id, score in enumerate(self.scores(query)) if score > 0 and section_id not in exclude),
+            key=lambda item: -item[0]
+        )
+        selected, used_chars = [], 0
+        for _, section_id in ranked:
+            if len(selected) >= top_k:
+                break
+            section_chars = len(self.sections[section_id]["text"])
+            if max_chars and used_chars + section_chars > max_chars:
+                continue
+            selected.append(section_id)
+            used_chars += section_chars
+        return selected
+
+    def core_sections(self, core_query: str, core_headings=config.API_GUIDE_CORE_HEADINGS, top_k: int = config.API_GUIDE_CORE_TOP_K) -> list[int]:
+        """The fixed core: the introduction, the sections named in `core_headings` and the best matches of `core_query`."""
+        wanted = [heading.lower() for heading in core_headings]
+        core = [
+            section_id for section_id, section in enumerate(self.sections)
+            if not section["heading"] or any(heading in section["heading"].lower() for heading in wanted)
+        ]
+        return sorted(core + self.search(core_query, top_k, exclude=core))
+
+    def format_sections(self, section_ids) -> str:
+        """The sections in guide order, each under the path of headings that encloses it."""
+        parts = []
+        for section_id in sorted(set(section_ids)):
+            section = self.sections[section_id]
+            context = " > ".join(section["path"])
+            parts.append(f"[{context}]\n{section['text']}" if context else section["text"])
+        return "\n\n".join(parts)
+
+    def headings(self, section_ids) -> list[str]:
+        return [self.sections[section_id]["heading"] or "(introduction)" for section_id in sorted(set(section_ids))]
@@ -0,0 +1,118 @@
+"""
+Module: code_patcher
+
+Description:
+Helpers for the error-targeted fix path of VisualArchitect.
+
+Instead of a rewritten script, the fix prompt asks the LLM for minimal
+SEARCH/REPLACE blocks:
+
+    <<<<<<< SEARCH
+    exact lines from the current script
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+`apply_patch_blocks` applies them to the failing script. Every SEARCH text
+must match exactly one place in the script, so a patch never lands in the
+wrong spot. Unchanged animations keep their exact code, which also keeps
+Manim's partial movie cache for them valid.
+
+`extract_error_region` finds the lines a traceback (or a static validation
+report) points at, so the prompt can show the failing region with line
+numbers.
+"""
+
+import os
+import re
+
+_PATCH_BLOCK_REGEX = re.compile(
+    r"^[ \t]*<{5,9} ?SEARCH[^\n]*\n(.*?)^[ \t]*={5,9}[ \t]*\n(.*?)^[ \t]*>{5,9} ?REPLACE", re.DOTALL | re.MULTILINE
+)
+# Plain (`File ".../scene_01_x.py", line 42`) and rich (`.../scene_01_x.py:42 in construct`) traceback
+# frames, and `line 42:` entries of static validation reports
+_TRACEBACK_LINE_REGEX = re.compile(r'File "([^"]+)", line (\d+)')
+_RICH_TRACEBACK_LINE_REGEX = re.compile(r'([^\s"│]+\.py):(\d+) in ')
+_REPORT_LINE_REGEX = re.compile(r"^- line (\d+):", re.MULTILINE)
+
+
+class PatchError(ValueError):
+    """A patch block that cannot be applied unambiguously."""
+
+
+def parse_patch_blocks(text: str) -> list[tuple[str, str]]:
+    """Returns the (search, replace) pairs in an LLM response, in order."""
+    return [
+        (search.removesuffix("\n"), replace.removesuffix("\n"))
+        for search, replace in _PATCH_BLOCK_REGEX.findall(text)
+    ]
+
+
+def _find_unique(code: str, search: str) -> tuple[int, int] | None:
+    """Start and end of the only occurrence of `search` in `code`; None if it does not occur."""
+    start = code.find(search)
+    if start == -1:
+        return None
+    if code.find(search, start + 1) != -1:
+        raise PatchError(f"SEARCH text occurs more than once:\n{search}")
+    return start, start + len(search)
+
+
+def _find_ignoring_trailing_whitespace(code: str, search: str) -> tuple[int, int] | None:
+    """Line-based match that tolerates trailing whitespace differences."""
+    code_lines = code.split("\n")
+    search_lines = [line.rstrip() for line in search.split("\n")]
+    matches = [
+        i for i in range(len(code_lines) - len(search_lines) + 1)
+        if [line.rstrip() for line in code_lines[i:i + len(search_lines)]] == search_lines
+    ]
+    if not matches:
+        return None
+    if len(matches) > 1:
+        raise PatchError(f"SEARCH text occurs more than once:\n{search}")
+    start = sum(len(line) + 1 for line in code_lines[:matches[0]])
+    end = start + len("\n".join(code_lines[matches[0]:matches[0] + len(search_lines)]))
+    return start, end
+
+
+def apply_patch_blocks(code: str, blocks: list[tuple[str, str]]) -> str:
+    """Applies the blocks one after another. Raises PatchError if one is empty, missing or ambiguous."""
+    for search, replace in blocks:
+        if not search.strip():
+            raise PatchError("SEARCH text is empty.")
+        span = _find_unique(code, search) or _find_ignoring_trailing_whitespace(code, search)
+        if span is None:
+            raise PatchError(f"SEARCH text not found in the script:\n{search}")
+        code = code[:span[0]] + replace + code[span[1]:]
+    return code
+
+
+def error_line_numbers(error_message: str, script_path: str | None = None) -> list[int]:
+    """Line numbers of the script that the error points at."""
+    script_name = os.path.basename(script_path) if script_path else None
+    frames = _TRACEBACK_LINE_REGEX.findall(error_message or "") + _RICH_TRACEBACK_LINE_REGEX.findall(error_message or "")
+    line_numbers = [
+        int(line) for path, line in frames
+        if script_name is None or os.path.basename(path) == script_name
+    ]
+    line_numbers += [int(line) for line in _REPORT_LINE_REGEX.findall(error_message or "")]
+    return line_numbers
+
+
+def extract_error_region(code: str, error_message: str, script_path: str | None = None, context: int = 6) -> str:
+    """
+    Numbered excerpt of the script around every line the error points at, with the pointed-at
+    lines marked by `>>`. Empty if the error names no line of this script.
+    """
+    lines = code.split("\n")
+    targets = {n for n in error_line_numbers(error_message, script_path) if 1 <= n <= len(lines)}
+    if not targets:
+        return ""
+    shown = sorted({i for n in targets for i in range(max(1, n - context), min(len(lines), n + context) + 1)})
+    excerpt = []
+    for previous, number in zip([None] + shown, shown):
+        if previous is not None and number != previous + 1:
+            excerpt.append("...")
+        marker = ">>" if number in targets else "  "
+        excerpt.append(f"{marker}{number:4d} | {lines[number - 1]}")
+    return "\n".join(excerpt)
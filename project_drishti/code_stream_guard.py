@@ -0,0 +1,231 @@
+"""
+Module: code_stream_guard
+
+Description:
+Checks Manim code while the LLM is still streaming it, so a generation that
+can no longer produce a usable script is stopped early instead of being paid
+for in full and rejected afterwards.
+
+`StreamingCodeGuard` is fed the completion text chunk by chunk. It aborts
+when:
+1.  Too much prose arrives before any code starts.
+2.  A Scene class is declared under a name other than the expected one.
+3.  A finished statement does not compile. Statements are checked one at a
+    time at module level, in a top-level class body and in the body of that
+    class's methods, so an error in `construct` is caught before the class ends.
+4.  At the end, the output was truncated, the last statement does not compile,
+    or there is neither the expected class nor a `construct` method to wrap.
+
+The guard keeps only the statement being checked, not the whole script.
+Once a fenced code block closes, `complete` is set and later text is ignored,
+because `_clean_generated_code` discards anything after the first block anyway.
+"""
+
+import re
+
+from project_drishti import config
+
+# Errors that only mean the statement has not finished arriving yet
+_INCOMPLETE_ERROR_MARKERS = ("was never closed", "unterminated", "unexpected EOF", "expected an indented block")
+# Errors that depend on scopes outside the statement, so only the whole script can decide them
+_CONTEXT_ERROR_MARKERS = ("nonlocal",)
+# Lines that continue the previous statement rather than start a new one
+_CONTINUATION_REGEX = re.compile(r"^(else|elif|except|finally)\b")
+_CODE_START_REGEX = re.compile(r"^(from\s|import\s|class\s|def\s|@|#)")
+_CLASS_DEF_REGEX = re.compile(r"^class\s+(\w+)\s*\(([^)]*)\)\s*:")
+_CONSTRUCT_DEF_REGEX = re.compile(r"def\s+construct\s*\(\s*self\s*\):")
+_DEF_REGEX = re.compile(r"^(async\s+)?def\s")
+
+
+class StreamingCodeGuard:
+    """
+    Incremental structural check of a streamed Manim code completion.
+    """
+
+    def __init__(self, class_name: str, max_preamble_chars: int = config.CODEGEN_MAX_PREAMBLE_CHARS):
+        self.class_name = class_name
+        self.max_preamble_chars = max_preamble_chars
+        # Set from the stream's last chunk by the caller
+        self.finish_reason = None
+        self.complete = False
+        self._pending = ""
+        self._preamble_chars = 0
+        self._in_code = False
+        self._fenced = False
+        self._saw_class = False
+        self._saw_construct = False
+        self._line_number = 0
+        self._previous_line = ""
+        # (body indent, wrapper) of the blocks whose statements are checked one by one. The
+        # wrapper is the header a statement from that block needs to compile on its own.
+        self._blocks: list[tuple[int, str]] = [(0, "")]
+        # (header indent, wrapper, index of the header's first line in the statement) of a class
+        # or method whose body has not started yet
+        self._opening_block: tuple[int, str, int] | None = None
+        self._statement: list[str] = []
+        self._statement_start = 1
+        self._statement_wrapper = ""
+        # Set while the statement at the innermost tracked level has only decorators so far
+        self._decorating = False
+
+    def feed(self, text: str) -> str | None:
+        """Consumes a chunk of the completion. Returns the abort reason, or None to keep going."""
+        if self.complete:
+            return None
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            reason = self._consume_line(line)
+            if reason or self.complete:
+                return reason
+        if not self._in_code and self._preamble_chars + len(self._pending) > self.max_preamble_chars:
+            return f"No code after {self._preamble_chars + len(self._pending)} characters of output."
+        return None
+
+    def finish(self) -> str | None:
+        """Checks the completed output. Returns the reason it is unusable, or None if it looks valid."""
+        if self._pending and not self.complete:
+            reason = self._consume_line(self._pending)
+            self._pending = ""
+            if reason:
+                return reason
+        if self.finish_reason == "length":
+            return "Output was truncated at the token limit."
+        if not self._in_code:
+            return "Output contains no code."
+        # Every earlier statement compiled, so the code compiles if the last one does
+        error = self._compile_statement()
+        if error:
+            if self._fenced and not self.complete:
+                return f"Output ends inside an unclosed code block ({error.msg}, line {self._error_line(error)})."
+            return f"Code does not compile ({error.msg}, line {self._error_line(error)})."
+        if not self._saw_class and not self._saw_construct:
+            return f"Code defines neither class {self.class_name} nor a construct method."
+        return None
+
+    def _consume_line(self, line: str) -> str | None:
+        stripped = line.strip()
+        if not self._in_code:
+            if stripped.startswith("```"):
+                self._in_code = self._fenced = True
+                return None
+            if _CODE_START_REGEX.match(line):
+                self._in_code = True
+                return self._consume_code_line(line)
+            self._preamble_chars += len(line) + 1
+            if self._preamble_chars > self.max_preamble_chars:
+                return f"No code after {self._preamble_chars} characters of output."
+            return None
+        if self._fenced and stripped.startswith("```"):
+            self.complete = True
+            return None
+        return self._consume_code_line(line)
+
+    def _consume_code_line(self, line: str) -> str | None:
+        self._line_number += 1
+        class_match = _CLASS_DEF_REGEX.match(line)
+        if class_match and "Scene" in class_match.group(2):
+            if class_match.group(1) != self.class_name:
+                return f"Scene class is named {class_match.group(1)} instead of {self.class_name}."
+            self._saw_class = True
+        if _CONSTRUCT_DEF_REGEX.search(line):
+            self._saw_construct = True
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            self._statement.append(line)
+            return None
+        indent = len(line) - len(line.lstrip())
+        previous_line, self._previous_line = self._previous_line, line
+        # The def or class line that ends a run of decorators, which may span several lines each
+        ends_decorators = self._decorating and indent == self._blocks[-1][0] and stripped[0] not in "@)]}"
+        if self._opening_block and indent > self._opening_block[0] and self._header_complete():
+            # First line of a class or method body; it stays in the header's statement
+            self._blocks.append((indent, self._opening_block[1]))
+            self._opening_block = None
+            self._decorating = stripped.startswith("@")
+            self._note_block_header(stripped, indent, len(self._statement))
+        elif self._starts_statement(stripped, indent, previous_line):
+            reason = self._start_statement(line, indent)
+            if reason:
+                return reason
+            if self._statement_start == self._line_number:
+                self._note_block_header(stripped, indent, 0)
+            return None
+        elif ends_decorators:
+            self._decorating = False
+            self._note_block_header(stripped, indent, len(self._statement))
+        self._statement.append(line)
+        return None
+
+    def _starts_statement(self, stripped: str, indent: int, previous_line: str) -> bool:
+        if indent > self._blocks[-1][0] or stripped[0] in ")]}":
+            return False
+        if _CONTINUATION_REGEX.match(stripped):
+            return False
+        # Decorators and backslash continuations belong to the statement that follows
+        return not (self._decorating or previous_line.rstrip().endswith("\\"))
+
+    def _note_block_header(self, stripped: str, indent: int, start: int) -> None:
+        """
+        Starts tracking the body of a top-level class, or of a method in that class, whose header
+        begins at `self._statement[start]`.
+        """
+        if len(self._blocks) == 1 and stripped.startswith("class "):
+            self._opening_block = (indent, "class _:", start)
+        elif len(self._blocks) == 2 and _DEF_REGEX.match(stripped):
+            self._opening_block = (indent, "async def _():" if stripped.startswith("async") else "def _():", start)
+
+    def _header_complete(self) -> bool:
+        """
+        Whether the class or def header has ended. Until it has, deeper lines continue the header
+        (e.g. parameters on several lines) rather than start the body.
+        """
+        header_indent, _, start = self._opening_block
+        code = "\n".join(self._statement[start:]) + "\n" + " " * (header_indent + 1) + "pass"
+        if self._blocks[-1][1]:
+            code = f"{self._blocks[-1][1]}\n{code}"
+        try:
+            compile(code, "<generated>", "exec")
+        except SyntaxError:
+            return False
+        return True
+
+    def _start_statement(self, line: str, indent: int) -> str | None:
+        """
+        A line at the level of an enclosing block ends the current statement, which must then be
+        complete, valid Python. The finished statement is dropped and `line` starts the next one.
+        """
+        error = self._compile_statement()
+        if error and any(marker in str(error.msg) for marker in _INCOMPLETE_ERROR_MARKERS):
+            self._statement.append(line)  # e.g. the line is inside a multi-line string
+            return None
+        if error:
+            return f"Code does not compile ({error.msg}, line {self._error_line(error)})."
+        while len(self._blocks) > 1 and indent < self._blocks[-1][0]:
+            self._blocks.pop()
+        if indent != self._blocks[-1][0]:
+            return f"Code does not compile (unindent does not match any outer indentation level, line {self._line_number})."
+        self._opening_block = None
+        self._statement = [line]
+        self._statement_start = self._line_number
+        self._decorating = line.lstrip().startswith("@")
+        self._statement_wrapper = self._blocks[-1][1]
+        return None
+
+    def _compile_statement(self) -> SyntaxError | None:
+        """Compiles the current statement, inside a stand-in header if it comes from a class or method body."""
+        code = "\n".join(self._statement)
+        if self._statement_wrapper:
+            code = f"{self._statement_wrapper}\n{code}"
+        try:
+            compile(code, "<generated>", "exec")
+        except SyntaxError as e:
+            if any(marker in str(e.msg) for marker in _CONTEXT_ERROR_MARKERS):
+                return None
+            return e
+        return None
+
+    def _error_line(self, error: SyntaxError) -> int:
+        """Maps a line number within the compiled statement to one within the code."""
+        wrapper_lines = 1 if self._statement_wrapper else 0
+        return max((error.lineno or 1) - wrapper_lines, 1) + self._statement_start - 1
@@ -1,18 +1,26 @@
+import json
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# --- Local stand-ins for the paid APIs (project_drishti/mock_services.py) ---
+# When set (e.g. http://127.0.0.1:8765), OpenRouter, Gemini and DeepInfra TTS are all called there
+MOCK_SERVICES_URL = os.getenv("MOCK_SERVICES_URL", "").rstrip("/")
+
 # --- Gemini API Configuration ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or ("mock" if MOCK_SERVICES_URL else None)
+# Endpoint of the Gemini REST API; None uses the SDK's default (gRPC to Google)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", MOCK_SERVICES_URL or None)
 
 # --- Base Directory Configuration ---
 # APP_BASE_DIR will be the absolute path to the 'anim_gemini' directory
 # This assumes config.py is in anim_gemini/project_drishti/config.py
 APP_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY") or ("mock" if MOCK_SERVICES_URL else None)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", f"{MOCK_SERVICES_URL}/openrouter/v1" if MOCK_SERVICES_URL else "https://openrouter.ai/api/v1")
 OPENROUTER_SITE_URL = os.getenv("OPENROUTER_SITE_URL", "http://localhost:3000")
 OPENROUTER_APP_NAME = os.getenv("OPENROUTER_APP_NAME", "ProjectDrishti")
 OPENROUTER_MODEL_NAME = os.getenv("OPENROUTER_MODEL_NAME", "deepseek/deepseek-r1-0528")
@@ -26,8 +34,25 @@ MANIM_VIDEO_DIR = os.path.join(GENERATED_CONTENT_DIR, "videos")
 MANIM_LOG_DIR = os.path.join(GENERATED_CONTENT_DIR, "logs")
 MANIM_IMAGE_DIR = os.path.join(GENERATED_CONTENT_DIR, "images")
 FINAL_VIDEOS_DIR = os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "final_videos")
+RUN_MANIFEST_DIR = os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "run_manifests")
 
 MANIM_QUALITY_FLAG = os.getenv("MANIM_QUALITY_FLAG", "-pql")
+# Two-tier rendering: analyze a small, low frame rate QA render first and render at
+# MANIM_QUALITY_FLAG only once the QA render passes. Failed attempts then cost a fraction of a full render.
+RENDER_QA_FIRST = os.getenv("RENDER_QA_FIRST", "false").lower() in ("1", "true", "yes")
+RENDER_QA_RESOLUTION = os.getenv("RENDER_QA_RESOLUTION", "426,240")  # width,height
+RENDER_QA_FPS = int(os.getenv("RENDER_QA_FPS", "10"))
+# Check scripts with project_drishti/script_validator.py before starting Manim; failures go to the fix path
+SCRIPT_VALIDATION_ENABLED = os.getenv("SCRIPT_VALIDATION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Also reject colors outside the mcolors palette (colors.py)
+SCRIPT_VALIDATION_ENFORCE_PALETTE = os.getenv("SCRIPT_VALIDATION_ENFORCE_PALETTE", "true").lower() in ("1", "true", "yes")
+# Names and constructor signatures of manim/manim_voiceover, rebuilt when their versions change
+SCRIPT_VALIDATOR_INDEX_PATH = os.getenv("SCRIPT_VALIDATOR_INDEX_PATH", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "manim_namespace_index.json"))
+# Run construct() with every animation skipped (project_drishti/dry_run.py) before a real render; runtime errors go to the fix path
+DRY_RUN_ENABLED = os.getenv("DRY_RUN_ENABLED", "true").lower() in ("1", "true", "yes")
+DRY_RUN_TIMEOUT_SECONDS = float(os.getenv("DRY_RUN_TIMEOUT_SECONDS", "30"))
+# Voiceover length assumed in a dry run for text that is not in the speech cache yet
+DRY_RUN_SECONDS_PER_WORD = float(os.getenv("DRY_RUN_SECONDS_PER_WORD", "0.4"))
 
 # Ensure Manim output directories exist
 os.makedirs(MANIM_SCRIPTS_DIR, exist_ok=True)
@@ -35,6 +60,7 @@ os.makedirs(MANIM_VIDEO_DIR, exist_ok=True)
 os.makedirs(MANIM_LOG_DIR, exist_ok=True)
 os.makedirs(MANIM_IMAGE_DIR, exist_ok=True)
 os.makedirs(FINAL_VIDEOS_DIR, exist_ok=True)
+os.makedirs(RUN_MANIFEST_DIR, exist_ok=True)
 
 # Validate essential configurations
 if not OPENROUTER_API_KEY:
@@ -43,6 +69,13 @@ if not OPENROUTER_API_KEY:
 # LLM settings
 LLM_DEFAULT_TEMPERATURE = float(os.getenv("LLM_DEFAULT_TEMPERATURE", "0.8"))
 LLM_DEFAULT_REASONING_EFFORT = os.getenv("LLM_DEFAULT_REASONING_EFFORT", "low")
+# Stream the didactic script and start per-scene work as soon as each scene object is complete
+DIDACTIC_SCRIPT_STREAMING = os.getenv("DIDACTIC_SCRIPT_STREAMING", "false").lower() == "true"
+# Stream Manim code generation into the script's .partial file and stop generations that become
+# structurally unusable (prose instead of code, wrong class, syntax error, truncation) early
+CODEGEN_STREAMING = os.getenv("CODEGEN_STREAMING", "true").lower() in ("1", "true", "yes")
+# Characters of prose tolerated before the code starts
+CODEGEN_MAX_PREAMBLE_CHARS = int(os.getenv("CODEGEN_MAX_PREAMBLE_CHARS", "3000"))
 
 # Path for Visual Architect Prompt Template
 # This path is relative to APP_BASE_DIR/project_drishti/
@@ -55,6 +88,14 @@ if not os.path.exists(VISUAL_ARCHITECT_PROMPT_TEMPLATE_PATH):
     print(f"Please ensure the file exists. Calculated APP_BASE_DIR: {APP_BASE_DIR}")
     # Optionally, raise an exception here to halt execution if it's critical
 
+# Failed renders and rejected videos are fixed with a minimal SEARCH/REPLACE patch of the script
+# (project_drishti/code_patcher.py) before falling back to regenerating the scene from scratch
+FIX_WITH_PATCHES = os.getenv("FIX_WITH_PATCHES", "true").lower() in ("1", "true", "yes")
+# Patch requests per fix; a patch that does not apply or fails the static check is sent back
+FIX_MAX_PATCH_ROUNDS = int(os.getenv("FIX_MAX_PATCH_ROUNDS", "2"))
+# Only the tail of long Manim error output is sent in the fix prompt
+FIX_MAX_ERROR_CHARS = int(os.getenv("FIX_MAX_ERROR_CHARS", "6000"))
+
 # Path for Visual Architect Fix Prompt Template
 VISUAL_ARCHITECT_FIX_PROMPT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts", "visual_architect_fix_prompt.txt")
 if not os.path.exists(VISUAL_ARCHITECT_FIX_PROMPT_TEMPLATE_PATH):
@@ -78,6 +119,157 @@ COMPRESSED_VIDEO_DIR = os.path.join(GENERATED_CONTENT_DIR, "compressed_videos")
 os.makedirs(COMPRESSED_VIDEO_DIR, exist_ok=True)
 COMPRESSION_RESOLUTION = "256x144"
 
+# --- Global resource budgets (shared by every topic in a batch run) ---
+LLM_MAX_CONCURRENT_CALLS = int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "16"))
+# Manim renders are CPU-bound, so by default as many run at once as there are cores
+RENDER_MAX_CONCURRENT = int(os.getenv("RENDER_MAX_CONCURRENT", str(os.cpu_count() or 1)))
+GEMINI_MAX_CONCURRENT_UPLOADS = int(os.getenv("GEMINI_MAX_CONCURRENT_UPLOADS", "4"))
+# Number of topics from a batch file that are processed at the same time
+BATCH_MAX_CONCURRENT_TOPICS = int(os.getenv("BATCH_MAX_CONCURRENT_TOPICS", "4"))
+
+# --- Stage workers ---
+# Each pipeline stage has its own bounded queue and worker count, so a scene only occupies
+# the stage it is currently in (e.g. a scene waiting on Gemini does not block a render).
+CODEGEN_WORKERS = int(os.getenv("CODEGEN_WORKERS", "8"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(RENDER_MAX_CONCURRENT)))
+COMPRESS_WORKERS = int(os.getenv("COMPRESS_WORKERS", "4"))
+ANALYZE_WORKERS = int(os.getenv("ANALYZE_WORKERS", str(GEMINI_MAX_CONCURRENT_UPLOADS)))
+FIX_WORKERS = int(os.getenv("FIX_WORKERS", "4"))
+# Maximum number of jobs waiting in each stage's queue before submitters block
+STAGE_QUEUE_MAXSIZE = int(os.getenv("STAGE_QUEUE_MAXSIZE", "16"))
+
+# --- Deadlines (seconds, 0 disables) ---
+# A stage that passes its deadline is cancelled: its Manim/ffmpeg process group is killed,
+# its slot is freed and the attempt is recorded as "Timed Out".
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "900"))
+COMPRESS_TIMEOUT_SECONDS = float(os.getenv("COMPRESS_TIMEOUT_SECONDS", "300"))
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "600"))
+# Whole-scene budget across all attempts
+SCENE_DEADLINE_SECONDS = float(os.getenv("SCENE_DEADLINE_SECONDS", "3600"))
+
+# --- Job queue (project_drishti/job_worker.py) ---
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "job_queue.sqlite3"))
+# A leased job is handed to another worker if its heartbeat stops for this long
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Leases per job (crashes, API errors) before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+
+# --- Speculative script generation ---
+# Candidate scripts generated, rendered and analyzed in parallel per scene attempt; the first to
+# pass analysis wins and the rest are cancelled. 1 disables speculation.
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
+
+# --- Adaptive concurrency ---
+# When enabled, LLM_MAX_CONCURRENT_CALLS, RENDER_MAX_CONCURRENT and GEMINI_MAX_CONCURRENT_UPLOADS
+# become ceilings: renders follow CPU load and memory, LLM/Gemini calls back off on 429s and latency spikes.
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+ADAPTIVE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("ADAPTIVE_SAMPLE_INTERVAL_SECONDS", "5"))
+# Render limit drops above this 1-minute load average per CPU and may grow below the low mark
+RENDER_HIGH_LOAD_PER_CPU = float(os.getenv("RENDER_HIGH_LOAD_PER_CPU", "1.0"))
+RENDER_LOW_LOAD_PER_CPU = float(os.getenv("RENDER_LOW_LOAD_PER_CPU", "0.7"))
+# Render limit drops when less than this fraction of memory is available
+RENDER_MIN_FREE_MEMORY_FRACTION = float(os.getenv("RENDER_MIN_FREE_MEMORY_FRACTION", "0.1"))
+# An API call slower than this multiple of the running average counts as a latency spike
+ADAPTIVE_LATENCY_SPIKE_FACTOR = float(os.getenv("ADAPTIVE_LATENCY_SPIKE_FACTOR", "2.5"))
+# After a back-off, further decreases and increases wait this long
+ADAPTIVE_BACKOFF_COOLDOWN_SECONDS = float(os.getenv("ADAPTIVE_BACKOFF_COOLDOWN_SECONDS", "10"))
+
+# --- LLM response cache (project_drishti/llm_cache.py) ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Skip cache lookups (fresh samples); new responses still replace the cached ones
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+# Mark the static part of the Manim code prompt (rules + API guide) with a cache_control breakpoint
+# so providers that need one (Anthropic, Gemini via OpenRouter) cache it between scenes
+PROMPT_CACHE_CONTROL = os.getenv("PROMPT_CACHE_CONTROL", "true").lower() in ("1", "true", "yes")
+
+# --- Render result cache (project_drishti/render_cache.py) ---
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RENDER_CACHE_DB = os.getenv("RENDER_CACHE_DB", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "render_cache.sqlite3"))
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "render_cache"))
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "1000"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# --- Warm render workers (project_drishti/render_worker.py) ---
+# Render in long-lived processes that import Manim once, instead of a `manim` CLI process per render
+RENDER_WARM_WORKERS = os.getenv("RENDER_WARM_WORKERS", "true").lower() in ("1", "true", "yes")
+# Imported when a worker starts; if any import fails, renders fall back to the CLI
+RENDER_WORKER_PRELOAD = [name.strip() for name in os.getenv(
+    "RENDER_WORKER_PRELOAD", "manim,manim_voiceover,manim_voiceover.services.openai,numpy,anim_gemini.layout_utils,anim_gemini.colors"
+).split(",") if name.strip()]
+# At most RENDER_MAX_CONCURRENT workers are alive at once, idle or busy
+# A worker is replaced after this many renders, which bounds leaks in long-running processes
+RENDER_WORKER_MAX_JOBS = int(os.getenv("RENDER_WORKER_MAX_JOBS", "20"))
+RENDER_WORKER_STARTUP_TIMEOUT_SECONDS = float(os.getenv("RENDER_WORKER_STARTUP_TIMEOUT_SECONDS", "120"))
+
+# --- Section-parallel rendering (project_drishti/section_render.py) ---
+# Render long scenes as sections on several warm workers at once and join them with an ffmpeg stream copy
+RENDER_SECTIONS_ENABLED = os.getenv("RENDER_SECTIONS_ENABLED", "false").lower() in ("1", "true", "yes")
+# Every section after the first takes a free RENDER_MAX_CONCURRENT slot; without one the scene renders in one piece
+RENDER_SECTIONS_MAX = int(os.getenv("RENDER_SECTIONS_MAX", "4"))
+# Scenes with fewer animations (plays and waits) render in one piece
+RENDER_SECTIONS_MIN_ANIMATIONS = int(os.getenv("RENDER_SECTIONS_MIN_ANIMATIONS", "12"))
+
+# --- Pooled HTTP clients (project_drishti/http_clients.py) ---
+# One keep-alive pool per provider, shared by every client in the process
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", str(LLM_MAX_CONCURRENT_CALLS)))
+OPENROUTER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_KEEPALIVE_CONNECTIONS", str(LLM_MAX_CONCURRENT_CALLS)))
+# DeepInfra TTS is called from the Manim render processes; project_drishti/openai.py reads these from the environment
+DEEPINFRA_MAX_CONNECTIONS = int(os.getenv("DEEPINFRA_MAX_CONNECTIONS", "4"))
+DEEPINFRA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DEEPINFRA_MAX_KEEPALIVE_CONNECTIONS", "4"))
+DEEPINFRA_BASE_URL = os.getenv("DEEPINFRA_BASE_URL", f"{MOCK_SERVICES_URL}/deepinfra/v1/openai" if MOCK_SERVICES_URL else "https://api.deepinfra.com/v1/openai")
+HTTP_PROVIDER_LIMITS = {
+    "openrouter": (OPENROUTER_MAX_CONNECTIONS, OPENROUTER_MAX_KEEPALIVE_CONNECTIONS),
+    "deepinfra": (DEEPINFRA_MAX_CONNECTIONS, DEEPINFRA_MAX_KEEPALIVE_CONNECTIONS),
+}
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+# Reasoning models can think for minutes before the first token
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "600"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+# Used only when the optional h2 package is installed (pip install "httpx[http2]")
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# --- Usage accounting (project_drishti/usage_tracker.py) ---
+# USD per million tokens, used when the provider does not report the cost itself (OpenRouter does).
+# Override with a JSON object: {"model": {"input": ..., "output": ..., "cached_input": ...}}
+MODEL_PRICES = json.loads(os.getenv("MODEL_PRICES_JSON", json.dumps({
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cached_input": 0.075},
+})))
+# Budgets (prompt + completion tokens, USD; 0 disables). Once one is used up, the scene (or every
+# scene of the topic) is not retried any more.
+SCENE_TOKEN_BUDGET = int(os.getenv("SCENE_TOKEN_BUDGET", "0"))
+SCENE_COST_BUDGET_USD = float(os.getenv("SCENE_COST_BUDGET_USD", "0"))
+TOPIC_TOKEN_BUDGET = int(os.getenv("TOPIC_TOKEN_BUDGET", "0"))
+TOPIC_COST_BUDGET_USD = float(os.getenv("TOPIC_COST_BUDGET_USD", "0"))
+USAGE_REPORT_DIR = os.getenv("USAGE_REPORT_DIR", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "usage_reports"))
+
+# --- Manim API guide retrieval (project_drishti/api_guide_index.py) ---
+MANIM_API_GUIDE_PATH = os.getenv("MANIM_API_GUIDE_PATH", os.path.abspath(os.path.join(APP_BASE_DIR, "..", "manim_v0.19.0_api_guide.md")))
+# Send each scene only the guide sections relevant to it (plus a fixed core) instead of the whole guide
+API_GUIDE_RETRIEVAL = os.getenv("API_GUIDE_RETRIEVAL", "true").lower() in ("1", "true", "yes")
+# Comma-separated heading substrings whose sections are always sent (the text before the first heading always is)
+API_GUIDE_CORE_HEADINGS = [heading.strip() for heading in os.getenv("API_GUIDE_CORE_HEADINGS", "").split(",") if heading.strip()]
+# Sections best matching the code generation prompt template, added to the core
+API_GUIDE_CORE_TOP_K = int(os.getenv("API_GUIDE_CORE_TOP_K", "4"))
+# Sections added per scene, and per fix for the error being fixed
+API_GUIDE_SCENE_TOP_K = int(os.getenv("API_GUIDE_SCENE_TOP_K", "6"))
+API_GUIDE_FIX_TOP_K = int(os.getenv("API_GUIDE_FIX_TOP_K", "3"))
+# Character budget for the sections added per scene (0 = no limit)
+API_GUIDE_MAX_CHARS = int(os.getenv("API_GUIDE_MAX_CHARS", "24000"))
+# Section index of the guide, rebuilt when the guide changes
+API_GUIDE_INDEX_PATH = os.getenv("API_GUIDE_INDEX_PATH", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "api_guide_index.json"))
+
+# --- Few-shot exemplars (project_drishti/exemplar_store.py) ---
+# Put the accepted scripts of the most similar earlier scenes into the code generation prompt
+EXEMPLARS_ENABLED = os.getenv("EXEMPLARS_ENABLED", "true").lower() in ("1", "true", "yes")
+EXEMPLAR_DB = os.getenv("EXEMPLAR_DB", os.path.join(APP_BASE_DIR, GENERATED_CONTENT_BASE, "exemplars.sqlite3"))
+EXEMPLAR_TOP_K = int(os.getenv("EXEMPLAR_TOP_K", "2"))
+# Character budget for the example scripts in one prompt (0 = no limit)
+EXEMPLAR_MAX_CHARS = int(os.getenv("EXEMPLAR_MAX_CHARS", "24000"))
+
 # You can add more configurations here as needed
 # For example, default reasoning effort, temperature for LLM calls
 # LLM_DEFAULT_TEMPERATURE = 0.7
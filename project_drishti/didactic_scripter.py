@@ -17,11 +17,15 @@ Key functionalities:
 5.  Outputs the script in a structured format (e.g., JSON).
 """
 
+import asyncio
 import json
 import os
 import logging
-from openai import OpenAI # For OpenRouter
+import time
+from openai import AsyncOpenAI, OpenAI # For OpenRouter
 from project_drishti import config
+from project_drishti.llm_cache import LLMCache, cached_completion, completion_cache_key, text_version
+from project_drishti.http_clients import get_async_http_client, get_http_client
 import re
 
 # Configure logging
@@ -42,13 +46,28 @@ class DidacticScripter:
         if not config.OPENROUTER_API_KEY:
             logger.error("OpenRouter API key not found. Please set it in the .env file.")
             self.client = None
+            self.async_client = None
         else:
+            # Both clients reuse the process-wide OpenRouter connection pools
             self.client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
+                base_url=config.OPENROUTER_BASE_URL,
                 api_key=config.OPENROUTER_API_KEY,
+                http_client=get_http_client("openrouter"),
             )
-        
+            self.async_client = AsyncOpenAI(
+                base_url=config.OPENROUTER_BASE_URL,
+                api_key=config.OPENROUTER_API_KEY,
+                http_client=get_async_http_client("openrouter"),
+            )
+        # Optional callable(service, latency_seconds, error) told about every OpenRouter call
+        self.api_observer = None
+        # Optional UsageTracker told about the token usage of every OpenRouter call
+        self.usage_tracker = None
+
         self.prompt_template = self._load_prompt_template()
+        self.prompt_template_version = text_version(self.prompt_template)
+        # Completions are cached by content; see project_drishti/llm_cache.py
+        self.llm_cache = LLMCache() if config.LLM_CACHE_ENABLED else None
 
     def _load_prompt_template(self) -> str:
         """Loads the prompt template from the file specified in config."""
@@ -88,7 +107,7 @@ class DidacticScripter:
             
         return response_text.strip() # Fallback
 
-    def generate_script(self, topic: str, num_scenes: int | None = None) -> dict | None:
+    def generate_script(self, topic: str, num_scenes: int | None = None, use_cache: bool = True) -> dict | None:
         """
         Generates a didactic script for the given topic using an LLM.
 
@@ -96,6 +115,8 @@ class DidacticScripter:
             topic (str): The topic to generate a script for.
             num_scenes (int | None): Desired number of scenes. The LLM is prompted for 4-5 scenes,
                                      this parameter is currently for logging/future use if direct control is needed.
+            use_cache (bool): If False, skip the LLM cache lookup and request a fresh completion
+                              (which then replaces the cached one).
 
         Returns:
             dict | None: A dictionary representing the script, or None if generation fails.
@@ -103,102 +124,380 @@ class DidacticScripter:
         if not self.client:
             logger.error("LLM client not initialized. Cannot generate script.")
             return None
-        
-        if not self.prompt_template or "Generate a didactic script" in self.prompt_template : # check if it's the fallback
-             logger.error("Prompt template not loaded properly. Cannot generate script effectively.")
-             # return None # Or proceed with a very basic prompt
 
-        logger.info(f"Generating didactic script for topic: '{topic}' using LLM: {self.model_name}.")
+        request = self._start_request(topic, num_scenes, use_cache)
+        if request["cached_response"] is not None:
+            return self._parse_script_response(topic, request["cached_response"])
+        try:
+            completion = self.client.chat.completions.create(**request["completion_kwargs"])
+        except Exception as e:
+            return self._request_failed(request, e)
+        return self._finish_completion(request, completion)
+
+    def stream_script(self, topic: str, num_scenes: int | None = None, on_scene=None, use_cache: bool = True) -> dict | None:
+        """
+        Generates a didactic script like `generate_script`, but streams the completion and
+        parses the `scenes` array incrementally. Each scene object is passed to `on_scene`
+        as soon as its closing brace arrives, so downstream work can start before the
+        LLM has finished writing the remaining scenes.
+
+        Args:
+            topic (str): The topic to generate a script for.
+            num_scenes (int | None): Advisory number of scenes (logged only, as in `generate_script`).
+            on_scene (callable | None): Called with each completed scene dict, in order.
+                                        `scene_number` is already normalised to its position.
+            use_cache (bool): As in `generate_script`. A cached response is replayed through
+                              `on_scene` without calling the LLM.
+
+        Returns:
+            dict | None: The full script, or None if generation fails. If the final JSON
+                         does not parse but some scenes were streamed, a script built from
+                         those scenes is returned so already-started work stays consistent.
+        """
+        if not self.client:
+            logger.error("LLM client not initialized. Cannot generate script.")
+            return None
+
+        request = self._start_request(topic, num_scenes, use_cache, streaming=True)
+        if request["cached_response"] is not None:
+            streamed_scenes = self._replay_cached_scenes(request["cached_response"], on_scene)
+            return self._finish_streamed_script(topic, [request["cached_response"]], streamed_scenes)
+        try:
+            stream = self.client.chat.completions.create(stream=True, **request["completion_kwargs"])
+            for chunk in stream:
+                self._apply_stream_chunk(request, chunk, on_scene)
+        except Exception as e:
+            if not self._stream_failed(request, e):
+                return None
+        return self._finish_streamed_script(topic, request["response_chunks"], request["streamed_scenes"], request["cache_key"])
+
+    async def generate_script_async(self, topic: str, num_scenes: int | None = None, use_cache: bool = True) -> dict | None:
+        """
+        Coroutine version of `generate_script`, using the AsyncOpenAI client.
+        """
+        if not self.async_client:
+            logger.error("LLM client not initialized. Cannot generate script.")
+            return None
+
+        # The LLM cache is a SQLite file that may be locked by another process, and parsing writes files
+        request = await asyncio.to_thread(self._start_request, topic, num_scenes, use_cache)
+        if request["cached_response"] is not None:
+            return await asyncio.to_thread(self._parse_script_response, topic, request["cached_response"])
+        try:
+            completion = await self.async_client.chat.completions.create(**request["completion_kwargs"])
+        except Exception as e:
+            return self._request_failed(request, e)
+        return await asyncio.to_thread(self._finish_completion, request, completion)
+
+    async def stream_script_async(self, topic: str, num_scenes: int | None = None, on_scene=None, use_cache: bool = True) -> dict | None:
+        """
+        Coroutine version of `stream_script`. `on_scene` is called on the event loop, so it
+        may schedule tasks directly.
+        """
+        if not self.async_client:
+            logger.error("LLM client not initialized. Cannot generate script.")
+            return None
+
+        request = await asyncio.to_thread(self._start_request, topic, num_scenes, use_cache, True)
+        if request["cached_response"] is not None:
+            # on_scene runs here, on the event loop
+            streamed_scenes = self._replay_cached_scenes(request["cached_response"], on_scene)
+            return await asyncio.to_thread(self._finish_streamed_script, topic, [request["cached_response"]], streamed_scenes)
+        try:
+            stream = await self.async_client.chat.completions.create(stream=True, **request["completion_kwargs"])
+            async for chunk in stream:
+                self._apply_stream_chunk(request, chunk, on_scene)
+        except Exception as e:
+            if not self._stream_failed(request, e):
+                return None
+        return await asyncio.to_thread(
+            self._finish_streamed_script, topic, request["response_chunks"], request["streamed_scenes"], request["cache_key"]
+        )
+
+    def _start_request(self, topic: str, num_scenes: int | None, use_cache: bool, streaming: bool = False) -> dict:
+        """
+        Builds the completion request for `topic` and looks it up in the LLM cache. The returned
+        state is shared by the blocking and streaming calls; streams also collect their chunks in it.
+        """
+        logger.info(f"{'Streaming' if streaming else 'Generating'} didactic script for topic: '{topic}' using LLM: {self.model_name}.")
         if num_scenes:
             logger.info(f"Requested number of scenes (advisory): {num_scenes}")
 
+        completion_kwargs = self._build_completion_kwargs(topic)
+        cache_key = completion_cache_key(completion_kwargs, self.prompt_template_version)
+        cached_response = cached_completion(self.llm_cache, cache_key, use_cache)
+        if cached_response is not None:
+            logger.info(f"Using cached didactic script response for topic '{topic}'.")
+        request = {
+            "topic": topic,
+            "completion_kwargs": completion_kwargs,
+            "cache_key": cache_key,
+            "cached_response": cached_response,
+            "call_start": time.perf_counter(),
+        }
+        if streaming:
+            request.update(parser=SceneStreamParser(), streamed_scenes=[], response_chunks=[], first_chunk_seen=False)
+        return request
 
-        formatted_prompt = self.prompt_template.format(topic=topic)
+    def _request_failed(self, request: dict, error: Exception) -> None:
+        """Logs and reports a blocking call that raised."""
+        logger.error(f"An unexpected error occurred while generating didactic script for topic '{request['topic']}': {error}", exc_info=True)
+        if self.api_observer:
+            self.api_observer("llm", time.perf_counter() - request["call_start"], error)
+        return None
 
+    def _finish_completion(self, request: dict, completion) -> dict | None:
+        """Reports a finished blocking call, then parses and caches its response."""
+        topic = request["topic"]
+        latency = time.perf_counter() - request["call_start"]
+        if self.api_observer:
+            self.api_observer("llm", latency, None)
+        self._record_usage(completion, topic, latency)
+
+        raw_response_content = completion.choices[0].message.content
+        if not raw_response_content:
+            logger.error("LLM returned an empty response.")
+            return None
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert didactic scriptwriter. Follow the user's instructions precisely and output ONLY the requested JSON object."},
-                    {"role": "user", "content": formatted_prompt}
-                ],
-                temperature=config.LLM_DEFAULT_TEMPERATURE,
-                # Consider adding other parameters like max_tokens if necessary
-                extra_body={
-                    "provider": {
-                        "only": [config.OPENROUTER_PROVIDER_ORDER],
-                        "allow_fallbacks": False
-                    }
-                }
+            return self._parse_and_cache(topic, raw_response_content, request["cache_key"])
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while generating didactic script for topic '{topic}': {e}", exc_info=True)
+            self._save_error_output(topic, "error_unexpected", raw_response_content)
+            return None
+
+    def _apply_stream_chunk(self, request: dict, chunk, on_scene=None) -> None:
+        """Reports the first chunk, records usage and hands every scene the chunk completes to `on_scene`."""
+        if not request["first_chunk_seen"]:
+            # For a stream, the time to the first chunk is the latency signal
+            request["first_chunk_seen"] = True
+            if self.api_observer:
+                self.api_observer("llm_stream", time.perf_counter() - request["call_start"], None)
+        # OpenRouter reports usage on the final chunk
+        self._record_usage(chunk, request["topic"], time.perf_counter() - request["call_start"])
+        if not chunk.choices:
+            return
+        delta_text = chunk.choices[0].delta.content
+        if not delta_text:
+            return
+        request["response_chunks"].append(delta_text)
+        streamed_scenes = request["streamed_scenes"]
+        for scene in request["parser"].feed(delta_text):
+            scene["scene_number"] = len(streamed_scenes) + 1
+            streamed_scenes.append(scene)
+            logger.info(f"Streamed scene {scene['scene_number']}: '{scene.get('title', 'Untitled')}'")
+            if on_scene:
+                on_scene(scene)
+
+    def _stream_failed(self, request: dict, error: Exception) -> bool:
+        """Logs and reports a stream that raised. Returns whether the scenes streamed so far are worth keeping."""
+        logger.error(f"Streaming didactic script failed for topic '{request['topic']}': {error}", exc_info=True)
+        if self.api_observer and not request["first_chunk_seen"]:
+            self.api_observer("llm_stream", time.perf_counter() - request["call_start"], error)
+        return bool(request["streamed_scenes"])
+
+    def _finish_streamed_script(
+        self,
+        topic: str,
+        response_chunks: list[str],
+        streamed_scenes: list[dict],
+        cache_key: str | None = None
+    ) -> dict | None:
+        """
+        Parses the full streamed response and reconciles it with the scenes already handed out.
+        """
+        raw_response_content = "".join(response_chunks)
+        script_data = None
+        if raw_response_content:
+            script_data = self._parse_and_cache(topic, raw_response_content, cache_key)
+        if script_data is None and streamed_scenes:
+            logger.warning(f"Full didactic script for '{topic}' did not parse; keeping the {len(streamed_scenes)} scenes already streamed.")
+            script_data = {"topic": topic, "scenes": streamed_scenes}
+            self._save_script_markdown(topic, script_data)
+        elif script_data is not None and len(script_data["scenes"]) != len(streamed_scenes):
+            logger.warning(
+                f"Streamed {len(streamed_scenes)} scenes but the full script has {len(script_data['scenes'])}. "
+                "Using the streamed scenes to stay consistent with work already started."
             )
-            
-            raw_response_content = completion.choices[0].message.content
-            if not raw_response_content:
-                logger.error("LLM returned an empty response.")
-                return None
+            script_data["scenes"] = streamed_scenes
+        return script_data
 
-            logger.debug(f"Raw LLM response for didactic script:\\n{raw_response_content}")
+    @staticmethod
+    def _replay_cached_scenes(cached_response: str, on_scene=None) -> list[dict]:
+        """Feeds a cached response through the stream parser so `on_scene` sees the same scenes."""
+        streamed_scenes = []
+        for scene in SceneStreamParser().feed(cached_response):
+            scene["scene_number"] = len(streamed_scenes) + 1
+            streamed_scenes.append(scene)
+            if on_scene:
+                on_scene(scene)
+        return streamed_scenes
 
-            # Clean the response to get a potential JSON string
-            cleaned_json_string = self._clean_llm_json_response(raw_response_content)
-            logger.debug(f"Cleaned JSON string for didactic script:\\n{cleaned_json_string}")
-            
-            script_data = json.loads(cleaned_json_string)
+    def _parse_and_cache(self, topic: str, raw_response_content: str, cache_key: str | None) -> dict | None:
+        """Parses a fresh response and caches it if it produced a valid script."""
+        script_data = self._parse_script_response(topic, raw_response_content)
+        if script_data is not None and self.llm_cache and cache_key:
+            self.llm_cache.put(cache_key, raw_response_content, self.model_name)
+        return script_data
 
-            # Basic validation
-            if not isinstance(script_data, dict) or "topic" not in script_data or "scenes" not in script_data:
-                logger.error(f"LLM output is not in the expected JSON format. Output:\\n{cleaned_json_string}")
-                # Save the problematic output for debugging
-                error_output_path = os.path.join(self.output_dir, f"error_didactic_script_{topic.replace(' ', '_')}.txt")
-                with open(error_output_path, "w") as f:
-                    f.write(f"Topic: {topic}\\n")
-                    f.write(f"Raw LLM Output:\\n{raw_response_content}\\n")
-                    f.write(f"Cleaned String (attempted JSON):\\n{cleaned_json_string}\\n")
-                logger.error(f"Problematic LLM output saved to {error_output_path}")
-                return None
+    def _record_usage(self, response, topic: str, latency: float) -> None:
+        """Hands a completion (or stream chunk) to the usage tracker; responses without usage are skipped."""
+        if self.usage_tracker is not None:
+            self.usage_tracker.record_response(response, topic, None, "script", self.model_name, latency)
 
-            # Ensure scene numbers are sequential if not already
-            for i, scene in enumerate(script_data.get("scenes", [])):
-                if scene.get("scene_number") != i + 1:
-                    logger.warning(f"Adjusting scene_number for scene {i+1} from {scene.get('scene_number')} to {i+1}")
-                    scene["scene_number"] = i + 1
-            
-            script_data["topic"] = topic # Ensure the original topic is in the output
+    def _build_completion_kwargs(self, topic: str) -> dict:
+        """Builds the chat completion arguments shared by the blocking and streaming calls."""
+        formatted_prompt = self.prompt_template.format(topic=topic)
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": "You are an expert didactic scriptwriter. Follow the user's instructions precisely and output ONLY the requested JSON object."},
+                {"role": "user", "content": formatted_prompt}
+            ],
+            "temperature": config.LLM_DEFAULT_TEMPERATURE,
+            # Consider adding other parameters like max_tokens if necessary
+            "extra_body": {
+                "provider": {
+                    "only": [config.OPENROUTER_PROVIDER_ORDER],
+                    "allow_fallbacks": False
+                },
+                # Ask OpenRouter to return token usage and cost
+                "usage": {"include": True},
+            },
+        }
 
-            # Save to .md file for debugging (successful or not if it parsed)
-            output_filename = f"didactic_script_{topic.replace(' ', '_').replace('/', '_')}.md"
-            output_path = os.path.join(self.output_dir, output_filename)
-            with open(output_path, "w") as f:
-                f.write(f"# Didactic Script for: {topic}\\n\\n")
-                f.write("```json\\n")
-                json.dump(script_data, f, indent=4)
-                f.write("\\n```\\n")
-            logger.info(f"LLM-generated didactic script saved to {output_path}")
+    def _parse_script_response(self, topic: str, raw_response_content: str) -> dict | None:
+        """
+        Cleans, parses and validates a raw LLM response, normalises scene numbers
+        and saves the script to a .md file. Returns None if the response is unusable.
+        """
+        logger.debug(f"Raw LLM response for didactic script:\\n{raw_response_content}")
 
-            return script_data
+        # Clean the response to get a potential JSON string
+        cleaned_json_string = self._clean_llm_json_response(raw_response_content)
+        logger.debug(f"Cleaned JSON string for didactic script:\\n{cleaned_json_string}")
 
+        try:
+            script_data = json.loads(cleaned_json_string)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from LLM response for topic '{topic}': {e}")
             logger.error(f"LLM Response (cleaned attempt) that failed parsing:\\n{cleaned_json_string}")
             # Save the problematic output
-            error_output_path = os.path.join(self.output_dir, f"error_json_decode_{topic.replace(' ', '_')}.txt")
-            with open(error_output_path, "w") as f:
-                f.write(f"Topic: {topic}\\n")
-                f.write(f"Raw LLM Output:\\n{raw_response_content}\\n") # Add raw_response_content if available
-                f.write(f"Cleaned String (failed JSON):\\n{cleaned_json_string}\\n") # Add cleaned_json_string if available
-            logger.error(f"Problematic JSON output saved to {error_output_path}")
+            self._save_error_output(topic, "error_json_decode", raw_response_content, cleaned_json_string)
             return None
-        except Exception as e:
-            logger.error(f"An unexpected error occurred while generating didactic script for topic '{topic}': {e}", exc_info=True)
-            # Save raw response if available
-            if 'raw_response_content' in locals():
-                 error_output_path = os.path.join(self.output_dir, f"error_unexpected_{topic.replace(' ', '_')}.txt")
-                 with open(error_output_path, "w") as f:
-                    f.write(f"Topic: {topic}\\n")
-                    f.write(f"Raw LLM Output:\\n{raw_response_content}\\n")
-                 logger.error(f"Raw LLM output for unexpected error saved to {error_output_path}")
+
+        # Basic validation
+        if not isinstance(script_data, dict) or "topic" not in script_data or "scenes" not in script_data:
+            logger.error(f"LLM output is not in the expected JSON format. Output:\\n{cleaned_json_string}")
+            # Save the problematic output for debugging
+            self._save_error_output(topic, "error_didactic_script", raw_response_content, cleaned_json_string)
             return None
 
+        # Ensure scene numbers are sequential if not already
+        for i, scene in enumerate(script_data.get("scenes", [])):
+            if scene.get("scene_number") != i + 1:
+                logger.warning(f"Adjusting scene_number for scene {i+1} from {scene.get('scene_number')} to {i+1}")
+                scene["scene_number"] = i + 1
+        
+        script_data["topic"] = topic # Ensure the original topic is in the output
+
+        # Save to .md file for debugging (successful or not if it parsed)
+        self._save_script_markdown(topic, script_data)
+        return script_data
+
+    def _save_script_markdown(self, topic: str, script_data: dict) -> None:
+        """Saves the parsed script to a .md file for debugging."""
+        output_filename = f"didactic_script_{topic.replace(' ', '_').replace('/', '_')}.md"
+        output_path = os.path.join(self.output_dir, output_filename)
+        with open(output_path, "w") as f:
+            f.write(f"# Didactic Script for: {topic}\\n\\n")
+            f.write("```json\\n")
+            json.dump(script_data, f, indent=4)
+            f.write("\\n```\\n")
+        logger.info(f"LLM-generated didactic script saved to {output_path}")
+
+    def _save_error_output(self, topic: str, prefix: str, raw_response_content: str, cleaned_json_string: str | None = None) -> None:
+        """Saves a problematic LLM response so it can be inspected later."""
+        error_output_path = os.path.join(self.output_dir, f"{prefix}_{topic.replace(' ', '_')}.txt")
+        with open(error_output_path, "w") as f:
+            f.write(f"Topic: {topic}\\n")
+            f.write(f"Raw LLM Output:\\n{raw_response_content}\\n")
+            if cleaned_json_string is not None:
+                f.write(f"Cleaned String (attempted JSON):\\n{cleaned_json_string}\\n")
+        logger.error(f"Problematic LLM output saved to {error_output_path}")
+
+
+class SceneStreamParser:
+    """
+    Incremental parser for the `scenes` array of a didactic script JSON object.
+
+    Text is fed in arbitrary chunks as it arrives from the LLM. Each call to `feed`
+    returns the scene objects that were completed by that chunk. The parser only
+    tracks string/escape state and brace depth, so it never re-parses text it has
+    already scanned.
+    """
+
+    _SCENES_ARRAY_START = re.compile(r'"scenes"\s*:\s*\[')
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._array_done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, text: str) -> list[dict]:
+        """Adds `text` to the buffer and returns any scene objects it completed."""
+        self._buffer += text
+        completed = []
+        if self._array_done:
+            return completed
+
+        if not self._in_array:
+            match = self._SCENES_ARRAY_START.search(self._buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the scenes array itself
+                    self._array_done = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and char == "}" and self._object_start is not None:
+                    object_text = buffer[self._object_start:self._pos + 1]
+                    self._object_start = None
+                    try:
+                        scene = json.loads(object_text)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping streamed scene object that failed to parse: {e}")
+                    else:
+                        if isinstance(scene, dict):
+                            completed.append(scene)
+            self._pos += 1
+        return completed
+
 if __name__ == '__main__':
     # Ensure .env is loaded (if running this file directly for testing)
     from dotenv import load_dotenv
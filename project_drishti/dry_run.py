@@ -0,0 +1,252 @@
+"""
+Module: dry_run
+
+Description:
+Runs a scene's `construct()` without drawing or encoding anything, so runtime
+errors show up before a real render. Typical ones are a bad keyword argument,
+a wrong `Line` signature or an `AttributeError` on a mobject. Without a dry
+run, a script that raises at its 20th animation fails only after Manim has
+rasterized and encoded the first 19.
+
+The scene runs under a `tempconfig` with `dry_run` (no files are written) and
+`from_animation_number` set beyond any scene, so every `play` and `wait` is
+skipped: animations jump to their end state without producing frames.
+Voiceovers are not synthesized. Each `voiceover` block gets a tracker whose
+duration comes from the speech cache when the text was spoken before, and
+otherwise from `DRY_RUN_SECONDS_PER_WORD`.
+
+The result names the exception, the script line it came from and the index of
+the animation that was running. It also lists when each animation and each
+voiceover starts. With `synthesize_voiceovers`, speech is synthesized for
+real (and cached), so those times are exact; `section_render` plans its
+sections from such a run. `ManimRenderer` runs dry runs on a warm render
+worker (see `render_worker`) and only renders scripts that get through. A dry
+run that fails for reasons outside the script (Manim missing, a worker dying,
+the time limit) does not block the render.
+
+    python -m project_drishti.dry_run path/to/script.py SceneClassName
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import time
+import traceback
+
+from project_drishti import config
+
+# The bookmark tag of manim_voiceover texts
+BOOKMARK_PATTERN = re.compile(r"<bookmark\s*mark\s*=\s*['\"](\w*)['\"]\s*/>")
+# manim_voiceover's index of synthesized texts in a speech service's cache_dir
+VOICEOVER_CACHE_FILE = "cache.json"
+TRACEBACK_TAIL_CHARS = 4000
+
+# Skips every animation (no frames are rendered) and writes no files
+DRY_RUN_MANIM_CONFIG = {
+    "dry_run": True,
+    "from_animation_number": 10 ** 9,
+    "disable_caching": True,
+    "preview": False,
+    "progress_bar": "none",
+}
+
+
+def _word_count(text: str) -> int:
+    return len(BOOKMARK_PATTERN.sub(" ", text).split())
+
+
+def cached_speech_duration(text: str, cache_dir: str | None) -> float | None:
+    """Length in seconds of the audio already synthesized for `text` in a manim_voiceover cache, if any."""
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, VOICEOVER_CACHE_FILE), "r") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # manim_voiceover collapses whitespace before synthesizing and caching
+    text = " ".join(text.split())
+    plain_text = BOOKMARK_PATTERN.sub("", text)
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        if entry.get("input_text") != text and (entry.get("input_data") or {}).get("input_text") != plain_text:
+            continue
+        audio_file = entry.get("final_audio") or entry.get("original_audio")
+        try:
+            from mutagen import File as AudioFile
+            audio = AudioFile(os.path.join(cache_dir, audio_file))
+            return audio.info.length if audio is not None else None
+        except Exception:
+            return None
+    return None
+
+
+class EstimatedVoiceoverTracker:
+    """
+    Stands in for manim_voiceover's `VoiceoverTracker` during a dry run. Bookmarks are placed
+    in proportion to the words before them.
+    """
+
+    def __init__(self, scene, text: str, duration: float):
+        self.scene = scene
+        self.duration = duration
+        self.start_t = scene.renderer.time
+        self.end_t = self.start_t + duration
+        total_words = max(_word_count(text), 1)
+        self.bookmark_times = {
+            match.group(1): self.start_t + duration * _word_count(text[:match.start()]) / total_words
+            for match in BOOKMARK_PATTERN.finditer(text)
+        }
+
+    def get_remaining_duration(self, buff: float = 0.0) -> float:
+        return max(self.end_t - self.scene.renderer.time + buff, 0)
+
+    def time_until_bookmark(self, mark: str, buff: float = 0, limit: float | None = None) -> float:
+        if mark not in self.bookmark_times:
+            raise Exception(f"There is no <bookmark mark='{mark}' /> in the voiceover text.")
+        result = max(self.bookmark_times[mark] + buff - self.scene.renderer.time, 0)
+        return min(limit, result) if limit is not None else result
+
+
+@contextlib.contextmanager
+def recorded_voiceovers(voiceover_starts: list[int], estimate: bool = True, seconds_per_word: float = config.DRY_RUN_SECONDS_PER_WORD):
+    """
+    Appends the animation index at which each voiceover starts to `voiceover_starts`. With `estimate`,
+    `VoiceoverScene.add_voiceover_text` also returns estimated trackers instead of synthesizing speech.
+    """
+    try:
+        from manim_voiceover import VoiceoverScene
+    except ImportError:
+        yield
+        return
+    original = VoiceoverScene.add_voiceover_text
+
+    def add_voiceover_text(scene, text: str, **kwargs):
+        voiceover_starts.append(scene.renderer.num_plays)
+        if not estimate:
+            return original(scene, text, **kwargs)
+        if not hasattr(scene, "speech_service"):
+            raise Exception("You need to call init_voiceover() before adding a voiceover.")
+        duration = cached_speech_duration(text, getattr(scene.speech_service, "cache_dir", None))
+        if duration is None:
+            duration = max(_word_count(text), 1) * seconds_per_word
+        scene.current_tracker = EstimatedVoiceoverTracker(scene, text, duration)
+        return scene.current_tracker
+
+    VoiceoverScene.add_voiceover_text = add_voiceover_text
+    try:
+        yield
+    finally:
+        VoiceoverScene.add_voiceover_text = original
+
+
+def _record_animation_times(scene) -> list[float]:
+    """Wraps the scene's renderer to note the scene time at which each animation (a play or a wait) starts."""
+    animation_times = []
+    play = scene.renderer.play
+
+    def recording_play(*args, **kwargs):
+        animation_times.append(scene.renderer.time)
+        return play(*args, **kwargs)
+
+    scene.renderer.play = recording_play
+    return animation_times
+
+
+def dry_run_scene(
+    script_path: str,
+    scene_class_name: str,
+    manim_config: dict | None = None,
+    synthesize_voiceovers: bool = False
+) -> dict:
+    """
+    Runs the scene's `construct()` with every animation skipped. Returns `ok` and the `seconds` it took.
+    On success also the `animation_times` (scene time at which each animation starts), the `voiceover_starts`
+    (animation index at which each voiceover starts) and the scene's `duration`. On failure the `exception`
+    ("TypeError: ..."), the script `line` it was raised from, the `animation_index` (number of animations played
+    before it), whether the script itself is at fault (`script_error`) and the `traceback`.
+    """
+    from project_drishti.render_worker import loaded_scene_class
+    started = time.perf_counter()
+    output = io.StringIO()
+    scene = None
+    voiceover_starts = []
+    try:
+        from manim import tempconfig
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output), \
+                tempconfig({**DRY_RUN_MANIM_CONFIG, **(manim_config or {})}), \
+                recorded_voiceovers(voiceover_starts, estimate=not synthesize_voiceovers):
+            with loaded_scene_class(script_path, scene_class_name) as scene_class:
+                scene = scene_class()
+                animation_times = _record_animation_times(scene)
+                scene.render()
+        result = {
+            "ok": True,
+            "animation_times": animation_times,
+            "voiceover_starts": voiceover_starts,
+            "duration": scene.renderer.time,
+        }
+    except BaseException as e:
+        # Includes SystemExit from the script
+        script_file = os.path.abspath(script_path)
+        script_frames = [
+            frame for frame in traceback.extract_tb(e.__traceback__)
+            if os.path.abspath(frame.filename) == script_file
+        ]
+        line = script_frames[-1].lineno if script_frames else None
+        if isinstance(e, SyntaxError) and e.filename and os.path.abspath(e.filename) == script_file:
+            line = e.lineno
+        missing_class = isinstance(e, AttributeError) and str(e).startswith(f"{scene_class_name} is not in the script")
+        result = {
+            "ok": False,
+            # Errors that never reach the script (e.g. Manim not installed) say nothing about it
+            "script_error": line is not None or missing_class,
+            "exception": "".join(traceback.format_exception_only(type(e), e)).strip(),
+            "line": line,
+            "animation_index": getattr(getattr(scene, "renderer", None), "num_plays", None),
+            "traceback": traceback.format_exc()[-TRACEBACK_TAIL_CHARS:],
+        }
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def format_dry_run_error(result: dict, scene_class_name: str) -> str:
+    """The failure as an error message for the fix prompt, like a Manim traceback but with the location up front."""
+    location = f" at line {result['line']}" if result.get("line") else ""
+    if result.get("animation_index") is not None:
+        location += f", after {result['animation_index']} animations had played"
+    return (
+        f"Dry run (construct() without rendering) of '{scene_class_name}' raised {result['exception']}{location}.\n"
+        f"{result['traceback']}"
+    )
+
+
+def parse_dry_run_output(stdout: str) -> dict | None:
+    """The result printed by `python -m project_drishti.dry_run`, or None if the run ended without one."""
+    for line in reversed(stdout.splitlines()):
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(result, dict) and "ok" in result:
+            return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Manim scene's construct() without rendering it.")
+    parser.add_argument("script_path")
+    parser.add_argument("scene_class_name")
+    parser.add_argument("--media_dir", help="Media directory whose voiceover cache supplies speech durations.")
+    args = parser.parse_args()
+    manim_config = {"media_dir": os.path.abspath(args.media_dir)} if args.media_dir else None
+    # One JSON line, last on stdout; `ManimRenderer` reads it when no warm worker is available
+    print(json.dumps(dry_run_scene(args.script_path, args.scene_class_name, manim_config)))
+
+
+if __name__ == "__main__":
+    main()
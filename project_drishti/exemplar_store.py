@@ -0,0 +1,241 @@
+"""
+Module: exemplar_store
+
+Description:
+Few-shot examples for code generation, taken from scene scripts that passed
+video analysis.
+
+When a scene's video passes analysis, its script is recorded together with the
+scene's topic, its title and the text that describes it: the title, the
+narration and the scripter's visual suggestions (see
+`api_guide_index.scene_query`). Before a scene is generated, the accepted
+scripts that best match its text (BM25) are added to its prompt as examples,
+up to `EXEMPLAR_TOP_K` scripts within `EXEMPLAR_MAX_CHARS`.
+
+A scene never gets examples from its own topic. The scenes of a topic are
+accepted in parallel and in no fixed order, so using them would make the
+prompts, and therefore the LLM cache keys, depend on timing.
+
+The store is a SQLite file that pipeline runs and job workers share. Scripts
+accepted before the store existed can be imported from an output directory
+with `final_videos/` and `generated_content/manim_scripts/`:
+
+    python -m project_drishti.exemplar_store import outputs_sonnet_audio
+    python -m project_drishti.exemplar_store list
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+
+from project_drishti import config
+from project_drishti.api_guide_index import Bm25Index, scene_query, tokenize
+from project_drishti.sqlite_utils import connection, create_schema
+from project_drishti.usage_tracker import topic_key
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exemplars (
+    key TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    scene_title TEXT NOT NULL,
+    manim_class_name TEXT NOT NULL,
+    query_text TEXT NOT NULL,
+    code TEXT NOT NULL,
+    video_path TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def voiceover_texts(code: str) -> list[str]:
+    """The `text=` strings of the script's `self.voiceover(...)` calls: its narration, for imported scripts."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    texts = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "voiceover":
+            for keyword in node.keywords:
+                if keyword.arg == "text" and isinstance(keyword.value, ast.Constant) and isinstance(keyword.value.value, str):
+                    texts.append(keyword.value.value)
+    return texts
+
+
+def defined_classes(code: str) -> list[str]:
+    try:
+        return [node.name for node in ast.parse(code).body if isinstance(node, ast.ClassDef)]
+    except SyntaxError:
+        return []
+
+
+class ExemplarStore:
+    """
+    Accepted scene scripts in a SQLite file, retrieved by similarity to a new scene.
+    """
+
+    def __init__(self, db_path: str = config.EXEMPLAR_DB):
+        self.db_path = db_path
+        # (row count, latest created_at) -> rows and their BM25 index, rebuilt when the store changes
+        self._index_signature = None
+        self._index_rows: list[tuple] = []
+        self._index: Bm25Index | None = None
+        create_schema(db_path, _SCHEMA)
+
+    def add_code(
+        self,
+        code: str,
+        topic: str,
+        scene_title: str,
+        manim_class_name: str,
+        query_text: str,
+        video_path: str | None = None
+    ) -> str | None:
+        """Stores an accepted script and returns its key (a hash of the code). None if it could not be stored."""
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        try:
+            with connection(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO exemplars (key, topic, scene_title, manim_class_name, query_text, code, video_path, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, topic_key(topic), scene_title, manim_class_name, query_text, code, video_path, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store the exemplar for scene '{scene_title}': {e}")
+            return None
+        logger.info(f"Stored the accepted script of scene '{scene_title}' as an exemplar.")
+        return key
+
+    def add(self, scene_data: dict, topic: str, script_path: str, manim_class_name: str, video_path: str | None = None) -> str | None:
+        """Stores the script of a scene that passed analysis."""
+        try:
+            with open(script_path, "r") as f:
+                code = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read the accepted script {script_path} for the exemplar store: {e}")
+            return None
+        scene_title = scene_data.get("title", manim_class_name)
+        return self.add_code(code, topic, scene_title, manim_class_name, scene_query(scene_data), video_path)
+
+    def _load_index(self) -> None:
+        with connection(self.db_path) as conn:
+            signature = conn.execute("SELECT COUNT(*), MAX(created_at) FROM exemplars").fetchone()
+            if signature == self._index_signature:
+                return
+            rows = conn.execute("SELECT key, topic, scene_title, manim_class_name, query_text, LENGTH(code) FROM exemplars ORDER BY key").fetchall()
+        self._index_rows = rows
+        self._index = Bm25Index([dict(Counter(tokenize(row[4]))) for row in rows])
+        self._index_signature = signature
+
+    def similar(
+        self,
+        scene_data: dict,
+        topic: str,
+        top_k: int = config.EXEMPLAR_TOP_K,
+        max_chars: int = config.EXEMPLAR_MAX_CHARS
+    ) -> list[dict]:
+        """
+        The accepted scripts most similar to the scene, best first, leaving out the scene's own topic.
+        Scripts that would exceed `max_chars` (0 = no limit) in total are skipped.
+        """
+        if top_k <= 0:
+            return []
+        try:
+            self._load_index()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the exemplar store: {e}")
+            return []
+        own_topic = topic_key(topic)
+        ranked = sorted(
+            (
+                (score, row) for score, row in zip(self._index.scores(scene_query(scene_data)), self._index_rows)
+                if score > 0 and row[1] != own_topic
+            ),
+            key=lambda item: -item[0]
+        )
+        selected, used_chars = [], 0
+        for score, (key, row_topic, scene_title, manim_class_name, _, code_chars) in ranked:
+            if len(selected) >= top_k:
+                break
+            if max_chars and used_chars + code_chars > max_chars:
+                continue
+            selected.append({"key": key, "topic": row_topic, "scene_title": scene_title, "manim_class_name": manim_class_name, "score": score})
+            used_chars += code_chars
+        try:
+            return [dict(exemplar, code=self._code(exemplar["key"])) for exemplar in selected]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the exemplar store: {e}")
+            return []
+
+    def _code(self, key: str) -> str:
+        with connection(self.db_path) as conn:
+            return conn.execute("SELECT code FROM exemplars WHERE key = ?", (key,)).fetchone()[0]
+
+    def entries(self) -> list[dict]:
+        with connection(self.db_path) as conn:
+            rows = conn.execute("SELECT topic, scene_title, manim_class_name, LENGTH(code), video_path FROM exemplars ORDER BY topic, scene_title").fetchall()
+        return [
+            {"topic": topic, "scene_title": scene_title, "manim_class_name": manim_class_name, "chars": chars, "video_path": video_path}
+            for topic, scene_title, manim_class_name, chars, video_path in rows
+        ]
+
+    def import_output_dir(self, output_dir: str, topic: str | None = None) -> int:
+        """
+        Imports the scripts of an output directory whose videos reached `final_videos/` (named after
+        their Scene class). Their narration is read from the scripts' voiceover texts. Returns the count.
+        """
+        accepted = {}
+        for video_path in glob.glob(os.path.join(output_dir, "final_videos", "**", "*.mp4"), recursive=True):
+            subdir = os.path.relpath(os.path.dirname(video_path), os.path.join(output_dir, "final_videos"))
+            accepted[os.path.splitext(os.path.basename(video_path))[0]] = (video_path, None if subdir == "." else subdir)
+
+        imported = 0
+        for script_path in sorted(glob.glob(os.path.join(output_dir, "generated_content", "manim_scripts", "*.py"))):
+            with open(script_path, "r") as f:
+                code = f.read()
+            class_name = next((name for name in defined_classes(code) if name in accepted), None)
+            if class_name is None:
+                continue
+            video_path, namespace = accepted[class_name]
+            # scene_01_Some_Title.py (optionally with a "<namespace>__" prefix) -> "Some Title"
+            scene_title = re.sub(r"^(.*__)?scene_\d+_", "", os.path.splitext(os.path.basename(script_path))[0]).replace("_", " ")
+            query_text = "\n".join([scene_title] + voiceover_texts(code))
+            if self.add_code(code, topic or namespace or os.path.basename(os.path.abspath(output_dir)), scene_title, class_name, query_text, video_path):
+                imported += 1
+        logger.info(f"Imported {imported} accepted scripts from {output_dir}.")
+        return imported
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Accepted scene scripts used as few-shot examples.")
+    parser.add_argument("--db", default=config.EXEMPLAR_DB, help="Path of the SQLite exemplar store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import the accepted scripts of output directories.")
+    import_parser.add_argument("output_dirs", nargs="+", help="Directories with final_videos/ and generated_content/manim_scripts/.")
+    import_parser.add_argument("--topic", help="Topic of the imported scripts (default: the final_videos subdirectory or the directory name).")
+
+    subparsers.add_parser("list", help="List the stored exemplars.")
+
+    args = parser.parse_args()
+    store = ExemplarStore(args.db)
+    if args.command == "import":
+        for output_dir in args.output_dirs:
+            store.import_output_dir(output_dir, args.topic)
+    else:
+        for entry in store.entries():
+            print(f"{entry['topic']:<40} | {entry['scene_title']:<60} | {entry['chars']:>6} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Module: http_clients
+
+Description:
+Process-wide registry of pooled HTTP clients, one per API provider.
+
+Every OpenAI-compatible client in the pipeline (DidacticScripter,
+VisualArchitect) is built on top of the provider's shared `httpx` client, so
+requests reuse keep-alive connections instead of paying a TCP and TLS
+handshake each time. Pool sizes are set per provider in `config.py`.
+HTTP/2 is used when the optional `h2` package is installed (and
+`HTTP2_ENABLED` is on), so many concurrent requests share one connection.
+
+The sync and async clients of a provider have separate pools, because an
+`httpx.AsyncClient` belongs to the event loop it was first used on.
+"""
+
+import importlib.util
+import logging
+import threading
+
+import httpx
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+_clients: dict[str, httpx.Client] = {}
+_async_clients: dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install "httpx[http2]"`)."""
+    return config.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _client_options(provider: str) -> dict:
+    if provider not in config.HTTP_PROVIDER_LIMITS:
+        raise ValueError(f"Unknown HTTP provider: {provider}")
+    max_connections, max_keepalive = config.HTTP_PROVIDER_LIMITS[provider]
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(config.HTTP_TIMEOUT_SECONDS, connect=config.HTTP_CONNECT_TIMEOUT_SECONDS),
+        "http2": http2_available(),
+    }
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Returns the shared sync client for `provider`, creating it on first use."""
+    with _lock:
+        client = _clients.get(provider)
+        if client is None or client.is_closed:
+            options = _client_options(provider)
+            logger.info(f"Creating pooled HTTP client for {provider} (HTTP/2: {options['http2']}, limits: {options['limits']}).")
+            client = _clients[provider] = httpx.Client(**options)
+        return client
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Returns the shared async client for `provider`, creating it on first use."""
+    with _lock:
+        client = _async_clients.get(provider)
+        if client is None or client.is_closed:
+            options = _client_options(provider)
+            logger.info(f"Creating pooled async HTTP client for {provider} (HTTP/2: {options['http2']}, limits: {options['limits']}).")
+            client = _async_clients[provider] = httpx.AsyncClient(**options)
+        return client
+
+
+def close_http_clients() -> None:
+    """Closes the sync clients. They are recreated lazily if used again."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_async_http_clients() -> None:
+    """
+    Closes the async clients. Called when the event loop that used them is about to end;
+    OpenAI clients built on them must not be used afterwards.
+    """
+    with _lock:
+        async_clients = list(_async_clients.values())
+        _async_clients.clear()
+    for async_client in async_clients:
+        await async_client.aclose()
@@ -0,0 +1,211 @@
+"""
+Module: job_queue
+
+Description:
+Durable scene job queue backed by a local SQLite file.
+
+Jobs belong to a stage (`codegen`, `render`, `analyze`) and are leased by
+independent worker processes (see `job_worker`). A lease lasts
+`lease_seconds` and is extended by heartbeats while the worker is busy. If a
+worker crashes or loses its host, its lease expires and the job is handed
+to the next worker that asks for that stage. Every lease counts as an
+attempt, and a job that has used up `max_attempts` is marked failed instead
+of being leased again.
+
+Completing a job and enqueueing its follow-up jobs happen in one
+transaction, so no stage transition is lost if a worker dies in between.
+
+Every write opens its own connection with `BEGIN IMMEDIATE`. The file can
+therefore be shared by any number of processes, and by other hosts as long
+as the filesystem supports SQLite locking. Artifacts (scripts, videos) are
+passed between stages as paths and must live on the same shared filesystem.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+
+from project_drishti import config
+from project_drishti.sqlite_utils import create_schema, immediate_transaction
+
+logger = logging.getLogger(__name__)
+
+STAGE_CODEGEN = "codegen"
+STAGE_RENDER = "render"
+STAGE_ANALYZE = "analyze"
+JOB_STAGES = (STAGE_CODEGEN, STAGE_RENDER, STAGE_ANALYZE)
+
+STATUS_QUEUED = "queued"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    topic TEXT,
+    scene_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage_status ON jobs (stage, status, id);
+"""
+
+
+class JobQueue:
+    """
+    Lease-based job queue stored in a SQLite file.
+    """
+
+    def __init__(self, db_path: str = config.JOB_QUEUE_DB, lease_seconds: float = config.JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        create_schema(db_path, _SCHEMA)
+
+    def _transaction(self):
+        return immediate_transaction(self.db_path, row_factory=sqlite3.Row)
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(
+        self,
+        stage: str,
+        payload: dict,
+        topic: str | None = None,
+        scene_key: str | None = None,
+        max_attempts: int = config.JOB_MAX_ATTEMPTS
+    ) -> int:
+        """Adds a job for `stage` and returns its id."""
+        with self._transaction() as conn:
+            return self._insert(conn, stage, payload, topic, scene_key, max_attempts)
+
+    def _insert(self, conn, stage, payload, topic, scene_key, max_attempts) -> int:
+        if stage not in JOB_STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT INTO jobs (stage, topic, scene_key, payload, status, max_attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (stage, topic, scene_key, json.dumps(payload), STATUS_QUEUED, max_attempts, now, now)
+        )
+        return cursor.lastrowid
+
+    def lease(self, stage: str, worker_id: str) -> dict | None:
+        """
+        Leases the oldest available job for `stage`: queued, or leased by a worker whose lease
+        has expired. Returns the job dict, or None if there is nothing to do.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases that have no attempts left fail instead of being handed out again
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE stage = ? AND status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (STATUS_FAILED, "Lease expired on the final attempt.", now, stage, STATUS_LEASED, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE stage = ? AND (status = ? OR (status = ? AND lease_expires < ?)) "
+                "ORDER BY id LIMIT 1",
+                (stage, STATUS_QUEUED, STATUS_LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["status"] == STATUS_LEASED:
+                logger.warning(f"Re-leasing job {row['id']} ({stage}): lease held by {row['lease_owner']} expired.")
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (STATUS_LEASED, worker_id, now + self.lease_seconds, now, row["id"])
+            )
+            leased = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return self._to_job(leased)
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extends the lease. Returns False if the worker no longer holds it."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, job_id, STATUS_LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: dict | None = None, next_jobs: list[dict] | None = None) -> bool:
+        """
+        Marks the job done and enqueues `next_jobs` (dicts of `enqueue` keyword arguments) in the
+        same transaction. Returns False, changing nothing, if the worker lost the lease.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (STATUS_DONE, json.dumps(result) if result is not None else None, now, job_id, STATUS_LEASED, worker_id)
+            )
+            if cursor.rowcount != 1:
+                return False
+            for next_job in next_jobs or []:
+                self._insert(
+                    conn,
+                    next_job["stage"],
+                    next_job["payload"],
+                    next_job.get("topic"),
+                    next_job.get("scene_key"),
+                    next_job.get("max_attempts", config.JOB_MAX_ATTEMPTS)
+                )
+            return True
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Records a failed attempt. The job is queued again if `retry` is set and it has attempts
+        left, otherwise it is marked failed. Returns False if the worker lost the lease.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, STATUS_LEASED, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            status = STATUS_QUEUED if retry and row["attempts"] < row["max_attempts"] else STATUS_FAILED
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (status, error, now, job_id)
+            )
+            return True
+
+    def get(self, job_id: int) -> dict | None:
+        with self._transaction() as conn:
+            return self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def counts(self, topic: str | None = None) -> dict:
+        """Returns {stage: {status: count}}, optionally for one topic."""
+        query = "SELECT stage, status, COUNT(*) AS n FROM jobs"
+        params = ()
+        if topic is not None:
+            query += " WHERE topic = ?"
+            params = (topic,)
+        query += " GROUP BY stage, status"
+        summary = {}
+        with self._transaction() as conn:
+            for row in conn.execute(query, params):
+                summary.setdefault(row["stage"], {})[row["status"]] = row["n"]
+        return summary
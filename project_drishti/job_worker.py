@@ -0,0 +1,354 @@
+"""
+Module: job_worker
+
+Description:
+Worker processes and CLI for the SQLite job queue (see `job_queue`).
+
+A scene moves through the queue as a chain of jobs:
+
+    codegen -> render -> analyze -> (final video)
+       ^          |          |
+       +----------+----------+   patch (or regenerate) on render/analysis
+                                 failure, up to MAX_SCENE_ATTEMPTS
+
+With `RENDER_QA_FIRST`, the first render is a low-resolution QA preview. Once
+it passes analysis, a second render job renders the script at
+`MANIM_QUALITY_FLAG`, and its analyze job only moves the video to the final
+videos (no second review):
+
+    codegen -> render (QA) -> analyze -> render (final) -> analyze (move only)
+
+Each worker process serves one stage. Start as many as the machine (or a set
+of machines sharing the filesystem) can take:
+
+    python -m project_drishti.job_worker submit --topic "The Rosetta Stone"
+    python -m project_drishti.job_worker work --stage codegen
+    python -m project_drishti.job_worker work --stage render
+    python -m project_drishti.job_worker work --stage analyze
+    python -m project_drishti.job_worker status
+
+While a job runs, a heartbeat thread keeps its lease alive. If the lease is
+lost (the worker was too slow and another worker took the job over), or the
+stage deadline passes, the job's Manim/ffmpeg process group is killed.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+from project_drishti import config
+from project_drishti.job_queue import (
+    JOB_STAGES,
+    JobQueue,
+    STAGE_ANALYZE,
+    STAGE_CODEGEN,
+    STAGE_RENDER,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_SCENE_ATTEMPTS = 3  # Same budget as MAX_RENDER_ATTEMPTS in main_pipeline
+
+STAGE_TIMEOUTS = {
+    STAGE_RENDER: config.RENDER_TIMEOUT_SECONDS,
+    STAGE_ANALYZE: config.COMPRESS_TIMEOUT_SECONDS + config.ANALYSIS_TIMEOUT_SECONDS,
+}
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker finds that another worker has taken over its job."""
+
+
+def topic_job_fields(topic: str) -> dict:
+    """Names derived from the topic the same way `main_pipeline.run_pipeline` derives them."""
+    topic_title_str = topic.replace(" ", "_")
+    return {
+        "topic": topic,
+        "topic_title_str": topic_title_str,
+        "output_namespace": re.sub(r"[^a-zA-Z0-9_]", "", topic_title_str),
+    }
+
+
+def submit_topic(queue: JobQueue, topic: str, num_scenes: int | None = None) -> list[int]:
+    """Generates the didactic script for `topic` and enqueues a codegen job per scene."""
+    from project_drishti.didactic_scripter import DidacticScripter
+
+    script_args = {"topic": topic}
+    if num_scenes is not None:
+        script_args["num_scenes"] = num_scenes
+    didactic_script = DidacticScripter().generate_script(**script_args)
+    if not didactic_script:
+        logger.error(f"Failed to generate the didactic script for '{topic}'. Nothing was queued.")
+        return []
+
+    job_ids = []
+    for scene_data in didactic_script.get("scenes", []):
+        scene_title = scene_data.get("title", f"Scene_{scene_data.get('scene_number', 'Unknown')}")
+        payload = {**topic_job_fields(topic), "scene_data": scene_data, "attempt": 1}
+        job_ids.append(queue.enqueue(STAGE_CODEGEN, payload, topic=topic, scene_key=scene_title))
+    logger.info(f"Queued {len(job_ids)} codegen jobs for '{topic}'.")
+    return job_ids
+
+
+class JobWorker:
+    """
+    Leases and runs jobs of one stage until stopped.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        queue: JobQueue | None = None,
+        worker_id: str | None = None,
+        poll_interval: float = config.JOB_POLL_INTERVAL_SECONDS
+    ):
+        if stage not in JOB_STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        self.stage = stage
+        self.queue = queue or JobQueue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{stage}"
+        self.poll_interval = poll_interval
+        self._stage_instance = None
+        self._exemplar_store = None
+
+    def run(self, max_jobs: int | None = None, exit_when_idle: bool = False) -> int:
+        """Processes jobs until `max_jobs` have run or, with `exit_when_idle`, the stage is empty."""
+        logger.info(f"Worker {self.worker_id} serving stage '{self.stage}' from {self.queue.db_path}")
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            if self.run_one():
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                time.sleep(self.poll_interval)
+        return processed
+
+    def run_one(self) -> bool:
+        """Leases and runs one job. Returns False if no job was available."""
+        job = self.queue.lease(self.stage, self.worker_id)
+        if job is None:
+            return False
+        logger.info(f"Leased job {job['id']} ({self.stage}, attempt {job['attempts']}/{job['max_attempts']}) for '{job['scene_key']}'")
+
+        cancel_event = threading.Event()
+        lease_lost = threading.Event()
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(job["id"], cancel_event, lease_lost, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+        timed_out = threading.Event()
+        deadline = STAGE_TIMEOUTS.get(self.stage)
+        deadline_timer = threading.Timer(deadline, lambda: (timed_out.set(), cancel_event.set())) if deadline else None
+        if deadline_timer:
+            deadline_timer.start()
+
+        try:
+            result, next_jobs = self._handle(job, cancel_event)
+            if timed_out.is_set():
+                logger.warning(f"Job {job['id']} ({self.stage}) for '{job['scene_key']}' timed out after {deadline:.0f}s.")
+                result["timed_out"] = True
+            if lease_lost.is_set():
+                raise LeaseLostError(f"Lease on job {job['id']} was lost while it ran.")
+            if not self.queue.complete(job["id"], self.worker_id, result, next_jobs):
+                raise LeaseLostError(f"Lease on job {job['id']} was lost before it completed.")
+            logger.info(f"Completed job {job['id']} ({self.stage}) for '{job['scene_key']}'")
+        except LeaseLostError as e:
+            logger.warning(f"{e} Its result was discarded.")
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({self.stage}) failed: {e}", exc_info=True)
+            self.queue.fail(job["id"], self.worker_id, str(e))
+        finally:
+            stop_heartbeat.set()
+            if deadline_timer:
+                deadline_timer.cancel()
+            heartbeat.join()
+        return True
+
+    def _heartbeat_loop(self, job_id, cancel_event, lease_lost, stop_heartbeat):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not stop_heartbeat.wait(interval):
+            try:
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    logger.warning(f"Lost lease on job {job_id}. Cancelling it.")
+                    lease_lost.set()
+                    cancel_event.set()
+                    return
+            except Exception as e:
+                logger.error(f"Heartbeat for job {job_id} failed: {e}")
+
+    # --- Stage handlers ---
+
+    def _handle(self, job: dict, cancel_event: threading.Event) -> tuple[dict, list[dict]]:
+        handlers = {
+            STAGE_CODEGEN: self._handle_codegen,
+            STAGE_RENDER: self._handle_render,
+            STAGE_ANALYZE: self._handle_analyze,
+        }
+        return handlers[self.stage](job, job["payload"], cancel_event)
+
+    def _get_stage_instance(self):
+        if self._stage_instance is None:
+            if self.stage == STAGE_CODEGEN:
+                from project_drishti.visual_architect import VisualArchitect
+                self._stage_instance = VisualArchitect()
+            elif self.stage == STAGE_RENDER:
+                from project_drishti.manim_renderer import ManimRenderer
+                self._stage_instance = ManimRenderer()
+            else:
+                from project_drishti.video_analyzer import VideoAnalyzer
+                self._stage_instance = VideoAnalyzer()
+        return self._stage_instance
+
+    def _record_exemplar(self, payload: dict, video_path: str) -> None:
+        """Keeps the accepted script as an example for later topics (see exemplar_store)."""
+        if not config.EXEMPLARS_ENABLED:
+            return
+        if self._exemplar_store is None:
+            from project_drishti.exemplar_store import ExemplarStore
+            self._exemplar_store = ExemplarStore()
+        self._exemplar_store.add(
+            payload["scene_data"], payload["topic_title_str"], payload["script_path"], payload["manim_class_name"], video_path
+        )
+
+    def _next_job(self, job: dict, stage: str, payload: dict) -> dict:
+        return {"stage": stage, "payload": payload, "topic": job["topic"], "scene_key": job["scene_key"]}
+
+    def _retry_scene(
+        self, job: dict, payload: dict, reason: str, fixable: bool = False, analysis_verdict: str | None = None
+    ) -> tuple[dict, list[dict]]:
+        """
+        Queues the next attempt of the scene, or gives up after MAX_SCENE_ATTEMPTS. If the failure is
+        `fixable` (a render error or an analysis verdict), the codegen job first tries to patch the script.
+        """
+        if payload["attempt"] >= MAX_SCENE_ATTEMPTS:
+            logger.error(f"All {MAX_SCENE_ATTEMPTS} attempts failed for scene '{job['scene_key']}'. Last error: {reason}")
+            return {"success": False, "error": reason, "scene_failed": True}, []
+        retry_payload = {
+            key: payload[key] for key in ("topic", "topic_title_str", "output_namespace", "scene_data")
+        }
+        retry_payload["attempt"] = payload["attempt"] + 1
+        if fixable and config.FIX_WITH_PATCHES and payload.get("script_path"):
+            retry_payload["fix"] = {
+                "script_path": payload["script_path"],
+                "error_message": None if analysis_verdict else reason,
+                "analysis_verdict": analysis_verdict,
+            }
+        logger.info(f"Queueing script {'patch' if 'fix' in retry_payload else 'regeneration'} (attempt {retry_payload['attempt']}) for '{job['scene_key']}'.")
+        return {"success": False, "error": reason}, [self._next_job(job, STAGE_CODEGEN, retry_payload)]
+
+    def _patch_script(self, architect, payload: dict) -> tuple[str | None, str | None]:
+        """Patches the script named in the payload's "fix" entry. (None, None) if that is not possible."""
+        fix = payload["fix"]
+        try:
+            with open(fix["script_path"], "r") as f:
+                faulty_script_content = f.read()
+        except OSError as e:
+            logger.warning(f"Cannot patch {fix['script_path']}, regenerating instead: {e}")
+            return None, None
+        return architect.fix_manim_code_for_scene(
+            payload["scene_data"],
+            topic_title=payload["topic_title_str"],
+            faulty_code_content=faulty_script_content,
+            error_message=fix["error_message"],
+            script_path=fix["script_path"],
+            analysis_verdict=fix["analysis_verdict"]
+        )
+
+    def _handle_codegen(self, job, payload, cancel_event):
+        architect = self._get_stage_instance()
+        output_namespace = payload.get("output_namespace")
+        script_path = manim_class_name = None
+        if payload.get("fix"):
+            script_path, manim_class_name = self._patch_script(architect, payload)
+        if not (script_path and manim_class_name):
+            script_path, manim_class_name = architect.generate_manim_code_for_scene(
+                payload["scene_data"],
+                topic_title=payload["topic_title_str"],
+                script_prefix=f"{output_namespace}__" if output_namespace else "",
+                sample=payload["attempt"]
+            )
+        if not (script_path and manim_class_name):
+            # Infrastructure-style failure (e.g. API error): let the queue retry the same job
+            raise RuntimeError("Script generation failed to return a valid path or class name.")
+        render_payload = {key: value for key, value in payload.items() if key != "fix"}
+        render_payload.update(script_path=script_path, manim_class_name=manim_class_name)
+        return (
+            {"script_path": script_path, "manim_class_name": manim_class_name},
+            [self._next_job(job, STAGE_RENDER, render_payload)]
+        )
+
+    def _handle_render(self, job, payload, cancel_event):
+        from project_drishti.manim_renderer import RENDER_TIER_FINAL, RENDER_TIER_QA
+        renderer = self._get_stage_instance()
+        tier = RENDER_TIER_QA if config.RENDER_QA_FIRST and not payload.get("final_render") else RENDER_TIER_FINAL
+        render_success, video_path, render_error = renderer.render_scene(
+            payload["script_path"], payload["manim_class_name"], cancel_event=cancel_event, tier=tier
+        )
+        if not render_success:
+            return self._retry_scene(job, payload, render_error or "Render failed.", fixable=True)
+        analyze_payload = {**payload, "video_path": video_path}
+        return {"video_path": video_path}, [self._next_job(job, STAGE_ANALYZE, analyze_payload)]
+
+    def _handle_analyze(self, job, payload, cancel_event):
+        video_analyzer = self._get_stage_instance()
+        if payload.get("final_render"):
+            # The QA render of this script already passed analysis
+            return self._finish_scene(job, payload, video_analyzer, payload["analysis_reason"])
+        compressed_path = video_analyzer.compress_video(payload["video_path"], cancel_event=cancel_event)
+        if not compressed_path:
+            return self._retry_scene(job, payload, "Video compression for analysis failed.")
+        scene_narration = payload["scene_data"].get("script_content", "")
+        analysis_passed, analysis_reason = video_analyzer.analyze_compressed_video(compressed_path, scene_narration)
+        if not analysis_passed:
+            return self._retry_scene(job, payload, analysis_reason, fixable=True, analysis_verdict=analysis_reason)
+        if config.RENDER_QA_FIRST:
+            logger.info(f"QA render of '{job['scene_key']}' passed quality analysis; queueing the final quality render.")
+            final_payload = {key: value for key, value in payload.items() if key != "video_path"}
+            final_payload.update(final_render=True, analysis_reason=analysis_reason)
+            return {"qa_passed": True, "reason": analysis_reason}, [self._next_job(job, STAGE_RENDER, final_payload)]
+        return self._finish_scene(job, payload, video_analyzer, analysis_reason)
+
+    def _finish_scene(self, job, payload, video_analyzer, analysis_reason):
+        final_video_path = video_analyzer.move_to_final_videos(payload["video_path"], subdir=payload.get("output_namespace"))
+        logger.info(f"SUCCESS: '{job['scene_key']}' passed quality analysis: {final_video_path}")
+        self._record_exemplar(payload, final_video_path or payload["video_path"])
+        return {"success": True, "final_video_path": final_video_path, "reason": analysis_reason}, []
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Project Drishti job queue workers.")
+    parser.add_argument("--db", default=config.JOB_QUEUE_DB, help="Path of the SQLite job queue file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = subparsers.add_parser("submit", help="Generate the didactic script for a topic and queue its scenes.")
+    submit_parser.add_argument("--topic", required=True)
+    submit_parser.add_argument("--num-scenes", type=int)
+
+    work_parser = subparsers.add_parser("work", help="Run a worker for one stage.")
+    work_parser.add_argument("--stage", required=True, choices=JOB_STAGES)
+    work_parser.add_argument("--max-jobs", type=int, help="Exit after this many jobs.")
+    work_parser.add_argument("--exit-when-idle", action="store_true", help="Exit when the stage has no jobs.")
+
+    status_parser = subparsers.add_parser("status", help="Print job counts per stage and status.")
+    status_parser.add_argument("--topic")
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db)
+    if args.command == "submit":
+        submit_topic(queue, args.topic, args.num_scenes)
+    elif args.command == "work":
+        JobWorker(args.stage, queue).run(max_jobs=args.max_jobs, exit_when_idle=args.exit_when_idle)
+    else:
+        print(json.dumps(queue.counts(args.topic), indent=4))
+
+
+if __name__ == "__main__":
+    main()
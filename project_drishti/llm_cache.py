@@ -0,0 +1,146 @@
+"""
+Module: llm_cache
+
+Description:
+Persistent, content-addressed cache for LLM completions.
+
+The key is a SHA-256 over everything that determines a completion: model,
+a hash of the full prompt (all messages), temperature, the extra request
+settings (reasoning effort, provider routing), the prompt template version
+and a sample index. The sample index keeps deliberately different samples
+of the same prompt apart (a retry after a failed render, or a speculative
+candidate), so a re-run replays each of them instead of collapsing them
+into one answer.
+
+Entries live in a SQLite file so that several pipeline or worker processes
+can share it. Reads refresh an entry's last-access time, and writes evict
+the least recently used entries once the cache exceeds `max_entries` or
+`max_bytes`.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+from project_drishti import config
+from project_drishti.sqlite_utils import connection, create_schema, evict_least_recently_used, immediate_transaction, table_totals
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access);
+"""
+
+
+def text_version(text: str) -> str:
+    """Short content hash used as the version of a prompt template."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def completion_cache_key(completion_kwargs: dict, template_version: str, sample: str | int | None = None) -> str:
+    """
+    Builds the cache key for a chat completion request. `completion_kwargs` are the
+    arguments passed to `chat.completions.create`. Headers and the usage accounting option
+    do not affect the answer and are ignored.
+    """
+    prompt_hash = hashlib.sha256(
+        json.dumps(completion_kwargs.get("messages"), sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    # Usage accounting options only change what is reported about the answer
+    settings = {k: v for k, v in (completion_kwargs.get("extra_body") or {}).items() if k != "usage"}
+    key_fields = {
+        "model": completion_kwargs.get("model"),
+        "prompt_hash": prompt_hash,
+        "temperature": completion_kwargs.get("temperature"),
+        # Reasoning effort and provider routing are passed through extra_body
+        "settings": settings or None,
+        "template_version": template_version,
+        "sample": str(sample) if sample is not None else "",
+    }
+    return hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    LRU cache of completion texts stored in a SQLite file.
+    """
+
+    def __init__(
+        self,
+        db_path: str = config.LLM_CACHE_DB,
+        max_entries: int = config.LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = config.LLM_CACHE_MAX_BYTES
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        create_schema(db_path, _SCHEMA)
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached completion for `key`, or None on a miss."""
+        try:
+            with immediate_transaction(self.db_path) as conn:
+                row = conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed, treating as a miss: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str, model: str | None = None) -> None:
+        """Stores a completion, replacing any previous one for `key`, then evicts if over budget."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        try:
+            with immediate_transaction(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, model, response, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        evicted = evict_least_recently_used(conn, "completions", self.max_entries, self.max_bytes)
+        if evicted:
+            entries, total_bytes = table_totals(conn, "completions")
+            logger.info(f"LLM cache evicted {len(evicted)} least recently used entries ({entries} entries, {total_bytes} bytes left).")
+
+    def stats(self) -> dict:
+        """Returns the entry count and size on disk, plus this instance's hit and miss counts."""
+        with connection(self.db_path) as conn:
+            entries, total_bytes = table_totals(conn, "completions")
+        return {"entries": entries, "bytes": total_bytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with immediate_transaction(self.db_path) as conn:
+            conn.execute("DELETE FROM completions")
+
+
+def cached_completion(cache: LLMCache | None, key: str, use_cache: bool = True) -> str | None:
+    """
+    Looks `key` up unless caching is off, the caller asked for a fresh sample
+    (`use_cache=False`) or `config.LLM_CACHE_BYPASS` is set.
+    """
+    if cache is None or not use_cache or config.LLM_CACHE_BYPASS:
+        return None
+    return cache.get(key)
@@ -14,19 +14,65 @@ Key functionalities:
 3.  Manages output directories for videos and logs based on `config.py`.
 4.  Captures and logs Manim's output (stdout/stderr).
 5.  Returns the path to the rendered .mp4 file on success.
+6.  Kills the Manim process group if the caller sets the optional cancel event
+    (used by the job workers for cancellation and per-stage deadlines).
+7.  `render_scene_async` runs Manim as an asyncio subprocess for the pipeline;
+    cancelling it kills the Manim process group.
+8.  Checks the script with `ScriptValidator` first; a script that fails is
+    returned as a failed render without starting Manim.
+9.  With `RENDER_WARM_WORKERS`, renders on warm worker processes that have
+    Manim imported already (see `render_worker`), and uses the CLI only if
+    they cannot start.
+10. Returns the video of an identical earlier render from the render cache
+    (`render_cache`) instead of rendering again.
+11. Renders at one of two tiers: "final" at `MANIM_QUALITY_FLAG`, or "qa", a
+    small, low frame rate preview (`RENDER_QA_RESOLUTION`, `RENDER_QA_FPS`)
+    that is only good enough for video analysis. Tiers write to separate
+    folders and have separate render cache entries.
+12. With `DRY_RUN_ENABLED`, runs the scene's `construct()` with every
+    animation skipped first (see `dry_run`). A script that raises is returned
+    as a failed render, with the line and animation index of the error,
+    before any frame is rendered.
+13. With `RENDER_SECTIONS_ENABLED`, renders long scenes as sections on several
+    warm workers at once and joins them with an ffmpeg stream copy (see
+    `section_render`). In the pipeline each extra section takes a free render
+    slot, so sections only use cores no other render is waiting for.
 
 Dependencies: Manim (must be installed and accessible in the system PATH).
 """
 
-import subprocess
+import asyncio
 import os
 import logging
+import shutil
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from project_drishti import config # Assuming config.py is in project_drishti directory or PYTHONPATH is set
+from project_drishti.subprocess_utils import run_cancellable, run_cancellable_async
+from project_drishti.script_validator import format_validation_error, get_script_validator
+from project_drishti.render_worker import get_render_worker_pool
+from project_drishti.render_cache import RenderCache, render_cache_key
+from project_drishti.scheduling import FairLimiter
+from project_drishti.dry_run import format_dry_run_error, parse_dry_run_output
+from project_drishti.section_render import concat_command, plan_sections, prepare_section_media_dir, section_job
 
 # Configure logging (can be configured globally in main app too)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+RENDER_TIER_FINAL = "final"
+RENDER_TIER_QA = "qa"
+
+# Manim's `quality` setting for each CLI quality flag
+QUALITY_NAMES = {
+    "-pql": "low_quality",
+    "-pqm": "medium_quality",
+    "-pqh": "high_quality",
+    "-pqk": "fourk_quality",
+}
+
 class ManimRenderer:
     def __init__(self):
         """
@@ -41,14 +87,31 @@ class ManimRenderer:
         os.makedirs(self.base_media_dir, exist_ok=True)
         # Also ensure the directory where we expect to find scripts exists
         os.makedirs(self.scripts_input_dir, exist_ok=True) 
+        # Catches broken scripts in milliseconds instead of a full Manim start-up
+        self.script_validator = get_script_validator() if config.SCRIPT_VALIDATION_ENABLED else None
+        # Skips interpreter start-up and the Manim imports for every render
+        self.worker_pool = get_render_worker_pool() if config.RENDER_WARM_WORKERS else None
+        # Byte-identical scripts (resumes, LLM cache hits) are not rendered twice
+        self.render_cache = RenderCache() if config.RENDER_CACHE_ENABLED else None
+        # Finds runtime errors in construct() before any frame is rendered
+        self.dry_run_enabled = config.DRY_RUN_ENABLED
 
-    def render_scene(self, script_path: str, scene_class_name: str) -> tuple[bool, str | None, str | None]:
+    def render_scene(
+        self,
+        script_path: str,
+        scene_class_name: str,
+        cancel_event: threading.Event | None = None,
+        tier: str = RENDER_TIER_FINAL
+    ) -> tuple[bool, str | None, str | None]:
         """
         Renders a specific scene from a Manim script file.
 
         Args:
             script_path (str): Absolute or relative path to the Manim .py script.
             scene_class_name (str): The name of the Scene class in the script to render.
+            cancel_event (threading.Event | None): If set while Manim is running, the Manim
+                                                   process group is killed and the render fails.
+            tier (str): RENDER_TIER_FINAL for the output quality, RENDER_TIER_QA for an analysis preview.
 
         Returns:
             tuple[bool, str | None, str | None]: A tuple containing:
@@ -56,17 +119,347 @@ class ManimRenderer:
                 - str | None: The path to the rendered .mp4 video file if successful, else None.
                 - str | None: The stderr output from Manim if an error occurred, else None.
         """
-        if not os.path.isabs(script_path):
-            # If script_path is relative, assume it's relative to MANIM_SCRIPTS_DIR
-            # However, Manim command itself usually takes path as is, so absolute might be safer.
-            # For simplicity, we expect script_path to be a valid path Manim can find.
-            # It's usually the output from VisualArchitect which should be absolute or resolvable.
-            pass 
+        render = self._start_render(script_path, scene_class_name, tier)
+        if render["result"]:
+            return render["result"]
+        dry_run_error = self._dry_run(render, cancel_event)
+        if dry_run_error:
+            return False, None, dry_run_error
+        try:
+            result = self._render_sections(render, cancel_event) if self._renders_sections(tier) else None
+            if not result:
+                process = self.worker_pool.render(render["job"], render["env"], cancel_event) if self.worker_pool else None
+                if process is None:
+                    process = run_cancellable(render["command"], cancel_event, cwd=config.APP_BASE_DIR, env=render["env"])
+                if cancel_event is not None and cancel_event.is_set():
+                    error_msg = f"Manim rendering for '{scene_class_name}' was cancelled."
+                    logger.info(error_msg)
+                    return False, None, error_msg
+                result = self._interpret_render_result(process, scene_class_name, render["video_path"])
+            self._store_render(render["cache_key"], result, scene_class_name)
+            return result
+        except Exception as e:
+            return self._render_error(e, scene_class_name)
+
+    async def render_scene_async(
+        self,
+        script_path: str,
+        scene_class_name: str,
+        tier: str = RENDER_TIER_FINAL,
+        render_slots: FairLimiter | None = None
+    ) -> tuple[bool, str | None, str | None]:
+        """
+        Coroutine version of `render_scene`. Manim runs under `asyncio.create_subprocess_exec`;
+        cancelling the awaiting task kills the Manim process group. `render_slots` is the limiter the
+        caller holds a slot of for this render; sections beyond the first each take another slot from it.
+        """
+        # The cache lookup hashes the script and may copy a video, and validation parses the whole script
+        render = await asyncio.to_thread(self._start_render, script_path, scene_class_name, tier)
+        if render["result"]:
+            return render["result"]
+        dry_run_error = await self._dry_run_async(render)
+        if dry_run_error:
+            return False, None, dry_run_error
+        try:
+            result = await self._render_sections_async(render, render_slots) if self._renders_sections(tier) else None
+            if not result:
+                process = await self.worker_pool.render_async(render["job"], render["env"]) if self.worker_pool else None
+                if process is None:
+                    process = await run_cancellable_async(render["command"], cwd=config.APP_BASE_DIR, env=render["env"])
+                result = self._interpret_render_result(process, scene_class_name, render["video_path"])
+            await asyncio.to_thread(self._store_render, render["cache_key"], result, scene_class_name)
+            return result
+        except Exception as e:
+            return self._render_error(e, scene_class_name)
 
+    def _start_render(self, script_path: str, scene_class_name: str, tier: str) -> dict:
+        """
+        Everything before Manim starts that does not depend on how it is run: the script check, the
+        render cache lookup, static validation and the command, job and environment. `result` is the
+        render's outcome when one of the checks already decided it, else None.
+        """
+        render = {"script_path": script_path, "scene_class_name": scene_class_name, "tier": tier, "cache_key": None, "result": None}
         if not os.path.exists(script_path):
             logger.error(f"Manim script not found at: {script_path}")
-            return False, None, f"Manim script not found at: {script_path}"
+            render["result"] = (False, None, f"Manim script not found at: {script_path}")
+            return render
+        render["cache_key"], cached_video_path = self._cached_render(script_path, scene_class_name, tier)
+        if cached_video_path:
+            render["result"] = (True, cached_video_path, None)
+            return render
+        validation_error = self._validate_script(script_path, scene_class_name)
+        if validation_error:
+            render["result"] = (False, None, validation_error)
+            return render
+        render["command"], render["video_path"], render["env"] = self._prepare_render(script_path, scene_class_name, tier)
+        render["job"] = self._render_job(script_path, scene_class_name, tier)
+        return render
+
+    @staticmethod
+    def _render_error(error: Exception, scene_class_name: str) -> tuple[bool, None, str]:
+        if isinstance(error, FileNotFoundError):
+            error_msg = "Manim command not found. Please ensure Manim is installed and in your system PATH."
+        else:
+            error_msg = f"An unexpected error occurred during Manim rendering for '{scene_class_name}': {error}"
+        logger.error(error_msg)
+        return False, None, error_msg
+
+    def _cached_render(self, script_path: str, scene_class_name: str, tier: str = RENDER_TIER_FINAL) -> tuple[str | None, str | None]:
+        """
+        Returns the render cache key for the script and, on a hit, the cached video restored to
+        the path Manim would have written it to.
+        """
+        if not self.render_cache:
+            return None, None
+        cache_key = render_cache_key(script_path, scene_class_name, self._quality_label(tier))
+        cached_video_path = self.render_cache.get(cache_key, self._expected_video_path(script_path, scene_class_name, tier))
+        if cached_video_path:
+            logger.info(f"Render cache hit for '{scene_class_name}': {cached_video_path}")
+        return cache_key, cached_video_path
+
+    def _store_render(self, cache_key: str | None, result: tuple[bool, str | None, str | None], scene_class_name: str) -> None:
+        success, video_path, _ = result
+        if cache_key and success and video_path:
+            self.render_cache.put(cache_key, video_path, scene_class_name)
+
+    def _validate_script(self, script_path: str, scene_class_name: str) -> str | None:
+        """Returns the static validation error for the script, or None if it passed (or validation is off)."""
+        if not self.script_validator:
+            return None
+        try:
+            problems = self.script_validator.validate_file(script_path, scene_class_name)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Could not statically validate {script_path}, rendering anyway: {e}")
+            return None
+        if not problems:
+            return None
+        error_msg = format_validation_error(problems)
+        logger.error(f"Script for '{scene_class_name}' failed static validation, skipping Manim:\n{error_msg}")
+        return error_msg
+
+    def _dry_run_job(self, render: dict, synthesize_voiceovers: bool = False) -> dict:
+        # The media_dir holds the voiceover cache that supplies speech durations
+        job = {
+            "script_path": os.path.abspath(render["script_path"]),
+            "scene_class_name": render["scene_class_name"],
+            "manim_config": {"media_dir": os.path.abspath(self.base_media_dir)},
+        }
+        if synthesize_voiceovers:
+            job["synthesize_voiceovers"] = True
+        return job
+
+    def _dry_run_command(self, render: dict) -> list[str]:
+        return [
+            sys.executable, "-m", "project_drishti.dry_run", os.path.abspath(render["script_path"]), render["scene_class_name"],
+            "--media_dir", os.path.abspath(self.base_media_dir)
+        ]
+
+    def _workers_available(self) -> bool:
+        return self.worker_pool is not None and not self.worker_pool.unavailable_reason
+
+    def _dry_run_on_cli(self, result: dict | None) -> bool:
+        """Whether the dry run should run as a subprocess: no warm worker gave a result and none can start."""
+        return result is None and not self._workers_available()
+
+    def _dry_run(self, render: dict, cancel_event: threading.Event | None = None) -> str | None:
+        """Returns the error of a dry run that failed in the script, or None if it passed, could not tell or is off."""
+        if not self.dry_run_enabled:
+            return None
+        result = None
+        try:
+            if self.worker_pool:
+                result = self.worker_pool.dry_run(self._dry_run_job(render), render["env"], cancel_event, config.DRY_RUN_TIMEOUT_SECONDS)
+            if self._dry_run_on_cli(result):
+                process = run_cancellable(
+                    self._dry_run_command(render), cancel_event,
+                    timeout=config.DRY_RUN_TIMEOUT_SECONDS, cwd=config.APP_BASE_DIR, env=render["env"]
+                )
+                result = parse_dry_run_output(process.stdout)
+        except OSError as e:
+            logger.warning(f"Could not dry-run '{render['scene_class_name']}': {e}")
+        return self._interpret_dry_run(result, render["scene_class_name"])
+
+    async def _dry_run_async(self, render: dict) -> str | None:
+        """Coroutine version of `_dry_run`."""
+        if not self.dry_run_enabled:
+            return None
+        result = None
+        try:
+            if self.worker_pool:
+                result = await self.worker_pool.dry_run_async(self._dry_run_job(render), render["env"], config.DRY_RUN_TIMEOUT_SECONDS)
+            if self._dry_run_on_cli(result):
+                process = await asyncio.wait_for(
+                    run_cancellable_async(self._dry_run_command(render), cwd=config.APP_BASE_DIR, env=render["env"]),
+                    config.DRY_RUN_TIMEOUT_SECONDS
+                )
+                result = parse_dry_run_output(process.stdout)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not dry-run '{render['scene_class_name']}': {str(e) or 'timed out'}")
+        return self._interpret_dry_run(result, render["scene_class_name"])
+
+    def _interpret_dry_run(self, result: dict | None, scene_class_name: str) -> str | None:
+        if result is None:
+            logger.warning(f"Dry run of '{scene_class_name}' did not finish; rendering anyway.")
+            return None
+        if result["ok"]:
+            logger.info(f"Dry run of '{scene_class_name}' passed in {result['seconds']:.2f}s.")
+            return None
+        if not result.get("script_error"):
+            logger.warning(f"Dry run of '{scene_class_name}' failed outside the script, rendering anyway: {result['exception']}")
+            return None
+        error_msg = format_dry_run_error(result, scene_class_name)
+        logger.error(f"Script for '{scene_class_name}' failed its dry run in {result['seconds']:.2f}s, skipping Manim:\n{error_msg}")
+        return error_msg
+
+    def _renders_sections(self, tier: str) -> bool:
+        # QA previews are cheap enough to render in one piece
+        return config.RENDER_SECTIONS_ENABLED and tier == RENDER_TIER_FINAL and self._workers_available()
+
+    def _start_sections(self, render: dict, plan: dict | None, max_sections: int = config.RENDER_SECTIONS_MAX) -> dict | None:
+        """
+        Plans up to `max_sections` sections from the planning pass and prepares their media directories and
+        warm worker jobs. Returns None if the scene should render in one piece: it is short or could not be planned.
+        """
+        scene_class_name = render["scene_class_name"]
+        if not plan or not plan["ok"]:
+            logger.warning(f"Could not plan sections for '{scene_class_name}'; rendering it in one piece.")
+            return None
+        planned = plan_sections(plan["animation_times"], plan["voiceover_starts"], plan["duration"], max_sections)
+        if len(planned) < 2:
+            return None
+        logger.info(f"Rendering '{scene_class_name}' as {len(planned)} sections (animation ranges {planned}).")
+
+        sections = {"dir": os.path.join(os.path.abspath(self.base_media_dir), "sections", f"{scene_class_name}_{uuid.uuid4().hex[:8]}")}
+        media_dir = os.path.abspath(self.base_media_dir)
+        total = len(plan["animation_times"])
+        try:
+            sections["jobs"], sections["video_paths"] = [], []
+            for index, (first, end) in enumerate(planned):
+                section_media_dir = os.path.join(sections["dir"], f"{index:02d}")
+                prepare_section_media_dir(media_dir, section_media_dir)
+                sections["jobs"].append(section_job(render["job"], media_dir, section_media_dir, first, end, total, plan["animation_times"][first]))
+                sections["video_paths"].append(
+                    self._expected_video_path(render["script_path"], scene_class_name, render["tier"], media_dir=section_media_dir)
+                )
+        except OSError as e:
+            self._finish_sections(sections)
+            logger.warning(f"Could not render '{scene_class_name}' in sections; rendering it in one piece: {e}")
+            return None
+        return sections
+
+    def _join_command(self, render: dict, sections: dict, processes: list) -> list[str] | None:
+        """The ffmpeg command that joins the rendered sections at the expected video path, or None if a section failed."""
+        for index, (process, video_path) in enumerate(zip(processes, sections["video_paths"])):
+            if process is None or process.returncode != 0 or not os.path.exists(video_path):
+                output = process.stderr if process is not None else "no render worker"
+                logger.warning(f"Section {index + 1} of '{render['scene_class_name']}' failed; rendering it in one piece:\n{output}")
+                return None
+        os.makedirs(os.path.dirname(render["video_path"]), exist_ok=True)
+        return concat_command(sections["video_paths"], os.path.join(sections["dir"], "sections.txt"), render["video_path"])
+
+    def _joined_result(self, process, render: dict) -> tuple[bool, str | None, str | None] | None:
+        scene_class_name = render["scene_class_name"]
+        if process.returncode != 0 or not os.path.exists(render["video_path"]):
+            logger.warning(f"Joining the sections of '{scene_class_name}' failed; rendering it in one piece:\n{process.stderr}")
+            return None
+        logger.info(f"Manim scene '{scene_class_name}' rendered in sections: {render['video_path']}")
+        return True, render["video_path"], None
+
+    @staticmethod
+    def _finish_sections(sections: dict) -> None:
+        shutil.rmtree(sections["dir"], ignore_errors=True)
+
+    def _render_sections(self, render: dict, cancel_event: threading.Event | None = None) -> tuple[bool, str | None, str | None] | None:
+        """
+        Renders a long scene as sections in parallel and joins them at the expected video path. Returns
+        None if the scene should be rendered in one piece instead: it is short, could not be planned,
+        or a section failed.
+        """
+        # The planning pass synthesizes the voiceovers, so it gets the render's deadline rather than a dry run's
+        plan = self.worker_pool.dry_run(self._dry_run_job(render, synthesize_voiceovers=True), render["env"], cancel_event)
+        sections = self._start_sections(render, plan)
+        if not sections:
+            return None
+        try:
+            with ThreadPoolExecutor(max_workers=len(sections["jobs"])) as executor:
+                processes = list(executor.map(lambda job: self.worker_pool.render(job, render["env"], cancel_event), sections["jobs"]))
+            command = self._join_command(render, sections, processes)
+            return self._joined_result(run_cancellable(command, cancel_event), render) if command else None
+        except OSError as e:
+            logger.warning(f"Could not render '{render['scene_class_name']}' in sections; rendering it in one piece: {e}")
+            return None
+        finally:
+            self._finish_sections(sections)
+
+    @staticmethod
+    def _take_section_slots(render_slots: FairLimiter | None) -> int:
+        """
+        Takes a render slot for each section after the first, as many as are free right now, and returns
+        how many it took. Without a limiter the sections are only bounded by the worker pool.
+        """
+        if render_slots is None:
+            return config.RENDER_SECTIONS_MAX - 1
+        taken = 0
+        while taken < config.RENDER_SECTIONS_MAX - 1 and render_slots.try_acquire():
+            taken += 1
+        return taken
+
+    @staticmethod
+    def _release_section_slots(render_slots: FairLimiter | None, count: int) -> None:
+        if render_slots is not None:
+            for _ in range(count):
+                render_slots.release()
+
+    async def _render_sections_async(self, render: dict, render_slots: FairLimiter | None = None) -> tuple[bool, str | None, str | None] | None:
+        """
+        Coroutine version of `_render_sections`. Cancelling it kills every section's worker. With
+        `render_slots`, the scene is cut into no more sections than there are slots free for them.
+        """
+        extra_slots = self._take_section_slots(render_slots)
+        if not extra_slots:
+            return None
+        try:
+            plan = await self.worker_pool.dry_run_async(self._dry_run_job(render, synthesize_voiceovers=True), render["env"])
+            sections = await asyncio.to_thread(self._start_sections, render, plan, extra_slots + 1)
+            # Hand back the slots of sections the plan did not use before rendering the others
+            unused = extra_slots - (len(sections["jobs"]) - 1 if sections else 0)
+            self._release_section_slots(render_slots, unused)
+            extra_slots -= unused
+            if not sections:
+                return None
+            try:
+                processes = await asyncio.gather(*(self.worker_pool.render_async(job, render["env"]) for job in sections["jobs"]))
+                command = self._join_command(render, sections, processes)
+                return self._joined_result(await run_cancellable_async(command), render) if command else None
+            except OSError as e:
+                logger.warning(f"Could not render '{render['scene_class_name']}' in sections; rendering it in one piece: {e}")
+                return None
+            finally:
+                await asyncio.to_thread(self._finish_sections, sections)
+        finally:
+            self._release_section_slots(render_slots, extra_slots)
+
+    @staticmethod
+    def _qa_size() -> tuple[int, int]:
+        width, height = (int(value) for value in config.RENDER_QA_RESOLUTION.split(","))
+        return width, height
+
+    def _quality_label(self, tier: str) -> str:
+        """What the tier renders at, as part of the render cache key."""
+        if tier == RENDER_TIER_QA:
+            return f"qa:{config.RENDER_QA_RESOLUTION}@{config.RENDER_QA_FPS}"
+        return config.MANIM_QUALITY_FLAG
 
+    def _quality_args(self, tier: str) -> list[str]:
+        if tier == RENDER_TIER_QA:
+            # No -p: a preview player is pointless for an analysis render
+            return ["-ql", "--resolution", config.RENDER_QA_RESOLUTION, "--fps", str(config.RENDER_QA_FPS)]
+        return [config.MANIM_QUALITY_FLAG]
+
+    def _expected_video_path(
+        self, script_path: str, scene_class_name: str, tier: str = RENDER_TIER_FINAL, media_dir: str | None = None
+    ) -> str:
+        """The path Manim writes the scene's video to, under `media_dir` (by default the renderer's)."""
         script_filename_no_ext = os.path.splitext(os.path.basename(script_path))[0]
         
         quality_map = {
@@ -76,6 +469,9 @@ class ManimRenderer:
             "-pqk": "2160p60",
         }
         quality_folder_name = quality_map.get(config.MANIM_QUALITY_FLAG, "1080p60") # Default
+        if tier == RENDER_TIER_QA:
+            # Manim names the folder after the pixel height and frame rate
+            quality_folder_name = f"{self._qa_size()[1]}p{config.RENDER_QA_FPS}"
 
         # Manim's default output structure with --media_dir:
         # <media_dir>/videos/<script_name_no_ext>/<quality_folder_name>/<SceneClassName>.mp4
@@ -85,7 +481,14 @@ class ManimRenderer:
             quality_folder_name,
             f"{scene_class_name}.mp4"
         )
-        expected_video_full_path = os.path.join(self.base_media_dir, expected_video_relative_to_media_dir)
+        return os.path.join(media_dir or self.base_media_dir, expected_video_relative_to_media_dir)
+
+    def _prepare_render(self, script_path: str, scene_class_name: str, tier: str = RENDER_TIER_FINAL) -> tuple[list[str], str, dict]:
+        """
+        Builds the Manim command, the path the video is expected at and the subprocess environment.
+        """
+        expected_video_full_path = self._expected_video_path(script_path, scene_class_name, tier)
+        expected_video_relative_to_media_dir = os.path.relpath(expected_video_full_path, self.base_media_dir)
 
         # Command construction for Manim Community v0.15+
         # `manim [OPTIONS] FILE [SCENE_NAMES...]`
@@ -93,7 +496,7 @@ class ManimRenderer:
             "manim",
             script_path,            
             scene_class_name,
-            config.MANIM_QUALITY_FLAG, 
+            *self._quality_args(tier),
             "--media_dir", os.path.abspath(self.base_media_dir),
             "--log_to_file", # Saves logs to <media_dir>/logs/
             "--progress_bar", "leave", # Keeps progress bar after completion
@@ -106,63 +509,75 @@ class ManimRenderer:
         logger.info(f"Expected video output (relative to media_dir): {expected_video_relative_to_media_dir}")
         logger.info(f"Full expected video path: {expected_video_full_path}")
 
-        try:
-            # --- Environment setup for subprocess ---
-            # Calculate project root directory (one level up from APP_BASE_DIR)
-            project_root_dir = os.path.abspath(os.path.join(config.APP_BASE_DIR, ".."))
-            
-            # Get current environment and update PYTHONPATH
-            env = os.environ.copy()
-            current_pythonpath = env.get("PYTHONPATH", "")
-            if project_root_dir not in current_pythonpath.split(os.pathsep):
-                env["PYTHONPATH"] = f"{project_root_dir}{os.pathsep}{current_pythonpath}".strip(os.pathsep)
+        # --- Environment setup for subprocess ---
+        # Calculate project root directory (one level up from APP_BASE_DIR)
+        project_root_dir = os.path.abspath(os.path.join(config.APP_BASE_DIR, ".."))
+        
+        # Get current environment and update PYTHONPATH
+        env = os.environ.copy()
+        current_pythonpath = env.get("PYTHONPATH", "")
+        if project_root_dir not in current_pythonpath.split(os.pathsep):
+            env["PYTHONPATH"] = f"{project_root_dir}{os.pathsep}{current_pythonpath}".strip(os.pathsep)
+        else:
+            env["PYTHONPATH"] = current_pythonpath # Already there, no change needed or ensure it's structured correctly
+        logger.debug(f"Setting PYTHONPATH for Manim subprocess: {env['PYTHONPATH']}")
+        # The voiceover TTS (project_drishti/openai.py) runs in the subprocess and reads its endpoint from the environment
+        env["DEEPINFRA_BASE_URL"] = config.DEEPINFRA_BASE_URL
+        if config.MOCK_SERVICES_URL:
+            env.setdefault("DEEPINFRA_API_KEY", "mock")
+        # --- End of environment setup ---
+
+        return command, expected_video_full_path, env
+
+    def _render_job(self, script_path: str, scene_class_name: str, tier: str = RENDER_TIER_FINAL) -> dict:
+        """
+        The warm worker job equivalent to the CLI command: the same quality, media_dir and log file,
+        so the video lands at the same path. Workers never open a preview player.
+        """
+        job = {
+            "script_path": os.path.abspath(script_path),
+            "scene_class_name": scene_class_name,
+            "manim_config": {
+                "input_file": os.path.abspath(script_path),
+                "scene_names": [scene_class_name],
+                "quality": QUALITY_NAMES.get(config.MANIM_QUALITY_FLAG, "high_quality"),
+                "media_dir": os.path.abspath(self.base_media_dir),
+                "log_to_file": True,
+                "progress_bar": "leave",
+                "preview": False,
+            },
+        }
+        if tier == RENDER_TIER_QA:
+            width, height = self._qa_size()
+            job["manim_config"].update(quality="low_quality", pixel_width=width, pixel_height=height, frame_rate=config.RENDER_QA_FPS)
+        return job
+
+    def _interpret_render_result(self, process, scene_class_name: str, expected_video_full_path: str) -> tuple[bool, str | None, str | None]:
+        """Logs Manim's output and maps the finished process to `render_scene`'s return value."""
+        # Log Manim's output
+        # Manim often uses stderr for informational messages as well as errors.
+        if process.stdout:
+            logger.info(f"Manim STDOUT:\n{process.stdout}")
+        if process.stderr:
+            if process.returncode != 0:
+                logger.error(f"Manim STDERR:\n{process.stderr}")
             else:
-                env["PYTHONPATH"] = current_pythonpath # Already there, no change needed or ensure it's structured correctly
-            logger.debug(f"Setting PYTHONPATH for Manim subprocess: {env['PYTHONPATH']}")
-            # --- End of environment setup ---
-
-            process = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                check=False, # We check returncode manually
-                cwd=config.APP_BASE_DIR, # Set Current Working Directory
-                env=env # Pass modified environment
-            )
-
-            # Log Manim's output
-            # Manim often uses stderr for informational messages as well as errors.
-            if process.stdout:
-                logger.info(f"Manim STDOUT:\n{process.stdout}")
-            if process.stderr:
-                if process.returncode != 0:
-                    logger.error(f"Manim STDERR:\n{process.stderr}")
-                else:
-                    logger.info(f"Manim STDERR (Info/Warnings):\n{process.stderr}")
-
-            if process.returncode == 0:
-                if os.path.exists(expected_video_full_path):
-                    logger.info(f"Manim scene '{scene_class_name}' rendered successfully: {expected_video_full_path}")
-                    return True, expected_video_full_path, None
-                else:
-                    error_msg = f"Manim process completed (exit code 0), but video file not found at expected path: {expected_video_full_path}"
-                    logger.error(error_msg)
-                    logger.error("Possible issues: Manim's output structure changed, error in script despite exit code 0, or class name mismatch.")
-                    logger.error("Please check Manim logs in the media_dir/logs/ directory.")
-                    return False, None, error_msg
+                logger.info(f"Manim STDERR (Info/Warnings):\n{process.stderr}")
+
+        if process.returncode == 0:
+            if os.path.exists(expected_video_full_path):
+                logger.info(f"Manim scene '{scene_class_name}' rendered successfully: {expected_video_full_path}")
+                return True, expected_video_full_path, None
             else:
-                error_msg = f"Manim rendering failed for scene '{scene_class_name}' with exit code {process.returncode}."
+                error_msg = f"Manim process completed (exit code 0), but video file not found at expected path: {expected_video_full_path}"
                 logger.error(error_msg)
-                return False, None, process.stderr # Return stderr on failure
-
-        except FileNotFoundError:
-            error_msg = "Manim command not found. Please ensure Manim is installed and in your system PATH."
-            logger.error(error_msg)
-            return False, None, error_msg
-        except Exception as e:
-            error_msg = f"An unexpected error occurred during Manim rendering for '{scene_class_name}': {e}"
+                logger.error("Possible issues: Manim's output structure changed, error in script despite exit code 0, or class name mismatch.")
+                logger.error("Please check Manim logs in the media_dir/logs/ directory.")
+                return False, None, error_msg
+        else:
+            error_msg = f"Manim rendering failed for scene '{scene_class_name}' with exit code {process.returncode}."
             logger.error(error_msg)
-            return False, None, error_msg
+            return False, None, process.stderr # Return stderr on failure
 
 if __name__ == '__main__':
     print("Testing ManimRenderer...")
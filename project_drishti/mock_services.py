@@ -0,0 +1,594 @@
+"""
+Module: mock_services
+
+Description:
+Local stand-ins for the pipeline's paid APIs, so throughput, concurrency and
+scheduling can be benchmarked reproducibly without network access:
+
+1.  OpenRouter chat completions (`/openrouter/v1/chat/completions`), streamed
+    or not, with OpenRouter-style usage.
+2.  DeepInfra's OpenAI-compatible text to speech
+    (`/deepinfra/v1/openai/audio/speech`), called from the render processes.
+3.  The Gemini REST API used by `google.generativeai`: the resumable File API
+    upload (including the discovery document the SDK reads first), file
+    status and delete, and `generateContent`.
+
+Set `MOCK_SERVICES_URL` (see config.py) and every client points here.
+
+Answers are replayed from earlier runs in `outputs_*` directories where
+possible, and canned otherwise:
+-   The didactic script comes from `didactic_scripter/*.md`.
+-   The code for a scene comes from `generated_content/manim_scripts/*.py`,
+    with its Scene class renamed to the one requested.
+-   A fix answer is a no-op SEARCH/REPLACE block.
+-   Speech for a line that was recorded before comes from
+    `generated_content/voiceovers/*.mp3`. Any other line gets silence of a
+    plausible length.
+-   The video verdict passes with probability `--analysis-pass-rate`.
+
+Each service has its own latency distribution, error rate, 429 rate and
+optional concurrency cap; requests beyond the cap get a 429 like a provider
+rate limit. With the same `--seed` and request order, runs are
+reproducible. `GET /mock/stats` returns per-service counters.
+
+    python -m project_drishti.mock_services --port 8765 --recordings outputs_sonnet_audio \\
+        --latency openrouter=lognormal:20:0.4 --rate-limit-rate openrouter=0.05 \\
+        --max-concurrent gemini=4 --time-scale 0.1
+    MOCK_SERVICES_URL=http://127.0.0.1:8765 python main_pipeline.py --topic "..."
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ("openrouter", "deepinfra", "gemini", "gemini_files")
+# Default latency distributions in seconds, roughly those of the real services
+DEFAULT_LATENCIES = {
+    "openrouter": "lognormal:20:0.5",
+    "deepinfra": "lognormal:0.8:0.3",
+    "gemini": "lognormal:8:0.3",
+    "gemini_files": "uniform:0.3:1.5",
+}
+# Share of a streamed completion's latency spent before the first chunk
+STREAM_FIRST_CHUNK_SHARE = 0.3
+STREAM_CHUNK_CHARS = 200
+RETRY_AFTER_SECONDS = 1
+CHARS_PER_TOKEN = 4
+SPOKEN_WORDS_PER_SECOND = 2.5
+PASSING_VERDICT = "####OVERLAP####NONE\n####BOUNDARY####NONE"
+FAILING_VERDICT = "####OVERLAP####CRITICAL\n####BOUNDARY####CRITICAL"
+
+CANNED_DIDACTIC_SCRIPT = {
+    "topic": "Mock Topic",
+    "scenes": [
+        {"scene_number": 1, "title": "Introduction", "script_content": "This scene introduces the topic with a title and a short overview."},
+        {"scene_number": 2, "title": "Key Idea", "script_content": "This scene explains the key idea step by step with a simple diagram."},
+    ],
+}
+CANNED_MANIM_SCRIPT = '''from manim import *
+from manim_voiceover import VoiceoverScene
+from manim_voiceover.services.openai import OpenAIService
+
+
+class MockScene(VoiceoverScene):
+    def construct(self):
+        self.set_speech_service(OpenAIService())
+        title = Text("Mock scene")
+        with self.voiceover(text="This is a mock scene rendered for benchmarking.") as tracker:
+            self.play(Write(title), run_time=tracker.duration)
+'''
+
+
+def parse_latency(spec: str):
+    """
+    Parses a latency distribution, returning a function of a `random.Random` that draws seconds:
+    fixed:S, uniform:A:B, normal:MEAN:SD, lognormal:MEDIAN:SIGMA or exp:MEAN.
+    """
+    kind, *values = spec.split(":")
+    try:
+        params = [float(value) for value in values]
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution '{spec}'.")
+    samplers = {
+        ("fixed", 1): lambda rng: params[0],
+        ("uniform", 2): lambda rng: rng.uniform(params[0], params[1]),
+        ("normal", 2): lambda rng: max(0.0, rng.gauss(params[0], params[1])),
+        ("lognormal", 2): lambda rng: rng.lognormvariate(math.log(params[0]), params[1]) if params[0] > 0 else 0.0,
+        ("exp", 1): lambda rng: rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0,
+    }
+    sampler = samplers.get((kind, len(params)))
+    if sampler is None:
+        raise ValueError(f"Invalid latency distribution '{spec}'.")
+    return sampler
+
+
+def silent_mp3(seconds: float) -> bytes:
+    """Silent MPEG-1 Layer III audio (128 kbit/s, 44.1 kHz) of about `seconds`."""
+    frame = b"\xff\xfb\x90\x64" + b"\x00" * 413  # 417-byte frames of 1152 samples
+    return frame * max(1, round(seconds * 44100 / 1152))
+
+
+def speech_slug(text: str) -> str:
+    """manim_voiceover's file name stem for a line, without its hash suffix."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _stable_choice(items: list, text: str):
+    """The same item for the same text, so replays do not depend on timing."""
+    return items[int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16) % len(items)]
+
+
+class Recordings:
+    """
+    Responses of earlier runs, read from `outputs_*` style directories.
+    """
+
+    def __init__(self, output_dirs: list[str] = ()):
+        self.didactic_scripts: list[dict] = []
+        self.manim_scripts: list[str] = []
+        self.voiceovers: dict[str, str] = {}
+        for output_dir in output_dirs:
+            self._load(output_dir)
+        logger.info(
+            f"Recordings: {len(self.didactic_scripts)} didactic scripts, {len(self.manim_scripts)} Manim scripts, "
+            f"{len(self.voiceovers)} voiceovers."
+        )
+
+    def _load(self, output_dir: str) -> None:
+        for path in sorted(glob.glob(os.path.join(output_dir, "didactic_scripter", "*.md"))):
+            with open(path, "r") as f:
+                text = f.read()
+            try:
+                script = json.loads(text[text.index("{"):text.rindex("}") + 1])
+            except ValueError:
+                continue
+            if isinstance(script, dict) and script.get("scenes"):
+                self.didactic_scripts.append(script)
+        for path in sorted(glob.glob(os.path.join(output_dir, "generated_content", "manim_scripts", "*.py"))):
+            with open(path, "r") as f:
+                self.manim_scripts.append(f.read())
+        for path in sorted(glob.glob(os.path.join(output_dir, "generated_content", "voiceovers", "*.mp3"))):
+            # <slug>-<8 hex digits>.mp3
+            stem = re.sub(r"-[0-9a-f]{8}$", "", os.path.splitext(os.path.basename(path))[0])
+            self.voiceovers[stem] = path
+
+    def didactic_script(self, prompt: str) -> dict:
+        return _stable_choice(self.didactic_scripts, prompt) if self.didactic_scripts else CANNED_DIDACTIC_SCRIPT
+
+    def manim_script(self, prompt: str, class_name: str) -> str:
+        code = _stable_choice(self.manim_scripts, prompt) if self.manim_scripts else CANNED_MANIM_SCRIPT
+        return re.sub(r"class \w+\((VoiceoverScene|Scene)\)", f"class {class_name}(\\1)", code, count=1)
+
+    def speech(self, text: str) -> bytes:
+        slug = speech_slug(text)
+        for stem, path in self.voiceovers.items():
+            # manim_voiceover truncates the slug in the file name
+            if slug.startswith(stem):
+                with open(path, "rb") as f:
+                    return f.read()
+        return silent_mp3(len(text.split()) / SPOKEN_WORDS_PER_SECOND)
+
+
+class ServiceProfile:
+    """
+    Latency, injected failures and concurrency cap of one mocked service.
+    """
+
+    def __init__(self, latency: str, error_rate: float = 0.0, rate_limit_rate: float = 0.0, max_concurrent: int = 0):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "max_in_flight": 0, "latency_total": 0.0}
+
+
+class MockServices:
+    """
+    State of the mock server: service profiles, recordings, uploaded Gemini files and counters.
+    """
+
+    def __init__(
+        self,
+        recordings: Recordings | None = None,
+        profiles: dict[str, ServiceProfile] | None = None,
+        seed: int = 0,
+        time_scale: float = 1.0,
+        analysis_pass_rate: float = 1.0
+    ):
+        self.recordings = recordings or Recordings()
+        self.profiles = {service: ServiceProfile(DEFAULT_LATENCIES[service]) for service in SERVICES}
+        self.profiles.update(profiles or {})
+        self.time_scale = time_scale
+        self.analysis_pass_rate = analysis_pass_rate
+        self.base_url = ""
+        self.files: dict[str, dict] = {}
+        self.uploads: dict[str, dict] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def admit(self, service: str) -> tuple[str | None, float]:
+        """
+        Starts a request: returns the failure to inject (None, "rate_limit" or "error") and the latency
+        to apply. A started request must be finished with `release`.
+        """
+        profile = self.profiles[service]
+        with self._lock:
+            profile.stats["requests"] += 1
+            profile.in_flight += 1
+            profile.stats["max_in_flight"] = max(profile.stats["max_in_flight"], profile.in_flight)
+            latency = profile.sample_latency(self._rng) * self.time_scale
+            draw = self._rng.random()
+            if (profile.max_concurrent and profile.in_flight > profile.max_concurrent) or draw < profile.rate_limit_rate:
+                profile.stats["rate_limited"] += 1
+                return "rate_limit", 0.0
+            if draw < profile.rate_limit_rate + profile.error_rate:
+                profile.stats["errors"] += 1
+                return "error", latency
+            profile.stats["latency_total"] += latency
+            return None, latency
+
+    def release(self, service: str) -> None:
+        with self._lock:
+            self.profiles[service].in_flight -= 1
+
+    def verdict_passes(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.analysis_pass_rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                service: dict(profile.stats, latency=profile.latency_spec, in_flight=profile.in_flight)
+                for service, profile in self.profiles.items()
+            }
+
+    # --- OpenRouter ---
+
+    def chat_completion_text(self, request: dict) -> str:
+        """The answer to a chat request, chosen by what the pipeline stage asks for."""
+        user_messages = [message for message in request.get("messages", []) if message.get("role") == "user"]
+        content = user_messages[-1]["content"] if user_messages else ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        if "SEARCH/REPLACE" in content:
+            return self._noop_patch(content)
+        class_match = re.search(r"class (\w+)\(VoiceoverScene\)", content)
+        if class_match:
+            return self.recordings.manim_script(content, class_match.group(1))
+        return json.dumps(self.recordings.didactic_script(content), indent=4)
+
+    @staticmethod
+    def _noop_patch(fix_prompt: str) -> str:
+        """A SEARCH/REPLACE block that changes nothing, on a line that occurs once in the code to fix."""
+        code_match = re.search(r"\*\*Current Manim Python Code:\*\*\s*```python\n(.*?)\n```", fix_prompt, re.DOTALL)
+        code = code_match.group(1) if code_match else ""
+        line = next((line for line in code.split("\n") if line.strip() and code.count(line) == 1), None)
+        if line is None:
+            return ""
+        return f"<<<<<<< SEARCH\n{line}\n=======\n{line}\n>>>>>>> REPLACE\n"
+
+    @staticmethod
+    def chat_usage(request: dict, completion: str) -> dict:
+        prompt_chars = len(json.dumps(request.get("messages", [])))
+        prompt_tokens, completion_tokens = prompt_chars // CHARS_PER_TOKEN, len(completion) // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+            "completion_tokens_details": {"reasoning_tokens": 0},
+        }
+
+    # --- Gemini ---
+
+    def discovery_document(self) -> dict:
+        """The part of the Generative Language discovery document that the SDK's File API upload uses."""
+        root_url = f"{self.base_url}/"
+        object_schema = {"type": "object", "properties": {"file": {"type": "object", "additionalProperties": {"type": "any"}}}}
+        return {
+            "kind": "discovery#restDescription",
+            "discoveryVersion": "v1",
+            "id": "generativelanguage:v1beta",
+            "name": "generativelanguage",
+            "version": "v1beta",
+            "rootUrl": root_url,
+            "servicePath": "",
+            "baseUrl": root_url,
+            "batchPath": "batch",
+            "parameters": {
+                "key": {"type": "string", "location": "query"},
+                "alt": {"type": "string", "location": "query", "default": "json"},
+            },
+            "schemas": {
+                "CreateFileRequest": dict(object_schema, id="CreateFileRequest"),
+                "CreateFileResponse": dict(object_schema, id="CreateFileResponse"),
+            },
+            "resources": {"media": {"methods": {"upload": {
+                "id": "generativelanguage.media.upload",
+                "path": "v1beta/files",
+                "flatPath": "v1beta/files",
+                "httpMethod": "POST",
+                "parameters": {},
+                "parameterOrder": [],
+                "request": {"$ref": "CreateFileRequest"},
+                "response": {"$ref": "CreateFileResponse"},
+                "supportsMediaUpload": True,
+                "mediaUpload": {
+                    "accept": ["*/*"],
+                    "protocols": {
+                        "simple": {"multipart": True, "path": "/upload/v1beta/files"},
+                        "resumable": {"multipart": True, "path": "/resumable/upload/v1beta/files"},
+                    },
+                },
+            }}}},
+        }
+
+    def create_file(self, metadata: dict, size: int, mime_type: str) -> dict:
+        file_id = uuid.uuid4().hex[:12]
+        name = (metadata.get("file") or {}).get("name") or f"files/{file_id}"
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        file = {
+            "name": name,
+            "displayName": (metadata.get("file") or {}).get("displayName", name),
+            "mimeType": mime_type,
+            "sizeBytes": str(size),
+            "createTime": now,
+            "updateTime": now,
+            "uri": f"{self.base_url}/v1beta/{name}",
+            "state": "ACTIVE",
+        }
+        with self._lock:
+            self.files[name] = file
+        return file
+
+    def generate_content_response(self) -> dict:
+        verdict = PASSING_VERDICT if self.verdict_passes() else FAILING_VERDICT
+        return {
+            "candidates": [{"content": {"parts": [{"text": verdict}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 5000, "candidatesTokenCount": 20, "thoughtsTokenCount": 500, "totalTokenCount": 5520},
+            "modelVersion": "mock",
+        }
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockServices/1.0"
+    mock: MockServices = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # --- Plumbing ---
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"), headers=headers)
+
+    def _send_failure(self, failure: str, google_style: bool) -> None:
+        status = 429 if failure == "rate_limit" else 500
+        message = "Rate limit exceeded (mock)." if failure == "rate_limit" else "Internal error (mock)."
+        if google_style:
+            error = {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"}
+        else:
+            error = {"message": message, "type": "rate_limit_exceeded" if status == 429 else "server_error", "code": status}
+        self._send_json(status, {"error": error}, headers={"Retry-After": str(RETRY_AFTER_SECONDS)} if status == 429 else None)
+
+    def _serve(self, service: str, respond, google_style: bool = False) -> None:
+        """Applies the service's latency and injected failures around `respond(latency)`."""
+        failure, latency = self.mock.admit(service)
+        try:
+            if failure:
+                time.sleep(latency)
+                self._send_failure(failure, google_style)
+            else:
+                respond(latency)
+        finally:
+            self.mock.release(service)
+
+    # --- Routing ---
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/mock/stats":
+            self._send_json(200, self.mock.stats())
+        elif path == "/$discovery/rest":
+            self._send_json(200, self.mock.discovery_document())
+        elif path.startswith("/v1beta/files/"):
+            self._serve("gemini_files", lambda latency: self._get_file(path, latency), google_style=True)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if path.startswith("/v1beta/files/"):
+            self._serve("gemini_files", lambda latency: self._delete_file(path, latency), google_style=True)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        body = self._body()
+        if parsed.path.endswith("/chat/completions"):
+            self._serve("openrouter", lambda latency: self._chat_completion(json.loads(body or b"{}"), latency))
+        elif parsed.path.endswith("/audio/speech"):
+            self._serve("deepinfra", lambda latency: self._speech(json.loads(body or b"{}"), latency))
+        elif parsed.path == "/upload/v1beta/files":
+            self._serve("gemini_files", lambda latency: self._start_upload(parsed, body, latency), google_style=True)
+        elif re.match(r"^/v1beta/models/[^/]+:generateContent$", parsed.path):
+            self._serve("gemini", lambda latency: self._generate_content(latency), google_style=True)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {parsed.path}"}})
+
+    def do_PUT(self):
+        parsed = urlparse(self.path)
+        body = self._body()
+        upload_id = parse_qs(parsed.query).get("upload_id", [""])[0]
+        upload = self.mock.uploads.pop(upload_id, None)
+        if parsed.path != "/upload/v1beta/files" or upload is None:
+            self._send_json(404, {"error": {"code": 404, "message": "Unknown upload.", "status": "NOT_FOUND"}})
+            return
+        file = self.mock.create_file(upload["metadata"], len(body), upload["mime_type"])
+        self._send_json(200, {"file": file})
+
+    # --- OpenRouter and DeepInfra ---
+
+    def _chat_completion(self, request: dict, latency: float) -> None:
+        text = self.mock.chat_completion_text(request)
+        usage = self.mock.chat_usage(request, text)
+        completion_id = f"gen-mock-{uuid.uuid4().hex[:16]}"
+        base = {"id": completion_id, "created": int(time.time()), "model": request.get("model", "mock")}
+        if not request.get("stream"):
+            time.sleep(latency)
+            self._send_json(200, dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ]))
+            return
+
+        pieces = [text[start:start + STREAM_CHUNK_CHARS] for start in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(latency * STREAM_FIRST_CHUNK_SHARE)
+        chunk_delay = latency * (1 - STREAM_FIRST_CHUNK_SHARE) / len(pieces)
+        for number, piece in enumerate(pieces):
+            delta = {"role": "assistant", "content": piece} if number == 0 else {"content": piece}
+            self._write_event(dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+            time.sleep(chunk_delay)
+        self._write_event(dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        # OpenRouter sends the usage in a last chunk without choices
+        self._write_event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_event(self, data: dict) -> None:
+        self._write_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _speech(self, request: dict, latency: float) -> None:
+        audio = self.mock.recordings.speech(request.get("input", ""))
+        time.sleep(latency)
+        self._send(200, audio, content_type="audio/mpeg")
+
+    # --- Gemini ---
+
+    def _start_upload(self, parsed, body: bytes, latency: float) -> None:
+        upload_type = parse_qs(parsed.query).get("uploadType", ["media"])[0]
+        time.sleep(latency)
+        if upload_type != "resumable":
+            # Simple and multipart uploads are not parsed; only their size is kept
+            file = self.mock.create_file({}, len(body), self.headers.get("Content-Type", "application/octet-stream"))
+            self._send_json(200, {"file": file})
+            return
+        upload_id = uuid.uuid4().hex
+        self.mock.uploads[upload_id] = {
+            "metadata": json.loads(body or b"{}"),
+            "mime_type": self.headers.get("X-Upload-Content-Type", "application/octet-stream"),
+        }
+        self._send(200, b"", headers={"Location": f"{self.mock.base_url}/upload/v1beta/files?upload_id={upload_id}"})
+
+    def _get_file(self, path: str, latency: float) -> None:
+        time.sleep(latency)
+        file = self.mock.files.get(path[len("/v1beta/"):])
+        if file is None:
+            self._send_json(404, {"error": {"code": 404, "message": "File not found.", "status": "NOT_FOUND"}})
+        else:
+            self._send_json(200, file)
+
+    def _delete_file(self, path: str, latency: float) -> None:
+        time.sleep(latency)
+        self.mock.files.pop(path[len("/v1beta/"):], None)
+        self._send_json(200, {})
+
+    def _generate_content(self, latency: float) -> None:
+        time.sleep(latency)
+        self._send_json(200, self.mock.generate_content_response())
+
+
+def start_mock_server(mock: MockServices, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Starts the server in a daemon thread and returns it; `port=0` picks a free port. Stop it with `shutdown()`."""
+    handler = type("MockHandler", (_MockHandler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    mock.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-services", daemon=True).start()
+    logger.info(f"Mock services listening on {mock.base_url}")
+    return server
+
+
+def _per_service(values: list[str], convert, option: str) -> dict:
+    settings = {}
+    for value in values:
+        service, _, setting = value.partition("=")
+        if service not in SERVICES or not setting:
+            raise SystemExit(f"{option} expects SERVICE=VALUE with SERVICE one of {', '.join(SERVICES)}; got '{value}'.")
+        settings[service] = convert(setting)
+    return settings
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local stand-ins for OpenRouter, Gemini and DeepInfra TTS.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", nargs="*", default=sorted(glob.glob("outputs_*")),
+                        help="Output directories of earlier runs to replay (default: outputs_*).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplies every latency.")
+    parser.add_argument("--analysis-pass-rate", type=float, default=1.0, help="Share of video verdicts that pass.")
+    parser.add_argument("--latency", action="append", default=[], help="SERVICE=DIST, e.g. openrouter=lognormal:20:0.5.")
+    parser.add_argument("--error-rate", action="append", default=[], help="SERVICE=RATE of HTTP 500 answers.")
+    parser.add_argument("--rate-limit-rate", action="append", default=[], help="SERVICE=RATE of HTTP 429 answers.")
+    parser.add_argument("--max-concurrent", action="append", default=[], help="SERVICE=N; requests beyond N in flight get 429.")
+    args = parser.parse_args()
+
+    latencies = dict(DEFAULT_LATENCIES, **_per_service(args.latency, str, "--latency"))
+    error_rates = _per_service(args.error_rate, float, "--error-rate")
+    rate_limit_rates = _per_service(args.rate_limit_rate, float, "--rate-limit-rate")
+    max_concurrent = _per_service(args.max_concurrent, int, "--max-concurrent")
+    profiles = {
+        service: ServiceProfile(latencies[service], error_rates.get(service, 0.0), rate_limit_rates.get(service, 0.0), max_concurrent.get(service, 0))
+        for service in SERVICES
+    }
+    mock = MockServices(Recordings(args.recordings), profiles, args.seed, args.time_scale, args.analysis_pass_rate)
+    server = start_mock_server(mock, args.host, args.port)
+    print(f"Mock services listening on {mock.base_url}. Run the pipeline with MOCK_SERVICES_URL={mock.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
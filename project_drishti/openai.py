@@ -1,5 +1,7 @@
+import importlib.util
 import os
 import sys
+import threading
 from pathlib import Path
 
 from dotenv import find_dotenv, load_dotenv
@@ -23,6 +25,40 @@ except ImportError:
 
 load_dotenv(find_dotenv(usecwd=True))
 
+# One pooled client per (base_url, api_key) for the whole render process, so voiceover
+# lines reuse keep-alive connections instead of opening a new one each. This file runs
+# from manim_voiceover's package directory, so the pool settings are read from the same
+# environment variables as project_drishti/config.py instead of importing it.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def get_pooled_client(base_url: str, api_key: str):
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import httpx
+
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("DEEPINFRA_MAX_CONNECTIONS", "4")),
+                    max_keepalive_connections=int(os.getenv("DEEPINFRA_MAX_KEEPALIVE_CONNECTIONS", "4")),
+                    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60")),
+                ),
+                timeout=httpx.Timeout(
+                    float(os.getenv("HTTP_TIMEOUT_SECONDS", "600")),
+                    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10")),
+                ),
+                http2=_env_flag("HTTP2_ENABLED", "true") and importlib.util.find_spec("h2") is not None,
+            )
+            client = _clients[key] = openai.OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+        return client
+
 
 def create_dotenv_openai():
     logger.info(
@@ -51,7 +87,7 @@ class OpenAIService(SpeechService):
         model: str = "hexgrad/Kokoro-82M",
         transcription_model="None",
         api_key: str = None,
-        base_url: str = "https://api.deepinfra.com/v1/openai",
+        base_url: str = None,
         **kwargs
     ):
         """
@@ -67,7 +103,8 @@ class OpenAIService(SpeechService):
         self.voice = voice
         self.model = model
         self.api_key = api_key or os.getenv("DEEPINFRA_API_KEY")
-        self.base_url = base_url
+        # The renderer sets DEEPINFRA_BASE_URL to point the render processes at the mock services
+        self.base_url = base_url or os.getenv("DEEPINFRA_BASE_URL", "https://api.deepinfra.com/v1/openai")
 
         SpeechService.__init__(self, transcription_model=transcription_model, **kwargs)
 
@@ -106,11 +143,8 @@ class OpenAIService(SpeechService):
         if os.getenv("DEEPINFRA_API_KEY") is None:
             create_dotenv_openai()
 
-        # Create OpenAI client with DeepInfra configuration
-        client = openai.OpenAI(
-            base_url=self.base_url,
-            api_key=self.api_key
-        )
+        # Shared OpenAI client with DeepInfra configuration
+        client = get_pooled_client(self.base_url, self.api_key)
 
         # Use streaming response as shown in the DeepInfra example
         with client.audio.speech.with_streaming_response.create(
@@ -0,0 +1,216 @@
+"""
+Module: render_cache
+
+Description:
+Persistent cache of rendered scene videos, so a script that was rendered
+before is not rendered again. This happens on resume, when the LLM cache
+returns the same code, or when a fix patch leads back to a known script.
+
+The key is a SHA-256 over everything that determines the video: the script's
+content, the Scene class, `MANIM_QUALITY_FLAG`, the installed manim and
+manim-voiceover versions, and the content of `layout_utils.py` and `colors.py`.
+The generated scripts import the last two.
+
+Videos are kept as copies in `RENDER_CACHE_DIR`, indexed by a SQLite file that
+several pipeline or worker processes can share. They are copies rather than
+hard links because Manim may rewrite its output file in place. The pipeline
+moves accepted videos to `final_videos/`, so a hit is copied back to the path
+where the renderer would have written it. Hits refresh an entry's last-access
+time, and writes evict the least recently used entries once the cache exceeds
+`max_entries` or `max_bytes`.
+
+    python -m project_drishti.render_cache stats
+    python -m project_drishti.render_cache clear
+"""
+
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+from project_drishti import config
+from project_drishti.sqlite_utils import connection, create_schema, evict_least_recently_used, immediate_transaction, table_totals
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    key TEXT PRIMARY KEY,
+    scene_class_name TEXT,
+    video_file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS renders_last_access ON renders (last_access);
+"""
+# Files next to the scripts' imports whose content changes what a script renders
+TOOLCHAIN_FILES = ("layout_utils.py", "colors.py")
+TOOLCHAIN_PACKAGES = ("manim", "manim-voiceover")
+
+_toolchain_version: str | None = None
+
+
+def _file_hash(path: str) -> str:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return "missing"
+
+
+def toolchain_version() -> str:
+    """Hash of the installed manim and manim-voiceover versions and the helper modules. Computed once per process."""
+    global _toolchain_version
+    if _toolchain_version is None:
+        parts = {}
+        for package in TOOLCHAIN_PACKAGES:
+            try:
+                parts[package] = importlib.metadata.version(package)
+            except importlib.metadata.PackageNotFoundError:
+                parts[package] = "missing"
+        for file_name in TOOLCHAIN_FILES:
+            parts[file_name] = _file_hash(os.path.join(config.APP_BASE_DIR, file_name))
+        _toolchain_version = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return _toolchain_version
+
+
+def render_cache_key(script_path: str, scene_class_name: str, quality_flag: str = config.MANIM_QUALITY_FLAG) -> str:
+    """Builds the cache key for rendering `scene_class_name` from the script at `script_path`."""
+    key_fields = {
+        "script_hash": _file_hash(script_path),
+        "scene_class_name": scene_class_name,
+        "quality": quality_flag,
+        "toolchain": toolchain_version(),
+    }
+    return hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _copy(source: str, destination: str) -> None:
+    """Copies through a temporary file, so a reader never sees a partial video."""
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    tmp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class RenderCache:
+    """
+    LRU cache of rendered videos: files in `cache_dir`, indexed in a SQLite file.
+    """
+
+    def __init__(
+        self,
+        db_path: str = config.RENDER_CACHE_DB,
+        cache_dir: str = config.RENDER_CACHE_DIR,
+        max_entries: int = config.RENDER_CACHE_MAX_ENTRIES,
+        max_bytes: int = config.RENDER_CACHE_MAX_BYTES
+    ):
+        self.db_path = db_path
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        create_schema(db_path, _SCHEMA)
+
+    def get(self, key: str, destination: str) -> str | None:
+        """
+        On a hit, places the cached video at `destination` and returns that path. None on a miss,
+        including an entry whose file has gone missing (the entry is dropped).
+        """
+        try:
+            with immediate_transaction(self.db_path) as conn:
+                row = conn.execute("SELECT video_file FROM renders WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if os.path.exists(os.path.join(self.cache_dir, row[0])):
+                        conn.execute("UPDATE renders SET last_access = ? WHERE key = ?", (time.time(), key))
+                    else:
+                        conn.execute("DELETE FROM renders WHERE key = ?", (key,))
+                        row = None
+        except sqlite3.Error as e:
+            logger.warning(f"Render cache read failed, treating as a miss: {e}")
+            row = None
+        if row is not None:
+            try:
+                _copy(os.path.join(self.cache_dir, row[0]), destination)
+            except OSError as e:
+                logger.warning(f"Could not restore the cached render to {destination}: {e}")
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return destination
+
+    def put(self, key: str, video_path: str, scene_class_name: str | None = None) -> None:
+        """Stores a copy of a rendered video, replacing any previous one for `key`, then evicts if over budget."""
+        video_file = f"{key}.mp4"
+        now = time.time()
+        try:
+            _copy(video_path, os.path.join(self.cache_dir, video_file))
+            size = os.path.getsize(video_path)
+            with immediate_transaction(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO renders (key, scene_class_name, video_file, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, scene_class_name, video_file, size, now, now)
+                )
+                evicted_files = self._evict(conn)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Render cache write failed: {e}")
+            return
+        for evicted_file in evicted_files:
+            try:
+                os.remove(os.path.join(self.cache_dir, evicted_file))
+            except OSError:
+                pass  # Already gone
+
+    def _evict(self, conn: sqlite3.Connection) -> list[str]:
+        """Deletes the least recently used entries beyond the budgets and returns their video files."""
+        evicted_files = evict_least_recently_used(conn, "renders", self.max_entries, self.max_bytes, column="video_file")
+        if evicted_files:
+            self.evictions += len(evicted_files)
+            entries, total_bytes = table_totals(conn, "renders")
+            logger.info(f"Render cache evicted {len(evicted_files)} least recently used videos ({entries} entries, {total_bytes} bytes left).")
+        return evicted_files
+
+    def stats(self) -> dict:
+        """Returns the entry count and size on disk, plus this instance's hit, miss and eviction counts."""
+        with connection(self.db_path) as conn:
+            entries, total_bytes = table_totals(conn, "renders")
+        return {"entries": entries, "bytes": total_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self) -> None:
+        with immediate_transaction(self.db_path) as conn:
+            video_files = [row[0] for row in conn.execute("SELECT video_file FROM renders").fetchall()]
+            conn.execute("DELETE FROM renders")
+        for video_file in video_files:
+            try:
+                os.remove(os.path.join(self.cache_dir, video_file))
+            except OSError:
+                pass
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Cache of rendered scene videos.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    args = parser.parse_args()
+    cache = RenderCache()
+    if args.command == "clear":
+        cache.clear()
+    stats = cache.stats()
+    print(f"Render cache: {stats['entries']} videos, {stats['bytes'] / (1024 * 1024):.1f} MiB in {cache.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
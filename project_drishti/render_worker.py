@@ -0,0 +1,403 @@
+"""
+Module: render_worker
+
+Description:
+Long-lived Manim render processes, so a render does not pay for interpreter
+start-up and for importing manim, numpy, cairo, pango, manim_voiceover and the
+layout helpers every time. That start-up is a large share of the time for a
+short scene, and for the retry renders of every scene.
+
+A worker (`python -m project_drishti.render_worker`) imports the modules in
+`RENDER_WORKER_PRELOAD` once. Then it reads render jobs from stdin, one JSON
+line each. For each job it:
+1.  Loads the script with `importlib` as a new module.
+2.  Renders the requested Scene class under a `tempconfig` built from the job
+    (quality, media_dir, input file), with stdout and stderr captured.
+3.  Resets the state the job left behind: the script's module, file log
+    handlers and the working directory.
+The result goes back as one JSON line on the original stdout. Everything else
+the process writes goes to a log file in `MANIM_LOG_DIR`. A job marked
+`dry_run` runs the scene without rendering it instead (see `dry_run`). A job
+with a `section` renders only part of a scene (see `section_render`).
+
+`RenderWorkerPool` hands each job to an idle worker, or starts one. It runs at
+most `RENDER_MAX_CONCURRENT` workers at once, retiring idle ones started for
+another environment to make room, and otherwise makes the job wait. A worker
+is retired after `RENDER_WORKER_MAX_JOBS` jobs (leaks in long-running cairo or
+pango code stay bounded) and after any job it did not survive. Cancelling a job
+kills its worker's process group, like `subprocess_utils` does for the CLI.
+If a worker cannot import its modules, the pool reports itself unavailable and
+`ManimRenderer` falls back to the `manim` CLI.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+from project_drishti import config
+from project_drishti.subprocess_utils import kill_process_group
+
+logger = logging.getLogger(__name__)
+
+# Exit code reported for a job whose worker died, like a crashed `manim` process
+WORKER_DIED_RETURNCODE = 70
+LOG_TAIL_CHARS = 4000
+
+
+@contextlib.contextmanager
+def loaded_scene_class(script_path: str, scene_class_name: str):
+    """
+    Loads the script as a new module and yields its Scene class. Afterwards resets what the script
+    may have left behind in this process: the module, Manim's file log handlers and the working directory.
+    """
+    module_name = f"_render_job_{uuid.uuid4().hex}"
+    cwd = os.getcwd()
+    manim_logger = logging.getLogger("manim")
+    log_handlers = list(manim_logger.handlers)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, script_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        scene_class = getattr(module, scene_class_name, None)
+        if scene_class is None:
+            raise AttributeError(f"{scene_class_name} is not in the script {script_path}.")
+        yield scene_class
+    finally:
+        sys.modules.pop(module_name, None)
+        for handler in manim_logger.handlers[:]:
+            if handler not in log_handlers:
+                manim_logger.removeHandler(handler)
+                handler.close()
+        os.chdir(cwd)
+
+
+def render_job(job: dict) -> dict:
+    """
+    Renders one job in this process: `script_path`, `scene_class_name` and the `manim_config` overrides.
+    Returns the `returncode` (0 or 1) and the captured `output`, with the traceback on failure.
+    """
+    output = io.StringIO()
+    returncode = 0
+    try:
+        from manim import tempconfig
+        from project_drishti.section_render import section_sounds
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output), tempconfig(job["manim_config"]), \
+                section_sounds(job.get("section")):
+            with loaded_scene_class(job["script_path"], job["scene_class_name"]) as scene_class:
+                scene_class().render()
+    except BaseException:
+        # Includes SystemExit from the script; the worker itself keeps running
+        output.write(traceback.format_exc())
+        returncode = 1
+    return {"returncode": returncode, "output": output.getvalue()}
+
+
+def run_job(job: dict) -> dict:
+    if job.get("dry_run"):
+        from project_drishti.dry_run import dry_run_scene
+        return dry_run_scene(
+            job["script_path"], job["scene_class_name"], job.get("manim_config"), job.get("synthesize_voiceovers", False)
+        )
+    return render_job(job)
+
+
+def _worker_main(preload: list[str]) -> None:
+    # Keep the original stdout for the protocol; stray writes go to stderr (the worker's log file)
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message: dict) -> None:
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            send({"ready": False, "error": f"Could not import {module_name}: {e}"})
+            return
+    send({"ready": True, "pid": os.getpid()})
+
+    for line in sys.stdin:
+        if line.strip():
+            send(run_job(json.loads(line)))
+
+
+class RenderWorker:
+    """
+    One warm render process and its pipes.
+    """
+
+    def __init__(self, env: dict, preload: list[str], startup_timeout: float):
+        os.makedirs(config.MANIM_LOG_DIR, exist_ok=True)
+        self.log_path = os.path.join(config.MANIM_LOG_DIR, f"render_worker_{uuid.uuid4().hex[:8]}.log")
+        self.jobs_done = 0
+        self._buffer = b""
+        with open(self.log_path, "w") as log_file:
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "project_drishti.render_worker", "--preload", ",".join(preload)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=log_file,
+                bufsize=0,
+                cwd=config.APP_BASE_DIR,
+                env=env,
+                start_new_session=True
+            )
+        ready = self._read_message(startup_timeout)
+        if not ready or not ready.get("ready"):
+            self.close(keep_log=True)
+            reason = ready.get("error") if ready else f"no answer within {startup_timeout:.0f}s ({self._log_tail()})"
+            raise RuntimeError(f"Render worker did not start: {reason}")
+
+    def _read_message(self, timeout: float | None = None, cancel_event: threading.Event | None = None, poll_interval: float = 0.5) -> dict | None:
+        """The next protocol line, or None if the worker exited, the timeout passed or the job was cancelled."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            # Lines are split here rather than by a buffered reader, which could hold a line `select` no longer sees
+            while b"\n" in self._buffer:
+                line, self._buffer = self._buffer.split(b"\n", 1)
+                try:
+                    return json.loads(line)
+                except ValueError:
+                    # Printed by an import before the worker took over stdout (e.g. config warnings)
+                    logger.debug(f"Render worker pid {self.process.pid}: {line.decode(errors='replace')}")
+            wait = poll_interval if cancel_event is not None or deadline else None
+            if deadline:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            readable, _, _ = select.select([self.process.stdout], [], [], wait)
+            if readable:
+                chunk = os.read(self.process.stdout.fileno(), 65536)
+                if not chunk:
+                    return None
+                self._buffer += chunk
+            elif (cancel_event is not None and cancel_event.is_set()) or (deadline and time.monotonic() >= deadline):
+                return None
+
+    def run(self, job: dict, cancel_event: threading.Event | None = None, timeout: float | None = None) -> dict | None:
+        """Runs one job. None if the worker died, the job was cancelled or timed out; the worker is unusable then."""
+        try:
+            self.process.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+        except (BrokenPipeError, OSError):
+            return None
+        result = self._read_message(timeout, cancel_event=cancel_event)
+        if result is not None:
+            self.jobs_done += 1
+        return result
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _log_tail(self) -> str:
+        try:
+            with open(self.log_path, "r", errors="replace") as f:
+                return f.read()[-LOG_TAIL_CHARS:]
+        except OSError:
+            return ""
+
+    def close(self, keep_log: bool = False) -> None:
+        """Kills the worker. Its log is only kept on request (a worker that died or failed to start)."""
+        kill_process_group(self.process)
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            with contextlib.suppress(OSError):
+                pipe.close()
+        if not keep_log:
+            with contextlib.suppress(OSError):
+                os.remove(self.log_path)
+
+
+class RenderWorkerPool:
+    """
+    Warm render workers shared by every renderer in the process.
+    """
+
+    def __init__(
+        self,
+        preload: list[str] = config.RENDER_WORKER_PRELOAD,
+        max_idle: int = config.RENDER_MAX_CONCURRENT,
+        max_workers: int = config.RENDER_MAX_CONCURRENT,
+        max_jobs_per_worker: int = config.RENDER_WORKER_MAX_JOBS,
+        startup_timeout: float = config.RENDER_WORKER_STARTUP_TIMEOUT_SECONDS
+    ):
+        self.preload = list(preload)
+        self.max_idle = max_idle
+        self.max_workers = max(1, max_workers)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.startup_timeout = startup_timeout
+        # Set when a worker could not start; the renderer then uses the manim CLI
+        self.unavailable_reason: str | None = None
+        # Idle workers per environment, since the environment is fixed when a worker starts
+        self._idle: dict[tuple, list[RenderWorker]] = {}
+        # Workers started and not yet closed, idle or busy; notified whenever one is closed
+        self._live = 0
+        self._lock = threading.Condition()
+
+    def _acquire(self, env: dict, cancel_event: threading.Event | None = None) -> RenderWorker | None:
+        """An idle worker for `env`, or a new one once fewer than `max_workers` are alive. None if none could start."""
+        key = tuple(sorted(env.items()))
+        with self._lock:
+            while True:
+                idle = self._idle.get(key, [])
+                while idle:
+                    worker = idle.pop()
+                    if worker.alive():
+                        return worker
+                    self._forget(worker)
+                if self._live < self.max_workers:
+                    self._live += 1
+                    break
+                other_idle = next((workers for workers in self._idle.values() if workers), None)
+                if other_idle:
+                    self._forget(other_idle.pop(0))
+                    continue
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                self._lock.wait(timeout=0.5)
+        try:
+            worker = RenderWorker(env, self.preload, self.startup_timeout)
+        except (OSError, RuntimeError) as e:
+            with self._lock:
+                self._live -= 1
+                self._lock.notify()
+            self.unavailable_reason = str(e)
+            logger.warning(f"Warm render workers are unavailable, using the manim CLI instead: {e}")
+            return None
+        logger.info(f"Started render worker pid {worker.process.pid}.")
+        return worker
+
+    def _release(self, worker: RenderWorker, env: dict) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(tuple(sorted(env.items())), [])
+            if worker.alive() and worker.jobs_done < self.max_jobs_per_worker and len(idle) < self.max_idle:
+                idle.append(worker)
+                return
+        self._retire(worker)
+
+    def _forget(self, worker: RenderWorker, keep_log: bool = False) -> None:
+        """Closes a worker and frees its place. The caller holds the lock."""
+        worker.close(keep_log=keep_log)
+        self._live -= 1
+        self._lock.notify()
+
+    def _retire(self, worker: RenderWorker, keep_log: bool = False) -> None:
+        worker.close(keep_log=keep_log)
+        with self._lock:
+            self._live -= 1
+            self._lock.notify()
+
+    def _run(
+        self, job: dict, env: dict, cancel_event: threading.Event | None = None, timeout: float | None = None
+    ) -> tuple[dict | None, RenderWorker | None]:
+        """
+        Runs the job on a warm worker. Returns the worker's answer (None if it has none) and the worker,
+        or (None, None) if no worker could be started.
+        """
+        if self.unavailable_reason:
+            return None, None
+        worker = self._acquire(env, cancel_event)
+        if worker is None:
+            return None, None
+        result = None
+        try:
+            result = worker.run(job, cancel_event, timeout)
+        finally:
+            if result is None:
+                cancelled = cancel_event is not None and cancel_event.is_set()
+                if cancelled:
+                    logger.info(f"Killing render worker pid {worker.process.pid}: cancelled.")
+                elif timeout and worker.alive():
+                    logger.warning(f"Killing render worker pid {worker.process.pid}: no answer within {timeout:.0f}s.")
+                else:
+                    logger.error(f"Render worker pid {worker.process.pid} died; its log is kept at {worker.log_path}")
+                self._retire(worker, keep_log=not cancelled)
+            else:
+                self._release(worker, env)
+        return result, worker
+
+    def render(self, job: dict, env: dict, cancel_event: threading.Event | None = None) -> subprocess.CompletedProcess | None:
+        """
+        Renders the job on a warm worker and returns the outcome as the `manim` CLI's CompletedProcess would be
+        (the captured output as stderr). None if no worker could be started.
+        """
+        result, worker = self._run(job, env, cancel_event)
+        if worker is None:
+            return None
+        command = ["render_worker", job["script_path"], job["scene_class_name"]]
+        if result is None:
+            if cancel_event is not None and cancel_event.is_set():
+                return subprocess.CompletedProcess(command, worker.process.returncode, "", "Render cancelled.")
+            return subprocess.CompletedProcess(
+                command, WORKER_DIED_RETURNCODE, "",
+                f"The render worker exited unexpectedly (exit code {worker.process.returncode}).\n{worker._log_tail()}"
+            )
+        return subprocess.CompletedProcess(command, result["returncode"], "", result["output"])
+
+    def dry_run(self, job: dict, env: dict, cancel_event: threading.Event | None = None, timeout: float | None = None) -> dict | None:
+        """Runs a `dry_run` job and returns its result, or None if no worker ran it to the end."""
+        return self._run({**job, "dry_run": True}, env, cancel_event, timeout)[0]
+
+    async def _in_thread(self, method, job: dict, env: dict, **kwargs):
+        """Runs a blocking pool method in a thread. Cancelling the awaiting task kills the job's worker."""
+        cancel_event = threading.Event()
+        call = asyncio.ensure_future(asyncio.to_thread(method, job, env, cancel_event, **kwargs))
+        try:
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            with contextlib.suppress(Exception):
+                await call
+            raise
+
+    async def render_async(self, job: dict, env: dict) -> subprocess.CompletedProcess | None:
+        """Coroutine version of `render`. Cancelling the awaiting task kills the job's worker."""
+        return await self._in_thread(self.render, job, env)
+
+    async def dry_run_async(self, job: dict, env: dict, timeout: float | None = None) -> dict | None:
+        """Coroutine version of `dry_run`."""
+        return await self._in_thread(self.dry_run, job, env, timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            workers = [worker for idle in self._idle.values() for worker in idle]
+            self._idle.clear()
+        for worker in workers:
+            self._retire(worker)
+
+
+_shared_pool: RenderWorkerPool | None = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_render_worker_pool() -> RenderWorkerPool:
+    """Process-wide pool, so the pipeline's and the job workers' renderers share warm workers."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = RenderWorkerPool()
+    return _shared_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm Manim render worker; reads JSON render jobs from stdin.")
+    parser.add_argument("--preload", default=",".join(config.RENDER_WORKER_PRELOAD), help="Comma-separated modules to import at start-up.")
+    args = parser.parse_args()
+    _worker_main([module_name for module_name in args.preload.split(",") if module_name])
+
+
+if __name__ == "__main__":
+    main()
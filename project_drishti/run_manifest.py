@@ -0,0 +1,166 @@
+"""
+Module: run_manifest
+
+Description:
+Per-topic run manifest used to checkpoint and resume `main_pipeline.run_pipeline`.
+
+The manifest is a small JSON file (one per topic) that records the didactic
+script and, for every scene, which pipeline stages have completed:
+
+    script_generated -> rendered -> analyzed -> finalized
+
+Each stage entry carries the path of the artifact it produced and its SHA-256
+hash. On resume, a stage is only treated as complete if its artifact still
+exists and still hashes to the recorded value, so a stale or partially
+written file is never reused.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+STAGE_SCRIPT_GENERATED = "script_generated"
+STAGE_RENDERED = "rendered"
+STAGE_ANALYZED = "analyzed"
+STAGE_FINALIZED = "finalized"
+
+# Ordered: recording a stage invalidates every stage that comes after it.
+SCENE_STAGES = (STAGE_SCRIPT_GENERATED, STAGE_RENDERED, STAGE_ANALYZED, STAGE_FINALIZED)
+
+
+def file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_sha256(data) -> str:
+    """Returns the SHA-256 digest of a JSON-serialisable object in canonical form."""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    Checkpoint manifest for a single topic run.
+    """
+
+    def __init__(self, topic: str, manifest_dir: str = config.RUN_MANIFEST_DIR):
+        self.topic = topic
+        safe_topic = re.sub(r"[^a-zA-Z0-9_]", "", topic.replace(" ", "_"))
+        os.makedirs(manifest_dir, exist_ok=True)
+        self.path = os.path.join(manifest_dir, f"run_manifest_{safe_topic}.json")
+        self.data = {
+            "topic": topic,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "didactic_script": None,
+            "scenes": {},
+        }
+
+    @classmethod
+    def load(cls, topic: str, manifest_dir: str = config.RUN_MANIFEST_DIR) -> "RunManifest":
+        """
+        Loads the manifest for `topic` from disk. Returns an empty manifest if
+        none exists or if the existing file cannot be read.
+        """
+        manifest = cls(topic, manifest_dir)
+        if not os.path.exists(manifest.path):
+            logger.info(f"No existing run manifest for '{topic}' at {manifest.path}. Starting fresh.")
+            return manifest
+        try:
+            with open(manifest.path, "r") as f:
+                data = json.load(f)
+            if data.get("topic") != topic or not isinstance(data.get("scenes"), dict):
+                logger.warning(f"Run manifest at {manifest.path} does not match topic '{topic}'. Ignoring it.")
+                return manifest
+            manifest.data = data
+            logger.info(f"Loaded run manifest for '{topic}' from {manifest.path}")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to read run manifest {manifest.path}: {e}. Starting fresh.")
+        return manifest
+
+    def save(self) -> None:
+        """Writes the manifest atomically so a crash never leaves a truncated file."""
+        self.data["updated_at"] = time.time()
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(prefix=".run_manifest_", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.data, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # --- Didactic script ---
+
+    def record_didactic_script(self, script_data: dict) -> None:
+        """Stores the didactic script inline, together with its hash."""
+        self.data["didactic_script"] = {
+            "sha256": _json_sha256(script_data),
+            "recorded_at": time.time(),
+            "script": script_data,
+        }
+        self.save()
+
+    def get_didactic_script(self) -> dict | None:
+        """Returns the stored didactic script if present and intact, else None."""
+        entry = self.data.get("didactic_script")
+        if not entry or not isinstance(entry.get("script"), dict):
+            return None
+        if _json_sha256(entry["script"]) != entry.get("sha256"):
+            logger.warning(f"Stored didactic script for '{self.topic}' failed hash verification. It will be regenerated.")
+            return None
+        return entry["script"]
+
+    # --- Scene stages ---
+
+    def record_stage(self, scene_key: str, stage: str, artifact_path: str | None = None, **extra) -> None:
+        """
+        Marks `stage` as complete for a scene. Stages that come after `stage`
+        are cleared, because their artifacts were derived from an older input.
+        """
+        if stage not in SCENE_STAGES:
+            raise ValueError(f"Unknown manifest stage: {stage}")
+        entry = {"completed_at": time.time(), **extra}
+        if artifact_path:
+            entry["path"] = os.path.abspath(artifact_path)
+            entry["sha256"] = file_sha256(artifact_path)
+
+        stages = self.data["scenes"].setdefault(scene_key, {})
+        for later_stage in SCENE_STAGES[SCENE_STAGES.index(stage) + 1:]:
+            stages.pop(later_stage, None)
+        stages[stage] = entry
+        self.save()
+
+    def verified_stage(self, scene_key: str, stage: str) -> dict | None:
+        """
+        Returns the stage entry if the stage was completed and its artifact
+        still exists with the recorded hash, otherwise None.
+        """
+        entry = self.data["scenes"].get(scene_key, {}).get(stage)
+        if not entry:
+            return None
+        path = entry.get("path")
+        if not path:
+            return entry
+        if not os.path.exists(path):
+            logger.info(f"Manifest stage '{stage}' for '{scene_key}' points to a missing file: {path}")
+            return None
+        if file_sha256(path) != entry.get("sha256"):
+            logger.warning(f"Manifest stage '{stage}' for '{scene_key}' failed hash verification: {path}")
+            return None
+        return entry
@@ -0,0 +1,261 @@
+"""
+Module: scheduling
+
+Description:
+Concurrency primitives shared by every topic in a pipeline process.
+
+`FairLimiter` caps how many operations of one kind (LLM calls, renders, Gemini
+uploads) run at once. When the limit is reached, waiters are grouped by key
+(the topic) and free slots are handed out round-robin across keys. A topic
+with twenty queued scenes therefore cannot starve a topic with two.
+
+`ResourceLimits` bundles the limiters that bound the global resource budgets
+configured in `config.py`. Their limits can be changed at runtime (see
+`adaptive_concurrency`).
+
+`StagePool` is a bounded job queue drained by a fixed number of worker tasks.
+`PipelineStages` holds one pool per pipeline stage (codegen, render, compress,
+analyze, fix). A scene only occupies a worker of the stage it is currently in,
+so a scene waiting on Gemini never blocks a render. When a stage's queue is full,
+submitting to it waits, which pushes backpressure onto the previous stage.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "default"
+
+
+class FairLimiter:
+    """
+    Asyncio concurrency limiter with round-robin fairness across keys.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self._limit = max(1, limit)
+        self._active = 0
+        # key -> deque of futures waiting for a slot; key order is the round-robin order
+        self._waiters: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def set_limit(self, limit: int) -> None:
+        """
+        Changes the limit at runtime. Raising it wakes waiters immediately; lowering it
+        takes effect as the active holders release.
+        """
+        self._limit = max(1, limit)
+        self._wake_waiters()
+
+    def try_acquire(self) -> bool:
+        """Takes a slot without waiting. Fails if none is free or a caller is already waiting for one."""
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return True
+        return False
+
+    async def acquire(self, key: str = DEFAULT_KEY) -> None:
+        """Waits until a slot is granted to `key`."""
+        if self.try_acquire():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as the waiter was cancelled; hand it on.
+                self.release()
+            else:
+                self._discard_waiter(key, future)
+            raise
+
+    def release(self) -> None:
+        """Returns a slot and grants it to the next waiting key in round-robin order."""
+        self._active -= 1
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, key: str = DEFAULT_KEY):
+        """Async context manager holding one slot for the duration of the block."""
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _wake_waiters(self) -> None:
+        while self._active < self._limit and self._waiters:
+            key, queue = self._waiters.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # Key still has waiters: move it to the back of the rotation
+                self._waiters[key] = queue
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def _discard_waiter(self, key: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(key)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[key]
+
+
+class ResourceLimits:
+    """
+    Global budgets for the scarce resources used by the pipeline. A single instance
+    is shared by every topic running in the process.
+    """
+
+    def __init__(
+        self,
+        llm_calls: int = config.LLM_MAX_CONCURRENT_CALLS,
+        renders: int = config.RENDER_MAX_CONCURRENT,
+        gemini_uploads: int = config.GEMINI_MAX_CONCURRENT_UPLOADS,
+    ):
+        self.llm = FairLimiter("llm", llm_calls)
+        self.render = FairLimiter("render", renders)
+        self.gemini = FairLimiter("gemini", gemini_uploads)
+        logger.info(
+            f"Resource limits: {self.llm.limit} concurrent LLM calls, "
+            f"{self.render.limit} concurrent renders, {self.gemini.limit} concurrent Gemini uploads."
+        )
+
+
+class StagePool:
+    """
+    Bounded, per-key round-robin job queue served by `workers` asyncio worker tasks.
+
+    `run` enqueues an async callable and waits for its result. Cancelling the caller
+    cancels the job, whether it is still queued or already running on a worker.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int = config.STAGE_QUEUE_MAXSIZE):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._jobs: "OrderedDict[str, deque]" = OrderedDict()
+        self._capacity: asyncio.Semaphore | None = None
+        self._available: asyncio.Semaphore | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self.busy = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._jobs.values())
+
+    def _ensure_started(self) -> None:
+        if self._worker_tasks:
+            return
+        self._capacity = asyncio.Semaphore(self.max_queue)
+        self._available = asyncio.Semaphore(0)
+        self._worker_tasks = [
+            asyncio.ensure_future(self._worker_loop(i)) for i in range(self.workers)
+        ]
+        logger.info(f"Started stage '{self.name}' with {self.workers} workers (queue bound {self.max_queue}).")
+
+    async def run(self, key: str, fn, *args, **kwargs):
+        """Queues `fn(*args, **kwargs)` for this stage and returns its result."""
+        self._ensure_started()
+        await self._capacity.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self._jobs.setdefault(key, deque()).append((future, fn, args, kwargs))
+        self._available.release()
+        return await future
+
+    async def close(self) -> None:
+        """Cancels the worker tasks. Jobs still queued are cancelled too."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for queue in self._jobs.values():
+            for future, *_ in queue:
+                future.cancel()
+        self._jobs.clear()
+
+    def _next_job(self):
+        key, queue = self._jobs.popitem(last=False)
+        job = queue.popleft()
+        if queue:
+            self._jobs[key] = queue
+        return job
+
+    async def _worker_loop(self, worker_index: int) -> None:
+        while True:
+            await self._available.acquire()
+            future, fn, args, kwargs = self._next_job()
+            self._capacity.release()
+            if future.done():
+                # Caller was cancelled while the job was still queued
+                continue
+
+            self.busy += 1
+            job_task = asyncio.ensure_future(fn(*args, **kwargs))
+            future.add_done_callback(lambda f, t=job_task: t.cancel() if f.cancelled() else None)
+            try:
+                await asyncio.wait([job_task])
+            except asyncio.CancelledError:
+                # Let the job clean up (e.g. reap its killed subprocess) before the worker exits
+                job_task.cancel()
+                await asyncio.wait([job_task])
+                raise
+            finally:
+                self.busy -= 1
+
+            if future.done():
+                if not job_task.cancelled():
+                    job_task.exception()  # Mark as retrieved; the caller is gone
+                continue
+            if job_task.cancelled():
+                future.cancel()
+            elif job_task.exception() is not None:
+                future.set_exception(job_task.exception())
+            else:
+                future.set_result(job_task.result())
+
+
+class PipelineStages:
+    """
+    One `StagePool` per pipeline stage, sized from `config.py`.
+    """
+
+    def __init__(self):
+        self.codegen = StagePool("codegen", config.CODEGEN_WORKERS)
+        self.render = StagePool("render", config.RENDER_WORKERS)
+        self.compress = StagePool("compress", config.COMPRESS_WORKERS)
+        self.analyze = StagePool("analyze", config.ANALYZE_WORKERS)
+        self.fix = StagePool("fix", config.FIX_WORKERS)
+
+    @property
+    def pools(self) -> list[StagePool]:
+        return [self.codegen, self.render, self.compress, self.analyze, self.fix]
+
+    async def close(self) -> None:
+        for pool in self.pools:
+            await pool.close()
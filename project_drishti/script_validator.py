@@ -0,0 +1,279 @@
+"""
+Module: script_validator
+
+Description:
+Fast in-process check of a generated Manim script before it is rendered.
+
+Starting `manim` takes seconds before a broken script fails. `ScriptValidator`
+parses the script with `ast` instead and reports:
+1.  Syntax errors, and a missing Scene class with the expected name.
+2.  Names that are neither bound in the script, builtins, nor exported by its
+    star imports (`manim`, `anim_gemini.layout_utils`).
+3.  `from manim... import X` of names the package does not have.
+4.  Keyword arguments that a Manim class constructor does not accept.
+5.  Colors outside the `mcolors` palette (`colors.py`): unknown `mcolors.X`,
+    bare Manim color constants and literal color strings.
+
+The names and constructor signatures of the `manim` and `manim_voiceover`
+namespaces are collected once by importing them. They are saved as JSON
+keyed by the installed package versions, so later runs only read the file.
+Without Manim installed no index can be built, and validation is skipped.
+"""
+
+import ast
+import builtins
+import difflib
+import importlib
+import importlib.metadata
+import inspect
+import json
+import logging
+import os
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+INDEXED_MODULES = ("manim", "manim_voiceover", "manim_voiceover.services.openai")
+# Star imports whose exported names come from the repo's own files rather than the index
+LAYOUT_UTILS_MODULE = "anim_gemini.layout_utils"
+LAYOUT_UTILS_PATH = os.path.join(config.APP_BASE_DIR, "layout_utils.py")
+COLORS_PATH = os.path.join(config.APP_BASE_DIR, "colors.py")
+COLORS_ALIAS = "mcolors"
+
+
+def _package_versions() -> dict:
+    return {package: importlib.metadata.version(package) for package in ("manim", "manim_voiceover")}
+
+
+def _accepted_keywords(cls) -> list[str] | None:
+    """
+    Keyword arguments accepted by `cls(...)`: the parameters of each `__init__` along the MRO,
+    following `**kwargs` to the parent. None if the chain never ends in a closed signature.
+    """
+    accepted = set()
+    for klass in cls.__mro__:
+        if klass is object:
+            return None
+        if "__init__" not in vars(klass):
+            continue
+        try:
+            parameters = inspect.signature(vars(klass)["__init__"]).parameters.values()
+        except (TypeError, ValueError):
+            return None
+        open_ended = False
+        for parameter in parameters:
+            if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                open_ended = True
+            elif parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY):
+                accepted.add(parameter.name)
+        if not open_ended:
+            accepted.discard("self")
+            return sorted(accepted)
+    return None
+
+
+def build_namespace_index() -> dict:
+    """Imports the indexed modules and records their public names and constructor signatures."""
+    import manim
+
+    modules = {}
+    for module_name in INDEXED_MODULES:
+        module = importlib.import_module(module_name)
+        modules[module_name] = sorted(name for name in dir(module) if not name.startswith("_"))
+    signatures = {}
+    color_constants = []
+    for name in modules["manim"]:
+        value = getattr(manim, name)
+        if inspect.isclass(value):
+            signatures[name] = _accepted_keywords(value)
+        elif isinstance(value, manim.ManimColor):
+            color_constants.append(name)
+    return {
+        "versions": _package_versions(),
+        "modules": modules,
+        "signatures": signatures,
+        "color_constants": color_constants,
+    }
+
+
+def load_namespace_index(index_path: str = config.SCRIPT_VALIDATOR_INDEX_PATH) -> dict | None:
+    """
+    Returns the saved index if it matches the installed Manim versions, otherwise builds and
+    saves a new one. None if Manim is not installed.
+    """
+    try:
+        versions = _package_versions()
+    except importlib.metadata.PackageNotFoundError as e:
+        logger.warning(f"Static script validation disabled: {e.name} is not installed.")
+        return None
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if index.get("versions") == versions:
+            return index
+    except (OSError, ValueError):
+        pass
+
+    logger.info(f"Building Manim namespace index for static script validation ({versions}).")
+    try:
+        index = build_namespace_index()
+    except Exception as e:
+        logger.warning(f"Static script validation disabled: could not index the Manim namespace: {e}")
+        return None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        with open(index_path, "w") as f:
+            json.dump(index, f)
+    except OSError as e:
+        logger.warning(f"Could not save the Manim namespace index to {index_path}: {e}")
+    return index
+
+
+def _top_level_names(path: str, string_constants_only: bool = False) -> set[str]:
+    """Names bound at the top level of a Python file, read with `ast` so the file is not imported."""
+    with open(path, "r") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            if string_constants_only and not (isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+                continue
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+        elif string_constants_only:
+            continue
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+    return {name for name in names if not name.startswith("_")}
+
+
+def _bound_names(tree: ast.AST) -> set[str]:
+    """Every name the script binds anywhere. Scopes are not tracked, which errs on the side of no false reports."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names if alias.name != "*")
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+class ScriptValidator:
+    """
+    Checks generated Manim scripts against the Manim namespace index and the `mcolors` palette.
+    """
+
+    def __init__(self, index: dict | None = None, enforce_palette: bool = config.SCRIPT_VALIDATION_ENFORCE_PALETTE):
+        self.index = index if index is not None else load_namespace_index()
+        self.enforce_palette = enforce_palette
+        self.palette = _top_level_names(COLORS_PATH, string_constants_only=True)
+        self.layout_names = _top_level_names(LAYOUT_UTILS_PATH)
+
+    @property
+    def available(self) -> bool:
+        return self.index is not None
+
+    def validate_file(self, script_path: str, scene_class_name: str) -> list[str]:
+        with open(script_path, "r") as f:
+            return self.validate(f.read(), scene_class_name)
+
+    def validate(self, code: str, scene_class_name: str) -> list[str]:
+        """Returns a list of problems, each prefixed with its line number. Empty if none were found."""
+        if not self.available:
+            return []
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return [f"line {e.lineno}: SyntaxError: {e.msg}"]
+
+        problems = []
+        if not any(isinstance(node, ast.ClassDef) and node.name == scene_class_name for node in tree.body):
+            problems.append(f"line 1: Scene class '{scene_class_name}' is not defined at the top level.")
+
+        modules = self.index["modules"]
+        star_names, resolvable = set(), True
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.ImportFrom) or node.module is None:
+                continue
+            imported = [alias.name for alias in node.names]
+            if "*" in imported:
+                if node.module in modules:
+                    star_names.update(modules[node.module])
+                elif node.module == LAYOUT_UTILS_MODULE:
+                    star_names.update(self.layout_names)
+                else:
+                    resolvable = False  # Unknown star import: undefined names cannot be decided
+            elif node.module in modules:
+                for name in imported:
+                    if name not in modules[node.module]:
+                        problems.append(f"line {node.lineno}: cannot import name '{name}' from '{node.module}'.")
+
+        local_names = _bound_names(tree)
+        known_names = local_names | star_names | set(dir(builtins))
+        signatures = self.index["signatures"]
+        color_constants = set(self.index["color_constants"])
+        reported_names = set()
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                if resolvable and node.id not in known_names and node.id not in reported_names:
+                    reported_names.add(node.id)
+                    problems.append(f"line {node.lineno}: name '{node.id}' is not defined.{self._suggest(node.id, known_names)}")
+                elif self.enforce_palette and node.id in color_constants and node.id not in local_names:
+                    problems.append(f"line {node.lineno}: use {COLORS_ALIAS}.{node.id} instead of the bare Manim color {node.id}.")
+            elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == COLORS_ALIAS:
+                if node.attr not in self.palette:
+                    problems.append(f"line {node.lineno}: {COLORS_ALIAS}.{node.attr} is not in the color palette.{self._suggest(node.attr, self.palette)}")
+            elif isinstance(node, ast.Call):
+                problems.extend(self._check_call(node, signatures, local_names))
+        return problems
+
+    def _check_call(self, node: ast.Call, signatures: dict, local_names: set[str]) -> list[str]:
+        problems = []
+        if self.enforce_palette:
+            for keyword in node.keywords:
+                if keyword.arg and keyword.arg.endswith("color") and isinstance(keyword.value, ast.Constant) and isinstance(keyword.value.value, str):
+                    problems.append(f"line {node.lineno}: {keyword.arg}={keyword.value.value!r} is not a palette color; use {COLORS_ALIAS}.<NAME>.")
+        class_name = node.func.id if isinstance(node.func, ast.Name) else None
+        accepted = signatures.get(class_name)
+        if accepted is None or class_name in local_names:
+            return problems
+        for keyword in node.keywords:
+            if keyword.arg is not None and keyword.arg not in accepted:
+                problems.append(f"line {node.lineno}: {class_name}() got an unexpected keyword argument '{keyword.arg}'.{self._suggest(keyword.arg, accepted)}")
+        return problems
+
+    @staticmethod
+    def _suggest(name: str, candidates) -> str:
+        matches = difflib.get_close_matches(name, list(candidates), n=1)
+        return f" Did you mean '{matches[0]}'?" if matches else ""
+
+
+_shared_validator: ScriptValidator | None = None
+
+
+def get_script_validator() -> ScriptValidator:
+    """Process-wide validator, so the namespace index is loaded once for the renderer and the fix path."""
+    global _shared_validator
+    if _shared_validator is None:
+        _shared_validator = ScriptValidator()
+    return _shared_validator
+
+
+def format_validation_error(problems: list[str]) -> str:
+    """The message handed to the fix path in place of Manim's stderr."""
+    return "Static validation failed before rendering:\n" + "\n".join(f"- {problem}" for problem in problems)
@@ -0,0 +1,145 @@
+"""
+Module: section_render
+
+Description:
+Renders a long scene as sections on several warm render workers at once (see
+`render_worker`) and joins their videos with an ffmpeg stream copy. Manim
+renders a scene on one core, so without this a long scene sets the wall-clock
+time of the whole run.
+
+1.  A planning pass runs the scene with every animation skipped, like a dry
+    run (see `dry_run`), but with real voiceovers. Speech is synthesized into
+    the voiceover cache, and the pass records the scene time at which each
+    animation and each voiceover starts.
+2.  `plan_sections` cuts the animations into up to `RENDER_SECTIONS_MAX`
+    ranges of similar duration. Cuts are only made where a voiceover starts,
+    so no voiceover is split across two sections and every section has audio.
+3.  Each section renders `from_animation_number`..`upto_animation_number` in its
+    own media directory. The animations before the section are replayed
+    without drawing frames, which rebuilds the scene's state. `section_sounds`
+    keeps the section's own sounds and moves them to its time zero. The
+    voiceover cache is a copy of the primed one. LaTeX and text are shared
+    with the main media directory.
+4.  The section videos are joined in order without re-encoding.
+"""
+
+import contextlib
+import logging
+import os
+import shutil
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+VOICEOVER_DIR = "voiceovers"
+VOICEOVER_CACHE_FILE = "cache.json"
+
+
+def plan_sections(
+    animation_times: list[float],
+    voiceover_starts: list[int],
+    duration: float,
+    max_sections: int = config.RENDER_SECTIONS_MAX,
+    min_animations: int = config.RENDER_SECTIONS_MIN_ANIMATIONS
+) -> list[tuple[int, int]]:
+    """
+    Splits the scene's animations into (first, end) index ranges, end exclusive, whose durations are as
+    even as the allowed cut points permit. A single range means the scene should render in one piece.
+    """
+    total = len(animation_times)
+    if total < min_animations or max_sections < 2:
+        return [(0, total)]
+    if voiceover_starts:
+        # Cutting where a voiceover starts keeps it whole, and leaves the first voiceover in the first section
+        cut_points = sorted({start for start in voiceover_starts if voiceover_starts[0] < start < total})
+    else:
+        cut_points = list(range(1, total))
+    cuts = []
+    for section in range(1, max_sections):
+        remaining = [cut for cut in cut_points if not cuts or cut > cuts[-1]]
+        if not remaining:
+            break
+        target = duration * section / max_sections
+        cuts.append(min(remaining, key=lambda cut: abs(animation_times[cut] - target)))
+    bounds = [0, *cuts, total]
+    return [(bounds[index], bounds[index + 1]) for index in range(len(bounds) - 1)]
+
+
+def section_job(job: dict, media_dir: str, section_media_dir: str, first: int, end: int, total: int, start_time: float) -> dict:
+    """Turns a warm worker render job for the whole scene into one for animations `first` to `end` (exclusive)."""
+    # upto is inclusive; the last section also renders anything after the last animation
+    upto = end - 1 if end < total else -1
+    manim_config = {
+        **job["manim_config"],
+        "media_dir": section_media_dir,
+        "tex_dir": os.path.join(media_dir, "Tex"),
+        "text_dir": os.path.join(media_dir, "texts"),
+        "from_animation_number": first,
+        "upto_animation_number": upto,
+    }
+    return {**job, "manim_config": manim_config, "section": {"first": first, "upto": upto, "start_time": start_time}}
+
+
+@contextlib.contextmanager
+def section_sounds(section: dict | None):
+    """
+    While a section renders, keeps only the sounds added during its animations and places them relative to
+    its start. Manim's own check (whether the last animation was skipped) would drop a voiceover that starts
+    right at the section's first animation.
+    """
+    if not section:
+        yield
+        return
+    from manim import Scene
+    original = Scene.add_sound
+
+    def add_sound(scene, sound_file, time_offset=0, gain=None, **kwargs):
+        index = scene.renderer.num_plays
+        if index < section["first"] or (section["upto"] >= 0 and index > section["upto"]):
+            return
+        time = scene.renderer.time + time_offset - section["start_time"]
+        scene.renderer.file_writer.add_sound(sound_file, max(time, 0), gain, **kwargs)
+
+    Scene.add_sound = add_sound
+    try:
+        yield
+    finally:
+        Scene.add_sound = original
+
+
+def prepare_section_media_dir(media_dir: str, section_media_dir: str) -> None:
+    """
+    Gives a section its own copy of the voiceover cache index, with links to the audio files, so sections
+    rendering at once never write to a shared cache index.
+    """
+    voiceover_dir = os.path.join(media_dir, VOICEOVER_DIR)
+    section_voiceover_dir = os.path.join(section_media_dir, VOICEOVER_DIR)
+    os.makedirs(section_voiceover_dir, exist_ok=True)
+    if not os.path.isdir(voiceover_dir):
+        return
+    for file_name in os.listdir(voiceover_dir):
+        source = os.path.join(voiceover_dir, file_name)
+        if file_name == VOICEOVER_CACHE_FILE:
+            shutil.copyfile(source, os.path.join(section_voiceover_dir, file_name))
+        elif os.path.isfile(source):
+            os.symlink(source, os.path.join(section_voiceover_dir, file_name))
+
+
+def concat_command(video_paths: list[str], list_path: str, output_path: str) -> list[str]:
+    """Writes the ffmpeg concat list for `video_paths` and returns the command that joins them by stream copy."""
+    with open(list_path, "w") as f:
+        for video_path in video_paths:
+            escaped_path = os.path.abspath(video_path).replace("'", "'\\''")
+            f.write(f"file '{escaped_path}'\n")
+    return [
+        "ffmpeg",
+        "-y",
+        "-loglevel", "error",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", list_path,
+        "-c", "copy",
+        "-movflags", "+faststart",
+        output_path
+    ]
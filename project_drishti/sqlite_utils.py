@@ -0,0 +1,85 @@
+"""
+Module: sqlite_utils
+
+Description:
+Shared SQLite plumbing for the stores that several pipeline and worker
+processes use at once: the LLM cache, the render cache, the job queue and
+the exemplar store.
+
+Every operation opens its own connection in autocommit mode with a 30 second
+busy timeout, so a file can be shared across processes (and across hosts,
+where the filesystem supports SQLite locking). Writes go through
+`immediate_transaction`, which takes the write lock with `BEGIN IMMEDIATE`
+up front instead of upgrading a read lock halfway through.
+
+The caches keep `size` and `last_access` columns. `evict_least_recently_used`
+trims such a table to its entry and byte budgets.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def create_schema(db_path: str, schema: str) -> None:
+    """Creates the file's directory and runs the `CREATE ... IF NOT EXISTS` script."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    with connection(db_path) as conn:
+        conn.executescript(schema)
+
+
+def connect(db_path: str, row_factory=None) -> sqlite3.Connection:
+    # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    return conn
+
+
+@contextmanager
+def connection(db_path: str, row_factory=None):
+    """A connection for reads and single statements, closed on exit."""
+    conn = connect(db_path, row_factory)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def immediate_transaction(db_path: str, row_factory=None):
+    """A connection inside `BEGIN IMMEDIATE`, committed on exit or rolled back if the block raises."""
+    with connection(db_path, row_factory) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def table_totals(conn: sqlite3.Connection, table: str) -> tuple[int, int]:
+    """Entry count and total `size` of a cache table."""
+    return conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+
+
+def evict_least_recently_used(conn: sqlite3.Connection, table: str, max_entries: int, max_bytes: int, column: str = "key") -> list:
+    """
+    Deletes the least recently used rows of `table` until it fits both budgets, inside the
+    caller's transaction. Returns `column` of the deleted rows, oldest first.
+    """
+    entries, total_bytes = table_totals(conn, table)
+    evicted = []
+    if entries <= max_entries and total_bytes <= max_bytes:
+        return evicted
+    for key, value, size in conn.execute(f"SELECT key, {column}, size FROM {table} ORDER BY last_access").fetchall():
+        if entries <= max_entries and total_bytes <= max_bytes:
+            break
+        conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+        entries -= 1
+        total_bytes -= size
+        evicted.append(value)
+    return evicted
@@ -0,0 +1,107 @@
+"""
+Module: subprocess_utils
+
+Description:
+Cancellable replacements for `subprocess.run` used by the Manim and ffmpeg stages.
+
+The command is started in its own session (and so its own process group). When
+the caller sets the cancel event (because a stage or scene deadline passed, or
+the attempt was cancelled), the whole group is killed. Manim's ffmpeg/LaTeX
+children and the ffmpeg encoder therefore never outlive their attempt.
+
+`run_cancellable` blocks its thread and is used by the job workers.
+`run_cancellable_async` is a coroutine used by the pipeline: cancelling the task
+that awaits it (a deadline or a losing speculative candidate) kills the group.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def kill_process_group(process: subprocess.Popen | asyncio.subprocess.Process) -> None:
+    """Kills `process` and every process in its group."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass  # Already gone
+
+
+def run_cancellable(
+    command: list[str],
+    cancel_event: threading.Event | None = None,
+    poll_interval: float = 0.5,
+    timeout: float | None = None,
+    **popen_kwargs
+) -> subprocess.CompletedProcess:
+    """
+    Runs `command` like `subprocess.run(..., capture_output=True, text=True)`.
+
+    If `cancel_event` is set while the command runs, or `timeout` seconds pass, its process
+    group is killed and the CompletedProcess returned carries the (negative) kill return code.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+        **popen_kwargs
+    )
+    try:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=poll_interval if cancel_event or deadline else None)
+                break
+            except subprocess.TimeoutExpired:
+                timed_out = deadline is not None and time.monotonic() >= deadline
+                if timed_out or (cancel_event is not None and cancel_event.is_set()):
+                    logger.info(f"Killing process group of {command[0]} (pid {process.pid}): {'timed out' if timed_out else 'cancelled'}.")
+                    kill_process_group(process)
+                    stdout, stderr = process.communicate()
+                    break
+    except BaseException:
+        # Never leave an orphaned group behind, whatever interrupted the wait
+        kill_process_group(process)
+        process.wait()
+        raise
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+async def run_cancellable_async(command: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """
+    Coroutine version of `run_cancellable`, built on `asyncio.create_subprocess_exec`.
+
+    Output is decoded as text. If the awaiting task is cancelled, the process group is
+    killed and reaped before the cancellation propagates.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+        **kwargs
+    )
+    try:
+        stdout, stderr = await process.communicate()
+    except BaseException:
+        logger.info(f"Killing process group of {command[0]} (pid {process.pid}): cancelled.")
+        kill_process_group(process)
+        await process.wait()
+        raise
+    return subprocess.CompletedProcess(
+        command,
+        process.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace")
+    )
@@ -0,0 +1,228 @@
+"""
+Module: usage_tracker
+
+Description:
+Token, latency and cost accounting for every LLM and Gemini call of a run,
+with optional per-scene and per-topic budgets.
+
+The stages hand each response to `UsageTracker.record_response` together with
+the topic, the scene (None for topic-level calls such as the didactic script)
+and the pipeline stage. Prompt, completion, reasoning and cached-prompt token
+counts are read from OpenAI-style `usage` objects and from Gemini's
+`usage_metadata`. The cost is the one OpenRouter reports in `usage.cost`;
+otherwise it is computed from the per-model prices in `config.MODEL_PRICES`.
+
+A code generation stream that is stopped early never receives its usage
+chunk. Such calls are recorded with token counts estimated from the text
+length and are flagged as estimated in the report.
+
+`budget_exceeded` tells the retry loops when a scene or its topic has used up
+its token or cost budget, so they stop retrying. `report` returns the totals
+per topic, scene and stage as a dict, and `write_report` saves it as JSON.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from project_drishti import config
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens")
+# Rough characters per token, used only for streams stopped before their usage arrived
+ESTIMATED_CHARS_PER_TOKEN = 4
+
+
+def topic_key(topic: str | None) -> str:
+    """Topics are tracked under the underscored title the pipeline uses as its limiter key."""
+    return (topic or "").replace(" ", "_")
+
+
+def _count(value) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def usage_from_response(response) -> dict | None:
+    """
+    Token counts of an OpenAI-style completion (or final stream chunk) or a Gemini response.
+    None if the response carries no usage. Completion tokens include the reasoning tokens.
+    """
+    usage = getattr(response, "usage", None)
+    if isinstance(getattr(usage, "prompt_tokens", None), int):
+        cost = getattr(usage, "cost", None)
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": _count(getattr(usage, "completion_tokens", None)),
+            "reasoning_tokens": _count(getattr(getattr(usage, "completion_tokens_details", None), "reasoning_tokens", None)),
+            "cached_tokens": _count(getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)),
+            "cost": float(cost) if isinstance(cost, (int, float)) else None,
+        }
+    metadata = getattr(response, "usage_metadata", None)
+    if isinstance(getattr(metadata, "prompt_token_count", None), int):
+        # Gemini counts thinking tokens separately from the answer
+        reasoning_tokens = _count(getattr(metadata, "thoughts_token_count", None))
+        return {
+            "prompt_tokens": metadata.prompt_token_count,
+            "completion_tokens": _count(getattr(metadata, "candidates_token_count", None)) + reasoning_tokens,
+            "reasoning_tokens": reasoning_tokens,
+            "cached_tokens": _count(getattr(metadata, "cached_content_token_count", None)),
+            "cost": None,
+        }
+    return None
+
+
+def estimate_usage(prompt_chars: int, completion_chars: int) -> dict:
+    """Token counts estimated from text lengths, for calls whose usage was never reported."""
+    return {
+        "prompt_tokens": prompt_chars // ESTIMATED_CHARS_PER_TOKEN,
+        "completion_tokens": completion_chars // ESTIMATED_CHARS_PER_TOKEN,
+        "reasoning_tokens": 0,
+        "cached_tokens": 0,
+        "cost": None,
+        "estimated": True,
+    }
+
+
+def empty_totals() -> dict:
+    totals = dict.fromkeys(TOKEN_FIELDS, 0)
+    totals.update({"calls": 0, "estimated_calls": 0, "latency": 0.0, "cost": 0.0})
+    return totals
+
+
+def _add_to_totals(totals: dict, record: dict) -> None:
+    totals["calls"] += 1
+    totals["estimated_calls"] += 1 if record["estimated"] else 0
+    for field in TOKEN_FIELDS:
+        totals[field] += record[field]
+    totals["latency"] += record["latency"]
+    totals["cost"] += record["cost"]
+
+
+def usage_difference(after: dict, before: dict) -> dict:
+    """Usage between two `totals` snapshots, e.g. what one attempt of a scene spent."""
+    return {field: after[field] - before[field] for field in after}
+
+
+class UsageTracker:
+    """
+    Thread-safe record of every LLM and Gemini call in the process.
+    """
+
+    def __init__(
+        self,
+        prices: dict = config.MODEL_PRICES,
+        scene_token_budget: int = config.SCENE_TOKEN_BUDGET,
+        scene_cost_budget: float = config.SCENE_COST_BUDGET_USD,
+        topic_token_budget: int = config.TOPIC_TOKEN_BUDGET,
+        topic_cost_budget: float = config.TOPIC_COST_BUDGET_USD
+    ):
+        self.prices = prices
+        self.scene_token_budget = scene_token_budget
+        self.scene_cost_budget = scene_cost_budget
+        self.topic_token_budget = topic_token_budget
+        self.topic_cost_budget = topic_cost_budget
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def price(self, model: str, usage: dict) -> float:
+        """Cost in USD from the configured per-million-token prices. 0.0 for unpriced models."""
+        model_prices = self.prices.get(model) or self.prices.get(model.split("/")[-1])
+        if not model_prices:
+            return 0.0
+        cached_tokens = min(usage["cached_tokens"], usage["prompt_tokens"])
+        cached_price = model_prices.get("cached_input", model_prices.get("input", 0.0))
+        return (
+            (usage["prompt_tokens"] - cached_tokens) * model_prices.get("input", 0.0)
+            + cached_tokens * cached_price
+            + usage["completion_tokens"] * model_prices.get("output", 0.0)
+        ) / 1_000_000
+
+    def record(self, usage: dict, topic: str | None, scene: str | None, stage: str, model: str, latency: float) -> dict:
+        """Adds one call's usage (see `usage_from_response`) and returns the stored record."""
+        record = {field: usage[field] for field in TOKEN_FIELDS}
+        record.update({
+            "topic": topic_key(topic),
+            "scene": scene,
+            "stage": stage,
+            "model": model,
+            "latency": latency,
+            "cost": usage["cost"] if usage.get("cost") is not None else self.price(model, usage),
+            "estimated": usage.get("estimated", False),
+        })
+        with self._lock:
+            self.records.append(record)
+        logger.info(
+            f"{stage} call for {scene or record['topic']}: {record['prompt_tokens']} prompt "
+            f"({record['cached_tokens']} cached), {record['completion_tokens']} completion "
+            f"({record['reasoning_tokens']} reasoning) tokens, ${record['cost']:.4f}"
+            + (" (estimated)" if record["estimated"] else "")
+        )
+        return record
+
+    def record_response(self, response, topic: str | None, scene: str | None, stage: str, model: str, latency: float) -> dict | None:
+        """Records a response's usage. None if the provider did not report any."""
+        usage = usage_from_response(response)
+        if usage is None:
+            return None
+        return self.record(usage, topic, scene, stage, model, latency)
+
+    def totals(self, topic: str | None = None, scene: str | None = None, stage: str | None = None) -> dict:
+        """Sums the records matching every given filter."""
+        totals = empty_totals()
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            if topic is not None and record["topic"] != topic_key(topic):
+                continue
+            if scene is not None and record["scene"] != scene:
+                continue
+            if stage is not None and record["stage"] != stage:
+                continue
+            _add_to_totals(totals, record)
+        return totals
+
+    def budget_exceeded(self, topic: str, scene: str | None = None) -> str | None:
+        """Why the scene (or, without a scene, the topic) may not spend more. None while within budget."""
+        checks = [("Topic", self.totals(topic), self.topic_token_budget, self.topic_cost_budget)]
+        if scene is not None:
+            checks.insert(0, ("Scene", self.totals(topic, scene), self.scene_token_budget, self.scene_cost_budget))
+        for label, totals, token_budget, cost_budget in checks:
+            tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+            if token_budget and tokens >= token_budget:
+                return f"{label} token budget exceeded ({tokens} of {token_budget} tokens used)."
+            if cost_budget and totals["cost"] >= cost_budget:
+                return f"{label} cost budget exceeded (${totals['cost']:.4f} of ${cost_budget:.4f} used)."
+        return None
+
+    def report(self, topic: str | None = None) -> dict:
+        """Totals for the run, each topic, each scene and each stage, ready for `json.dump`."""
+        with self._lock:
+            records = [record for record in self.records if topic is None or record["topic"] == topic_key(topic)]
+        report = {"totals": empty_totals(), "stages": {}, "topics": {}}
+        for record in records:
+            topic_report = report["topics"].setdefault(record["topic"], {"totals": empty_totals(), "stages": {}, "scenes": {}})
+            # Topic-level calls (the didactic script) have no scene
+            scene_report = topic_report["scenes"].setdefault(record["scene"], {"totals": empty_totals(), "stages": {}}) if record["scene"] else None
+            for section in (report, topic_report, scene_report):
+                if section is None:
+                    continue
+                _add_to_totals(section["totals"], record)
+                if "stages" in section:
+                    _add_to_totals(section["stages"].setdefault(record["stage"], empty_totals()), record)
+        report["budgets"] = {
+            "scene_tokens": self.scene_token_budget,
+            "scene_cost_usd": self.scene_cost_budget,
+            "topic_tokens": self.topic_token_budget,
+            "topic_cost_usd": self.topic_cost_budget,
+        }
+        return report
+
+    def write_report(self, path: str, topic: str | None = None) -> str:
+        """Writes `report(topic)` as JSON and returns the path."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(topic), f, indent=2)
+        logger.info(f"Usage report written to {path}")
+        return path
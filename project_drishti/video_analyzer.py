@@ -1,15 +1,34 @@
+import asyncio
 import os
 import subprocess
 import logging
+import threading
 import time
+import uuid
 import google.generativeai as genai
 from . import config
+from .subprocess_utils import run_cancellable, run_cancellable_async
 import shutil
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key=config.GEMINI_API_KEY)
+
+
+def _configure_gemini() -> None:
+    """
+    Configures the SDK. With `GEMINI_API_ENDPOINT` set (e.g. the mock services), it uses the REST
+    transport against that endpoint, including the discovery document that its file upload reads.
+    """
+    if not config.GEMINI_API_ENDPOINT:
+        genai.configure(api_key=config.GEMINI_API_KEY)
+        return
+    from google.generativeai import client as genai_client
+    genai_client.GENAI_API_DISCOVERY_URL = f"{config.GEMINI_API_ENDPOINT}/$discovery/rest"
+    genai.configure(api_key=config.GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": config.GEMINI_API_ENDPOINT})
+
+
+_configure_gemini()
 
 class VideoAnalyzer:
     """
@@ -18,10 +37,15 @@ class VideoAnalyzer:
     def __init__(self):
         if not config.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        genai.configure(api_key=config.GEMINI_API_KEY)
+        _configure_gemini()
         #self.model = genai.GenerativeModel('gemini-2.5-flash-lite-preview-06-17')
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model_name = 'gemini-2.5-flash'
+        self.model = genai.GenerativeModel(self.model_name)
         self.prompt_template = self._load_prompt_template()
+        # Optional callable(service, latency_seconds, error) told about every Gemini request
+        self.api_observer = None
+        # Optional UsageTracker told about the token usage of every Gemini verdict
+        self.usage_tracker = None
         # Added attributes to track timing of compression and analysis stages per call
         self.last_compress_time: float = 0.0
         self.last_analysis_time: float = 0.0
@@ -44,13 +68,58 @@ class VideoAnalyzer:
             Respond with "YES" if the video is good quality and "NO" if it has issues.
             """
 
-    def _compress_video(self, input_path: str) -> str | None:
+    def compress_video(self, input_path: str, cancel_event: threading.Event | None = None) -> str | None:
+        """
+        Downscales a video for upload. If `cancel_event` gets set, the ffmpeg process group
+        is killed and None is returned.
+        """
         if not os.path.exists(input_path):
             logger.error(f"Input video for compression not found: {input_path}")
             return None
 
+        command, output_path = self._compression_command(input_path)
+        try:
+            result = run_cancellable(command, cancel_event)
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"Compression of {input_path} was cancelled.")
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return None
+            result.check_returncode()
+            logger.info(f"Successfully compressed video to: {output_path}")
+            return output_path
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to compress video: {e.stderr}")
+            return None
+
+    async def compress_video_async(self, input_path: str) -> str | None:
+        """
+        Coroutine version of `compress_video`. Cancelling the awaiting task kills ffmpeg.
+        """
+        if not os.path.exists(input_path):
+            logger.error(f"Input video for compression not found: {input_path}")
+            return None
+
+        command, output_path = self._compression_command(input_path)
+        try:
+            result = await run_cancellable_async(command)
+            result.check_returncode()
+        except asyncio.CancelledError:
+            logger.info(f"Compression of {input_path} was cancelled.")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to compress video: {e.stderr}")
+            return None
+        logger.info(f"Successfully compressed video to: {output_path}")
+        return output_path
+
+    def _compression_command(self, input_path: str) -> tuple[list[str], str]:
+        """Returns the ffmpeg command that downscales `input_path` and the path it writes to."""
         filename = os.path.basename(input_path)
-        output_path = os.path.join(config.COMPRESSED_VIDEO_DIR, f"compressed_{filename}")
+        # Unique per call: different scripts (e.g. speculative candidates) can render the same class name
+        output_path = os.path.join(config.COMPRESSED_VIDEO_DIR, f"compressed_{uuid.uuid4().hex[:8]}_{filename}")
 
         command = [
             "ffmpeg",
@@ -62,30 +131,45 @@ class VideoAnalyzer:
             output_path
         ]
         
-        try:
-            # Using capture_output=True and text=True to get stderr on failure
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            logger.info(f"Successfully compressed video to: {output_path}")
-            return output_path
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to compress video: {e.stderr}")
-            return None
+        return command, output_path
 
     def analyze_video(self, video_path: str, scene_description: str) -> bool:
         logger.info(f"Starting analysis for video: {video_path}")
         start_time = time.perf_counter()
-        compressed_path = self._compress_video(video_path)
+        compressed_path = self.compress_video(video_path)
         # Capture compression duration
         self.last_compress_time = time.perf_counter() - start_time
 
         if not compressed_path:
-            # Error is already logged by _compress_video
+            # Error is already logged by compress_video
             # No analysis performed since compression failed
             self.last_analysis_time = 0.0
             return False
 
         analysis_start = time.perf_counter()
+        is_good, _ = self.analyze_compressed_video(compressed_path, scene_description)
+        # Capture total analysis (upload + Gemini response) duration
+        self.last_analysis_time = time.perf_counter() - analysis_start
+        return is_good
+
+    def analyze_compressed_video(
+        self,
+        compressed_path: str,
+        scene_description: str,
+        topic_title: str | None = None,
+        scene_title: str | None = None
+    ) -> tuple[bool, str]:
+        """
+        Uploads an already-compressed video to Gemini and checks it for quality issues.
+        The compressed file is removed afterwards. The token usage is recorded under
+        `topic_title` and `scene_title`.
+
+        Returns:
+            tuple[bool, str]: Whether the video passed, and the verdict text (Gemini's
+                              answer, or a description of why no verdict was reached).
+        """
         video_file = None
+        call_start = time.perf_counter()
         try:
             logger.info(f"Uploading compressed video to Gemini: {compressed_path}")
             video_file = genai.upload_file(path=compressed_path)
@@ -97,8 +181,7 @@ class VideoAnalyzer:
 
             if video_file.state.name == "FAILED":
                 logger.error("Gemini video processing failed.")
-                self.last_analysis_time = time.perf_counter() - analysis_start
-                return False
+                return False, "Gemini video processing failed."
 
             logger.info("Video uploaded. Generating content with Gemini.")
             # The new prompt is a pure visual check and doesn't require scene description.
@@ -110,61 +193,19 @@ class VideoAnalyzer:
             #    For dynamic thinking, you could use `thinking_budget=-1`.
             generation_config = {"thinking_budget": 2048}
             #response = self.model.generate_content([prompt, video_file],generation_config=generation_config)
+            call_start = time.perf_counter()
             response = self.model.generate_content([prompt, video_file])
-            # Extract and interpret the response
-            result_text = response.text.strip()
-            print("=========================================")
-            print("START: Gemini analysis result")
-            print(result_text)
-            print("END: Gemini analysis result")
-            print("=========================================")
-            logger.info(f"Gemini analysis result: {result_text}")
-
-            try:
-                lines = result_text.strip().split('\n')
-                if len(lines) < 2:
-                    logger.error(f"Unexpected response format - expecting 2 lines but got {len(lines)}: '{result_text}'")
-                    self.last_analysis_time = time.perf_counter() - analysis_start
-                    return False
-
-                # Take the last two lines to be robust against prepended text
-                overlap_line = lines[-2]
-                boundary_line = lines[-1]
-
-                overlap_prefix = "####OVERLAP####"
-                boundary_prefix = "####BOUNDARY####"
-
-                if not overlap_line.startswith(overlap_prefix) or not boundary_line.startswith(boundary_prefix):
-                    logger.error(f"Unexpected response format - missing prefixes: '{result_text}'")
-                    self.last_analysis_time = time.perf_counter() - analysis_start
-                    return False
-
-                overlap_severity = overlap_line.replace(overlap_prefix, "").strip()
-                boundary_severity = boundary_line.replace(boundary_prefix, "").strip()
-
-                logger.info(f"Parsed Overlap severity: {overlap_severity}, Boundary severity: {boundary_severity}")
-
-                good_severities = ["NONE", "LOW", "HIGH"]
-                is_overlap_ok = overlap_severity in good_severities
-                is_boundary_ok = boundary_severity in good_severities
-                is_boundary_ok=1 #remove later ,keeping for some experiemnt
-                if not is_overlap_ok:
-                    logger.warning(f"Video failed due to OVERLAP severity: {overlap_severity}")
-                if not is_boundary_ok:
-                    logger.warning(f"Video failed due to BOUNDARY severity: {boundary_severity}")
-
-                # Capture total analysis (upload + Gemini response) duration
-                self.last_analysis_time = time.perf_counter() - analysis_start
-                return is_overlap_ok and is_boundary_ok
-            except Exception as e:
-                logger.error(f"Error parsing Gemini response: '{result_text}'. Error: {e}")
-                self.last_analysis_time = time.perf_counter() - analysis_start
-                return False
+            if self.api_observer:
+                self.api_observer("gemini", time.perf_counter() - call_start, None)
+            if self.usage_tracker is not None:
+                self.usage_tracker.record_response(response, topic_title, scene_title, "analysis", self.model_name, time.perf_counter() - call_start)
+            return self._report_analysis_result(response.text.strip())
 
         except Exception as e:
             logger.error(f"An error occurred during Gemini video analysis: {e}")
-            self.last_analysis_time = time.perf_counter() - analysis_start
-            return False
+            if self.api_observer:
+                self.api_observer("gemini", time.perf_counter() - call_start, e)
+            return False, f"Gemini video analysis error: {e}"
         finally:
             # Cleanup the uploaded file on Gemini servers
             if video_file:
@@ -174,24 +215,133 @@ class VideoAnalyzer:
                 except Exception as e:
                     logger.error(f"Failed to delete Gemini file {video_file.name}: {e}")
 
-            # Clean up the local compressed file
-            if compressed_path and os.path.exists(compressed_path):
+            self._remove_compressed_file(compressed_path)
+
+    async def analyze_compressed_video_async(
+        self,
+        compressed_path: str,
+        scene_description: str,
+        topic_title: str | None = None,
+        scene_title: str | None = None
+    ) -> tuple[bool, str]:
+        """
+        Coroutine version of `analyze_compressed_video`. Processing is polled with
+        `asyncio.sleep` and the verdict requested with `generate_content_async`. The SDK
+        has no async file API, so the upload, status and delete calls run in a thread;
+        they are short requests, unlike the polling wait they replace.
+        """
+        video_file = None
+        call_start = time.perf_counter()
+        try:
+            logger.info(f"Uploading compressed video to Gemini: {compressed_path}")
+            video_file = await asyncio.to_thread(genai.upload_file, path=compressed_path)
+
+            # Wait for the video to be processed
+            while video_file.state.name == "PROCESSING":
+                await asyncio.sleep(10)
+                video_file = await asyncio.to_thread(genai.get_file, video_file.name)
+
+            if video_file.state.name == "FAILED":
+                logger.error("Gemini video processing failed.")
+                return False, "Gemini video processing failed."
+
+            logger.info("Video uploaded. Generating content with Gemini.")
+            call_start = time.perf_counter()
+            if config.GEMINI_API_ENDPOINT:
+                # The SDK's async client is gRPC only; the REST transport is synchronous
+                response = await asyncio.to_thread(self.model.generate_content, [self.prompt_template, video_file])
+            else:
+                response = await self.model.generate_content_async([self.prompt_template, video_file])
+            if self.api_observer:
+                self.api_observer("gemini", time.perf_counter() - call_start, None)
+            if self.usage_tracker is not None:
+                self.usage_tracker.record_response(response, topic_title, scene_title, "analysis", self.model_name, time.perf_counter() - call_start)
+            return self._report_analysis_result(response.text.strip())
+
+        except Exception as e:
+            logger.error(f"An error occurred during Gemini video analysis: {e}")
+            if self.api_observer:
+                self.api_observer("gemini", time.perf_counter() - call_start, e)
+            return False, f"Gemini video analysis error: {e}"
+        finally:
+            if video_file:
                 try:
-                    os.remove(compressed_path)
-                    logger.info(f"Removed temporary compressed file: {compressed_path}")
-                except OSError as e:
-                    logger.error(f"Error removing compressed file {compressed_path}: {e}")
+                    await asyncio.to_thread(genai.delete_file, video_file.name)
+                    logger.info(f"Cleaned up uploaded file on Gemini: {video_file.name}")
+                except Exception as e:
+                    logger.error(f"Failed to delete Gemini file {video_file.name}: {e}")
+            self._remove_compressed_file(compressed_path)
+
+    def _report_analysis_result(self, result_text: str) -> tuple[bool, str]:
+        """Prints and logs Gemini's verdict, then parses it."""
+        print("=========================================")
+        print("START: Gemini analysis result")
+        print(result_text)
+        print("END: Gemini analysis result")
+        print("=========================================")
+        logger.info(f"Gemini analysis result: {result_text}")
+        return self._parse_analysis_result(result_text), result_text
+
+    def _remove_compressed_file(self, compressed_path: str | None) -> None:
+        """Cleans up the local compressed file."""
+        if compressed_path and os.path.exists(compressed_path):
+            try:
+                os.remove(compressed_path)
+                logger.info(f"Removed temporary compressed file: {compressed_path}")
+            except OSError as e:
+                logger.error(f"Error removing compressed file {compressed_path}: {e}")
+
+    def _parse_analysis_result(self, result_text: str) -> bool:
+        """Interprets Gemini's two-line OVERLAP/BOUNDARY verdict."""
+        try:
+            lines = result_text.strip().split('\n')
+            if len(lines) < 2:
+                logger.error(f"Unexpected response format - expecting 2 lines but got {len(lines)}: '{result_text}'")
+                return False
+
+            # Take the last two lines to be robust against prepended text
+            overlap_line = lines[-2]
+            boundary_line = lines[-1]
+
+            overlap_prefix = "####OVERLAP####"
+            boundary_prefix = "####BOUNDARY####"
+
+            if not overlap_line.startswith(overlap_prefix) or not boundary_line.startswith(boundary_prefix):
+                logger.error(f"Unexpected response format - missing prefixes: '{result_text}'")
+                return False
+
+            overlap_severity = overlap_line.replace(overlap_prefix, "").strip()
+            boundary_severity = boundary_line.replace(boundary_prefix, "").strip()
+
+            logger.info(f"Parsed Overlap severity: {overlap_severity}, Boundary severity: {boundary_severity}")
+
+            good_severities = ["NONE", "LOW", "HIGH"]
+            is_overlap_ok = overlap_severity in good_severities
+            is_boundary_ok = boundary_severity in good_severities
+            is_boundary_ok=1 #remove later ,keeping for some experiemnt
+            if not is_overlap_ok:
+                logger.warning(f"Video failed due to OVERLAP severity: {overlap_severity}")
+            if not is_boundary_ok:
+                logger.warning(f"Video failed due to BOUNDARY severity: {boundary_severity}")
+
+            return bool(is_overlap_ok and is_boundary_ok)
+        except Exception as e:
+            logger.error(f"Error parsing Gemini response: '{result_text}'. Error: {e}")
+            return False
 
-    def move_to_final_videos(self, video_path: str) -> str | None:
+    def move_to_final_videos(self, video_path: str, subdir: str | None = None) -> str | None:
         """
-        Moves the video to the final videos directory.
+        Moves the video to the final videos directory, optionally into a subdirectory
+        (used to keep topics apart in batch runs).
         """
         if not os.path.exists(video_path):
             logger.error(f"Video file not found at: {video_path}")
             return None
 
         filename = os.path.basename(video_path)
-        destination_path = os.path.join(config.FINAL_VIDEOS_DIR, filename)
+        destination_dir = os.path.join(config.FINAL_VIDEOS_DIR, subdir) if subdir else config.FINAL_VIDEOS_DIR
+        os.makedirs(destination_dir, exist_ok=True)
+        destination_path = os.path.join(destination_dir, filename)
 
         try:
             shutil.move(video_path, destination_path)
@@ -201,15 +351,16 @@ class VideoAnalyzer:
             logger.error(f"Failed to move video: {e}")
             return None
 
-    def analyze_and_report(self, video_path, scene_narration):
+    def analyze_and_report(self, video_path, scene_narration, final_subdir: str | None = None):
         """
         Analyzes a video and returns a tuple of (bool, str) indicating success and a message.
         This is a wrapper around analyze_video.
         """
         is_good = self.analyze_video(video_path, scene_narration)
+        final_video_path = None
         
         if is_good:
-            self.move_to_final_videos(video_path)
+            final_video_path = self.move_to_final_videos(video_path, subdir=final_subdir)
             report_message = "Video analysis passed."
         else:
             report_message = "Video analysis failed and will be retried."
@@ -218,7 +369,9 @@ class VideoAnalyzer:
         # Return timing details as a dict for downstream latency dashboard
         timing_info = {
             "compress_time": getattr(self, "last_compress_time", 0.0),
-            "analysis_time": getattr(self, "last_analysis_time", 0.0)
+            "analysis_time": getattr(self, "last_analysis_time", 0.0),
+            # Where the video ended up after a passing analysis (None if it was not moved)
+            "final_video_path": final_video_path,
         }
 
         return is_good, report_message, timing_info
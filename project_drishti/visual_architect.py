@@ -17,34 +17,61 @@ Key functionalities:
 6.  Returns the path to the .py file and the Manim class name.
 """
 
+import asyncio
 import json
 import os
 import re
 import logging
-from openai import OpenAI # For OpenRouter
+import time
+from openai import AsyncOpenAI, OpenAI # For OpenRouter
 from project_drishti import config
+from project_drishti.llm_cache import LLMCache, cached_completion, completion_cache_key, text_version
+from project_drishti.http_clients import get_async_http_client, get_http_client
+from project_drishti.code_stream_guard import StreamingCodeGuard
+from project_drishti.code_patcher import PatchError, apply_patch_blocks, extract_error_region, parse_patch_blocks
+from project_drishti.script_validator import format_validation_error, get_script_validator
+from project_drishti.usage_tracker import estimate_usage, usage_from_response
+from project_drishti.api_guide_index import ApiGuideIndex, scene_query
+from project_drishti.exemplar_store import ExemplarStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class VisualArchitect:
-    def __init__(self):
+    def __init__(self, api_guide_retrieval: bool = config.API_GUIDE_RETRIEVAL):
         """
         Initializes the VisualArchitect with an OpenRouter client.
+
+        Args:
+            api_guide_retrieval (bool): Send each scene only the relevant sections of the Manim API
+                                        guide (see `api_guide_index`) instead of the whole guide.
         """
         if not config.OPENROUTER_API_KEY:
             logger.error("OpenRouter API key not found. Please set it in the .env file.")
             # raise ValueError("OpenRouter API key not found.")
             # For POC, we might allow it to initialize but generation will fail
             self.client = None
+            self.async_client = None
         else:
+            # Both clients reuse the process-wide OpenRouter connection pools
             self.client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
+                base_url=config.OPENROUTER_BASE_URL,
+                api_key=config.OPENROUTER_API_KEY,
+                http_client=get_http_client("openrouter"),
+            )
+            # Used by the pipeline's coroutine stages; the sync client serves the job workers
+            self.async_client = AsyncOpenAI(
+                base_url=config.OPENROUTER_BASE_URL,
                 api_key=config.OPENROUTER_API_KEY,
+                http_client=get_async_http_client("openrouter"),
             )
         self.output_script_dir = config.MANIM_SCRIPTS_DIR
         self.output_md_dir = "outputs/visual_architect" # For debug MD files
+        # Optional callable(service, latency_seconds, error) told about every OpenRouter call
+        self.api_observer = None
+        # Optional UsageTracker told about the token usage of every OpenRouter call
+        self.usage_tracker = None
         os.makedirs(self.output_script_dir, exist_ok=True)
         os.makedirs(self.output_md_dir, exist_ok=True)
 
@@ -52,8 +79,20 @@ class VisualArchitect:
         self.prompt_template = self._load_prompt_template()
         # Load the Manim API guide
         self.manim_api_guide_content = self._load_manim_api_guide()
+        # Section index of the guide; the core sections go into the static prefix, the rest per scene
+        self.api_guide_index = ApiGuideIndex.load(self.manim_api_guide_content) if api_guide_retrieval else None
+        self.api_guide_core_ids = self.api_guide_index.core_sections(self.prompt_template) if self.api_guide_index else []
         # Load the fix prompt template
         self.fix_prompt_template = self._load_fix_prompt_template()
+        # Identical for every scene, so built once and reused (and cached by the provider)
+        self.static_prompt_prefix = self._build_static_prompt_prefix()
+        # Provider-side prompt cache usage, summed over generation requests
+        self.prompt_cache_usage = {"requests": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self.prompt_template_version = text_version(self.prompt_template)
+        # Completions are cached by content; see project_drishti/llm_cache.py
+        self.llm_cache = LLMCache() if config.LLM_CACHE_ENABLED else None
+        # Accepted scripts of similar scenes, given as examples; see project_drishti/exemplar_store.py
+        self.exemplar_store = ExemplarStore() if config.EXEMPLARS_ENABLED else None
 
     def _load_prompt_template(self) -> str:
         """Loads the prompt template from the file specified in config."""
@@ -97,8 +136,7 @@ class VisualArchitect:
         # The guide is at the workspace root, config.APP_BASE_DIR is 'anim_gemini'
         # So, path is relative from APP_BASE_DIR to workspace root, then to the file.
         # Workspace root is one level up from APP_BASE_DIR.
-        guide_path = os.path.join(config.APP_BASE_DIR, "..", "manim_v0.19.0_api_guide.md")
-        guide_path = os.path.abspath(guide_path) # Resolve to absolute path
+        guide_path = os.path.abspath(config.MANIM_API_GUIDE_PATH) # Resolve to absolute path
 
         try:
             with open(guide_path, "r") as f:
@@ -301,13 +339,25 @@ class VisualArchitect:
         
         return code.strip() # Ensure stripping at the end
 
-    def generate_manim_code_for_scene(self, scene_data: dict, topic_title: str) -> tuple[str | None, str | None]:
+    def generate_manim_code_for_scene(
+        self,
+        scene_data: dict,
+        topic_title: str,
+        script_prefix: str = "",
+        sample: str | int | None = None,
+        use_cache: bool = True
+    ) -> tuple[str | None, str | None]:
         """
         Generates Manim Python code for a single scene using an LLM.
 
         Args:
             scene_data (dict): A dictionary containing 'scene_number', 'title', and 'narration' for the scene.
             topic_title (str): The overall topic title, for context in prompts.
+            script_prefix (str): Prepended to the script and debug file names, so that scenes with the
+                                 same number and title from different topics do not overwrite each other.
+            sample (str | int | None): Which sample of this prompt is wanted (e.g. the attempt or candidate
+                                       label). Part of the LLM cache key, so retries get new code.
+            use_cache (bool): If False, skip the LLM cache lookup and request a fresh completion.
 
         Returns:
             tuple[str | None, str | None]: Path to the generated .py file and the Manim class name, or (None, None) on failure.
@@ -316,6 +366,243 @@ class VisualArchitect:
             logger.error("OpenRouter client not initialized. Cannot generate code.")
             return None, None
 
+        request = self._start_generation(scene_data, topic_title, script_prefix, sample, use_cache)
+        if request["cached_response"] is not None:
+            return self._save_generated_code(request, request["cached_response"], script_prefix)
+        try:
+            if request["streaming"]:
+                llm_response_content = self._stream_manim_code(request)
+            else:
+                response = self.client.chat.completions.create(**request["completion_kwargs"])
+                llm_response_content = self._completion_content(request, response)
+        except Exception as e:
+            return self._call_failed(request, e)
+        return self._finish_generation(request, llm_response_content)
+
+    async def generate_manim_code_for_scene_async(
+        self,
+        scene_data: dict,
+        topic_title: str,
+        script_prefix: str = "",
+        sample: str | int | None = None,
+        use_cache: bool = True
+    ) -> tuple[str | None, str | None]:
+        """
+        Coroutine version of `generate_manim_code_for_scene`. The request goes through the
+        AsyncOpenAI client, so a waiting scene holds no thread.
+        """
+        if not self.async_client:
+            logger.error("OpenRouter client not initialized. Cannot generate code.")
+            return None, None
+
+        # The LLM cache and exemplar store are SQLite files that may be locked by another process
+        request = await asyncio.to_thread(self._start_generation, scene_data, topic_title, script_prefix, sample, use_cache)
+        if request["cached_response"] is not None:
+            return await asyncio.to_thread(self._save_generated_code, request, request["cached_response"], script_prefix)
+        try:
+            if request["streaming"]:
+                llm_response_content = await self._stream_manim_code_async(request)
+            else:
+                response = await self.async_client.chat.completions.create(**request["completion_kwargs"])
+                llm_response_content = self._completion_content(request, response)
+        except Exception as e:
+            return self._call_failed(request, e)
+        return await asyncio.to_thread(self._finish_generation, request, llm_response_content)
+
+    def _stream_manim_code(self, request: dict) -> str | None:
+        """
+        Streams the completion into the script's .partial file while a StreamingCodeGuard checks it.
+        Returns the raw response, or None if the guard stopped the generation.
+
+        A finished code block does not end the stream: the few remaining tokens are read so the
+        final chunk with the token usage arrives.
+        """
+        self._open_code_stream(request)
+        try:
+            stream = self.client.chat.completions.create(**request["completion_kwargs"], stream=True)
+            try:
+                for chunk in stream:
+                    if self._apply_stream_chunk(request, chunk):
+                        break
+            finally:
+                stream.close()  # Closing the connection stops the generation
+        except BaseException as e:
+            self._code_stream_failed(request, e)
+            raise
+        return self._finish_streamed_code(request)
+
+    async def _stream_manim_code_async(self, request: dict) -> str | None:
+        """Coroutine version of `_stream_manim_code`."""
+        self._open_code_stream(request)
+        try:
+            stream = await self.async_client.chat.completions.create(**request["completion_kwargs"], stream=True)
+            try:
+                async for chunk in stream:
+                    if self._apply_stream_chunk(request, chunk):
+                        break
+            finally:
+                await stream.close()
+        except BaseException as e:
+            self._code_stream_failed(request, e)
+            raise
+        return self._finish_streamed_code(request)
+
+    def _start_generation(
+        self, scene_data: dict, topic_title: str, script_prefix: str, sample: str | int | None, use_cache: bool
+    ) -> dict:
+        """Builds the generation request and looks it up in the LLM cache (`cached_response`)."""
+        request = self._build_generation_request(scene_data, topic_title)
+        completion_kwargs = self._generation_completion_kwargs(request["scene_prompt"])
+        cache_key = completion_cache_key(completion_kwargs, self.prompt_template_version, sample)
+        cached_response = cached_completion(self.llm_cache, cache_key, use_cache)
+        if cached_response is not None:
+            logger.info(f"Using cached Manim code for Scene {request['scene_number']}: '{request['scene_title']}' (sample {sample}).")
+        request.update(
+            stage="codegen",
+            script_prefix=script_prefix,
+            completion_kwargs=completion_kwargs,
+            cache_key=cache_key,
+            cached_response=cached_response,
+            streaming=config.CODEGEN_STREAMING,
+            call_start=time.perf_counter(),
+        )
+        return request
+
+    def _completion_content(self, request: dict, response) -> str | None:
+        """Reports a finished blocking call and its token usage, and returns the response text."""
+        self._observe_api_call("llm", request["call_start"])
+        self._record_usage(response, request, request["stage"], time.perf_counter() - request["call_start"])
+        return response.choices[0].message.content
+
+    def _call_failed(self, request: dict, error: Exception) -> tuple[None, None]:
+        """Logs and reports a call that raised. A stream has already reported itself."""
+        action = "to fix" if request["stage"] == "fix" else "for"
+        logger.error(f"Error calling OpenRouter API {action} scene '{request['scene_title']}': {error}")
+        if not request.get("streaming"):
+            self._observe_api_call("llm", request["call_start"], error)
+        return None, None
+
+    def _finish_generation(self, request: dict, llm_response_content: str | None) -> tuple[str | None, str | None]:
+        """Saves a fresh response as the scene's script and caches it."""
+        if llm_response_content is None:
+            return None, None  # Stopped early by the stream guard
+        return self._save_and_cache(request, llm_response_content, request["script_prefix"], request["cache_key"])
+
+    def _open_code_stream(self, request: dict) -> None:
+        """Adds the stream's guard, partial file and progress to the request."""
+        partial_path = self._script_file_path(request, request["script_prefix"]) + ".partial"
+        request.update(
+            guard=StreamingCodeGuard(request["manim_class_name"]),
+            partial_path=partial_path,
+            partial_file=open(partial_path, "w"),
+            verdict=None,
+            usage_chunk=None,
+            first_chunk_seen=False,
+        )
+
+    def _apply_stream_chunk(self, request: dict, chunk) -> str | None:
+        """
+        Writes a chunk's text to the partial file and feeds it to the guard. Returns the guard's
+        abort reason, or None to keep reading.
+        """
+        if not request["first_chunk_seen"]:
+            # For a stream, the time to the first chunk is the latency signal
+            request["first_chunk_seen"] = True
+            self._observe_api_call("llm_stream", request["call_start"])
+        if getattr(chunk, "usage", None) is not None:
+            request["usage_chunk"] = chunk  # OpenRouter reports usage on the final chunk
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        guard = request["guard"]
+        if choice.finish_reason:
+            guard.finish_reason = choice.finish_reason
+        text = choice.delta.content
+        if not text:
+            return None  # Reasoning tokens arrive with empty content
+        request["partial_file"].write(text)
+        request["verdict"] = guard.feed(text)
+        return request["verdict"]
+
+    def _code_stream_failed(self, request: dict, error: BaseException) -> None:
+        request["partial_file"].close()
+        self._remove_partial_file(request["partial_path"])
+        if not request["first_chunk_seen"] and isinstance(error, Exception):
+            self._observe_api_call("llm_stream", request["call_start"], error)
+
+    def _finish_streamed_code(self, request: dict) -> str | None:
+        """Records the stream's usage, applies the guard's final check and reads the response back from the partial file."""
+        partial_path = request["partial_path"]
+        streamed_chars = request["partial_file"].tell()
+        request["partial_file"].close()
+        self._record_usage(request["usage_chunk"], request, "codegen", time.perf_counter() - request["call_start"], streamed_chars)
+        verdict = request["verdict"] or request["guard"].finish()
+        if verdict:
+            logger.warning(f"Stopped code generation for scene '{request['scene_title']}' early: {verdict}")
+            self._remove_partial_file(partial_path)
+            return None
+        # The guard keeps no copy of the code, so this is the only one in memory. The file cannot
+        # just be renamed to the script: the script is the cleaned, validated code, not the raw response.
+        with open(partial_path, "r") as partial_file:
+            llm_response_content = partial_file.read()
+        self._remove_partial_file(partial_path)
+        return llm_response_content
+
+    def _observe_api_call(self, service: str, call_start: float, error: Exception | None = None) -> None:
+        """Tells the api_observer, if any, how long a call (or a stream's first chunk) took since `call_start`."""
+        if self.api_observer:
+            self.api_observer(service, time.perf_counter() - call_start, error)
+
+    @staticmethod
+    def _remove_partial_file(partial_path: str) -> None:
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+
+    def _record_usage(self, response, request: dict, stage: str, latency: float, streamed_chars: int | None = None) -> None:
+        """
+        Reports a call's token usage to `prompt_cache_usage` and the usage tracker. A stream that
+        was stopped before its usage chunk (`response` is None) is estimated from the text lengths.
+        """
+        self._record_prompt_cache_usage(response, request["scene_title"])
+        if self.usage_tracker is None:
+            return
+        usage = usage_from_response(response)
+        if usage is None and streamed_chars is not None:
+            usage = estimate_usage(len(self.static_prompt_prefix) + len(request["scene_prompt"]), streamed_chars)
+        if usage is not None:
+            self.usage_tracker.record(usage, request["topic_title"], request["scene_title"], stage, config.OPENROUTER_MODEL_NAME, latency)
+
+    def _record_prompt_cache_usage(self, response, scene_title: str) -> None:
+        """Adds a response's prompt and cached-prompt token counts to `prompt_cache_usage`."""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if not isinstance(prompt_tokens, int):
+            return  # Provider did not report usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if not isinstance(cached_tokens, int):
+            cached_tokens = 0
+        self.prompt_cache_usage["requests"] += 1
+        self.prompt_cache_usage["prompt_tokens"] += prompt_tokens
+        self.prompt_cache_usage["cached_tokens"] += cached_tokens
+        if cached_tokens:
+            self.prompt_cache_usage["cache_hits"] += 1
+        logger.info(f"Prompt tokens for scene '{scene_title}': {prompt_tokens} ({cached_tokens} served from the provider's prompt cache)")
+
+    def _save_and_cache(self, request: dict, llm_response_content: str, script_prefix: str, cache_key: str) -> tuple[str | None, str | None]:
+        """Saves a fresh response and caches it once it has produced a script."""
+        script_path, manim_class_name = self._save_generated_code(request, llm_response_content, script_prefix)
+        if script_path and llm_response_content and self.llm_cache:
+            self.llm_cache.put(cache_key, llm_response_content, config.OPENROUTER_MODEL_NAME)
+        return script_path, manim_class_name
+
+    def _build_generation_request(self, scene_data: dict, topic_title: str, with_exemplars: bool = True) -> dict:
+        """
+        Builds the class name, file name stem and prompts for a scene's code generation request.
+        Fixes reuse it for the naming and guide sections, and skip the example scripts.
+        """
         scene_number = scene_data.get("scene_number", 0)
         scene_title = scene_data.get("title", f"UntitledScene{scene_number}")
         narration = scene_data.get("narration", "No narration provided.")
@@ -340,6 +627,80 @@ class VisualArchitect:
             # Add any other placeholders here if your template uses them
         )
 
+        # Guide sections for what this scene shows (the core sections are already in the static prefix)
+        api_guide_ids = self._select_api_guide_sections(scene_query({**scene_data, "title": scene_title}), config.API_GUIDE_SCENE_TOP_K)
+
+        exemplars = self.exemplar_store.similar(scene_data, topic_title) if self.exemplar_store and with_exemplars else []
+
+        # The invariant instructions and API guide are built once in __init__ (see _build_static_prompt_prefix)
+        scene_prompt = "".join([
+            self._api_guide_excerpt(api_guide_ids, "relevant to this scene"),
+            self._exemplar_excerpt(exemplars),
+            f"""Now, using the above guide and API reference, generate the Manim Python code (starting with `from manim import *`, then the helper functions as defined above, then your class {manim_class_name}(VoiceoverScene):, etc.) for the following request:\n""",
+            f"""{prompt}"""
+        ])
+
+        logger.info(f"Generating Manim code for Scene {scene_number}: '{scene_title}' using model {config.OPENROUTER_MODEL_NAME}")
+        # Log the scene prompt for debugging (the static prefix is not repeated here)
+        # logger.debug(f"Scene prompt sent to LLM for scene {scene_title}:\\n{scene_prompt}")
+
+        return {
+            "scene_number": scene_number,
+            "scene_title": scene_title,
+            "topic_title": topic_title,
+            "sane_scene_title": sane_scene_title,
+            "manim_class_name": manim_class_name,
+            "prompt": prompt,
+            "scene_prompt": scene_prompt,
+            "api_guide_ids": api_guide_ids,
+            "exemplar_keys": [exemplar["key"] for exemplar in exemplars],
+        }
+
+    def _select_api_guide_sections(self, query: str, top_k: int, exclude=()) -> list[int]:
+        """Ids of the guide sections best matching the query, leaving out the core. Empty without retrieval."""
+        if not self.api_guide_index:
+            return []
+        section_ids = self.api_guide_index.search(
+            query, top_k, exclude=set(self.api_guide_core_ids) | set(exclude), max_chars=config.API_GUIDE_MAX_CHARS
+        )
+        logger.info(f"API guide sections selected: {self.api_guide_index.headings(section_ids)}")
+        return section_ids
+
+    def _api_guide_excerpt(self, section_ids: list[int], purpose: str) -> str:
+        """The selected guide sections as a prompt block, or an empty string if none were selected."""
+        if not section_ids:
+            return ""
+        return "".join([
+            f"""---BEGIN MANIM V0.19.0 API GUIDE SECTIONS ({purpose})---\n""",
+            f"""{self.api_guide_index.format_sections(section_ids)}\n""",
+            """---END MANIM V0.19.0 API GUIDE SECTIONS---\n\n""",
+        ])
+
+    @staticmethod
+    def _exemplar_excerpt(exemplars: list[dict]) -> str:
+        """Accepted scripts of similar earlier scenes as a prompt block, or an empty string if there are none."""
+        if not exemplars:
+            return ""
+        logger.info(f"Example scripts selected: {[exemplar['scene_title'] for exemplar in exemplars]}")
+        parts = ["""---BEGIN EXAMPLE SCRIPTS (accepted scripts of similar earlier scenes; reuse their structure and API usage, not their content)---\n"""]
+        for number, exemplar in enumerate(exemplars, start=1):
+            parts.append(f"""# Example {number}: scene "{exemplar['scene_title']}" of topic "{exemplar['topic']}"\n{exemplar['code'].strip()}\n\n""")
+        parts.append("""---END EXAMPLE SCRIPTS---\n\n""")
+        return "".join(parts)
+
+    def _static_api_guide(self) -> tuple[str, str]:
+        """The guide text for the static prefix and its label: the core sections with retrieval, otherwise the whole guide."""
+        if not self.api_guide_index:
+            return self.manim_api_guide_content, "for reference when writing the Scene class logic"
+        label = "core sections; the sections relevant to the scene are given with the request"
+        return self.api_guide_index.format_sections(self.api_guide_core_ids), label
+
+    def _build_static_prompt_prefix(self) -> str:
+        """
+        Builds the part of the code generation prompt that is the same for every scene: color rules,
+        mandatory helpers, layout rules and the Manim API guide. It is sent as a separate leading
+        message so that provider-side prompt caching can reuse it across requests.
+        """
         # List of available colors to be injected into the prompt
         available_colors_list = [
             "BLACK", "BLUE", "BLUE_A", "BLUE_B", "BLUE_C", "BLUE_D", "BLUE_E", "BROWN", 
@@ -356,9 +717,10 @@ class VisualArchitect:
             "YELLOW_A", "YELLOW_B", "YELLOW_C", "YELLOW_D", "YELLOW_E"
         ]
         available_colors_names_str = ", ".join(available_colors_list)
+        api_guide_text, api_guide_label = self._static_api_guide()
 
-        # Construct full_prompt by joining a list of triple-quoted strings for robustness
-        prompt_parts = [
+        # Construct the prefix by joining a list of triple-quoted strings for robustness
+        prefix_parts = [
             """You are an expert Manim programmer. Your task is to generate a complete, directly executable Manim Community v0.19.0 Python script for a single scene. """,
             """The script you generate will have some helper functions and necessary imports (`numpy`, `logging`) prepended to it programmatically. """,
             """The import `import anim_gemini.colors as mcolors` will also be handled by our system, but your code MUST use it. """,
@@ -431,7 +793,7 @@ class VisualArchitect:
             """       return ORIGIN # Default to screen center (0,0,0)\n\n""",
 
             """**Your generated code (after the helper definitions above) MUST:**\n""",
-            f"""1.  Follow with the Manim scene class definition: `class {manim_class_name}(VoiceoverScene):`\n""",
+            """1.  Follow with the Manim scene class definition: the `VoiceoverScene` subclass named in the request at the end of this prompt.\n""",
             """2.  Implement the `construct(self):` method for that class, using Manim v0.19.0 syntax based on the API guide and scene request below.\n""",
             """3.  Use colors ONLY from the `mcolors` module as specified (e.g., `mcolors.RED`).\n\n""",
 
@@ -449,44 +811,60 @@ class VisualArchitect:
 
             """**Output Format:** Your entire response MUST be a single block of raw Python code. Do NOT include any markdown formatting (like ```python at the start/end), explanations, or any other text outside of this single Python code block. The script must be directly executable after the boilerplate (containing helpers) is prepended.\n\n""",
 
-            """---BEGIN MANIM V0.19.0 API GUIDE (for reference when writing the Scene class logic)---\n""",
-            f"""{self.manim_api_guide_content}\n""",
+            f"""---BEGIN MANIM V0.19.0 API GUIDE ({api_guide_label})---\n""",
+            f"""{api_guide_text}\n""",
             """---END MANIM V0.19.0 API GUIDE---\n\n""",
-
-            f"""Now, using the above guide and API reference, generate the Manim Python code (starting with `from manim import *`, then the helper functions as defined above, then your class {manim_class_name}(VoiceoverScene):, etc.) for the following request:\n""",
-            f"""{prompt}"""
         ]
-        full_prompt = "".join(prompt_parts)
+        return "".join(prefix_parts)
+
+    def _generation_completion_kwargs(self, scene_prompt: str) -> dict:
+        """Returns the chat completion arguments shared by the sync and async generation calls."""
+        if config.PROMPT_CACHE_CONTROL:
+            # Explicit breakpoint for providers that need one (Anthropic, Gemini); OpenAI-style
+            # providers cache the identical prefix automatically
+            prefix_content = [{"type": "text", "text": self.static_prompt_prefix, "cache_control": {"type": "ephemeral"}}]
+        else:
+            prefix_content = self.static_prompt_prefix
+        return {
+            "model": config.OPENROUTER_MODEL_NAME,
+            "messages": [
+                {"role": "system", "content": prefix_content},
+                {"role": "user", "content": scene_prompt},
+            ],
+            "temperature": config.LLM_DEFAULT_TEMPERATURE,
+            # As per user's reference, reasoning_effort might be specific to some models
+            # For general OpenAI API, it's not standard. OpenRouter might handle it.
+            "extra_body": {
+                "reasoning": {
+                    "effort": 'high',
+                    "exclude": False,
+                },
+                # Ask OpenRouter to return token usage, including cached prompt tokens
+                "usage": {"include": True},
+            },
+            "extra_headers": {
+                "HTTP-Referer": config.OPENROUTER_SITE_URL,
+                "X-Title": config.OPENROUTER_APP_NAME,
+                # "Reasoning-Effort": config.LLM_DEFAULT_REASONING_EFFORT # If supported
+            }
+        }
 
-        logger.info(f"Generating Manim code for Scene {scene_number}: '{scene_title}' using model {config.OPENROUTER_MODEL_NAME}")
-        # Log the full prompt for debugging (can be very long)
-        # logger.debug(f"Full prompt sent to LLM for scene {scene_title}:\\n{full_prompt}")
+    def _script_file_path(self, request: dict, script_prefix: str) -> str:
+        return os.path.join(
+            self.output_script_dir, f"{script_prefix}scene_{request['scene_number']:02d}_{request['sane_scene_title']}.py"
+        )
 
-        try:
-            response = self.client.chat.completions.create(
-                model=config.OPENROUTER_MODEL_NAME,
-                messages=[{"role": "user", "content": full_prompt}],
-                temperature=config.LLM_DEFAULT_TEMPERATURE,
-                # As per user's reference, reasoning_effort might be specific to some models
-                # For general OpenAI API, it's not standard. OpenRouter might handle it.
-                extra_body={
-                    "reasoning": {
-                        "effort": 'high',
-                        "exclude": False,  
-                    }
-                },
-                extra_headers={
-                    "HTTP-Referer": config.OPENROUTER_SITE_URL,
-                    "X-Title": config.OPENROUTER_APP_NAME,
-                    # "Reasoning-Effort": config.LLM_DEFAULT_REASONING_EFFORT # If supported
-                }
-            )
-            llm_response_content = response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Error calling OpenRouter API for scene '{scene_title}': {e}")
-            return None, None
+    def _save_generated_code(self, request: dict, llm_response_content: str, script_prefix: str) -> tuple[str | None, str | None]:
+        """
+        Cleans and validates the LLM's code, then writes the script and its debug MD file.
+        """
+        scene_number = request["scene_number"]
+        scene_title = request["scene_title"]
+        sane_scene_title = request["sane_scene_title"]
+        manim_class_name = request["manim_class_name"]
+        prompt = request["prompt"]
 
-        logger.debug(f"Raw LLM Response for Scene {scene_data.get('scene_number', 'Unknown')}:\n{llm_response_content}")
+        logger.debug(f"Raw LLM Response for Scene {scene_number}:\n{llm_response_content}")
 
         cleaned_code = self._clean_generated_code(llm_response_content)
         
@@ -497,8 +875,8 @@ class VisualArchitect:
         # --- END DEBUG LOGGING ---
 
         # Save the generated Python script
-        script_file_name = f"scene_{scene_number:02d}_{sane_scene_title}.py"
-        script_file_path = os.path.join(self.output_script_dir, script_file_name)
+        script_file_path = self._script_file_path(request, script_prefix)
+        script_file_name = os.path.basename(script_file_path)
         try:
             with open(script_file_path, "w") as f:
                 f.write(validated_code)
@@ -508,7 +886,7 @@ class VisualArchitect:
             return None, None
 
         # Save a debug MD file
-        md_output_path = os.path.join(self.output_md_dir, f"visual_script_scene_{scene_number:02d}_{sane_scene_title}.md")
+        md_output_path = os.path.join(self.output_md_dir, f"visual_script_{script_prefix}scene_{scene_number:02d}_{sane_scene_title}.md")
         try:
             with open(md_output_path, "w") as f:
                 f.write(f"# Visual Script (LLM-Generated Manim Code) for: {scene_title}\\n\\n")
@@ -524,109 +902,214 @@ class VisualArchitect:
         return script_file_path, manim_class_name
 
     def fix_manim_code_for_scene(
-        self, 
-        scene_data: dict, 
-        topic_title: str, 
-        faulty_code_content: str, 
-        error_message: str
+        self,
+        scene_data: dict,
+        topic_title: str,
+        faulty_code_content: str,
+        error_message: str,
+        script_path: str | None = None,
+        analysis_verdict: str | None = None,
+        script_prefix: str = ""
     ) -> tuple[str | None, str | None]:
         """
-        Attempts to fix a faulty Manim script using the LLM based on an error message.
+        Fixes a failing Manim script with a minimal LLM-written patch instead of a full rewrite.
+
+        The prompt carries the error message, the numbered region of the script it points at and
+        the video analysis verdict. The response is a set of SEARCH/REPLACE blocks (see
+        `code_patcher`). The patched script is checked statically; if the patch does not apply or
+        the check fails, the problems are sent back for another patch, up to
+        `config.FIX_MAX_PATCH_ROUNDS` times.
 
         Args:
             scene_data (dict): The original scene data (title, narration, scene_number).
             topic_title (str): The title of the overall topic.
             faulty_code_content (str): The content of the Manim script that failed.
-            error_message (str): The error message captured from the Manim execution.
+            error_message (str): The error Manim (or the static validator) reported. May be empty.
+            script_path (str | None): The failing script. The patched script overwrites it, so the
+                                      video path and Manim's partial movie cache stay the same.
+            analysis_verdict (str | None): Why the rendered video failed quality analysis, if it did.
+            script_prefix (str): Used to name the script when `script_path` is not given.
 
         Returns:
-            tuple[str | None, str | None]: Path to the corrected .py file and the Manim class name, or (None, None) on failure.
+            tuple[str | None, str | None]: Path to the patched .py file and the Manim class name, or (None, None) on failure.
         """
         if not self.client:
             logger.error("OpenRouter client not initialized. Cannot fix Manim script.")
             return None, None
 
-        scene_title = scene_data.get("title", "UnknownScene")
-        narration = scene_data.get("narration", "No narration provided.")
-        # Ensure a unique class name for the scene, potentially based on scene number
-        # Using the original class name is important for the fix prompt
-        original_manim_class_name = self._generate_manim_class_name(scene_title, scene_data.get("scene_number", ""))
-        
-        logger.info(f"Attempting to fix Manim script for scene: '{scene_title}' using LLM.")
-        logger.debug(f"Faulty code provided:\n{faulty_code_content[:500]}...") # Log beginning of faulty code
-        logger.debug(f"Error message provided:\n{error_message}")
-
-        prompt = self.fix_prompt_template.format(
-            topic_title=topic_title,
-            scene_title=scene_title,
-            narration=narration,
-            manim_class_name=original_manim_class_name, # Use original class name
-            faulty_code=faulty_code_content,
-            error_message=error_message
-        )
-        
-        # Save the detailed prompt for debugging this "fix" attempt
-        prompt_debug_filename = f"visual_architect_fix_prompt_scene_{self._sanitize_filename(scene_title)}.md"
-        prompt_debug_path = os.path.join(self.output_md_dir, prompt_debug_filename)
-        try:
-            with open(prompt_debug_path, "w") as f:
-                f.write(prompt)
-            logger.info(f"Saved fix prompt for scene '{scene_title}' to: {prompt_debug_path}")
-        except Exception as e:
-            logger.warning(f"Could not save fix prompt debug file: {e}")
-
-        corrected_code_raw = self._call_llm(prompt, f"Manim Script Fix for {scene_title}", default_response_on_error="")
-
-        if not corrected_code_raw:
-            logger.error(f"LLM failed to return a corrected script for scene '{scene_title}'.")
+        fix_request = self._build_fix_request(scene_data, topic_title, faulty_code_content, error_message, script_path, analysis_verdict, script_prefix)
+        for patch_round in range(1, config.FIX_MAX_PATCH_ROUNDS + 1):
+            llm_response_content = self._start_fix_round(fix_request)
+            if llm_response_content is None:
+                try:
+                    response = self.client.chat.completions.create(**fix_request["completion_kwargs"])
+                except Exception as e:
+                    return self._call_failed(fix_request, e)
+                llm_response_content = self._completion_content(fix_request, response)
+            if self._apply_fix_response(fix_request, llm_response_content or "", patch_round):
+                return self._save_fixed_code(fix_request)
+        return self._fix_gave_up(fix_request)
+
+    async def fix_manim_code_for_scene_async(
+        self,
+        scene_data: dict,
+        topic_title: str,
+        faulty_code_content: str,
+        error_message: str,
+        script_path: str | None = None,
+        analysis_verdict: str | None = None,
+        script_prefix: str = ""
+    ) -> tuple[str | None, str | None]:
+        """Coroutine version of `fix_manim_code_for_scene`, using the AsyncOpenAI client."""
+        if not self.async_client:
+            logger.error("OpenRouter client not initialized. Cannot fix Manim script.")
             return None, None
 
-        cleaned_code = self._clean_generated_code(corrected_code_raw)
-        
-        if not cleaned_code:
-            logger.error(f"Cleaned code is empty for scene '{scene_title}' after attempting fix.")
-            return None, None
-            
-        # The class name should ideally remain the same after a fix.
-        # We pass the original_manim_class_name for validation and saving.
-        # The _validate_and_fix_manim_code method will ensure it's there or attempt to structure it.
-        # The _extract_class_name_and_save_script method can then confirm or extract it.
-
-        # At this stage, the class name IS the original_manim_class_name
-        # because the prompt asks to fix the class with that name.
-        # The validation step later might re-confirm this.
-        current_class_name_for_validation = original_manim_class_name
-
-        logger.info(f"Validating and applying standard fixes to the LLM's corrected code for scene '{scene_title}' using class name '{current_class_name_for_validation}'.")
-        final_code = self._validate_and_fix_manim_code(cleaned_code, current_class_name_for_validation)
-        
-        if not final_code:
-            logger.error(f"Validation of corrected code failed for scene '{scene_title}'.")
-            return None, None
+        fix_request = self._build_fix_request(scene_data, topic_title, faulty_code_content, error_message, script_path, analysis_verdict, script_prefix)
+        for patch_round in range(1, config.FIX_MAX_PATCH_ROUNDS + 1):
+            llm_response_content = await asyncio.to_thread(self._start_fix_round, fix_request)
+            if llm_response_content is None:
+                try:
+                    response = await self.async_client.chat.completions.create(**fix_request["completion_kwargs"])
+                except Exception as e:
+                    return self._call_failed(fix_request, e)
+                llm_response_content = self._completion_content(fix_request, response)
+            # Validates the patched script and caches the response
+            if await asyncio.to_thread(self._apply_fix_response, fix_request, llm_response_content or "", patch_round):
+                return await asyncio.to_thread(self._save_fixed_code, fix_request)
+        return self._fix_gave_up(fix_request)
+
+    def _build_fix_request(
+        self,
+        scene_data: dict,
+        topic_title: str,
+        faulty_code_content: str,
+        error_message: str,
+        script_path: str | None,
+        analysis_verdict: str | None,
+        script_prefix: str
+    ) -> dict:
+        """State of a fix: the scene's naming (as for generation), the code being patched and its current error."""
+        fix_request = self._build_generation_request(scene_data, topic_title, with_exemplars=False)
+        fix_request.update(
+            narration=scene_data.get("narration", "No narration provided."),
+            script_path=script_path or self._script_file_path(fix_request, script_prefix),
+            code=faulty_code_content,
+            error_message=error_message or "",
+            analysis_verdict=analysis_verdict or "",
+            patch_blocks=[],
+            stage="fix",
+        )
+        logger.info(f"Attempting to patch Manim script for scene: '{fix_request['scene_title']}' using LLM.")
+        logger.debug(f"Error message provided:\n{error_message}")
+        return fix_request
 
-        # Re-use the original scene_title and scene_number for filename generation
-        # to overwrite the faulty script.
-        # The class name used for saving should be the one confirmed/extracted.
-        # The _extract_class_name_and_save_script uses the scene_title and scene_data for file naming.
-        # It also extracts the class name from the final_code.
-
-        logger.info(f"Attempting to save corrected Manim script for scene: {scene_title}")
-        script_path, extracted_manim_class_name = self._extract_class_name_and_save_script(
-            final_code, 
-            scene_title, # Used for filename
-            scene_data, # Used for filename, contains scene_number
-            original_manim_class_name # Pass as a hint for extraction if needed
+    def _start_fix_round(self, fix_request: dict) -> str | None:
+        """
+        Builds the next patch request into `fix_request` and returns its cached response, if any.
+        The fix prompt follows the same static prefix as generation, so the provider's prompt
+        cache covers it too.
+        """
+        error_region = extract_error_region(fix_request["code"], fix_request["error_message"], fix_request["script_path"])
+        # The scene's own sections plus those matching the error and the failing lines
+        error_guide_ids = self._select_api_guide_sections(
+            "\n".join([fix_request["error_message"][-config.FIX_MAX_ERROR_CHARS:], error_region or "", fix_request["analysis_verdict"]]),
+            config.API_GUIDE_FIX_TOP_K,
+            exclude=fix_request["api_guide_ids"],
         )
+        prompt = self._api_guide_excerpt(fix_request["api_guide_ids"] + error_guide_ids, "relevant to this scene and its error") + self.fix_prompt_template.format(
+            topic_title=fix_request["topic_title"],
+            scene_title=fix_request["scene_title"],
+            narration=fix_request["narration"],
+            manim_class_name=fix_request["manim_class_name"],
+            faulty_code=fix_request["code"],
+            error_message=fix_request["error_message"][-config.FIX_MAX_ERROR_CHARS:] or "(none; the script rendered)",
+            error_region=error_region or "(the error does not point at a line of this script)",
+            analysis_verdict=fix_request["analysis_verdict"] or "(not reviewed)",
+        )
+        completion_kwargs = self._generation_completion_kwargs(prompt)
+        fix_request.update(
+            prompt=prompt,
+            completion_kwargs=completion_kwargs,
+            cache_key=completion_cache_key(completion_kwargs, text_version(self.fix_prompt_template)),
+        )
+        cached_response = cached_completion(self.llm_cache, fix_request["cache_key"])
+        fix_request["call_start"] = time.perf_counter()
+        return cached_response
 
-        if script_path and extracted_manim_class_name:
-            logger.info(f"Successfully fixed and saved Manim script for scene '{scene_title}' to: {script_path}, Class: {extracted_manim_class_name}")
-            if extracted_manim_class_name != original_manim_class_name:
-                 logger.warning(f"The class name after fix ('{extracted_manim_class_name}') differs from the original ('{original_manim_class_name}') for scene '{scene_title}'. This might be unexpected.")
-            return script_path, extracted_manim_class_name
-        else:
-            logger.error(f"Failed to save the corrected script or extract class name for scene '{scene_title}'.")
+    def _apply_fix_response(self, fix_request: dict, llm_response_content: str, patch_round: int) -> bool:
+        """
+        Applies the response's patch blocks to the code and checks the result. On success the fixed
+        code is stored in `fix_request` and the response is cached. Otherwise the code and error are
+        updated for the next round and False is returned.
+        """
+        scene_title = fix_request["scene_title"]
+        blocks = parse_patch_blocks(llm_response_content)
+        if not blocks:
+            logger.warning(f"Patch round {patch_round} for scene '{scene_title}' returned no SEARCH/REPLACE blocks.")
+            fix_request["error_message"] = "Your previous answer contained no SEARCH/REPLACE blocks. Answer only with SEARCH/REPLACE blocks."
+            return False
+        try:
+            patched_code = apply_patch_blocks(fix_request["code"], blocks)
+        except PatchError as e:
+            logger.warning(f"Patch round {patch_round} for scene '{scene_title}' could not be applied: {e}")
+            fix_request["error_message"] = f"Your previous patch could not be applied: {e}\nThe code is unchanged; the original error was:\n{fix_request['error_message']}"
+            return False
+
+        fix_request["patch_blocks"].extend(blocks)
+        patched_code = self._validate_and_fix_manim_code(patched_code, fix_request["manim_class_name"])
+        problems = self._check_patched_code(patched_code, fix_request["manim_class_name"])
+        if problems:
+            logger.warning(f"Patched script for scene '{scene_title}' failed its check in round {patch_round}: {problems}")
+            fix_request["code"] = patched_code
+            fix_request["error_message"] = format_validation_error(problems)
+            return False
+
+        logger.info(f"Patch round {patch_round} for scene '{scene_title}' applied {len(blocks)} block(s) and passed the static check.")
+        fix_request["code"] = patched_code
+        if self.llm_cache:
+            self.llm_cache.put(fix_request["cache_key"], llm_response_content, config.OPENROUTER_MODEL_NAME)
+        return True
+
+    def _fix_gave_up(self, fix_request: dict) -> tuple[None, None]:
+        logger.error(f"Could not produce a valid patch for scene '{fix_request['scene_title']}' in {config.FIX_MAX_PATCH_ROUNDS} rounds.")
+        return None, None
+
+    @staticmethod
+    def _check_patched_code(code: str, manim_class_name: str) -> list[str]:
+        """Static check of a patched script before it goes back to the renderer."""
+        validator = get_script_validator() if config.SCRIPT_VALIDATION_ENABLED else None
+        if validator and validator.available:
+            return validator.validate(code, manim_class_name)
+        try:
+            compile(code, "<patched>", "exec")
+        except SyntaxError as e:
+            return [f"line {e.lineno}: SyntaxError: {e.msg}"]
+        return []
+
+    def _save_fixed_code(self, fix_request: dict) -> tuple[str | None, str | None]:
+        """Overwrites the script with the patched code and writes a debug MD file with the applied blocks."""
+        script_path = fix_request["script_path"]
+        scene_title = fix_request["scene_title"]
+        try:
+            with open(script_path, "w") as f:
+                f.write(fix_request["code"])
+            logger.info(f"Patched Manim script for scene '{scene_title}' saved to: {script_path}")
+        except IOError as e:
+            logger.error(f"Failed to write patched Manim script to {script_path}: {e}")
             return None, None
 
+        script_stem = os.path.splitext(os.path.basename(script_path))[0]
+        md_output_path = os.path.join(self.output_md_dir, f"visual_script_fix_{script_stem}.md")
+        try:
+            with open(md_output_path, "w") as f:
+                f.write(f"# Patch for: {scene_title}\n\n")
+                f.write(f"## Last Fix Prompt:\n\n```text\n{fix_request['prompt']}\n```\n\n")
+                for search, replace in fix_request["patch_blocks"]:
+                    f.write(f"## Applied Block:\n\n```python\n{search}\n```\n\nreplaced by\n\n```python\n{replace}\n```\n\n")
+        except IOError as e:
+            logger.warning(f"Failed to write fix debug MD file to {md_output_path}: {e}")
+        return script_path, fix_request["manim_class_name"]
 
 if __name__ == '__main__':
     # This is a basic test. Ensure your .env file is set up with OPENROUTER_API_KEY.
@@ -0,0 +1,121 @@
+"""
+Unit tests for the adaptive_concurrency module (runtime limit control).
+"""
+import unittest
+from project_drishti.adaptive_concurrency import (
+    AIMDController,
+    LoadController,
+    is_rate_limit_error,
+)
+from project_drishti.scheduling import FairLimiter
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+class ResourceExhausted(Exception):
+    pass
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestAIMDController(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = FairLimiter("llm", 8)
+        self.controller = AIMDController(
+            self.limiter, min_limit=1, max_limit=8,
+            latency_spike_factor=2.0, cooldown_seconds=10, min_latency_samples=3, clock=self.clock
+        )
+
+    def test_rate_limit_halves_limit_once_per_cooldown(self):
+        """A 429 halves the limit; the burst of 429s from calls already in flight does not."""
+        decision = self.controller.observe(1.0, FakeRateLimitError("Too Many Requests"))
+        self.assertEqual(decision["new_limit"], 4)
+        self.assertIsNone(self.controller.observe(1.0, FakeRateLimitError("Too Many Requests")))
+        self.assertEqual(self.limiter.limit, 4)
+
+        self.clock.now = 11
+        self.controller.observe(1.0, FakeRateLimitError("Too Many Requests"))
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_other_errors_do_not_change_limit(self):
+        """Only rate limit errors count as back-pressure."""
+        self.assertIsNone(self.controller.observe(1.0, ValueError("bad JSON")))
+        self.assertEqual(self.limiter.limit, 8)
+
+    def test_latency_spike_backs_off(self):
+        """A call far slower than the running average reduces the limit."""
+        for _ in range(3):
+            self.controller.observe(10.0)
+        decision = self.controller.observe(45.0)
+        self.assertIsNotNone(decision)
+        self.assertEqual(self.limiter.limit, 6)
+
+    def test_latency_baselines_are_per_measurement(self):
+        """Slow full calls are not compared with the fast first chunks of streams."""
+        for _ in range(3):
+            self.controller.observe(1.0, measurement="llm_stream")
+        self.assertIsNone(self.controller.observe(40.0, measurement="llm"))
+        self.assertEqual(self.limiter.limit, 8)
+        self.assertIsNotNone(self.controller.observe(5.0, measurement="llm_stream"))
+
+    def test_healthy_calls_grow_limit_up_to_ceiling(self):
+        """After a back-off, a window of healthy calls adds one slot, never past the ceiling."""
+        self.controller.observe(1.0, FakeRateLimitError("429"))
+        self.clock.now = 11
+        for _ in range(4):
+            self.controller.observe(1.0)
+        self.assertEqual(self.limiter.limit, 5)
+
+        for _ in range(100):
+            self.controller.observe(1.0)
+        self.assertEqual(self.limiter.limit, 8)
+
+class TestLoadController(unittest.TestCase):
+
+    def make_controller(self, load, free_memory, limit=4, active=0):
+        limiter = FairLimiter("render", limit)
+        limiter._active = active
+        controller = LoadController(
+            limiter, min_limit=1, max_limit=6,
+            high_load_per_cpu=1.0, low_load_per_cpu=0.7, min_free_memory_fraction=0.1,
+            load_sampler=lambda: load, memory_sampler=lambda: free_memory,
+        )
+        return limiter, controller
+
+    def test_high_load_decreases(self):
+        limiter, controller = self.make_controller(load=1.5, free_memory=0.5)
+        self.assertIsNotNone(controller.sample())
+        self.assertEqual(limiter.limit, 3)
+
+    def test_memory_pressure_decreases(self):
+        limiter, controller = self.make_controller(load=0.2, free_memory=0.05)
+        controller.sample()
+        self.assertEqual(limiter.limit, 3)
+
+    def test_headroom_increases_only_when_saturated(self):
+        """The limit only grows if every render slot is in use."""
+        limiter, controller = self.make_controller(load=0.3, free_memory=0.5, active=2)
+        self.assertIsNone(controller.sample())
+        limiter, controller = self.make_controller(load=0.3, free_memory=0.5, active=4)
+        controller.sample()
+        self.assertEqual(limiter.limit, 5)
+
+class TestIsRateLimitError(unittest.TestCase):
+
+    def test_detection(self):
+        self.assertTrue(is_rate_limit_error(FakeRateLimitError("x")))
+        self.assertTrue(is_rate_limit_error(ResourceExhausted("Resource has been exhausted")))
+        self.assertFalse(is_rate_limit_error(RuntimeError("connection reset")))
+
+    def test_message_text_is_not_a_status(self):
+        """A 429 somewhere in the message (a token count, a scene id) is not a rate limit."""
+        self.assertFalse(is_rate_limit_error(RuntimeError("Scene 429 failed to render")))
+
+if __name__ == '__main__':
+    unittest.main()
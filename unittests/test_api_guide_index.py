@@ -0,0 +1,119 @@
+"""
+Unit tests for the api_guide_index module (BM25 retrieval over the Manim API guide sections).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from project_drishti.api_guide_index import ApiGuideIndex, scene_query, split_guide_sections, tokenize
+
+GUIDE = """Intro text before any heading.
+
+# Manim Guide
+## Text
+### Text
+`Text("hi", font_size=48)` creates text.
+```python
+# A comment, not a heading
+label = Text("x")
+```
+### MathTex
+`MathTex(r"x^2")` renders LaTeX formulas.
+## Animations
+### FadeIn
+`FadeIn(mobject, shift=UP)` fades a mobject in.
+### Transform
+`ReplacementTransform(a, b)` morphs shape a into b.
+## Graphs
+### Axes
+`Axes(x_range=[0, 10])` and `axes.plot(lambda x: x**2)` plot a function graph.
+#### Axis labels
+`axes.get_axis_labels()` labels both axes.
+"""
+
+
+class TestSplitAndTokenize(unittest.TestCase):
+
+    def test_splits_at_headings_outside_code_blocks(self):
+        sections = split_guide_sections(GUIDE)
+        self.assertEqual(
+            [section["heading"] for section in sections],
+            ["", "Manim Guide", "Text", "Text", "MathTex", "Animations", "FadeIn", "Transform", "Graphs", "Axes"]
+        )
+        text_section = sections[3]
+        self.assertIn("# A comment, not a heading", text_section["text"])
+        self.assertIn('label = Text("x")', text_section["code"])
+        self.assertEqual(sections[9]["path"], ["Manim Guide", "Graphs"])
+        # Level 4 headings stay inside their section
+        self.assertIn("#### Axis labels", sections[9]["text"])
+
+    def test_tokenize_splits_identifiers(self):
+        tokens = tokenize("ReplacementTransform get_axis_labels the")
+        self.assertIn("replacementtransform", tokens)
+        self.assertIn("replacement", tokens)
+        self.assertIn("transform", tokens)
+        self.assertIn("axi", tokens)  # "axis" and "axes" both lose their trailing s
+        self.assertNotIn("the", tokens)
+
+
+class TestApiGuideIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, "index.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def headings(self, index, section_ids):
+        return [index.sections[section_id]["heading"] for section_id in section_ids]
+
+    def test_search_ranks_sections_by_scene_text(self):
+        index = ApiGuideIndex.build(GUIDE)
+        self.assertEqual(self.headings(index, index.search("Plot the function on axes", 1)), ["Axes"])
+        self.assertEqual(self.headings(index, index.search("Morph the square into a circle with a transform", 1)), ["Transform"])
+        self.assertEqual(index.search("zebra", 3), [])
+
+    def test_search_respects_exclude_and_character_budget(self):
+        index = ApiGuideIndex.build(GUIDE)
+        best = index.search("fade the formula in", 2)
+        self.assertEqual(set(self.headings(index, best)), {"FadeIn", "MathTex"})
+        self.assertNotIn(best[0], index.search("fade the formula in", 2, exclude={best[0]}))
+        self.assertEqual(index.search("fade the formula in", 2, max_chars=10), [])
+
+    def test_core_sections_include_intro_and_configured_headings(self):
+        index = ApiGuideIndex.build(GUIDE)
+        core = index.core_sections("", core_headings=["mathtex"], top_k=0)
+        self.assertEqual(self.headings(index, core), ["", "MathTex"])
+
+    def test_format_sections_keeps_guide_order_and_heading_path(self):
+        index = ApiGuideIndex.build(GUIDE)
+        text = index.format_sections([9, 6])
+        self.assertLess(text.index("### FadeIn"), text.index("### Axes"))
+        self.assertIn("[Manim Guide > Graphs]\n### Axes", text)
+
+    def test_load_reuses_saved_index_until_guide_changes(self):
+        first = ApiGuideIndex.load(GUIDE, self.index_path)
+        self.assertTrue(os.path.exists(self.index_path))
+        with patch.object(ApiGuideIndex, "build", side_effect=AssertionError("rebuilt")):
+            second = ApiGuideIndex.load(GUIDE, self.index_path)
+        self.assertEqual(second.sections, first.sections)
+        self.assertEqual(second.search("plot axes", 1), first.search("plot axes", 1))
+
+        changed = ApiGuideIndex.load(GUIDE + "\n## Camera\nMovingCameraScene zooms.\n", self.index_path)
+        self.assertEqual(changed.sections[-1]["heading"], "Camera")
+
+    def test_scene_query_uses_narration_and_visual_suggestions(self):
+        query = scene_query({
+            "scene_number": 1,
+            "title": "Growth",
+            "script_content": "The curve rises.",
+            "manim_animation_suggestions": ["Plot y = x^2 on Axes"],
+            "diagram_suggestions": [],
+        })
+        self.assertEqual(query, "Growth\nThe curve rises.\nPlot y = x^2 on Axes")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Unit tests for the code_patcher module (SEARCH/REPLACE patches for the fix path).
+"""
+import unittest
+from project_drishti.code_patcher import PatchError, apply_patch_blocks, extract_error_region, parse_patch_blocks
+
+SCRIPT = """class Scene1(VoiceoverScene):
+    def construct(self):
+        a = Circle()
+        b = Square()
+        if a == b:
+            self.wait()
+        self.play(Create(a))"""
+
+class TestPatchBlocks(unittest.TestCase):
+
+    def test_parse_and_apply_blocks_in_order(self):
+        response = (
+            "Here is the fix:\n"
+            "<<<<<<< SEARCH\n        b = Square()\n=======\n        b = Square(side_length=2)\n>>>>>>> REPLACE\n"
+            "<<<<<<< SEARCH\n        if a == b:\n            self.wait()\n=======\n>>>>>>> REPLACE\n"
+        )
+        blocks = parse_patch_blocks(response)
+        self.assertEqual(len(blocks), 2)
+        patched = apply_patch_blocks(SCRIPT, blocks)
+        self.assertIn("Square(side_length=2)", patched)
+        self.assertNotIn("self.wait()", patched)
+        self.assertIn("self.play(Create(a))", patched)
+
+    def test_trailing_whitespace_is_tolerated(self):
+        patched = apply_patch_blocks(SCRIPT.replace("a = Circle()", "a = Circle()   "), [("        a = Circle()", "        a = Dot()")])
+        self.assertIn("a = Dot()", patched)
+
+    def test_missing_or_ambiguous_search_raises(self):
+        with self.assertRaises(PatchError):
+            apply_patch_blocks(SCRIPT, [("c = Triangle()", "c = Dot()")])
+        with self.assertRaises(PatchError):
+            apply_patch_blocks(SCRIPT, [("self.", "this.")])
+        with self.assertRaises(PatchError):
+            apply_patch_blocks(SCRIPT, [("  ", "x")])
+
+class TestErrorRegion(unittest.TestCase):
+
+    def test_plain_and_rich_traceback_frames_of_the_script(self):
+        error = (
+            'File "/usr/lib/manim/scene.py", line 2, in render\n'
+            'File "/out/scene_01_x.py", line 4, in construct\n'
+            "│ /out/scene_01_x.py:7 in construct │\n"
+        )
+        region = extract_error_region(SCRIPT, error, "/work/scene_01_x.py", context=0)
+        self.assertEqual(region.splitlines(), [">>   4 |         b = Square()", "...", ">>   7 |         self.play(Create(a))"])
+
+    def test_static_validation_report_lines(self):
+        region = extract_error_region(SCRIPT, "Static validation failed before rendering:\n- line 3: name 'Circle' is not defined.", context=1)
+        self.assertEqual(len(region.splitlines()), 3)
+        self.assertIn(">>   3 |", region)
+
+    def test_no_line_information(self):
+        self.assertEqual(extract_error_region(SCRIPT, "Video is blank."), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for the code_stream_guard module (early abort of streamed Manim code).
+"""
+import unittest
+from project_drishti.code_stream_guard import StreamingCodeGuard
+
+VALID_RESPONSE = """Here is the scene:
+```python
+from manim import *
+
+def helper(x):
+    return x * 2
+
+class Scene01Intro(VoiceoverScene):
+    def construct(self):
+        self.wait()
+```
+Some closing remarks."""
+
+def feed_in_chunks(guard, text, size=7):
+    for start in range(0, len(text), size):
+        reason = guard.feed(text[start:start + size])
+        if reason or guard.complete:
+            return reason
+    return None
+
+class TestStreamingCodeGuard(unittest.TestCase):
+
+    def test_valid_code_completes_at_closing_fence(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        self.assertIsNone(feed_in_chunks(guard, VALID_RESPONSE))
+        self.assertTrue(guard.complete)
+        self.assertIsNone(guard.finish())
+
+    def test_unfenced_code_is_accepted(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = VALID_RESPONSE.split("```python\n")[1].split("```")[0]
+        self.assertIsNone(feed_in_chunks(guard, code))
+        self.assertIsNone(guard.finish())
+
+    def test_prose_instead_of_code_aborts(self):
+        guard = StreamingCodeGuard("Scene01Intro", max_preamble_chars=100)
+        reason = feed_in_chunks(guard, "I think the best way to show this is to explain it in words. " * 5)
+        self.assertIn("No code", reason)
+
+    def test_wrong_class_name_aborts_immediately(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        reason = feed_in_chunks(guard, "```python\nfrom manim import *\nclass MyScene(VoiceoverScene):\n")
+        self.assertIn("MyScene", reason)
+
+    def test_syntax_error_aborts_at_next_statement(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        reason = feed_in_chunks(guard, "```python\ndef helper(:\n    pass\nclass Scene01Intro(VoiceoverScene):\n")
+        self.assertIn("does not compile", reason)
+
+    def test_syntax_error_in_construct_aborts_before_class_ends(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = "```python\nclass Scene01Intro(VoiceoverScene):\n    def construct(self):\n        self.play(x))\n        self.wait()\n"
+        reason = feed_in_chunks(guard, code)
+        self.assertIn("line 3", reason)
+
+    def test_multiline_def_header_is_not_the_body(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = (
+            "```python\nfrom manim import *\n\nclass Scene01Intro(VoiceoverScene):\n"
+            "    def make_box(self, label,\n                 color=BLUE):\n        box = Square(color=color)\n        return VGroup(box, Text(label))\n\n"
+            "    def construct(self):\n        self.add(self.make_box('a'))\n        self.wait()\n```"
+        )
+        self.assertIsNone(feed_in_chunks(guard, code))
+        self.assertIsNone(guard.finish())
+
+    def test_multiline_class_header_and_decorators(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = (
+            "class Scene01Intro(\n        VoiceoverScene):\n    @staticmethod\n    @lru_cache(\n        maxsize=2,\n    )\n"
+            "    def helper(x):\n        return x\n\n    def construct(self):\n        try:\n            self.wait()\n"
+            "        except* ValueError:\n            pass\n"
+        )
+        self.assertIsNone(feed_in_chunks(guard, code))
+        self.assertIsNone(guard.finish())
+
+    def test_nonlocal_in_nested_function_is_not_an_error(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = (
+            "class Scene01Intro(VoiceoverScene):\n    def construct(self):\n        count = 0\n"
+            "        def bump():\n            nonlocal count\n            count += 1\n        bump()\n"
+        )
+        self.assertIsNone(feed_in_chunks(guard, code))
+        self.assertIsNone(guard.finish())
+
+    def test_bad_unindent_aborts(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        code = "class Scene01Intro(VoiceoverScene):\n    def construct(self):\n        self.wait()\n      self.wait()\n"
+        self.assertIn("unindent", feed_in_chunks(guard, code))
+
+    def test_open_multiline_string_is_not_an_error(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        self.assertIsNone(feed_in_chunks(guard, 'TEXT = """\nProse at column zero\n"""\nclass Scene01Intro(VoiceoverScene):\n'))
+        method_guard = StreamingCodeGuard("Scene01Intro")
+        code = 'class Scene01Intro(VoiceoverScene):\n    def construct(self):\n        s = """\nraw\n    text\n"""\n        self.wait()\n'
+        self.assertIsNone(feed_in_chunks(method_guard, code))
+        self.assertIsNone(method_guard.finish())
+
+    def test_truncated_output_is_rejected(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        self.assertIsNone(feed_in_chunks(guard, VALID_RESPONSE[:VALID_RESPONSE.index("self.wait")] + "self.play("))
+        self.assertIn("unclosed code block", guard.finish())
+        length_guard = StreamingCodeGuard("Scene01Intro")
+        feed_in_chunks(length_guard, VALID_RESPONSE)
+        length_guard.finish_reason = "length"
+        self.assertIn("truncated", length_guard.finish())
+
+    def test_missing_class_and_construct_is_rejected(self):
+        guard = StreamingCodeGuard("Scene01Intro")
+        feed_in_chunks(guard, "```python\nfrom manim import *\nx = 1\n```")
+        self.assertIn("neither", guard.finish())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,25 @@ Unit tests for the DidacticScripter module.
 import unittest
 import os
 import json
-from project_drishti.didactic_scripter import DidacticScripter
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+from project_drishti import config
+from project_drishti.didactic_scripter import DidacticScripter, SceneStreamParser
 
 class TestDidacticScripter(unittest.TestCase):
 
     def setUp(self):
         """Set up for test methods."""
+        # Keep responses from other tests (or real runs) out of the LLM cache
+        cache_patcher = patch.object(config, "LLM_CACHE_ENABLED", False)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        # Scripts and error output go to a temporary directory, not outputs/
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
         self.scripter = DidacticScripter(model_name="test_model_for_scripter")
+        self.scripter.output_dir = self.temp_dir
         self.test_topic = "Test Topic for Scripter"
         self.output_file = os.path.join(self.scripter.output_dir, "didactic_script_output.md")
 
@@ -97,5 +109,61 @@ class TestDidacticScripter(unittest.TestCase):
         except (IndexError, json.JSONDecodeError) as e:
             self.fail(f"Could not parse JSON from .md file: {e}")
 
+class TestSceneStreamParser(unittest.TestCase):
+
+    def setUp(self):
+        """Build a script response to be fed to the parser in pieces."""
+        cache_patcher = patch.object(config, "LLM_CACHE_ENABLED", False)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        self.scenes = [
+            {"scene_number": 1, "title": "Intro {braces}", "narration": "Quotes \\\"inside\\\" and [brackets]."},
+            {"scene_number": 2, "title": "Second", "narration": "Nested", "extra": {"list": [1, 2, {"a": "}"}]}},
+        ]
+        self.response = "```json\n" + json.dumps({"topic": "T", "scenes": self.scenes}, indent=4) + "\n```"
+
+    def test_scenes_emitted_in_order_for_small_chunks(self):
+        """Scenes are emitted once complete, regardless of chunk boundaries."""
+        parser = SceneStreamParser()
+        emitted = []
+        for i in range(0, len(self.response), 3):
+            emitted.extend(parser.feed(self.response[i:i + 3]))
+        self.assertEqual(emitted, self.scenes)
+
+    def test_scene_emitted_before_stream_ends(self):
+        """The first scene is available before the second one has been written."""
+        parser = SceneStreamParser()
+        cut = self.response.index('"Second"')
+        first_batch = parser.feed(self.response[:cut])
+        self.assertEqual(first_batch, self.scenes[:1])
+        self.assertEqual(parser.feed(self.response[cut:]), self.scenes[1:])
+
+    def test_text_after_array_is_ignored(self):
+        """Objects after the scenes array is closed are not treated as scenes."""
+        parser = SceneStreamParser()
+        emitted = parser.feed('{"scenes": [{"title": "A"}], "meta": {"title": "B"}}')
+        self.assertEqual(emitted, [{"title": "A"}])
+
+    def test_stream_script_calls_on_scene_and_returns_full_script(self):
+        """stream_script hands scenes over as they arrive and returns the parsed script."""
+        scripter = DidacticScripter(model_name="test_model_for_scripter")
+        scripter.output_dir = tempfile.mkdtemp()  # The parsed script is saved there, not in outputs/
+        self.addCleanup(shutil.rmtree, scripter.output_dir, ignore_errors=True)
+        chunks = []
+        for i in range(0, len(self.response), 7):
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = self.response[i:i + 7]
+            chunks.append(chunk)
+        scripter.client = MagicMock()
+        scripter.client.chat.completions.create.return_value = iter(chunks)
+
+        received = []
+        script = scripter.stream_script("T", on_scene=received.append)
+
+        self.assertEqual([scene["title"] for scene in received], ["Intro {braces}", "Second"])
+        self.assertEqual(script["scenes"], received)
+        self.assertTrue(scripter.client.chat.completions.create.call_args.kwargs["stream"])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Unit tests for the dry_run module (construct() without rendering).
+"""
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from project_drishti.dry_run import (
+    EstimatedVoiceoverTracker, dry_run_scene, format_dry_run_error, parse_dry_run_output
+)
+
+HAS_MANIM = importlib.util.find_spec("manim") is not None
+
+FAILING_SCRIPT = '''from manim import *
+
+class Broken(Scene):
+    def construct(self):
+        circle = Circle()
+        self.play(Create(circle))
+        self.wait()
+        self.play(circle.animate.shift(RIGHT, colour=RED))
+'''
+
+
+class TestDryRun(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_script(self, content):
+        script_path = os.path.join(self.temp_dir, "scene.py")
+        with open(script_path, "w") as f:
+            f.write(content)
+        return script_path
+
+    def test_tracker_places_bookmarks_by_word_position(self):
+        scene = SimpleNamespace(renderer=SimpleNamespace(time=10.0))
+        tracker = EstimatedVoiceoverTracker(scene, "one two <bookmark mark='B'/> three four", 4.0)
+        self.assertEqual(tracker.time_until_bookmark("B"), 2.0)
+        scene.renderer.time = 13.0
+        self.assertEqual(tracker.get_remaining_duration(), 1.0)
+        self.assertEqual(tracker.time_until_bookmark("B"), 0)
+        with self.assertRaises(Exception):
+            tracker.time_until_bookmark("missing")
+
+    def test_parse_output_takes_last_result_line(self):
+        stdout = 'WARNING: config printed this\n{"not": "a result"}\n{"ok": true, "seconds": 0.1}\n'
+        self.assertEqual(parse_dry_run_output(stdout), {"ok": True, "seconds": 0.1})
+        self.assertIsNone(parse_dry_run_output("Traceback (most recent call last):\n"))
+
+    def test_error_message_leads_with_location(self):
+        message = format_dry_run_error({
+            "exception": "TypeError: bad kwarg", "line": 8, "animation_index": 2, "traceback": "Traceback ..."
+        }, "Broken")
+        self.assertTrue(message.startswith("Dry run (construct() without rendering) of 'Broken' raised TypeError: bad kwarg at line 8, after 2 animations"))
+        self.assertIn("Traceback ...", message)
+
+    @unittest.skipIf(HAS_MANIM, "Needs an environment without Manim")
+    def test_missing_manim_is_not_blamed_on_script(self):
+        result = dry_run_scene(self.write_script(FAILING_SCRIPT), "Broken")
+        self.assertFalse(result["ok"])
+        self.assertFalse(result["script_error"])
+
+    @unittest.skipUnless(HAS_MANIM, "Needs Manim")
+    def test_reports_line_and_animation_index(self):
+        result = dry_run_scene(self.write_script(FAILING_SCRIPT), "Broken", {"media_dir": self.temp_dir})
+        self.assertFalse(result["ok"])
+        self.assertTrue(result["script_error"])
+        self.assertEqual((result["line"], result["animation_index"]), (8, 2))
+        self.assertIn("TypeError", result["exception"])
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "videos")))
+
+    @unittest.skipUnless(HAS_MANIM, "Needs Manim")
+    def test_passing_scene(self):
+        script_path = self.write_script(FAILING_SCRIPT.replace(", colour=RED", ""))
+        self.assertTrue(dry_run_scene(script_path, "Broken", {"media_dir": self.temp_dir})["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
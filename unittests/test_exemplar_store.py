@@ -0,0 +1,94 @@
+"""
+Unit tests for the exemplar_store module (accepted scripts retrieved as few-shot examples).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from project_drishti.exemplar_store import ExemplarStore, voiceover_texts
+
+PLOT_SCRIPT = '''from manim import *
+
+class Scene1Growth(VoiceoverScene):
+    def construct(self):
+        with self.voiceover(text="The population curve grows exponentially on these axes.") as tracker:
+            axes = Axes()
+            self.play(Create(axes.plot(lambda x: 2 ** x)))
+'''
+TIMELINE_SCRIPT = '''from manim import *
+
+class Scene2Timeline(VoiceoverScene):
+    def construct(self):
+        with self.voiceover(text="A timeline of the revolution, from the oath to the republic.") as tracker:
+            self.play(Create(NumberLine()))
+'''
+
+
+class TestExemplarStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ExemplarStore(os.path.join(self.temp_dir, "exemplars.sqlite3"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, relative_path, content=""):
+        path = os.path.join(self.temp_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_similar_returns_best_match_from_other_topics(self):
+        plot_path = self.write("plot.py", PLOT_SCRIPT)
+        timeline_path = self.write("timeline.py", TIMELINE_SCRIPT)
+        self.store.add({"title": "Growth", "script_content": "Exponential population growth plotted on axes."}, "Biology", plot_path, "Scene1Growth")
+        self.store.add({"title": "Timeline", "script_content": "The revolution on a timeline."}, "French Revolution", timeline_path, "Scene2Timeline")
+
+        exemplars = self.store.similar({"title": "Compound interest", "script_content": "Money grows exponentially; plot it on axes."}, "Finance")
+        self.assertEqual([exemplar["scene_title"] for exemplar in exemplars], ["Growth"])
+        self.assertEqual(exemplars[0]["code"], PLOT_SCRIPT)
+        self.assertEqual(exemplars[0]["topic"], "Biology")
+
+        # Never the scene's own topic, and nothing without a matching term
+        self.assertEqual(self.store.similar({"title": "Growth plotted on axes"}, "Biology"), [])
+        self.assertEqual(self.store.similar({"title": "Zebra"}, "Finance"), [])
+
+    def test_similar_respects_top_k_and_character_budget(self):
+        for number in range(3):
+            path = self.write(f"plot{number}.py", PLOT_SCRIPT + f"# variant {number}\n")
+            self.store.add({"title": f"Axes plot {number}"}, f"Topic {number}", path, "Scene1Growth")
+        self.assertEqual(len(self.store.similar({"title": "Axes plot"}, "Other", top_k=2, max_chars=0)), 2)
+        self.assertEqual(len(self.store.similar({"title": "Axes plot"}, "Other", top_k=3, max_chars=len(PLOT_SCRIPT) + 20)), 1)
+
+    def test_same_script_is_stored_once(self):
+        path = self.write("plot.py", PLOT_SCRIPT)
+        first = self.store.add({"title": "Growth"}, "Biology", path, "Scene1Growth")
+        second = self.store.add({"title": "Growth"}, "Biology", path, "Scene1Growth")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.store.entries()), 1)
+
+    def test_missing_script_is_not_stored(self):
+        self.assertIsNone(self.store.add({"title": "Gone"}, "T", os.path.join(self.temp_dir, "missing.py"), "SceneGone"))
+        self.assertEqual(self.store.entries(), [])
+
+    def test_import_output_dir_takes_scripts_with_final_videos(self):
+        self.write("run/final_videos/Scene1Growth.mp4")
+        self.write("run/generated_content/manim_scripts/scene_01_Growth.py", PLOT_SCRIPT)
+        # Never accepted: no final video for its class
+        self.write("run/generated_content/manim_scripts/scene_02_Timeline.py", TIMELINE_SCRIPT)
+
+        self.assertEqual(self.store.import_output_dir(os.path.join(self.temp_dir, "run")), 1)
+        entry = self.store.entries()[0]
+        self.assertEqual((entry["topic"], entry["scene_title"], entry["manim_class_name"]), ("run", "Growth", "Scene1Growth"))
+        # The voiceover text stands in for the narration
+        self.assertEqual(len(self.store.similar({"title": "population curve"}, "Other")), 1)
+
+    def test_voiceover_texts(self):
+        self.assertEqual(voiceover_texts(PLOT_SCRIPT), ["The population curve grows exponentially on these axes."])
+        self.assertEqual(voiceover_texts("def broken("), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
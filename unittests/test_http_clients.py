@@ -0,0 +1,40 @@
+"""
+Unit tests for the http_clients module (process-wide pooled HTTP clients).
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+from project_drishti import config, http_clients
+
+class TestHttpClients(unittest.TestCase):
+
+    def tearDown(self):
+        http_clients.close_http_clients()
+        asyncio.run(http_clients.aclose_async_http_clients())
+
+    def test_client_is_shared_per_provider(self):
+        client = http_clients.get_http_client("openrouter")
+        self.assertIs(http_clients.get_http_client("openrouter"), client)
+        self.assertIsNot(http_clients.get_http_client("deepinfra"), client)
+
+    def test_closed_client_is_recreated(self):
+        client = http_clients.get_http_client("openrouter")
+        http_clients.close_http_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(http_clients.get_http_client("openrouter"), client)
+
+    def test_pool_limits_come_from_config(self):
+        with patch.dict(config.HTTP_PROVIDER_LIMITS, {"openrouter": (7, 3)}):
+            limits = http_clients._client_options("openrouter")["limits"]
+        self.assertEqual((limits.max_connections, limits.max_keepalive_connections), (7, 3))
+
+    def test_http2_requires_setting(self):
+        with patch.object(config, "HTTP2_ENABLED", False):
+            self.assertFalse(http_clients.http2_available())
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            http_clients.get_async_http_client("nowhere")
+
+if __name__ == '__main__':
+    unittest.main()
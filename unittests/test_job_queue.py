@@ -0,0 +1,161 @@
+"""
+Unit tests for the job_queue and job_worker modules (durable scene job queue).
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+from project_drishti import config
+from project_drishti.job_queue import (
+    JobQueue,
+    STAGE_ANALYZE,
+    STAGE_CODEGEN,
+    STAGE_RENDER,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_QUEUED,
+)
+from project_drishti.job_worker import JobWorker, MAX_SCENE_ATTEMPTS
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.temp_dir, "jobs.sqlite3"), lease_seconds=30)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lease_is_exclusive(self):
+        """A leased job is not handed to a second worker while its lease is live."""
+        job_id = self.queue.enqueue(STAGE_RENDER, {"script_path": "a.py"}, topic="T", scene_key="S")
+        job = self.queue.lease(STAGE_RENDER, "worker-1")
+        self.assertEqual(job["id"], job_id)
+        self.assertEqual(job["payload"], {"script_path": "a.py"})
+        self.assertIsNone(self.queue.lease(STAGE_RENDER, "worker-2"))
+        self.assertIsNone(self.queue.lease(STAGE_CODEGEN, "worker-3"))
+
+    def test_expired_lease_is_re_leased(self):
+        """A job whose worker stopped heartbeating goes to the next worker."""
+        queue = JobQueue(self.queue.db_path, lease_seconds=0.05)
+        job_id = queue.enqueue(STAGE_RENDER, {})
+        queue.lease(STAGE_RENDER, "crashed-worker")
+        time.sleep(0.1)
+        job = queue.lease(STAGE_RENDER, "worker-2")
+        self.assertEqual(job["id"], job_id)
+        self.assertEqual(job["attempts"], 2)
+        # The crashed worker can no longer heartbeat or complete it
+        self.assertFalse(queue.heartbeat(job_id, "crashed-worker"))
+        self.assertFalse(queue.complete(job_id, "crashed-worker"))
+        self.assertTrue(queue.complete(job_id, "worker-2"))
+
+    def test_expired_lease_on_last_attempt_fails_job(self):
+        queue = JobQueue(self.queue.db_path, lease_seconds=0.05)
+        job_id = queue.enqueue(STAGE_RENDER, {}, max_attempts=1)
+        queue.lease(STAGE_RENDER, "crashed-worker")
+        time.sleep(0.1)
+        self.assertIsNone(queue.lease(STAGE_RENDER, "worker-2"))
+        self.assertEqual(queue.get(job_id)["status"], STATUS_FAILED)
+
+    def test_complete_enqueues_next_jobs(self):
+        job_id = self.queue.enqueue(STAGE_CODEGEN, {"n": 1}, topic="T", scene_key="S")
+        self.queue.lease(STAGE_CODEGEN, "w")
+        self.queue.complete(job_id, "w", {"ok": True}, [{"stage": STAGE_RENDER, "payload": {"n": 2}, "topic": "T", "scene_key": "S"}])
+        self.assertEqual(self.queue.get(job_id)["status"], STATUS_DONE)
+        self.assertEqual(self.queue.get(job_id)["result"], {"ok": True})
+        next_job = self.queue.lease(STAGE_RENDER, "w")
+        self.assertEqual((next_job["payload"], next_job["scene_key"]), ({"n": 2}, "S"))
+
+    def test_fail_requeues_until_attempts_run_out(self):
+        job_id = self.queue.enqueue(STAGE_CODEGEN, {}, max_attempts=2)
+        self.queue.lease(STAGE_CODEGEN, "w")
+        self.queue.fail(job_id, "w", "API error")
+        self.assertEqual(self.queue.get(job_id)["status"], STATUS_QUEUED)
+        self.queue.lease(STAGE_CODEGEN, "w")
+        self.queue.fail(job_id, "w", "API error")
+        self.assertEqual(self.queue.get(job_id)["status"], STATUS_FAILED)
+        self.assertEqual(self.queue.counts(), {STAGE_CODEGEN: {STATUS_FAILED: 1}})
+
+class FakeRenderer:
+    def __init__(self, succeed):
+        self.succeed = succeed
+        self.tiers = []
+
+    def render_scene(self, script_path, scene_class_name, cancel_event=None, tier="final"):
+        self.tiers.append(tier)
+        if self.succeed:
+            return True, f"/videos/{scene_class_name}.mp4", None
+        return False, None, "NameError: name 'Foo' is not defined"
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.analyzed = []
+        self.moved = []
+
+    def compress_video(self, video_path, cancel_event=None):
+        return video_path
+
+    def analyze_compressed_video(self, compressed_path, scene_narration):
+        self.analyzed.append(compressed_path)
+        return True, "PASS"
+
+    def move_to_final_videos(self, video_path, subdir=None):
+        self.moved.append(video_path)
+        return f"/final/{os.path.basename(video_path)}"
+
+class TestJobWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.temp_dir, "jobs.sqlite3"))
+        self.payload = {
+            "topic": "T", "topic_title_str": "T", "output_namespace": "T",
+            "scene_data": {"title": "S"}, "attempt": 1,
+            "script_path": "s.py", "manim_class_name": "SceneS",
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_worker(self, succeed):
+        worker = JobWorker(STAGE_RENDER, self.queue, worker_id="render-1")
+        worker._stage_instance = FakeRenderer(succeed)
+        return worker
+
+    def test_successful_render_queues_analysis(self):
+        self.queue.enqueue(STAGE_RENDER, self.payload, topic="T", scene_key="S")
+        self.assertEqual(self.make_worker(succeed=True).run(exit_when_idle=True), 1)
+        analyze_job = self.queue.lease(STAGE_ANALYZE, "analyze-1")
+        self.assertEqual(analyze_job["payload"]["video_path"], "/videos/SceneS.mp4")
+
+    def test_qa_first_renders_final_quality_after_analysis_passes(self):
+        renderer, analyzer = FakeRenderer(succeed=True), FakeAnalyzer()
+        render_worker = JobWorker(STAGE_RENDER, self.queue, worker_id="render-1")
+        render_worker._stage_instance = renderer
+        analyze_worker = JobWorker(STAGE_ANALYZE, self.queue, worker_id="analyze-1")
+        analyze_worker._stage_instance = analyzer
+        self.queue.enqueue(STAGE_RENDER, self.payload, topic="T", scene_key="S")
+        with patch.object(config, "RENDER_QA_FIRST", True), patch.object(config, "EXEMPLARS_ENABLED", False):
+            render_worker.run(exit_when_idle=True)
+            analyze_worker.run(exit_when_idle=True)
+            self.assertEqual(analyzer.moved, [])  # The QA preview is never a final video
+            render_worker.run(exit_when_idle=True)
+            analyze_worker.run(exit_when_idle=True)
+        self.assertEqual(renderer.tiers, ["qa", "final"])
+        self.assertEqual(len(analyzer.analyzed), 1)
+        self.assertEqual(analyzer.moved, ["/videos/SceneS.mp4"])
+
+    def test_failed_render_regenerates_until_scene_attempts_run_out(self):
+        self.queue.enqueue(STAGE_RENDER, self.payload, topic="T", scene_key="S")
+        self.make_worker(succeed=False).run(exit_when_idle=True)
+        codegen_job = self.queue.lease(STAGE_CODEGEN, "codegen-1")
+        self.assertEqual(codegen_job["payload"]["attempt"], 2)
+
+        self.queue.enqueue(STAGE_RENDER, {**self.payload, "attempt": MAX_SCENE_ATTEMPTS}, topic="T", scene_key="S")
+        self.make_worker(succeed=False).run(exit_when_idle=True)
+        self.assertIsNone(self.queue.lease(STAGE_CODEGEN, "codegen-1"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for the llm_cache module (content-addressed LLM response cache).
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+from project_drishti import config
+from project_drishti.llm_cache import LLMCache, cached_completion, completion_cache_key
+
+class TestCompletionCacheKey(unittest.TestCase):
+
+    def setUp(self):
+        self.kwargs = {
+            "model": "model-a",
+            "messages": [{"role": "user", "content": "Draw a circle"}],
+            "temperature": 0.7,
+            "extra_body": {"reasoning": {"effort": "high", "exclude": False}},
+            "extra_headers": {"X-Title": "app"},
+        }
+
+    def test_identical_requests_share_a_key(self):
+        self.assertEqual(completion_cache_key(self.kwargs, "v1"), completion_cache_key(dict(self.kwargs), "v1"))
+
+    def test_every_input_changes_the_key(self):
+        base = completion_cache_key(self.kwargs, "v1")
+        variants = [
+            {**self.kwargs, "model": "model-b"},
+            {**self.kwargs, "messages": [{"role": "user", "content": "Draw a square"}]},
+            {**self.kwargs, "temperature": 0.2},
+            {**self.kwargs, "extra_body": {"reasoning": {"effort": "low", "exclude": False}}},
+        ]
+        for variant in variants:
+            self.assertNotEqual(completion_cache_key(variant, "v1"), base)
+        self.assertNotEqual(completion_cache_key(self.kwargs, "v2"), base)
+        self.assertNotEqual(completion_cache_key(self.kwargs, "v1", sample=2), base)
+
+    def test_headers_do_not_change_the_key(self):
+        other_headers = {**self.kwargs, "extra_headers": {"X-Title": "other"}}
+        self.assertEqual(completion_cache_key(other_headers, "v1"), completion_cache_key(self.kwargs, "v1"))
+
+    def test_usage_option_does_not_change_the_key(self):
+        with_usage = {**self.kwargs, "extra_body": {**self.kwargs["extra_body"], "usage": {"include": True}}}
+        self.assertEqual(completion_cache_key(with_usage, "v1"), completion_cache_key(self.kwargs, "v1"))
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "llm_cache.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_round_trip_and_persistence(self):
+        LLMCache(self.db_path).put("k", "response text", "model-a")
+        cache = LLMCache(self.db_path)
+        self.assertEqual(cache.get("k"), "response text")
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = LLMCache(self.db_path, max_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        cache.get("a")  # "b" is now the least recently used
+        time.sleep(0.01)
+        cache.put("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_evicts_by_size(self):
+        cache = LLMCache(self.db_path, max_bytes=25)
+        cache.put("a", "x" * 10)
+        time.sleep(0.01)
+        cache.put("b", "y" * 10)
+        time.sleep(0.01)
+        cache.put("c", "z" * 10)
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 25)
+
+    def test_bypass_skips_lookup(self):
+        cache = LLMCache(self.db_path)
+        cache.put("k", "cached")
+        self.assertEqual(cached_completion(cache, "k"), "cached")
+        self.assertIsNone(cached_completion(cache, "k", use_cache=False))
+        with patch.object(config, "LLM_CACHE_BYPASS", True):
+            self.assertIsNone(cached_completion(cache, "k"))
+        self.assertIsNone(cached_completion(None, "k"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,21 +1,30 @@
 """
 Unit tests for the ManimRenderer module.
 """
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 import os
 import shutil
-from project_drishti.manim_renderer import ManimRenderer
+import tempfile
+from project_drishti.manim_renderer import RENDER_TIER_QA, ManimRenderer
+from project_drishti.scheduling import FairLimiter
 from project_drishti import config # To access configured paths
 
 class TestManimRenderer(unittest.TestCase):
 
     def setUp(self):
         """Set up for test methods."""
-        self.renderer = ManimRenderer()
-        # Ensure the base generated content directory for tests is clean or specific for tests
-        self.test_base_media_dir = os.path.abspath(config.GENERATED_CONTENT_DIR) # Use configured path
-        self.test_scripts_dir = os.path.abspath(config.MANIM_SCRIPTS_DIR)
+        # The tests mock the manim subprocess; warm workers, the render cache and dry runs would bypass it
+        with patch.object(config, "RENDER_WARM_WORKERS", False), patch.object(config, "RENDER_CACHE_ENABLED", False), \
+                patch.object(config, "DRY_RUN_ENABLED", False):
+            self.renderer = ManimRenderer()
+        # Scripts, videos and Manim's logs go to a temporary directory, not outputs/generated_content
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.renderer.base_media_dir = self.temp_dir
+        self.test_base_media_dir = os.path.abspath(self.temp_dir)
+        self.test_scripts_dir = os.path.join(self.test_base_media_dir, "manim_scripts")
         
         # Create a dummy script for testing path generations
         self.dummy_script_name = "test_render_script.py"
@@ -134,5 +143,39 @@ class TestManimRenderer(unittest.TestCase):
         result_path = self.renderer.render_scene(non_existent_script, "AnyScene")
         self.assertIsNone(result_path)
 
+    @patch.object(config, "RENDER_QA_RESOLUTION", "426,240")
+    @patch.object(config, "RENDER_QA_FPS", 10)
+    def test_qa_tier_renders_small_preview_in_its_own_folder(self):
+        """The QA tier overrides resolution and frame rate, for both the CLI and the warm workers."""
+        command, video_path, _ = self.renderer._prepare_render(self.dummy_script_path, self.dummy_class_name, RENDER_TIER_QA)
+        self.assertNotIn(config.MANIM_QUALITY_FLAG, command)
+        self.assertEqual(command[command.index("--resolution") + 1], "426,240")
+        self.assertEqual(command[command.index("--fps") + 1], "10")
+        self.assertEqual(os.path.basename(os.path.dirname(video_path)), "240p10")
+        self.assertNotEqual(video_path, self.expected_video_full_path)
+
+        manim_config = self.renderer._render_job(self.dummy_script_path, self.dummy_class_name, RENDER_TIER_QA)["manim_config"]
+        self.assertEqual((manim_config["pixel_width"], manim_config["pixel_height"], manim_config["frame_rate"]), (426, 240, 10))
+        self.assertNotEqual(self.renderer._quality_label(RENDER_TIER_QA), self.renderer._quality_label("final"))
+
+    @patch.object(config, "RENDER_SECTIONS_MAX", 4)
+    def test_sections_take_only_free_render_slots(self):
+        """Each section after the first needs a render slot that is free; unused ones are handed back."""
+        async def sections(free_slots):
+            render_slots = FairLimiter("render", 1 + free_slots)
+            await render_slots.acquire()  # The scene's own slot
+            with patch.object(self.renderer, "_start_sections", return_value=None) as start_sections:
+                result = await self.renderer._render_sections_async(render, render_slots)
+            planned = start_sections.call_args[0][2] if start_sections.called else None
+            return result, planned, render_slots.active
+
+        render = {"script_path": self.dummy_script_path, "scene_class_name": self.dummy_class_name, "env": {}}
+        self.renderer.worker_pool = MagicMock()
+        self.renderer.worker_pool.dry_run_async = AsyncMock(return_value=None)
+        self.assertEqual(asyncio.run(sections(0)), (None, None, 1))
+        self.renderer.worker_pool.dry_run_async.assert_not_called()
+        self.assertEqual(asyncio.run(sections(2)), (None, 3, 1))
+        self.assertEqual(asyncio.run(sections(8)), (None, 4, 1))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
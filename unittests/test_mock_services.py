@@ -0,0 +1,145 @@
+"""
+Unit tests for the mock_services module (local stand-ins for OpenRouter, Gemini and DeepInfra TTS).
+"""
+import json
+import random
+import unittest
+import urllib.error
+import urllib.request
+from project_drishti.code_patcher import apply_patch_blocks, parse_patch_blocks
+from project_drishti.mock_services import (
+    PASSING_VERDICT, SERVICES, MockServices, Recordings, ServiceProfile, parse_latency, silent_mp3, start_mock_server
+)
+
+FIX_PROMPT = '''Fix the scene. Return ONLY SEARCH/REPLACE blocks.
+**Current Manim Python Code:**
+```python
+from manim import *
+
+class Scene1(VoiceoverScene):
+    def construct(self):
+        self.wait()
+        self.wait()
+        self.play(Write(Text("Hi")))
+```
+'''
+
+
+def fast_profiles(**overrides):
+    profiles = {service: ServiceProfile("fixed:0") for service in SERVICES}
+    profiles.update(overrides)
+    return profiles
+
+
+class TestMockServices(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockServices(Recordings(), fast_profiles())
+        self.server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def request(self, method, path, body=None, headers=None):
+        if self.server is None:
+            self.server = start_mock_server(self.mock)
+        data = json.dumps(body).encode("utf-8") if isinstance(body, dict) else body
+        request = urllib.request.Request(self.mock.base_url + path, data=data, method=method, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_parse_latency(self):
+        rng = random.Random(0)
+        self.assertEqual(parse_latency("fixed:1.5")(rng), 1.5)
+        self.assertTrue(2 <= parse_latency("uniform:2:3")(rng) <= 3)
+        self.assertGreater(parse_latency("lognormal:10:0.5")(rng), 0)
+        with self.assertRaises(ValueError):
+            parse_latency("uniform:2")
+        with self.assertRaises(ValueError):
+            parse_latency("gamma:1:2")
+
+    def test_codegen_request_gets_script_with_requested_class(self):
+        status, _, body = self.request("POST", "/openrouter/v1/chat/completions", {
+            "model": "m", "messages": [{"role": "system", "content": "guide"}, {"role": "user", "content": "Name it `class Scene3Orbit(VoiceoverScene)`."}]
+        })
+        self.assertEqual(status, 200)
+        completion = json.loads(body)
+        self.assertIn("class Scene3Orbit(VoiceoverScene)", completion["choices"][0]["message"]["content"])
+        self.assertGreater(completion["usage"]["completion_tokens"], 0)
+
+    def test_streamed_completion_ends_with_usage_and_done(self):
+        status, headers, body = self.request("POST", "/openrouter/v1/chat/completions", {
+            "model": "m", "stream": True, "messages": [{"role": "user", "content": "Write the didactic script."}]
+        })
+        self.assertEqual(status, 200)
+        events = [line[len("data: "):] for line in body.decode("utf-8").split("\n") if line.startswith("data: ")]
+        self.assertEqual(events[-1], "[DONE]")
+        chunks = [json.loads(event) for event in events[:-1]]
+        self.assertIn("usage", chunks[-1])
+        text = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks if chunk["choices"])
+        self.assertIn("scenes", json.loads(text))
+
+    def test_fix_answer_is_applicable_no_op_patch(self):
+        answer = self.mock.chat_completion_text({"messages": [{"role": "user", "content": FIX_PROMPT}]})
+        blocks = parse_patch_blocks(answer)
+        self.assertEqual(len(blocks), 1)
+        code = FIX_PROMPT.split("```python\n")[1].split("\n```")[0]
+        self.assertEqual(apply_patch_blocks(code, blocks), code)
+
+    def test_speech_is_silence_for_unrecorded_text(self):
+        status, headers, body = self.request("POST", "/deepinfra/v1/openai/audio/speech", {"input": "one two three four five", "model": "m", "voice": "v"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "audio/mpeg")
+        self.assertEqual(body, silent_mp3(2.0))
+
+    def test_gemini_resumable_upload_and_verdict(self):
+        status, headers, _ = self.request(
+            "POST", "/upload/v1beta/files?uploadType=resumable", {"file": {"displayName": "scene.mp4"}},
+            {"Content-Type": "application/json", "X-Upload-Content-Type": "video/mp4"}
+        )
+        self.assertEqual(status, 200)
+        upload_path = headers["Location"][len(self.mock.base_url):]
+        status, _, body = self.request("PUT", upload_path, b"\0" * 100)
+        file = json.loads(body)["file"]
+        self.assertEqual((file["state"], file["mimeType"], file["sizeBytes"]), ("ACTIVE", "video/mp4", "100"))
+
+        status, _, body = self.request("GET", f"/v1beta/{file['name']}")
+        self.assertEqual(json.loads(body)["name"], file["name"])
+        status, _, body = self.request("POST", "/v1beta/models/gemini-2.5-flash:generateContent", {"contents": []})
+        self.assertEqual(json.loads(body)["candidates"][0]["content"]["parts"][0]["text"], PASSING_VERDICT)
+        self.request("DELETE", f"/v1beta/{file['name']}")
+        status, _, _ = self.request("GET", f"/v1beta/{file['name']}")
+        self.assertEqual(status, 404)
+
+    def test_injected_rate_limits_and_errors(self):
+        self.mock = MockServices(Recordings(), fast_profiles(
+            openrouter=ServiceProfile("fixed:0", rate_limit_rate=1.0),
+            gemini=ServiceProfile("fixed:0", error_rate=1.0),
+        ))
+        status, headers, body = self.request("POST", "/openrouter/v1/chat/completions", {"messages": []})
+        self.assertEqual(status, 429)
+        self.assertIn("Retry-After", headers)
+        self.assertEqual(json.loads(body)["error"]["type"], "rate_limit_exceeded")
+        status, _, body = self.request("POST", "/v1beta/models/m:generateContent", {"contents": []})
+        self.assertEqual(status, 500)
+        self.assertEqual(json.loads(body)["error"]["status"], "INTERNAL")
+
+        stats = json.loads(self.request("GET", "/mock/stats")[2])
+        self.assertEqual((stats["openrouter"]["rate_limited"], stats["gemini"]["errors"]), (1, 1))
+
+    def test_requests_beyond_concurrency_cap_are_rate_limited(self):
+        self.mock = MockServices(Recordings(), fast_profiles(gemini=ServiceProfile("fixed:0", max_concurrent=1)))
+        self.assertEqual(self.mock.admit("gemini")[0], None)
+        self.assertEqual(self.mock.admit("gemini")[0], "rate_limit")
+        self.mock.release("gemini")
+        self.mock.release("gemini")
+        self.assertEqual(self.mock.admit("gemini")[0], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
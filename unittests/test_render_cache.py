@@ -0,0 +1,91 @@
+"""
+Unit tests for the render_cache module (rendered videos cached by script content and toolchain).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from project_drishti import config, render_cache
+from project_drishti.manim_renderer import ManimRenderer
+from project_drishti.render_cache import RenderCache, render_cache_key
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = RenderCache(os.path.join(self.temp_dir, "render_cache.sqlite3"), os.path.join(self.temp_dir, "videos"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_key_depends_on_script_class_quality_and_toolchain(self):
+        script = self.write("scene_01.py", "class A(Scene): pass\n")
+        same_script = self.write("scene_01_copy.py", "class A(Scene): pass\n")
+        key = render_cache_key(script, "A", "-pql")
+        self.assertEqual(key, render_cache_key(same_script, "A", "-pql"))
+        self.assertNotEqual(key, render_cache_key(script, "B", "-pql"))
+        self.assertNotEqual(key, render_cache_key(script, "A", "-pqh"))
+        with patch.object(render_cache, "_toolchain_version", "other-manim"):
+            self.assertNotEqual(key, render_cache_key(script, "A", "-pql"))
+        self.write("scene_01.py", "class A(Scene): pass  # edited\n")
+        self.assertNotEqual(key, render_cache_key(script, "A", "-pql"))
+
+    def test_hit_restores_video_after_original_was_moved(self):
+        video = self.write("A.mp4", "video bytes")
+        self.cache.put("k1", video, "A")
+        os.remove(video)  # The pipeline moves accepted videos to final_videos/
+        destination = os.path.join(self.temp_dir, "videos_out", "A.mp4")
+        self.assertEqual(self.cache.get("k1", destination), destination)
+        with open(destination) as f:
+            self.assertEqual(f.read(), "video bytes")
+        self.assertIsNone(self.cache.get("missing", destination))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used_beyond_budgets(self):
+        self.cache.max_entries = 2
+        for key in ("k1", "k2"):
+            self.cache.put(key, self.write(f"{key}.mp4", key), key)
+        self.cache.get("k1", os.path.join(self.temp_dir, "restored.mp4"))  # k2 is now the least recently used
+        self.cache.put("k3", self.write("k3.mp4", "k3"), "k3")
+        self.assertIsNone(self.cache.get("k2", os.path.join(self.temp_dir, "restored.mp4")))
+        self.assertFalse(os.path.exists(os.path.join(self.cache.cache_dir, "k2.mp4")))
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+
+        self.cache.max_bytes = 2
+        self.cache.put("k4", self.write("k4.mp4", "k4"), "k4")
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_entry_with_missing_file_is_a_miss(self):
+        self.cache.put("k1", self.write("A.mp4", "video"), "A")
+        os.remove(os.path.join(self.cache.cache_dir, "k1.mp4"))
+        self.assertIsNone(self.cache.get("k1", os.path.join(self.temp_dir, "restored.mp4")))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+    def test_renderer_returns_cached_video_without_rendering(self):
+        with patch.object(config, "RENDER_WARM_WORKERS", False), patch.object(config, "RENDER_CACHE_ENABLED", False):
+            renderer = ManimRenderer()
+        renderer.render_cache = self.cache
+        renderer.base_media_dir = self.temp_dir
+        script = self.write("scene_02_cached.py", "from manim import *\nclass Cached(Scene):\n    pass\n")
+        self.cache.put(render_cache_key(script, "Cached"), self.write("Cached.mp4", "video"), "Cached")
+        with patch("project_drishti.manim_renderer.run_cancellable") as run_cancellable:
+            success, video_path, error = renderer.render_scene(script, "Cached")
+        run_cancellable.assert_not_called()
+        self.assertTrue(success)
+        self.assertEqual(video_path, renderer._expected_video_path(script, "Cached"))
+        self.assertTrue(os.path.exists(video_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
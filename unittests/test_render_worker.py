@@ -0,0 +1,125 @@
+"""
+Unit tests for the render_worker module (warm Manim render processes).
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from project_drishti import config
+from project_drishti.render_worker import WORKER_DIED_RETURNCODE, RenderWorkerPool
+
+
+class TestRenderWorkerPool(unittest.TestCase):
+    """
+    The workers preload only the standard library, so the pool's protocol, reuse, retirement
+    and cancellation are tested without Manim. The jobs themselves fail without Manim installed.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir_patch = patch.object(config, "MANIM_LOG_DIR", self.temp_dir)
+        self.log_dir_patch.start()
+        self.env = dict(os.environ)
+        self.pool = RenderWorkerPool(preload=["json"], max_idle=2, max_jobs_per_worker=2, startup_timeout=60)
+        self.job = {"script_path": os.path.join(self.temp_dir, "missing.py"), "scene_class_name": "Missing", "manim_config": {}}
+
+    def tearDown(self):
+        self.pool.close()
+        self.log_dir_patch.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def idle_pids(self):
+        return [worker.process.pid for idle in self.pool._idle.values() for worker in idle]
+
+    def test_failed_job_returns_traceback_and_keeps_worker(self):
+        process = self.pool.render(self.job, self.env)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn("Traceback", process.stderr)
+        self.assertEqual(len(self.idle_pids()), 1)
+
+    def test_worker_is_reused_then_retired_after_max_jobs(self):
+        self.pool.render(self.job, self.env)
+        first_pid = self.idle_pids()
+        self.pool.render(self.job, self.env)
+        self.assertEqual(self.idle_pids(), [])  # Retired after its second job
+        self.pool.render(self.job, self.env)
+        self.assertNotEqual(self.idle_pids(), first_pid)
+
+    def test_cancel_kills_worker(self):
+        cancel_event = threading.Event()
+        with patch("project_drishti.render_worker.RenderWorker.run", autospec=True) as run:
+            def wait_for_cancel(worker, job, event, timeout=None):
+                event.wait()
+                return worker._read_message(cancel_event=event)
+            run.side_effect = wait_for_cancel
+            timer = threading.Timer(0.2, cancel_event.set)
+            timer.start()
+            process = self.pool.render(self.job, self.env, cancel_event)
+        self.assertEqual(process.stderr, "Render cancelled.")
+        self.assertEqual(self.idle_pids(), [])
+
+    def test_worker_dying_during_job_is_reported_and_replaced(self):
+        self.pool.render(self.job, self.env)
+        first_pid = self.idle_pids()
+        with patch("project_drishti.render_worker.RenderWorker.run", autospec=True) as run:
+            def crash(worker, job, event, timeout=None):
+                os.kill(worker.process.pid, 9)
+                return worker._read_message(cancel_event=event)
+            run.side_effect = crash
+            process = self.pool.render(self.job, self.env)
+        self.assertEqual(process.returncode, WORKER_DIED_RETURNCODE)
+        self.assertIn("exited unexpectedly", process.stderr)
+        self.assertEqual(self.pool.render(self.job, self.env).returncode, 1)
+        self.assertNotEqual(self.idle_pids(), first_pid)
+
+    def test_async_cancel_kills_worker(self):
+        async def cancelled_render():
+            with patch("project_drishti.render_worker.RenderWorker.run", autospec=True) as run:
+                run.side_effect = lambda worker, job, event, timeout=None: worker._read_message(cancel_event=event)
+                task = asyncio.ensure_future(self.pool.render_async(self.job, self.env))
+                await asyncio.sleep(0.5)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+        asyncio.run(cancelled_render())
+        self.assertEqual(self.idle_pids(), [])
+
+    def test_live_workers_are_capped(self):
+        pool = RenderWorkerPool(preload=["json"], max_idle=2, max_workers=2, startup_timeout=60)
+        self.addCleanup(pool.close)
+        running, peak, lock = [0], [0], threading.Lock()
+        with patch("project_drishti.render_worker.RenderWorker.run", autospec=True) as run:
+            def slow_job(worker, job, event, timeout=None):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.3)
+                with lock:
+                    running[0] -= 1
+                return {"returncode": 0, "output": ""}
+            run.side_effect = slow_job
+            threads = [threading.Thread(target=pool.render, args=(self.job, self.env)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # An idle worker started for another environment makes room for a new one
+            self.assertEqual(pool.render(self.job, {**self.env, "RENDER_WORKER_TEST": "1"}).returncode, 0)
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(pool._live, 2)
+
+    def test_unavailable_when_preload_fails(self):
+        pool = RenderWorkerPool(preload=["no_such_module_for_render_worker"], startup_timeout=60)
+        self.assertIsNone(pool.render(self.job, self.env))
+        self.assertIn("no_such_module_for_render_worker", pool.unavailable_reason)
+        started = time.monotonic()
+        self.assertIsNone(pool.render(self.job, self.env))
+        self.assertLess(time.monotonic() - started, 1)  # No new start attempt
+
+
+if __name__ == "__main__":
+    unittest.main()
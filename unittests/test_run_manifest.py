@@ -0,0 +1,85 @@
+"""
+Unit tests for the RunManifest module (pipeline checkpoint/resume).
+"""
+import unittest
+import os
+import shutil
+import tempfile
+from project_drishti.run_manifest import (
+    RunManifest,
+    STAGE_ANALYZED,
+    STAGE_FINALIZED,
+    STAGE_RENDERED,
+    STAGE_SCRIPT_GENERATED,
+)
+
+class TestRunManifest(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary manifest directory and a dummy artifact."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.topic = "Test Topic For Manifest"
+        self.scene_key = "Scene One"
+        self.script_path = os.path.join(self.temp_dir, "scene_01.py")
+        with open(self.script_path, "w") as f:
+            f.write("from manim import *\n")
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stage_round_trip(self):
+        """A recorded stage is visible after reloading the manifest from disk."""
+        manifest = RunManifest(self.topic, manifest_dir=self.temp_dir)
+        manifest.record_stage(self.scene_key, STAGE_SCRIPT_GENERATED, self.script_path, class_name="Scene1One")
+
+        reloaded = RunManifest.load(self.topic, manifest_dir=self.temp_dir)
+        entry = reloaded.verified_stage(self.scene_key, STAGE_SCRIPT_GENERATED)
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry["path"], os.path.abspath(self.script_path))
+        self.assertEqual(entry["class_name"], "Scene1One")
+
+    def test_modified_artifact_fails_verification(self):
+        """A stage whose artifact changed on disk is not reused."""
+        manifest = RunManifest(self.topic, manifest_dir=self.temp_dir)
+        manifest.record_stage(self.scene_key, STAGE_SCRIPT_GENERATED, self.script_path, class_name="Scene1One")
+        with open(self.script_path, "a") as f:
+            f.write("# edited\n")
+        self.assertIsNone(manifest.verified_stage(self.scene_key, STAGE_SCRIPT_GENERATED))
+
+    def test_missing_artifact_fails_verification(self):
+        """A stage whose artifact was deleted is not reused."""
+        manifest = RunManifest(self.topic, manifest_dir=self.temp_dir)
+        manifest.record_stage(self.scene_key, STAGE_SCRIPT_GENERATED, self.script_path, class_name="Scene1One")
+        os.remove(self.script_path)
+        self.assertIsNone(manifest.verified_stage(self.scene_key, STAGE_SCRIPT_GENERATED))
+
+    def test_recording_stage_clears_later_stages(self):
+        """Regenerating a script invalidates the render and analysis built from the old one."""
+        video_path = os.path.join(self.temp_dir, "Scene1One.mp4")
+        with open(video_path, "wb") as f:
+            f.write(b"video")
+        manifest = RunManifest(self.topic, manifest_dir=self.temp_dir)
+        manifest.record_stage(self.scene_key, STAGE_SCRIPT_GENERATED, self.script_path, class_name="Scene1One")
+        manifest.record_stage(self.scene_key, STAGE_RENDERED, video_path)
+        manifest.record_stage(self.scene_key, STAGE_ANALYZED, video_path)
+
+        manifest.record_stage(self.scene_key, STAGE_SCRIPT_GENERATED, self.script_path, class_name="Scene1One")
+        self.assertIsNone(manifest.verified_stage(self.scene_key, STAGE_RENDERED))
+        self.assertIsNone(manifest.verified_stage(self.scene_key, STAGE_ANALYZED))
+        self.assertIsNone(manifest.verified_stage(self.scene_key, STAGE_FINALIZED))
+
+    def test_didactic_script_round_trip(self):
+        """The didactic script is stored inline and verified by hash."""
+        script = {"topic": self.topic, "scenes": [{"scene_number": 1, "title": "A", "narration": "B"}]}
+        manifest = RunManifest(self.topic, manifest_dir=self.temp_dir)
+        manifest.record_didactic_script(script)
+
+        reloaded = RunManifest.load(self.topic, manifest_dir=self.temp_dir)
+        self.assertEqual(reloaded.get_didactic_script(), script)
+
+        reloaded.data["didactic_script"]["script"]["scenes"][0]["title"] = "Tampered"
+        self.assertIsNone(reloaded.get_didactic_script())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit tests for the scheduling module (global resource limits and stage pools).
+"""
+import unittest
+import asyncio
+from project_drishti.scheduling import FairLimiter, StagePool
+
+class TestFairLimiter(unittest.TestCase):
+
+    def test_limit_is_respected(self):
+        """No more than `limit` holders run at the same time."""
+        async def scenario():
+            limiter = FairLimiter("test", 2)
+            running = 0
+            peak = 0
+
+            async def worker():
+                nonlocal running, peak
+                async with limiter.slot("topic"):
+                    running += 1
+                    peak = max(peak, running)
+                    await asyncio.sleep(0.01)
+                    running -= 1
+
+            await asyncio.gather(*(worker() for _ in range(6)))
+            return peak, limiter.active
+
+        peak, active_after = asyncio.run(scenario())
+        self.assertEqual(peak, 2)
+        self.assertEqual(active_after, 0)
+
+    def test_slots_are_granted_round_robin_across_keys(self):
+        """A key with many waiters does not starve a key with few."""
+        async def scenario():
+            limiter = FairLimiter("test", 1)
+            order = []
+            release_first = asyncio.Event()
+
+            async def holder():
+                async with limiter.slot("topic_a"):
+                    await release_first.wait()
+
+            async def worker(key, label):
+                async with limiter.slot(key):
+                    order.append(label)
+
+            first = asyncio.ensure_future(holder())
+            await asyncio.sleep(0)
+            tasks = [asyncio.ensure_future(worker("topic_a", f"a{i}")) for i in range(3)]
+            tasks.append(asyncio.ensure_future(worker("topic_b", "b0")))
+            await asyncio.sleep(0)
+            release_first.set()
+            await asyncio.gather(first, *tasks)
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ["a0", "b0", "a1", "a2"])
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        """Cancelling a queued waiter leaves the limiter usable."""
+        async def scenario():
+            limiter = FairLimiter("test", 1)
+            await limiter.acquire("topic")
+            waiter = asyncio.ensure_future(limiter.acquire("topic"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+            limiter.release()
+            await asyncio.wait_for(limiter.acquire("other"), timeout=1)
+            return limiter.active, limiter.waiting
+
+        self.assertEqual(asyncio.run(scenario()), (1, 0))
+
+    def test_try_acquire_takes_a_slot_only_if_one_is_free(self):
+        async def scenario():
+            limiter = FairLimiter("test", 2)
+            taken = [limiter.try_acquire(), limiter.try_acquire(), limiter.try_acquire()]
+            waiter = asyncio.ensure_future(limiter.acquire("topic"))
+            await asyncio.sleep(0)
+            limiter.release()
+            # The freed slot goes to the waiter, not to a caller that does not wait
+            taken.append(limiter.try_acquire())
+            await waiter
+            return taken, limiter.active
+
+        self.assertEqual(asyncio.run(scenario()), ([True, True, False, False], 2))
+
+class TestStagePool(unittest.TestCase):
+
+    def test_workers_bound_concurrency_and_return_results(self):
+        """At most `workers` jobs run at once and each caller gets its own result."""
+        async def scenario():
+            pool = StagePool("test", workers=2, max_queue=4)
+            running = 0
+            peak = 0
+
+            async def job(value):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                return value * 2
+
+            results = await asyncio.gather(*(pool.run("topic", job, i) for i in range(8)))
+            await pool.close()
+            return results, peak
+
+        results, peak = asyncio.run(scenario())
+        self.assertEqual(results, [i * 2 for i in range(8)])
+        self.assertEqual(peak, 2)
+
+    def test_job_exception_reaches_caller(self):
+        """An exception raised by a job is re-raised in the submitting coroutine."""
+        async def scenario():
+            pool = StagePool("test", workers=1)
+
+            async def failing_job():
+                raise RuntimeError("render failed")
+
+            try:
+                with self.assertRaises(RuntimeError):
+                    await pool.run("topic", failing_job)
+                # The worker survives the failure
+                async def ok_job():
+                    return "ok"
+                return await pool.run("topic", ok_job)
+            finally:
+                await pool.close()
+
+        self.assertEqual(asyncio.run(scenario()), "ok")
+
+    def test_full_queue_applies_backpressure(self):
+        """Submitting to a full stage waits until a worker takes a job."""
+        async def scenario():
+            pool = StagePool("test", workers=1, max_queue=1)
+            release = asyncio.Event()
+
+            async def blocking_job():
+                await release.wait()
+
+            running = asyncio.ensure_future(pool.run("topic", blocking_job))
+            await asyncio.sleep(0)
+            queued = asyncio.ensure_future(pool.run("topic", blocking_job))
+            await asyncio.sleep(0)
+            blocked = asyncio.ensure_future(pool.run("topic", blocking_job))
+            await asyncio.sleep(0.01)
+            queue_depth = pool.queued
+            release.set()
+            await asyncio.gather(running, queued, blocked)
+            await pool.close()
+            return queue_depth
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the script_validator module (static checks before rendering).
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from project_drishti import script_validator
+from project_drishti.script_validator import ScriptValidator, format_validation_error
+
+# A small stand-in for the index built from the installed Manim packages
+INDEX = {
+    "versions": {"manim": "0.19.0", "manim_voiceover": "0.3.7"},
+    "modules": {
+        "manim": ["Circle", "Create", "RED", "Text", "UP", "Scene"],
+        "manim_voiceover": ["VoiceoverScene"],
+        "manim_voiceover.services.openai": ["OpenAIService"],
+    },
+    "signatures": {"Circle": ["color", "radius"], "Text": ["color", "font_size", "text"], "Create": None, "Scene": None},
+    "color_constants": ["RED"],
+}
+
+HEADER = """from manim import *
+from manim_voiceover import VoiceoverScene
+from anim_gemini.layout_utils import *
+import anim_gemini.colors as mcolors
+"""
+
+def scene(body):
+    return HEADER + "class Scene1Intro(VoiceoverScene):\n    def construct(self):\n" + "".join(f"        {line}\n" for line in body)
+
+class TestScriptValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = ScriptValidator(index=INDEX)
+
+    def test_valid_script_passes(self):
+        code = scene([
+            "circle = Circle(radius=1, color=mcolors.BLUE)",
+            "label = create_smart_text('Hi', max_width=3)",
+            "self.play(Create(circle), run_time=2)",
+            "for i in range(3): self.wait(i)",
+        ])
+        self.assertEqual(self.validator.validate(code, "Scene1Intro"), [])
+
+    def test_syntax_error_and_missing_class(self):
+        self.assertIn("SyntaxError", self.validator.validate("def broken(:\n", "Scene1Intro")[0])
+        problems = self.validator.validate(HEADER + "class Other(VoiceoverScene):\n    pass\n", "Scene1Intro")
+        self.assertIn("'Scene1Intro' is not defined", problems[0])
+
+    def test_undefined_name_and_bad_import(self):
+        code = "from manim import Circl\n" + scene(["self.play(Creat(Circle()))"])
+        problems = "\n".join(self.validator.validate(code, "Scene1Intro"))
+        self.assertIn("cannot import name 'Circl'", problems)
+        self.assertIn("name 'Creat' is not defined. Did you mean 'Create'?", problems)
+
+    def test_unknown_constructor_keyword(self):
+        problems = self.validator.validate(scene(["c = Circle(radious=2)", "self.play(Create(c, lag=1))"]), "Scene1Intro")
+        self.assertEqual(len(problems), 1)  # Create's signature is open-ended
+        self.assertIn("Circle() got an unexpected keyword argument 'radious'. Did you mean 'radius'?", problems[0])
+
+    def test_palette_is_enforced(self):
+        code = scene(["a = Circle(color=RED)", "b = Text('x', color='#FF0000')", "c = Circle(color=mcolors.NEON)"])
+        problems = "\n".join(self.validator.validate(code, "Scene1Intro"))
+        self.assertIn("use mcolors.RED instead of the bare Manim color RED", problems)
+        self.assertIn("color='#FF0000' is not a palette color", problems)
+        self.assertIn("mcolors.NEON is not in the color palette", problems)
+        self.assertEqual(ScriptValidator(index=INDEX, enforce_palette=False).validate(scene(["a = Circle(color=RED)"]), "Scene1Intro"), [])
+
+    def test_unavailable_index_skips_validation(self):
+        with patch.object(script_validator, "load_namespace_index", return_value=None):
+            validator = ScriptValidator()
+        self.assertFalse(validator.available)
+        self.assertEqual(validator.validate("def broken(:\n", "Scene1Intro"), [])
+
+    def test_saved_index_is_reused_for_same_versions(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        index_path = os.path.join(temp_dir, "index.json")
+        with open(index_path, "w") as f:
+            json.dump(INDEX, f)
+        with patch.object(script_validator, "_package_versions", return_value=INDEX["versions"]), \
+             patch.object(script_validator, "build_namespace_index") as build:
+            self.assertEqual(script_validator.load_namespace_index(index_path), INDEX)
+            build.assert_not_called()
+
+    def test_error_message_lists_problems(self):
+        self.assertEqual(format_validation_error(["line 1: a", "line 2: b"]), "Static validation failed before rendering:\n- line 1: a\n- line 2: b")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the section_render module (parallel rendering of scene sections).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from project_drishti.section_render import concat_command, plan_sections, prepare_section_media_dir, section_job
+
+
+class TestSectionRender(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_short_scene_is_not_split(self):
+        self.assertEqual(plan_sections([0.0, 1.0, 2.0], [0], 3.0, max_sections=4, min_animations=12), [(0, 3)])
+
+    def test_cuts_only_where_voiceovers_start(self):
+        # One untimed intro animation, then six voiceovers of three animations and 3.5 seconds each
+        animation_times = [0.0]
+        for block in range(6):
+            start = 1.0 + 3.5 * block
+            animation_times += [start, start + 1.0, start + 2.0]
+        voiceover_starts = [1, 4, 7, 10, 13, 16]
+        sections = plan_sections(animation_times, voiceover_starts, 22.0, max_sections=3, min_animations=4)
+        self.assertEqual(sections, [(0, 7), (7, 13), (13, 19)])
+
+    def test_scene_without_voiceovers_is_split_evenly(self):
+        sections = plan_sections([float(index) for index in range(20)], [], 20.0, max_sections=4, min_animations=4)
+        self.assertEqual(sections, [(0, 5), (5, 10), (10, 15), (15, 20)])
+
+    def test_single_voiceover_leaves_nowhere_to_cut(self):
+        self.assertEqual(plan_sections([float(index) for index in range(20)], [0], 20.0, max_sections=4, min_animations=4), [(0, 20)])
+
+    def test_section_job_renders_its_range_into_its_own_media_dir(self):
+        job = {"script_path": "s.py", "scene_class_name": "S", "manim_config": {"media_dir": "/media", "quality": "low_quality"}}
+        middle = section_job(job, "/media", "/media/sections/1", 7, 13, 19, 12.5)
+        self.assertEqual(middle["manim_config"]["media_dir"], "/media/sections/1")
+        self.assertEqual(middle["manim_config"]["tex_dir"], "/media/Tex")
+        self.assertEqual((middle["manim_config"]["from_animation_number"], middle["manim_config"]["upto_animation_number"]), (7, 12))
+        self.assertEqual(middle["section"], {"first": 7, "upto": 12, "start_time": 12.5})
+        last = section_job(job, "/media", "/media/sections/2", 13, 19, 19, 20.0)
+        self.assertEqual(last["manim_config"]["upto_animation_number"], -1)
+        self.assertEqual(job["manim_config"]["media_dir"], "/media")
+
+    def test_section_gets_own_voiceover_index(self):
+        voiceover_dir = os.path.join(self.temp_dir, "media", "voiceovers")
+        os.makedirs(voiceover_dir)
+        for file_name in ("cache.json", "hello.mp3"):
+            with open(os.path.join(voiceover_dir, file_name), "w") as f:
+                f.write("[]")
+        section_dir = os.path.join(self.temp_dir, "section")
+        prepare_section_media_dir(os.path.join(self.temp_dir, "media"), section_dir)
+        self.assertFalse(os.path.islink(os.path.join(section_dir, "voiceovers", "cache.json")))
+        self.assertTrue(os.path.islink(os.path.join(section_dir, "voiceovers", "hello.mp3")))
+
+    def test_concat_list_quotes_paths(self):
+        list_path = os.path.join(self.temp_dir, "sections.txt")
+        command = concat_command(["/v/a.mp4", "/v/it's.mp4"], list_path, "/v/out.mp4")
+        self.assertEqual(command[command.index("-c") + 1], "copy")
+        with open(list_path) as f:
+            self.assertEqual(f.read(), "file '/v/a.mp4'\nfile '/v/it'\\''s.mp4'\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Unit tests for the sqlite_utils module (shared SQLite connection, transaction and eviction helpers).
+"""
+import unittest
+import os
+import shutil
+import tempfile
+from project_drishti.sqlite_utils import connection, create_schema, evict_least_recently_used, immediate_transaction, table_totals
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, label TEXT, size INTEGER NOT NULL, last_access REAL NOT NULL);"
+
+class TestSqliteUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "nested", "items.sqlite3")
+        create_schema(self.db_path, SCHEMA)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def insert(self, key, size, last_access):
+        with immediate_transaction(self.db_path) as conn:
+            conn.execute("INSERT INTO items VALUES (?, ?, ?, ?)", (key, f"label-{key}", size, last_access))
+
+    def test_transaction_rolls_back_on_error(self):
+        self.insert("a", 1, 1.0)
+        with self.assertRaises(RuntimeError):
+            with immediate_transaction(self.db_path) as conn:
+                conn.execute("DELETE FROM items")
+                raise RuntimeError("boom")
+        with connection(self.db_path) as conn:
+            self.assertEqual(table_totals(conn, "items"), (1, 1))
+
+    def test_evicts_oldest_rows_until_within_budgets(self):
+        for key, size, last_access in (("a", 10, 1.0), ("b", 10, 3.0), ("c", 10, 2.0)):
+            self.insert(key, size, last_access)
+        with immediate_transaction(self.db_path) as conn:
+            self.assertEqual(evict_least_recently_used(conn, "items", 3, 1000), [])
+            self.assertEqual(evict_least_recently_used(conn, "items", 3, 15, column="label"), ["label-a", "label-c"])
+            self.assertEqual(table_totals(conn, "items"), (1, 10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Unit tests for the subprocess_utils module (cancellable process groups).
+"""
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from project_drishti.subprocess_utils import run_cancellable, run_cancellable_async
+
+CHILD_SPAWNING_SCRIPT = (
+    "import subprocess, sys, time\n"
+    "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+    "open(sys.argv[1], 'w').write(str(child.pid))\n"
+    "time.sleep(30)\n"
+)
+
+def is_running(pid: int) -> bool:
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                if "State:\tZ" in f.read():
+                    return False  # Killed, waiting to be reaped
+        except FileNotFoundError:
+            return False
+        time.sleep(0.05)
+    return True
+
+class TestRunCancellable(unittest.TestCase):
+
+    def test_completes_like_subprocess_run(self):
+        """Without cancellation, output and return code are captured."""
+        result = run_cancellable([sys.executable, "-c", "import sys; print('out'); sys.exit(3)"])
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stdout.strip(), "out")
+
+    def test_timeout_kills_command(self):
+        started = time.monotonic()
+        result = run_cancellable([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5, poll_interval=0.1)
+        self.assertLess(result.returncode, 0)
+        self.assertLess(time.monotonic() - started, 10)
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "Process state is read from /proc")
+    def test_cancel_kills_whole_process_group(self):
+        """Setting the cancel event kills the command and the children it spawned."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pid_file = os.path.join(temp_dir, "child.pid")
+            cancel_event = threading.Event()
+            threading.Timer(0.5, cancel_event.set).start()
+            started = time.monotonic()
+            result = run_cancellable([sys.executable, "-c", CHILD_SPAWNING_SCRIPT, pid_file], cancel_event, poll_interval=0.05)
+
+            self.assertLess(time.monotonic() - started, 10)
+            self.assertNotEqual(result.returncode, 0)
+            with open(pid_file) as f:
+                child_pid = int(f.read())
+            self.assertFalse(is_running(child_pid))
+
+class TestRunCancellableAsync(unittest.TestCase):
+
+    def test_completes_like_subprocess_run(self):
+        result = asyncio.run(run_cancellable_async([sys.executable, "-c", "import sys; print('out'); sys.exit(3)"]))
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stdout.strip(), "out")
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "Process state is read from /proc")
+    def test_timeout_kills_whole_process_group(self):
+        """Cancelling the awaiting task (here via wait_for) kills the command and its children."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pid_file = os.path.join(temp_dir, "child.pid")
+
+            async def run():
+                command = [sys.executable, "-c", CHILD_SPAWNING_SCRIPT, pid_file]
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(run_cancellable_async(command), timeout=1.0)
+
+            started = time.monotonic()
+            asyncio.run(run())
+            self.assertLess(time.monotonic() - started, 10)
+            with open(pid_file) as f:
+                child_pid = int(f.read())
+            self.assertFalse(is_running(child_pid))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for the usage_tracker module (token, latency and cost accounting with budgets).
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from project_drishti.usage_tracker import UsageTracker, estimate_usage, usage_difference, usage_from_response
+
+PRICES = {"model-a": {"input": 1.0, "output": 4.0, "cached_input": 0.5}}
+
+
+def openai_response(prompt_tokens, completion_tokens, reasoning_tokens=0, cached_tokens=0, cost=None):
+    usage = SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        completion_tokens_details=SimpleNamespace(reasoning_tokens=reasoning_tokens),
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+    if cost is not None:
+        usage.cost = cost
+    return SimpleNamespace(usage=usage)
+
+
+class TestUsageFromResponse(unittest.TestCase):
+
+    def test_reads_openai_style_usage(self):
+        usage = usage_from_response(openai_response(1000, 300, reasoning_tokens=200, cached_tokens=800, cost=0.01))
+        self.assertEqual(usage, {
+            "prompt_tokens": 1000, "completion_tokens": 300, "reasoning_tokens": 200, "cached_tokens": 800, "cost": 0.01
+        })
+
+    def test_reads_gemini_usage_metadata(self):
+        metadata = SimpleNamespace(prompt_token_count=5000, candidates_token_count=40, thoughts_token_count=900, cached_content_token_count=None)
+        usage = usage_from_response(SimpleNamespace(usage_metadata=metadata))
+        self.assertEqual(usage["prompt_tokens"], 5000)
+        self.assertEqual(usage["completion_tokens"], 940)
+        self.assertEqual(usage["reasoning_tokens"], 900)
+        self.assertEqual(usage["cached_tokens"], 0)
+
+    def test_response_without_usage(self):
+        self.assertIsNone(usage_from_response(SimpleNamespace(usage=None)))
+        self.assertIsNone(usage_from_response(None))
+
+
+class TestUsageTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = UsageTracker(prices=PRICES, scene_token_budget=0, scene_cost_budget=0, topic_token_budget=0, topic_cost_budget=0)
+
+    def test_cost_from_prices_discounts_cached_tokens(self):
+        record = self.tracker.record_response(openai_response(1_000_000, 100_000, cached_tokens=400_000), "Topic", "S1", "codegen", "model-a", 2.0)
+        self.assertAlmostEqual(record["cost"], 0.6 + 0.2 + 0.4)
+
+    def test_reported_cost_wins_and_unpriced_models_cost_nothing(self):
+        reported = self.tracker.record_response(openai_response(1000, 10, cost=0.25), "Topic", "S1", "codegen", "model-a", 1.0)
+        unpriced = self.tracker.record_response(openai_response(1000, 10), "Topic", "S1", "codegen", "other/model-b", 1.0)
+        self.assertEqual(reported["cost"], 0.25)
+        self.assertEqual(unpriced["cost"], 0.0)
+
+    def test_topic_spaces_and_underscores_are_the_same_topic(self):
+        self.tracker.record_response(openai_response(100, 10), "The Topic", None, "script", "model-a", 1.0)
+        self.tracker.record_response(openai_response(200, 20), "The_Topic", "S1", "codegen", "model-a", 1.0)
+        totals = self.tracker.totals("The_Topic")
+        self.assertEqual((totals["calls"], totals["prompt_tokens"], totals["completion_tokens"]), (2, 300, 30))
+        self.assertEqual(self.tracker.totals("The Topic", "S1")["calls"], 1)
+
+    def test_scene_and_topic_budgets(self):
+        self.tracker.scene_token_budget = 1000
+        self.tracker.topic_cost_budget = 0.5
+        self.tracker.record_response(openai_response(600, 100, cost=0.1), "T", "S1", "codegen", "model-a", 1.0)
+        self.assertIsNone(self.tracker.budget_exceeded("T", "S1"))
+        self.tracker.record_response(openai_response(300, 100, cost=0.1), "T", "S1", "fix", "model-a", 1.0)
+        self.assertIn("Scene token budget", self.tracker.budget_exceeded("T", "S1"))
+        self.assertIsNone(self.tracker.budget_exceeded("T", "S2"))
+        self.tracker.record_response(openai_response(10, 10, cost=0.4), "T", "S2", "codegen", "model-a", 1.0)
+        self.assertIn("Topic cost budget", self.tracker.budget_exceeded("T", "S2"))
+        self.assertIn("Topic cost budget", self.tracker.budget_exceeded("T"))
+
+    def test_attempt_usage_is_a_difference_of_snapshots(self):
+        self.tracker.record_response(openai_response(100, 10), "T", "S1", "codegen", "model-a", 1.0)
+        mark = self.tracker.totals("T", "S1")
+        self.tracker.record(estimate_usage(4000, 400), "T", "S1", "fix", "model-a", 3.0)
+        attempt = usage_difference(self.tracker.totals("T", "S1"), mark)
+        self.assertEqual((attempt["calls"], attempt["estimated_calls"]), (1, 1))
+        self.assertEqual((attempt["prompt_tokens"], attempt["completion_tokens"]), (1000, 100))
+        self.assertAlmostEqual(attempt["latency"], 3.0)
+
+    def test_report_groups_by_topic_scene_and_stage(self):
+        self.tracker.record_response(openai_response(100, 10), "T", None, "script", "model-a", 1.0)
+        self.tracker.record_response(openai_response(200, 20), "T", "S1", "codegen", "model-a", 1.0)
+        self.tracker.record_response(openai_response(300, 30), "T", "S1", "fix", "model-a", 1.0)
+        self.tracker.record_response(openai_response(400, 40), "Other", "S1", "codegen", "model-a", 1.0)
+        report = self.tracker.report("T")
+        self.assertEqual(list(report["topics"]), ["T"])
+        topic = report["topics"]["T"]
+        self.assertEqual(topic["totals"]["prompt_tokens"], 600)
+        self.assertEqual(list(topic["scenes"]), ["S1"])
+        self.assertEqual(set(topic["scenes"]["S1"]["stages"]), {"codegen", "fix"})
+        self.assertEqual(topic["stages"]["script"]["calls"], 1)
+        self.assertEqual(self.tracker.report()["totals"]["calls"], 4)
+
+    def test_write_report(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        self.tracker.record_response(openai_response(100, 10), "T", "S1", "codegen", "model-a", 1.0)
+        path = self.tracker.write_report(os.path.join(temp_dir, "reports", "usage_T.json"), "T")
+        with open(path) as f:
+            self.assertEqual(json.load(f)["topics"]["T"]["totals"]["prompt_tokens"], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import os
 import shutil
+import tempfile
 from project_drishti.visual_architect import VisualArchitect
 from project_drishti import config # To access configured paths and API key status
 
@@ -17,9 +18,27 @@ class TestVisualArchitectLLM(unittest.TestCase):
         self.original_api_key = config.OPENROUTER_API_KEY
         if not config.OPENROUTER_API_KEY:
             config.OPENROUTER_API_KEY = "test_api_key_for_mocking"
-        
-        self.architect = VisualArchitect()
-        
+        # Keep responses from other tests (or real runs) out of the LLM cache
+        cache_patcher = patch.object(config, "LLM_CACHE_ENABLED", False)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        # Nor examples from earlier accepted scripts
+        exemplar_patcher = patch.object(config, "EXEMPLARS_ENABLED", False)
+        exemplar_patcher.start()
+        self.addCleanup(exemplar_patcher.stop)
+        # These tests mock a single non-streamed completion; streaming is covered by test_code_stream_guard
+        streaming_patcher = patch.object(config, "CODEGEN_STREAMING", False)
+        streaming_patcher.start()
+        self.addCleanup(streaming_patcher.stop)
+        # Scripts, debug files and the API guide index go to a temporary directory, not outputs/
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        scripts_dir_patcher = patch.object(config, "MANIM_SCRIPTS_DIR", os.path.join(self.temp_dir, "manim_scripts"))
+        scripts_dir_patcher.start()
+        self.addCleanup(scripts_dir_patcher.stop)
+
+        self.architect = self.make_architect()
+
         self.test_scripts_dir = os.path.abspath(config.MANIM_SCRIPTS_DIR)
         self.test_md_dir = os.path.abspath(self.architect.output_md_dir)
         os.makedirs(self.test_scripts_dir, exist_ok=True)
@@ -62,6 +81,13 @@ class TestVisualArchitectLLM(unittest.TestCase):
         except OSError:
             pass
 
+    def make_architect(self):
+        # API guide retrieval would build its index under outputs/
+        architect = VisualArchitect(api_guide_retrieval=False)
+        architect.output_md_dir = os.path.join(self.temp_dir, "visual_architect")
+        os.makedirs(architect.output_md_dir, exist_ok=True)
+        return architect
+
     @patch('project_drishti.visual_architect.OpenAI') # Patch where OpenAI is imported and used
     def test_generate_manim_code_success(self, mock_openai_class):
         """Test successful Manim code generation using a mocked LLM call."""
@@ -78,7 +104,7 @@ class TestVisualArchitectLLM(unittest.TestCase):
 
         # If config.OPENROUTER_API_KEY was None initially, VisualArchitect re-init it for client
         if not self.original_api_key:
-            self.architect = VisualArchitect() # Re-init to pick up the mocked client
+            self.architect = self.make_architect() # Re-init to pick up the mocked client
 
         # Use mock_open for file writing assertions
         m_open = mock_open()
@@ -93,8 +119,8 @@ class TestVisualArchitectLLM(unittest.TestCase):
         mock_client_instance.chat.completions.create.assert_called_once()
         args, kwargs = mock_client_instance.chat.completions.create.call_args
         self.assertEqual(kwargs['model'], config.OPENROUTER_MODEL_NAME)
-        self.assertIn(self.sample_scene_data['narration'], kwargs['messages'][0]['content'])
-        self.assertIn(f"class {self.expected_class_name}(Scene):", kwargs['messages'][0]['content'])
+        self.assertIn(self.sample_scene_data['narration'], kwargs['messages'][-1]['content'])
+        self.assertIn(f"class {self.expected_class_name}(Scene):", kwargs['messages'][-1]['content'])
 
         # Check that files were attempted to be written
         # First call to open is for the .py script, second is for the .md debug file.
@@ -148,7 +174,7 @@ class TestVisualArchitectLLM(unittest.TestCase):
         mock_openai_class.return_value = mock_client_instance
 
         if not self.original_api_key:
-            self.architect = VisualArchitect()
+            self.architect = self.make_architect()
 
         script_path, class_name = self.architect.generate_manim_code_for_scene(
             self.sample_scene_data, self.sample_topic
@@ -156,13 +182,66 @@ class TestVisualArchitectLLM(unittest.TestCase):
         self.assertIsNone(script_path)
         self.assertIsNone(class_name)
 
+    def test_fix_manim_code_patches_script_in_place(self):
+        """A fix applies the LLM's SEARCH/REPLACE block to the failing script and overwrites it."""
+        faulty_code = (
+            "from manim import *\n"
+            "from manim_voiceover import VoiceoverScene\n"
+            f"class {self.expected_class_name}(VoiceoverScene):\n"
+            "    def construct(self):\n"
+            "        c = Circle()\n"
+            "        self.play(Creat(c))"
+        )
+        patch_response = MagicMock()
+        patch_response.choices = [MagicMock()]
+        patch_response.choices[0].message.content = (
+            "<<<<<<< SEARCH\n        self.play(Creat(c))\n=======\n        self.play(Create(c))\n>>>>>>> REPLACE"
+        )
+        self.architect.client = MagicMock()
+        self.architect.client.chat.completions.create.return_value = patch_response
+        fix_md_path = os.path.join(self.test_md_dir, f"visual_script_fix_{os.path.splitext(self.expected_script_filename)[0]}.md")
+        self.addCleanup(lambda: os.path.exists(fix_md_path) and os.remove(fix_md_path))
+
+        script_path, class_name = self.architect.fix_manim_code_for_scene(
+            self.sample_scene_data, self.sample_topic, faulty_code,
+            error_message=f'File "{self.expected_script_path}", line 6, in construct\nNameError: name \'Creat\' is not defined',
+            script_path=self.expected_script_path
+        )
+
+        self.assertEqual((script_path, class_name), (self.expected_script_path, self.expected_class_name))
+        with open(script_path) as f:
+            fixed_code = f.read()
+        self.assertIn("self.play(Create(c))", fixed_code)
+        self.assertNotIn("Creat(c)", fixed_code)
+        kwargs = self.architect.client.chat.completions.create.call_args.kwargs
+        self.assertIn(">>   6 |         self.play(Creat(c))", kwargs['messages'][-1]['content'])
+
+    def test_fix_manim_code_gives_up_when_patch_does_not_apply(self):
+        """A patch whose SEARCH text is not in the script is sent back, then the fix fails."""
+        bad_response = MagicMock()
+        bad_response.choices = [MagicMock()]
+        bad_response.choices[0].message.content = "<<<<<<< SEARCH\nnot in the script\n=======\nx = 1\n>>>>>>> REPLACE"
+        self.architect.client = MagicMock()
+        self.architect.client.chat.completions.create.return_value = bad_response
+
+        with patch.object(config, "FIX_MAX_PATCH_ROUNDS", 2):
+            result = self.architect.fix_manim_code_for_scene(
+                self.sample_scene_data, self.sample_topic, "x = 0", error_message="boom",
+                script_path=self.expected_script_path
+            )
+
+        self.assertEqual(result, (None, None))
+        self.assertEqual(self.architect.client.chat.completions.create.call_count, 2)
+        self.assertIn("could not be applied", self.architect.client.chat.completions.create.call_args.kwargs['messages'][-1]['content'])
+        self.assertFalse(os.path.exists(self.expected_script_path))
+
     def test_init_without_api_key(self):
         """Test VisualArchitect initialization when API key is missing (should not raise, but log error)."""
         original_key = config.OPENROUTER_API_KEY
         config.OPENROUTER_API_KEY = None
         try:
             # Should log an error but not necessarily raise during init for POC flexibility
-            architect_no_key = VisualArchitect()
+            architect_no_key = VisualArchitect(api_guide_retrieval=False)
             self.assertIsNone(architect_no_key.client) # Client should be None if key is missing
             # Attempting to generate code should then fail gracefully (tested in test_generate_manim_code_llm_failure via side_effect)
         finally: